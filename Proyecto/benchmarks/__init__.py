@@ -0,0 +1,8 @@
+"""
+Benchmarks de rendimiento de CardSIM
+
+Escenarios fijos que se ejecutan con `python -m benchmarks.bench_core` desde el
+directorio Proyecto y guardan los resultados en JSON para comparar entre commits
+con `python -m benchmarks.compare antes.json despues.json`. Los de repintado de
+la interfaz (`python -m benchmarks.bench_gui`) necesitan un display o Xvfb.
+"""
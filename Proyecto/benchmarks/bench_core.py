@@ -0,0 +1,141 @@
+"""
+Benchmarks del núcleo del simulador (sin interfaz)
+
+    python -m benchmarks.bench_core -o core.json
+    python -m benchmarks.bench_core -k "memory.*"
+
+Escenarios: MemoryManager (inicialización, lectura/escritura de 1/16/255 bytes,
+bits de protección), ciclos de PSC incorrecto/correcto en APDUHandler, datos de
+la tabla de memoria con colores, guardar/abrir ficheros de tarjeta y creación de
+100 sesiones.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+
+from benchmarks.harness import Benchmark, main_for_suite
+
+from src.utils.constants import CARD_TYPE_5542, CARD_TYPE_5528, DEFAULT_PSC_5542, DEFAULT_PSC_5528
+from src.core.memory_manager import MemoryManager
+from src.core.apdu_handler import APDUHandler
+from src.core.session_manager import SessionManager
+
+CARD_TYPES = {'5542': CARD_TYPE_5542, '5528': CARD_TYPE_5528}
+TRANSFER_SIZES = (1, 16, 255)
+USER_AREA_ADDRESS = 0x100  # Página 1 de la SLE5528: sin direcciones protegidas
+SESSIONS_TO_CREATE = 100
+
+
+def initialized_memory(card_type):
+    memory_manager = MemoryManager()
+    memory_manager.initialize_memory(card_type)
+    return memory_manager
+
+
+def memory_benchmarks():
+    benchmarks = []
+    for tag, card_type in CARD_TYPES.items():
+        benchmarks.append(Benchmark(
+            f"memory.initialize[{tag}]",
+            setup=MemoryManager,
+            run=lambda memory_manager, card_type=card_type: memory_manager.initialize_memory(card_type)))
+
+    for length in TRANSFER_SIZES:
+        data = [(address * 7) & 0xFF for address in range(length)]
+        benchmarks.append(Benchmark(
+            f"memory.read[{length}]",
+            setup=lambda: initialized_memory(CARD_TYPE_5528),
+            run=lambda memory_manager, length=length: memory_manager.read_memory(USER_AREA_ADDRESS, length)))
+        benchmarks.append(Benchmark(
+            f"memory.write[{length}]",
+            setup=lambda: initialized_memory(CARD_TYPE_5528),
+            run=lambda memory_manager, data=data: memory_manager.write_memory(USER_AREA_ADDRESS, data)))
+
+    def protected_memory():
+        memory_manager = initialized_memory(CARD_TYPE_5542)
+        for address in range(0, 32, 3):
+            memory_manager.set_protection_bit(address)
+        return memory_manager
+
+    def check_protection(memory_manager):
+        memory_manager.get_protection_bits()
+        for address in range(32):
+            memory_manager.is_protected(address)
+
+    benchmarks.append(Benchmark("memory.protection_bits[5542]", setup=protected_memory, run=check_protection))
+    return benchmarks
+
+
+def apdu_benchmarks():
+    benchmarks = []
+    for tag, card_type, correct_psc in (('5542', CARD_TYPE_5542, DEFAULT_PSC_5542),
+                                        ('5528', CARD_TYPE_5528, DEFAULT_PSC_5528)):
+        wrong_psc = [0x00] * len(correct_psc)
+
+        def setup(card_type=card_type):
+            memory_manager = initialized_memory(card_type)
+            return APDUHandler(memory_manager, card_type)
+
+        def verify_fail_cycle(handler, wrong_psc=wrong_psc, correct_psc=list(correct_psc)):
+            # Un intento fallido y el correcto, que restablece el contador
+            handler.process_present_psc(wrong_psc)
+            handler.process_present_psc(correct_psc)
+
+        benchmarks.append(Benchmark(f"apdu.psc_fail_verify[{tag}]", setup=setup, run=verify_fail_cycle))
+    return benchmarks
+
+
+def display_benchmarks():
+    return [Benchmark(f"display.memory_colors[{tag}]",
+                      setup=lambda card_type=card_type: initialized_memory(card_type),
+                      run=lambda memory_manager: memory_manager.get_memory_display_data_with_colors(True))
+            for tag, card_type in CARD_TYPES.items()]
+
+
+class FileRoundTrip:
+    """Sesión con datos de usuario que se guarda y se vuelve a abrir en un directorio temporal"""
+
+    def __init__(self, card_type):
+        self.directory = tempfile.mkdtemp(prefix="cardsim_bench_")
+        self.path = os.path.join(self.directory, "card.txt")
+        self.session_manager = SessionManager()
+        self.session, _ = self.session_manager.create_new_card_session("bench_source", card_type)
+        self.session.memory_manager.write_memory(0x20, [(address * 13) & 0xFF for address in range(0xC0)])
+
+    def run(self):
+        self.session_manager.save_session_to_file(self.session.session_id, self.path)
+        session, message = self.session_manager.open_card_from_file(self.path, "bench_copy")
+        if session is None:
+            raise RuntimeError(message)
+        self.session_manager.close_session(session.session_id)
+
+    def close(self):
+        self.session_manager.close_all_sessions()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def file_benchmarks():
+    return [Benchmark(f"file.save_open[{tag}]",
+                      setup=lambda card_type=card_type: FileRoundTrip(card_type),
+                      run=FileRoundTrip.run, teardown=FileRoundTrip.close)
+            for tag, card_type in CARD_TYPES.items()]
+
+
+def session_benchmarks():
+    def create_sessions(session_manager):
+        for index in range(SESSIONS_TO_CREATE):
+            session_manager.create_new_card_session(f"card_{index:03d}", CARD_TYPE_5542)
+
+    return [Benchmark(f"sessions.create[{SESSIONS_TO_CREATE}]", setup=SessionManager, run=create_sessions,
+                      teardown=SessionManager.close_all_sessions, loops=1)]
+
+
+def core_benchmarks():
+    """Todos los escenarios del núcleo, en orden de ejecución"""
+    return memory_benchmarks() + apdu_benchmarks() + display_benchmarks() + file_benchmarks() + session_benchmarks()
+
+
+if __name__ == "__main__":
+    sys.exit(main_for_suite('core', "CardSIM core benchmarks", core_benchmarks))
@@ -0,0 +1,197 @@
+"""
+Benchmarks de repintado de la interfaz principal
+
+    xvfb-run python -m benchmarks.bench_gui -o gui.json
+    python -m benchmarks.bench_gui --sessions 50 --log-entries 100 1000 5000
+
+Construye CardSimInterface sobre una raíz Tk retirada (withdraw), así que
+necesita un display (en servidores, Xvfb). Crea sesiones sintéticas con la
+tarjeta seleccionada, el PSC presentado, memoria escrita y un command log del
+tamaño pedido, y mide por repintado: update_card_display,
+update_command_log_display, el cambio de página de la SLE5528 y el cambio de
+sesión desde el explorador. Cada llamada medida termina con update_idletasks()
+para incluir el trabajo de geometría y redibujado pendiente de Tk.
+"""
+
+import sys
+import tkinter as tk
+
+from benchmarks.harness import Benchmark, make_parser, run_benchmarks, save_results
+
+from src.utils.constants import (CARD_TYPE_5542, CARD_TYPE_5528, DEFAULT_PSC_5542, DEFAULT_PSC_5528,
+                                 PAGES_5528)
+from src.utils.logging_config import configure_logging
+
+DEFAULT_SESSIONS = 10
+DEFAULT_LOG_ENTRIES = (100, 1000)
+USER_AREA_ADDRESS = 0x20
+USER_AREA_LENGTH = 0xC0
+
+
+class BenchRoot(tk.Tk):
+    """Raíz Tk que ignora el estado 'zoomed' en plataformas que no lo soportan (X11/Xvfb)"""
+
+    def state(self, newstate=None):
+        try:
+            return super().state(newstate)
+        except tk.TclError:
+            return 'normal'
+
+
+def synthetic_log(size):
+    """Command log con la mezcla habitual de entradas: APDU, respuesta con datos e INFO"""
+    entries = []
+    for index in range(size):
+        timestamp = f"10:{(index // 60) % 60:02d}:{index % 60:02d}"
+        address = (index * 16) & 0xFF
+        kind = index % 4
+        if kind == 0:
+            entries.append({'timestamp': timestamp, 'type': "APDU_SEND", 'message': "READ MEMORY",
+                            'apdu': f"FF B0 00 {address:02X} 10"})
+        elif kind == 1:
+            entries.append({'timestamp': timestamp, 'type': "APDU_RESPONSE", 'message': "Success",
+                            'sw': "90 00",
+                            'response_data': " ".join(f"{(address + i) & 0xFF:02X}" for i in range(16))})
+        elif kind == 2:
+            entries.append({'timestamp': timestamp, 'type': "APDU_SEND", 'message': "WRITE MEMORY",
+                            'apdu': f"FF D6 00 {address:02X} 04 DE AD BE EF",
+                            'address': address, 'data': "DE AD BE EF"})
+        else:
+            entries.append({'timestamp': timestamp, 'type': "INFO", 'message': f"Synthetic entry {index}"})
+    return entries
+
+
+class GuiFixture:
+    """Interfaz principal con sesiones sintéticas, compartida por todos los benchmarks"""
+
+    def __init__(self, session_count, log_size):
+        # Importar aquí: la interfaz arranca el worker de lectores al construirse
+        from src.gui.interface import CardSimInterface
+        from src.core.pcsc_worker import pcsc_worker
+
+        self._pcsc_worker = pcsc_worker
+        self.root = BenchRoot()
+        self.root.withdraw()
+        self.app = CardSimInterface(self.root)
+        self.root.withdraw()
+        # El benchmark no habla con lectores
+        pcsc_worker.stop()
+
+        self.sessions = {CARD_TYPE_5542: [], CARD_TYPE_5528: []}
+        for index in range(max(session_count, 2)):
+            card_type = CARD_TYPE_5528 if index % 2 else CARD_TYPE_5542
+            session = self._create_session(f"bench_{index:03d}", card_type, log_size)
+            self.sessions[card_type].append(session)
+        self.app.update_cards_list()
+        self.logs = {}
+        self.flush()
+
+    def _create_session(self, name, card_type, log_size):
+        session, message = self.app.session_manager.create_new_card_session(name, card_type)
+        if session is None:
+            raise RuntimeError(message)
+        session.execute_select_card()
+        session.execute_present_psc(list(DEFAULT_PSC_5528 if card_type == CARD_TYPE_5528 else DEFAULT_PSC_5542))
+        session.memory_manager.write_memory(USER_AREA_ADDRESS,
+                                            [(address * 13) & 0xFF for address in range(USER_AREA_LENGTH)])
+        # Asignar el log directamente: add_to_log guarda el estado en cada entrada
+        session.command_log = synthetic_log(log_size)
+        return session
+
+    def activate(self, session):
+        """Deja session como activa con la interfaz ya pintada (no se mide)"""
+        self.app.on_card_select_from_explorer(session.session_id)
+        self.flush()
+        return self
+
+    def with_log(self, size):
+        """Sesión activa con un command log de size entradas"""
+        session = self.sessions[CARD_TYPE_5542][0]
+        if size not in self.logs:
+            self.logs[size] = synthetic_log(size)
+        session.command_log = self.logs[size]
+        return self.activate(session)
+
+    def flush(self):
+        """Procesa el trabajo pendiente de Tk (geometría y redibujado)"""
+        self.root.update_idletasks()
+
+    def close(self):
+        self.app.session_manager.close_all_sessions()
+        self._pcsc_worker.stop()
+        try:
+            self.root.destroy()
+        except tk.TclError:
+            pass
+
+
+def gui_benchmarks(fixture, log_sizes):
+    def repaint_card_display(fixture):
+        fixture.app.update_card_display()
+        fixture.flush()
+
+    def repaint_command_log(fixture):
+        fixture.app.update_command_log_display()
+        fixture.flush()
+
+    def switch_pages(fixture):
+        # Un repintado por página: P1, P2, P3, P0
+        for page in range(1, PAGES_5528 + 1):
+            fixture.app.select_page(page % PAGES_5528)
+            fixture.flush()
+
+    benchmarks = []
+    for tag, card_type in (('5542', CARD_TYPE_5542), ('5528', CARD_TYPE_5528)):
+        session = fixture.sessions[card_type][0]
+        benchmarks.append(Benchmark(f"gui.card_display[{tag}]", run=repaint_card_display,
+                                    setup=lambda session=session: fixture.activate(session)))
+
+    for size in log_sizes:
+        benchmarks.append(Benchmark(f"gui.command_log[{size}]", run=repaint_command_log,
+                                    setup=lambda size=size: fixture.with_log(size)))
+
+    benchmarks.append(Benchmark(f"gui.page_switch[{PAGES_5528}]", run=switch_pages,
+                                setup=lambda: fixture.activate(fixture.sessions[CARD_TYPE_5528][0])))
+
+    all_sessions = fixture.sessions[CARD_TYPE_5542] + fixture.sessions[CARD_TYPE_5528]
+
+    def switch_sessions(fixture):
+        # Un repintado completo por sesión, acabando en la que dejó activa el setup
+        for session in all_sessions:
+            fixture.app.on_card_select_from_explorer(session.session_id)
+            fixture.flush()
+
+    benchmarks.append(Benchmark(f"gui.session_switch[{len(all_sessions)}]", run=switch_sessions,
+                                setup=lambda: fixture.activate(all_sessions[-1])))
+    return benchmarks
+
+
+def main(argv=None):
+    parser = make_parser("CardSIM GUI repaint benchmarks (needs a display, e.g. xvfb-run)")
+    parser.add_argument('--sessions', type=int, default=DEFAULT_SESSIONS,
+                        help="synthetic card sessions to open (half SLE5542, half SLE5528)")
+    parser.add_argument('--log-entries', type=int, nargs='+', default=list(DEFAULT_LOG_ENTRIES),
+                        help="command log sizes to benchmark")
+    args = parser.parse_args(argv)
+    configure_logging(args.log_level)
+
+    try:
+        fixture = GuiFixture(args.sessions, min(args.log_entries))
+    except tk.TclError as e:
+        print(f"Error: cannot create the Tk root ({e}); run under a display or xvfb-run")
+        return 1
+
+    try:
+        results = run_benchmarks(gui_benchmarks(fixture, args.log_entries), args.rounds, args.min_time, args.filter)
+    finally:
+        fixture.close()
+
+    if args.output:
+        save_results(args.output, 'gui', results,
+                     extra={'parameters': {'sessions': args.sessions, 'log_entries': args.log_entries}})
+        print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
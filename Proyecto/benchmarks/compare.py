@@ -0,0 +1,68 @@
+"""
+Compara dos ficheros de resultados de benchmarks (mediana por llamada)
+
+    python -m benchmarks.compare antes.json despues.json --threshold 0.10
+"""
+
+import argparse
+import json
+import sys
+
+from benchmarks.harness import format_seconds
+
+
+def load_results(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def compare_results(baseline, current, threshold):
+    """
+    Filas (nombre, mediana base, mediana actual, ratio, estado) de los benchmarks comunes.
+    Estado: 'slower' / 'faster' si el cambio supera threshold, '' si no.
+    """
+    rows = []
+    for name, result in current['benchmarks'].items():
+        base = baseline['benchmarks'].get(name)
+        if base is None:
+            rows.append((name, None, result['median'], None, 'new'))
+            continue
+        ratio = result['median'] / base['median'] if base['median'] else float('inf')
+        if ratio > 1 + threshold:
+            status = 'slower'
+        elif ratio < 1 - threshold:
+            status = 'faster'
+        else:
+            status = ''
+        rows.append((name, base['median'], result['median'], ratio, status))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare two CardSIM benchmark result files")
+    parser.add_argument('baseline')
+    parser.add_argument('current')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help="relative change reported as slower/faster (default 0.10)")
+    parser.add_argument('--fail-on-regression', action='store_true',
+                        help="exit with status 1 if any benchmark is slower")
+    args = parser.parse_args(argv)
+
+    baseline = load_results(args.baseline)
+    current = load_results(args.current)
+    print(f"baseline: {baseline['environment'].get('commit') or args.baseline}  "
+          f"current: {current['environment'].get('commit') or args.current}")
+
+    rows = compare_results(baseline, current, args.threshold)
+    for name, base, value, ratio, status in rows:
+        base_text = format_seconds(base) if base is not None else "-"
+        ratio_text = f"x{ratio:.2f}" if ratio is not None else ""
+        print(f"{name:<40} {base_text:>12} {format_seconds(value):>12} {ratio_text:>7}  {status}")
+
+    if args.fail_on_regression and any(status == 'slower' for *_, status in rows):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
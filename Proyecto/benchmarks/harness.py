@@ -0,0 +1,158 @@
+"""
+Ejecución de benchmarks y formato de resultados
+
+Cada benchmark tiene un setup (no se mide), la operación medida y un teardown
+opcional. El número de llamadas por ronda se calibra para que cada ronda dure al
+menos min_time segundos y se guardan los tiempos por llamada de todas las rondas.
+"""
+
+import argparse
+import datetime
+import fnmatch
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+# Mismo path que main.py: el núcleo importa también src/utils como "utils"
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (PROJECT_DIR, os.path.join(PROJECT_DIR, 'src')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from src.utils.logging_config import configure_logging
+
+DEFAULT_ROUNDS = 5
+DEFAULT_MIN_TIME = 0.2  # Segundos mínimos por ronda al calibrar
+
+
+class Benchmark:
+    """Escenario medible: setup() -> estado, run(estado) medido, teardown(estado)"""
+
+    def __init__(self, name, run, setup=None, teardown=None, loops=None, group=None):
+        self.name = name
+        self.run = run
+        self.setup = setup
+        self.teardown = teardown
+        self.loops = loops  # None = calibrar; 1 para escenarios que no se pueden repetir sobre el mismo estado
+        self.group = group or name.split('.')[0]
+
+    def _round(self, loops):
+        """Una ronda: devuelve los segundos totales de loops llamadas"""
+        state = self.setup() if self.setup else None
+        try:
+            started = time.perf_counter()
+            for _ in range(loops):
+                self.run(state)
+            return time.perf_counter() - started
+        finally:
+            if self.teardown:
+                self.teardown(state)
+
+    def calibrate(self, min_time):
+        """Llamadas por ronda necesarias para que una ronda dure al menos min_time"""
+        if self.loops:
+            return self.loops
+        loops = 1
+        while True:
+            elapsed = self._round(loops)
+            if elapsed >= min_time or loops >= 1_000_000:
+                return loops
+            # Estimar cuántas hacen falta (como mucho x10 por paso)
+            loops = min(loops * 10, max(loops + 1, int(loops * min_time / max(elapsed, 1e-9) * 1.2)))
+
+    def measure(self, rounds=DEFAULT_ROUNDS, min_time=DEFAULT_MIN_TIME):
+        """Tiempos por llamada (segundos) de cada ronda y su resumen"""
+        loops = self.calibrate(min_time)
+        per_call = [self._round(loops) / loops for _ in range(rounds)]
+        return {
+            'group': self.group,
+            'loops': loops,
+            'rounds': rounds,
+            'min': min(per_call),
+            'median': statistics.median(per_call),
+            'mean': statistics.mean(per_call),
+            'stdev': statistics.stdev(per_call) if len(per_call) > 1 else 0.0,
+            'max': max(per_call),
+        }
+
+
+def environment_info():
+    """Datos de la máquina y del commit para poder comparar resultados"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_DIR,
+                                capture_output=True, text=True, timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ""
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+    }
+
+
+def format_seconds(seconds):
+    """Tiempo con la unidad más legible"""
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:.1f} µs"
+    if seconds < 1.0:
+        return f"{seconds * 1e3:.2f} ms"
+    return f"{seconds:.3f} s"
+
+
+def run_benchmarks(benchmarks, rounds=DEFAULT_ROUNDS, min_time=DEFAULT_MIN_TIME, pattern=None, out=sys.stdout):
+    """Ejecuta los benchmarks cuyo nombre coincide con pattern (glob) y devuelve los resultados"""
+    results = {}
+    for benchmark in benchmarks:
+        if pattern and not fnmatch.fnmatch(benchmark.name, pattern):
+            continue
+        result = benchmark.measure(rounds, min_time)
+        results[benchmark.name] = result
+        print(f"{benchmark.name:<40} {format_seconds(result['median']):>12}  "
+              f"(min {format_seconds(result['min'])}, ±{format_seconds(result['stdev'])}, "
+              f"{result['loops']} x {result['rounds']})", file=out, flush=True)
+    return results
+
+
+def save_results(path, suite, results, extra=None):
+    """Guarda los resultados en JSON junto con los datos del entorno"""
+    document = {
+        'suite': suite,
+        'environment': environment_info(),
+        'benchmarks': results,
+    }
+    if extra:
+        document.update(extra)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(document, f, indent=2)
+
+
+def make_parser(description):
+    """Opciones comunes de las suites de benchmarks"""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('-o', '--output', help="write the results to this JSON file")
+    parser.add_argument('-k', '--filter', help="only run benchmarks matching this glob (e.g. 'memory.*')")
+    parser.add_argument('--rounds', type=int, default=DEFAULT_ROUNDS, help="measured rounds per benchmark")
+    parser.add_argument('--min-time', type=float, default=DEFAULT_MIN_TIME,
+                        help="minimum seconds per round when calibrating")
+    parser.add_argument('--log-level', default='WARNING',
+                        help="log level while running (DEBUG output distorts the timings)")
+    return parser
+
+
+def main_for_suite(suite, description, benchmarks_factory, argv=None):
+    """Punto de entrada común: parsea opciones, ejecuta y guarda el JSON"""
+    args = make_parser(description).parse_args(argv)
+    configure_logging(args.log_level)
+    results = run_benchmarks(benchmarks_factory(), args.rounds, args.min_time, args.filter)
+    if args.output:
+        save_results(args.output, suite, results)
+        print(f"Results written to {args.output}")
+    return 0
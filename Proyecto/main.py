@@ -5,6 +5,8 @@ Punto de entrada principal de la aplicación
 
 import sys
 import os
+import argparse
+import multiprocessing
 import tkinter as tk
 from typing import NoReturn
 
@@ -12,9 +14,21 @@ from typing import NoReturn
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
 from src.gui.interface import CardSimInterface
+from src.utils.logging_config import LOG_LEVELS, configure_logging
+from src.utils.user_config import user_config_manager
+
+def parse_arguments():
+    """Opciones de línea de comandos"""
+    parser = argparse.ArgumentParser(description="CardSIM - Smart Card Interface")
+    parser.add_argument("--log-level", type=str.upper, choices=LOG_LEVELS,
+                        help="console log level (default: the one saved in Settings, or INFO)")
+    return parser.parse_args()
 
 def main() -> NoReturn:
     """Función principal de la aplicación"""
+    args = parse_arguments()
+    configure_logging(args.log_level or user_config_manager.log_level)
+    
     try:
         # Crear ventana root
         root = tk.Tk()
@@ -32,4 +46,6 @@ def main() -> NoReturn:
         sys.exit(1)
 
 if __name__ == "__main__":
+    # Necesario en el ejecutable empaquetado para el proceso de E/S de lectores
+    multiprocessing.freeze_support()
     main()
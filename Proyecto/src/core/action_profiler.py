@@ -0,0 +1,194 @@
+"""
+Perfilado de las acciones del usuario (cProfile) activable desde Settings
+
+Con el perfilado activo, cada acción marcada con @profiled_action (botones de
+APDU, apertura de diálogos, abrir/guardar tarjeta, cambio de página o de
+tarjeta) se ejecuta bajo cProfile y deja un fichero .prof por acción en el
+directorio elegido, que se abre con pstats o snakeviz. Junto a ellos se mantiene
+summary.csv con una fila por acción (llamadas, tiempo total, medio y máximo),
+ordenado de la más lenta a la más rápida, para que los laboratorios puedan
+enviarnos los datos sin una versión especial.
+
+Desactivado, el decorador solo comprueba un booleano antes de llamar a la
+función. cProfile admite un solo perfilador a la vez, así que una acción que
+llama a otra se perfila entera como la exterior.
+"""
+
+import collections
+import contextlib
+import cProfile
+import csv
+import datetime
+import functools
+import logging
+import re
+import threading
+import time
+from pathlib import Path
+
+from src.utils.constants import PROFILING_MAX_RECORDS
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_FILENAME = "summary.csv"
+SUMMARY_FIELDS = ['action', 'count', 'total_seconds', 'mean_ms', 'max_ms', 'last_profile']
+
+
+class ActionProfiler:
+    """Perfila acciones completas y acumula sus tiempos por nombre de acción"""
+
+    def __init__(self, max_records=PROFILING_MAX_RECORDS):
+        self.enabled = False
+        self.output_dir = None
+        self.records = collections.deque(maxlen=max_records)  # Llamadas más recientes
+        self._actions = {}  # acción -> totales desde que se activó
+        self._profiling = False
+        self._lock = threading.Lock()
+
+    def enable(self, output_dir):
+        """
+        Activa el perfilado escribiendo los ficheros en output_dir
+
+        Returns:
+            tuple: (success, message)
+        """
+        output_dir = Path(output_dir)
+        try:
+            output_dir.mkdir(parents=True, exist_ok=True)
+        except OSError as e:
+            return False, f"Could not create profile directory: {e}"
+        self.output_dir = output_dir
+        self.enabled = True
+        logger.info("Action profiling enabled, writing to %s", output_dir)
+        return True, f"Profiling user actions to {output_dir}"
+
+    def disable(self):
+        """Desactiva el perfilado (los resultados se conservan hasta clear())"""
+        if self.enabled:
+            self.enabled = False
+            self.save_summary()
+            logger.info("Action profiling disabled")
+
+    def clear(self):
+        """Olvida los tiempos acumulados (los ficheros .prof se quedan en disco)"""
+        with self._lock:
+            self.records.clear()
+            self._actions.clear()
+
+    @contextlib.contextmanager
+    def profile(self, action):
+        """Ejecuta el bloque bajo cProfile si el perfilado está activo"""
+        if not self._begin():
+            yield
+            return
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Ya hay otro perfilador en el proceso (p. ej. python -m cProfile main.py)
+            profiler = None
+        if profiler is None:
+            self._profiling = False
+            yield
+            return
+
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            seconds = time.perf_counter() - started
+            self._profiling = False
+            self._record(action, seconds, profiler)
+
+    def _begin(self):
+        """Reserva el perfilador: solo desde el hilo de Tk y sin otra acción en curso"""
+        if not self.enabled or self._profiling or threading.current_thread() is not threading.main_thread():
+            return False
+        self._profiling = True
+        return True
+
+    def _record(self, action, seconds, profiler):
+        finished = datetime.datetime.now()
+        path = None
+        try:
+            path = self.output_dir / f"{finished:%Y%m%d_%H%M%S_%f}_{_safe_filename(action)}.prof"
+            profiler.dump_stats(str(path))
+        except OSError as e:
+            logger.warning("Could not write profile for %s: %s", action, e)
+            path = None
+
+        with self._lock:
+            self.records.append({
+                'action': action,
+                'seconds': seconds,
+                'finished_at': finished.timestamp(),
+                'profile': str(path) if path else "",
+            })
+            totals = self._actions.setdefault(action, {'count': 0, 'total_seconds': 0.0, 'max_seconds': 0.0,
+                                                       'last_profile': ""})
+            totals['count'] += 1
+            totals['total_seconds'] += seconds
+            totals['max_seconds'] = max(totals['max_seconds'], seconds)
+            if path:
+                totals['last_profile'] = path.name
+        logger.debug("Profiled %s in %.1f ms", action, seconds * 1000)
+        self.save_summary()
+
+    def summary(self):
+        """Una fila por acción, de la más lenta (tiempo máximo) a la más rápida"""
+        with self._lock:
+            rows = [{
+                'action': action,
+                'count': totals['count'],
+                'total_seconds': totals['total_seconds'],
+                'mean_ms': totals['total_seconds'] / totals['count'] * 1000,
+                'max_ms': totals['max_seconds'] * 1000,
+                'last_profile': totals['last_profile'],
+            } for action, totals in self._actions.items()]
+        rows.sort(key=lambda row: row['max_ms'], reverse=True)
+        return rows
+
+    def slowest(self, limit=20):
+        """Las llamadas individuales más lentas de entre las recientes"""
+        with self._lock:
+            records = list(self.records)
+        return sorted(records, key=lambda record: record['seconds'], reverse=True)[:limit]
+
+    def save_summary(self):
+        """Escribe summary.csv en el directorio de perfiles"""
+        if self.output_dir is None:
+            return
+        try:
+            with open(self.output_dir / SUMMARY_FILENAME, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.DictWriter(f, fieldnames=SUMMARY_FIELDS)
+                writer.writeheader()
+                for row in self.summary():
+                    writer.writerow({**row,
+                                     'total_seconds': f"{row['total_seconds']:.4f}",
+                                     'mean_ms': f"{row['mean_ms']:.2f}",
+                                     'max_ms': f"{row['max_ms']:.2f}"})
+        except OSError as e:
+            logger.warning("Could not write profiling summary: %s", e)
+
+
+def _safe_filename(action):
+    return re.sub(r'[^A-Za-z0-9_.-]+', '_', action)
+
+
+# Instancia global compartida por toda la interfaz
+action_profiler = ActionProfiler()
+
+
+def profiled_action(action):
+    """Decorador: perfila cada llamada como la acción indicada cuando el perfilado está activo"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not action_profiler.enabled:
+                return func(*args, **kwargs)
+            with action_profiler.profile(action):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -3,6 +3,7 @@ Manejador de APDUs - Simula las respuestas de comandos APDU
 """
 
 from src.utils.constants import *
+from .instrumentation import timed
 
 class APDUHandler:
     """Maneja la simulación de comandos APDU para tarjetas SLE5542/5528"""
@@ -65,6 +66,7 @@ class APDUHandler:
             }
         return None
         
+    @timed()
     def process_select_card(self):
         """Procesa el comando SELECT CARD"""
         # Generar APDU según tipo de tarjeta
@@ -87,6 +89,7 @@ class APDUHandler:
             'success': True
         }
     
+    @timed()
     def process_read_memory(self, address, length):
         """Procesa el comando READ MEMORY"""
         # Generar APDU según el tipo de tarjeta
@@ -113,6 +116,7 @@ class APDUHandler:
             'data_hex': ' '.join([f"{b:02X}" for b in response])
         }
     
+    @timed()
     def process_present_psc(self, psc_bytes):
         """Procesa el comando PRESENT PSC"""
         # Obtener PSC actual desde la memoria
@@ -215,6 +219,7 @@ class APDUHandler:
             'message': message
         }
     
+    @timed()
     def process_write_memory(self, address, data_bytes):
         """Procesa el comando WRITE MEMORY"""
         # Verificar si la tarjeta está bloqueada
@@ -255,6 +260,7 @@ class APDUHandler:
         
         return result
     
+    @timed()
     def process_change_psc(self, new_psc_bytes):
         """Procesa el comando CHANGE PSC"""
         # Verificar si la tarjeta está bloqueada
@@ -0,0 +1,212 @@
+"""
+Latencias por APDU de las operaciones con tarjetas físicas
+
+Cada APDU enviada por PhysicalCardHandler se mide (solo el transmit, con
+perf_counter) y se acumula en un histograma por lector y tipo de comando
+(SELECT, PSC, READ, WRITE, READ_EC...). Los histogramas tienen cubetas
+logarítmicas fijas, así que ocupan lo mismo tras diez APDUs que tras un millón.
+
+Las lecturas y escrituras de tarjeta completa se registran además como
+operaciones: tiempo total, tiempo dentro del lector, bytes por segundo y
+percentiles de sus APDUs. La diferencia entre el tiempo total y el del lector es
+el tiempo de nuestro propio código.
+"""
+
+import bisect
+import collections
+import copy
+import math
+import threading
+import time
+
+from src.utils.constants import APDU_METRICS_MAX_OPERATIONS
+
+# Tipo de comando según el INS de las APDUs de lector (FF xx)
+APDU_CLASSES = {
+    0xA4: 'SELECT',
+    0x20: 'PSC',
+    0xB0: 'READ',
+    0xD0: 'WRITE',
+    0xB1: 'READ_EC',
+    0xD2: 'CHANGE_PSC',
+}
+
+# Cubetas logarítmicas: 8 por octava (error < 10 %) desde 10 µs hasta ~170 s
+_BUCKET_MIN_SECONDS = 1e-5
+_BUCKETS_PER_OCTAVE = 8
+_BUCKET_COUNT = 192
+_BUCKET_BOUNDS = [_BUCKET_MIN_SECONDS * 2 ** (i / _BUCKETS_PER_OCTAVE) for i in range(_BUCKET_COUNT)]
+
+
+def classify_apdu(apdu):
+    """Tipo de comando de una APDU de lector ('OTHER' si no se reconoce)"""
+    if len(apdu) < 2 or apdu[0] != 0xFF:
+        return 'OTHER'
+    return APDU_CLASSES.get(apdu[1], 'OTHER')
+
+
+class LatencyHistogram:
+    """Histograma de latencias con tamaño fijo, bytes transferidos y errores"""
+
+    def __init__(self):
+        self.counts = [0] * (_BUCKET_COUNT + 1)  # La última cubeta recoge lo que se sale de escala
+        self.count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.bytes = 0
+        self.errors = 0
+
+    def add(self, seconds, byte_count=0, ok=True):
+        self.counts[bisect.bisect_left(_BUCKET_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.bytes += byte_count
+        if not ok:
+            self.errors += 1
+
+    def merge(self, other):
+        """Suma otro histograma (p. ej. el del proceso de E/S) a este"""
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.total_seconds += other.total_seconds
+        self.max_seconds = max(self.max_seconds, other.max_seconds)
+        self.bytes += other.bytes
+        self.errors += other.errors
+
+    def percentile(self, fraction):
+        """Latencia (segundos) por debajo de la cual queda la fracción indicada de APDUs"""
+        if not self.count:
+            return 0.0
+        target = max(1, math.ceil(fraction * self.count))
+        cumulative = 0
+        for index, bucket_count in enumerate(self.counts):
+            cumulative += bucket_count
+            if cumulative >= target:
+                bound = _BUCKET_BOUNDS[index] if index < _BUCKET_COUNT else self.max_seconds
+                return min(bound, self.max_seconds)
+        return self.max_seconds
+
+    def summary(self):
+        """Resumen en milisegundos para la interfaz"""
+        return {
+            'count': self.count,
+            'p50_ms': self.percentile(0.50) * 1000.0,
+            'p95_ms': self.percentile(0.95) * 1000.0,
+            'max_ms': self.max_seconds * 1000.0,
+            'mean_ms': self.total_seconds / self.count * 1000.0 if self.count else 0.0,
+            'bytes': self.bytes,
+            'errors': self.errors,
+        }
+
+
+class OperationTimer:
+    """Medida de una operación de tarjeta completa (lectura, escritura o verificación)"""
+
+    def __init__(self, reader_name, name, card_type):
+        self.reader_name = reader_name
+        self.name = name
+        self.card_type = card_type
+        self.histogram = LatencyHistogram()
+        self.started = time.perf_counter()
+
+    def finish(self):
+        """Resultado de la operación como diccionario"""
+        seconds = time.perf_counter() - self.started
+        apdu_seconds = self.histogram.total_seconds
+        result = self.histogram.summary()
+        result.update({
+            'reader': self.reader_name or "",
+            'operation': self.name,
+            'card_type': self.card_type,
+            'seconds': seconds,
+            'apdu_seconds': apdu_seconds,
+            'overhead_seconds': max(0.0, seconds - apdu_seconds),
+            'bytes_per_second': self.histogram.bytes / seconds if seconds > 0 else 0.0,
+            'finished_at': time.time(),
+        })
+        return result
+
+
+class ApduMetrics:
+    """Almacén de histogramas por (lector, tipo de APDU) y de las últimas operaciones"""
+
+    def __init__(self, max_operations=APDU_METRICS_MAX_OPERATIONS):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._operations = collections.deque(maxlen=max_operations)
+
+    def record(self, reader_name, apdu, response, sw1, sw2, seconds, operation=None):
+        """Registra una APDU completada (y la suma a la operación en curso, si la hay)"""
+        apdu_class = classify_apdu(apdu)
+        ok = sw1 == 0x90  # Las SLE devuelven 90 xx con el contador de errores en SW2
+        if apdu_class == 'READ':
+            byte_count = len(response or [])
+        elif apdu_class == 'WRITE' and ok and len(apdu) > 4:
+            byte_count = apdu[4]
+        else:
+            byte_count = 0
+
+        key = (reader_name or "", apdu_class)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = LatencyHistogram()
+            histogram.add(seconds, byte_count, ok)
+        if operation is not None:
+            operation.histogram.add(seconds, byte_count, ok)
+
+    def begin_operation(self, reader_name, name, card_type):
+        return OperationTimer(reader_name, name, card_type)
+
+    def end_operation(self, operation):
+        """Guarda la operación (las que no llegaron a enviar APDUs se descartan)"""
+        if operation is None or not operation.histogram.count:
+            return
+        result = operation.finish()
+        with self._lock:
+            self._operations.append(result)
+
+    def snapshot(self):
+        """Copia del estado actual (se puede enviar entre procesos)"""
+        with self._lock:
+            return {
+                'histograms': copy.deepcopy(self._histograms),
+                'operations': list(self._operations),
+            }
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._operations.clear()
+
+
+def merge_snapshots(*snapshots):
+    """Une las instantáneas de varios procesos en una sola"""
+    histograms = {}
+    operations = []
+    for snapshot in snapshots:
+        if not snapshot:
+            continue
+        for key, histogram in snapshot['histograms'].items():
+            if key in histograms:
+                histograms[key].merge(histogram)
+            else:
+                histograms[key] = copy.deepcopy(histogram)
+        operations.extend(snapshot['operations'])
+    operations.sort(key=lambda operation: operation['finished_at'])
+    return {'histograms': histograms, 'operations': operations}
+
+
+def latency_rows(snapshot):
+    """Filas (lector, tipo de APDU, percentiles...) ordenadas para mostrar"""
+    rows = []
+    for (reader_name, apdu_class), histogram in sorted(snapshot['histograms'].items()):
+        row = histogram.summary()
+        row.update({'reader': reader_name, 'apdu_class': apdu_class})
+        rows.append(row)
+    return rows
+
+
+# Instancia global de métricas del proceso
+apdu_metrics = ApduMetrics()
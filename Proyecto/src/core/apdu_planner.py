@@ -0,0 +1,158 @@
+"""
+Planificador de secuencias de APDUs de lectura/escritura para SLE5542/5528
+
+Divide un rango de direcciones en el mínimo número de APDUs teniendo en cuenta
+los huecos protegidos del perfil de tarjeta, la longitud máxima que admite el
+lector (Lc/Le de APDU corta) y los límites de página de 256 bytes.
+"""
+
+from src.utils.constants import CARD_TYPE_5542, CARD_TYPE_5528
+
+# Longitud máxima de datos en una APDU corta (Lc/Le de un byte, sin usar 00 = 256)
+SHORT_APDU_MAX_LENGTH = 255
+
+# Perfiles de tarjeta: tamaño, tamaño de página y huecos que nunca se escriben
+CARD_PROFILES = {
+    CARD_TYPE_5542: {
+        'name': 'SLE5542',
+        'size': 256,
+        'page_size': 256,
+        # Primer byte de la cabecera (dirección 0x00, también en el ATR tras 3B 04)
+        'header_byte': 0xA2,
+        # ATR que devuelven los lectores PC/SC (3B 04 + cabecera de la tarjeta)
+        'atrs': [(0x3B, 0x04, 0xA2, 0x13, 0x10, 0x91)],
+        # Primeras 2 filas: datos de fábrica
+        'write_holes': [(0x00, 0x1F)],
+    },
+    CARD_TYPE_5528: {
+        'name': 'SLE5528',
+        'size': 1024,
+        'page_size': 256,
+        'header_byte': 0x92,
+        'atrs': [(0x3B, 0x04, 0x92, 0x23, 0x10, 0x91)],
+        # Primeras 2 filas (datos de fábrica) y Error Counter + PSC
+        'write_holes': [(0x000, 0x01F), (0x3FD, 0x3FF)],
+    },
+}
+
+
+def get_card_profile(card_type):
+    """Devuelve el perfil de la tarjeta (SLE5528 si el tipo no es SLE5542)"""
+    return CARD_PROFILES.get(card_type, CARD_PROFILES[CARD_TYPE_5528])
+
+
+def card_type_from_header(header_byte):
+    """Tipo de tarjeta según el primer byte de su cabecera (None si no se reconoce)"""
+    for card_type, profile in CARD_PROFILES.items():
+        if profile['header_byte'] == header_byte:
+            return card_type
+    return None
+
+
+def card_type_from_atr(atr):
+    """
+    Tipo de tarjeta según su ATR: primero por ATR completo conocido y, si no,
+    por el byte de cabecera que sigue a 3B 04. None si no se reconoce.
+    """
+    atr = tuple(atr)
+    for card_type, profile in CARD_PROFILES.items():
+        if atr in profile['atrs']:
+            return card_type
+    if len(atr) >= 3:
+        return card_type_from_header(atr[2])
+    return None
+
+
+def subtract_holes(start, end, holes=()):
+    """
+    Quita los huecos protegidos de un rango inclusivo.
+
+    Returns:
+        list: rangos (inicio, fin) inclusivos que quedan, ordenados
+    """
+    segments = [(start, end)]
+    for hole_start, hole_end in sorted(holes):
+        remaining = []
+        for seg_start, seg_end in segments:
+            if hole_end < seg_start or hole_start > seg_end:
+                remaining.append((seg_start, seg_end))
+                continue
+            if seg_start < hole_start:
+                remaining.append((seg_start, hole_start - 1))
+            if hole_end < seg_end:
+                remaining.append((hole_end + 1, seg_end))
+        segments = remaining
+    return segments
+
+
+def plan_chunks(start, end, max_length=SHORT_APDU_MAX_LENGTH, holes=(), page_size=256):
+    """
+    Planifica las APDUs necesarias para cubrir el rango inclusivo [start, end].
+
+    Cada APDU se queda dentro de una página y no supera max_length. Cuando un tramo
+    necesita varias APDUs se reparte en partes iguales (p. ej. una página de 256
+    bytes con máximo 255 se envía como 128 + 128), lo que da el mismo número de
+    APDUs que cortar al máximo pero con transferencias equilibradas.
+
+    Returns:
+        list: tuplas (dirección, longitud) en orden ascendente
+    """
+    max_length = max(1, min(int(max_length), SHORT_APDU_MAX_LENGTH))
+    chunks = []
+
+    for seg_start, seg_end in subtract_holes(start, end, holes):
+        address = seg_start
+        while address <= seg_end:
+            # Tramo contenido en una sola página
+            piece_end = min(seg_end, address - (address % page_size) + page_size - 1)
+            piece_length = piece_end - address + 1
+
+            count = -(-piece_length // max_length)  # División redondeando hacia arriba
+            base, extra = divmod(piece_length, count)
+            for i in range(count):
+                length = base + (1 if i < extra else 0)
+                chunks.append((address, length))
+                address += length
+
+    return chunks
+
+
+def plan_card_read(card_type, start=0, end=None, max_length=SHORT_APDU_MAX_LENGTH):
+    """Planifica la lectura de un rango (por defecto la tarjeta completa)"""
+    profile = get_card_profile(card_type)
+    end = profile['size'] - 1 if end is None else min(end, profile['size'] - 1)
+    return plan_chunks(start, end, max_length, page_size=profile['page_size'])
+
+
+def plan_card_write(card_type, start=0, end=None, max_length=SHORT_APDU_MAX_LENGTH):
+    """Planifica la escritura de un rango saltando los huecos protegidos del perfil"""
+    profile = get_card_profile(card_type)
+    end = profile['size'] - 1 if end is None else min(end, profile['size'] - 1)
+    return plan_chunks(start, end, max_length, holes=profile['write_holes'],
+                       page_size=profile['page_size'])
+
+
+def diff_ranges(current, data, start, end, max_gap=0):
+    """
+    Calcula los rangos inclusivos de [start, end] en los que data difiere de current.
+    Los rangos separados por max_gap bytes iguales o menos se unen en uno solo.
+    """
+    ranges = []
+    for address in range(start, end + 1):
+        if current[address] == data[address]:
+            continue
+        if ranges and address - ranges[-1][1] - 1 <= max_gap:
+            ranges[-1][1] = address
+        else:
+            ranges.append([address, address])
+    return [tuple(r) for r in ranges]
+
+
+def build_read_apdu(address, length):
+    """READ MEMORY CARD: FF B0 <MSB> <LSB> <Le>"""
+    return [0xFF, 0xB0, (address >> 8) & 0xFF, address & 0xFF, length]
+
+
+def build_write_apdu(address, data):
+    """WRITE MEMORY CARD: FF D0 <MSB> <LSB> <Lc> <datos>"""
+    return [0xFF, 0xD0, (address >> 8) & 0xFF, address & 0xFF, len(data)] + list(data)
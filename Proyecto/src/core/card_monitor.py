@@ -0,0 +1,283 @@
+"""
+Monitor de lectores y tarjetas en segundo plano
+
+Publica eventos de conexión/desconexión de lectores e inserción/extracción de
+tarjetas en colas thread-safe que la interfaz vacía con after(). Usa los monitores
+de pyscard (ReaderMonitor/CardMonitor) si están disponibles y, si no, un sondeo
+ligero del estado PC/SC que no envía APDUs ni toca las conexiones abiertas.
+Con otro transporte (p. ej. lectores virtuales con CARDSIM_VIRTUAL_READERS) se
+sondean sus lectores y el ATR de la tarjeta insertada en cada uno.
+"""
+
+import logging
+import queue
+import threading
+
+try:
+    from smartcard.ReaderMonitoring import ReaderMonitor, ReaderObserver
+    from smartcard.CardMonitoring import CardMonitor, CardObserver
+    PYSCARD_MONITORS_AVAILABLE = True
+except ImportError:
+    ReaderObserver = CardObserver = object
+    PYSCARD_MONITORS_AVAILABLE = False
+
+try:
+    from smartcard import scard
+    SCARD_AVAILABLE = True
+except ImportError:
+    SCARD_AVAILABLE = False
+
+from src.utils.constants import CARD_MONITOR_POLL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Tipos de evento
+READER_ADDED = 'reader_added'
+READER_REMOVED = 'reader_removed'
+CARD_INSERTED = 'card_inserted'
+CARD_REMOVED = 'card_removed'
+
+
+class _ReaderObserver(ReaderObserver):
+    """Adaptador de pyscard: lectores añadidos/eliminados"""
+
+    def __init__(self, monitor):
+        self.monitor = monitor
+
+    def update(self, observable, actions):
+        added_readers, removed_readers = actions
+        for reader in added_readers:
+            self.monitor._reader_added(str(reader))
+        for reader in removed_readers:
+            self.monitor._reader_removed(str(reader))
+
+
+class _CardObserver(CardObserver):
+    """Adaptador de pyscard: tarjetas insertadas/extraídas"""
+
+    def __init__(self, monitor):
+        self.monitor = monitor
+
+    def update(self, observable, actions):
+        added_cards, removed_cards = actions
+        for card in removed_cards:
+            self.monitor._card_removed(str(card.reader))
+        for card in added_cards:
+            self.monitor._card_inserted(str(card.reader), list(card.atr))
+
+
+class CardEventMonitor:
+    """
+    Vigila lectores y tarjetas y reparte los eventos entre los suscriptores.
+    Arranca con el primer suscriptor y se detiene cuando se va el último.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = []
+        self.readers = set()   # Lectores conectados
+        self.cards = {}        # Lector -> ATR de la tarjeta insertada
+
+        self._running = False
+        self._observers = None
+        self._poll_thread = None
+        self._stop_event = threading.Event()
+
+    def subscribe(self):
+        """
+        Devuelve una cola nueva que recibirá los eventos. Se rellena primero con el
+        estado actual (lectores conectados y tarjetas insertadas) para que el
+        suscriptor no tenga que consultarlo por separado.
+        """
+        events = queue.Queue()
+        with self._lock:
+            for reader_name in sorted(self.readers):
+                events.put({'type': READER_ADDED, 'reader': reader_name, 'atr': None})
+            for reader_name, atr in self.cards.items():
+                events.put({'type': CARD_INSERTED, 'reader': reader_name, 'atr': atr})
+            self._subscribers.append(events)
+            start = not self._running
+            self._running = True
+        if start:
+            self._start()
+        return events
+
+    def unsubscribe(self, events):
+        """Da de baja una cola; el monitor se detiene si no queda ninguna"""
+        with self._lock:
+            if events in self._subscribers:
+                self._subscribers.remove(events)
+            stop = self._running and not self._subscribers
+            if stop:
+                self._running = False
+        if stop:
+            self._stop()
+
+    def drain(self, events):
+        """Devuelve los eventos pendientes de una cola sin bloquear"""
+        pending = []
+        while True:
+            try:
+                pending.append(events.get_nowait())
+            except queue.Empty:
+                return pending
+
+    def get_inserted_cards(self):
+        """Devuelve {lector: ATR} de las tarjetas insertadas ahora mismo"""
+        with self._lock:
+            return dict(self.cards)
+
+    def has_card(self, reader_name):
+        """Indica si hay una tarjeta insertada en el lector"""
+        with self._lock:
+            return reader_name in self.cards
+
+    def _start(self):
+        """Arranca los monitores de pyscard o, si no están disponibles, el sondeo"""
+        # Importar aquí: physical_card_handler carga el transporte al importarse
+        from .physical_card_handler import get_transport
+
+        # Un evento nuevo por arranque para que un hilo anterior no siga vivo tras reiniciar
+        self._stop_event = threading.Event()
+        if get_transport().name != 'pcsc':
+            self._poll_thread = threading.Thread(target=self._transport_poll_loop,
+                                                 args=(get_transport, self._stop_event), daemon=True)
+            self._poll_thread.start()
+            return
+
+        if PYSCARD_MONITORS_AVAILABLE:
+            try:
+                reader_observer = _ReaderObserver(self)
+                card_observer = _CardObserver(self)
+                ReaderMonitor().addObserver(reader_observer)
+                CardMonitor().addObserver(card_observer)
+                self._observers = (reader_observer, card_observer)
+                return
+            except Exception as e:
+                logger.warning("pyscard monitors unavailable, falling back to polling: %s", e)
+                self._observers = None
+
+        if not SCARD_AVAILABLE:
+            return
+        self._poll_thread = threading.Thread(target=self._poll_loop, args=(self._stop_event,), daemon=True)
+        self._poll_thread.start()
+
+    def _stop(self):
+        """Detiene los monitores o el hilo de sondeo"""
+        if self._observers is not None:
+            reader_observer, card_observer = self._observers
+            try:
+                ReaderMonitor().deleteObserver(reader_observer)
+                CardMonitor().deleteObserver(card_observer)
+            except Exception as e:
+                logger.warning("Could not stop pyscard monitors: %s", e)
+            self._observers = None
+        if self._poll_thread is not None:
+            self._stop_event.set()
+            self._poll_thread = None
+        with self._lock:
+            self.readers.clear()
+            self.cards.clear()
+
+    def _poll_loop(self, stop_event):
+        """Sondeo de respaldo: SCardGetStatusChange con timeout 0 en cada vuelta"""
+        hresult, context = scard.SCardEstablishContext(scard.SCARD_SCOPE_USER)
+        if hresult != scard.SCARD_S_SUCCESS:
+            logger.warning("Could not establish PC/SC context for monitoring: %s", hresult)
+            return
+        try:
+            while not stop_event.is_set():
+                self._poll_once(context)
+                stop_event.wait(CARD_MONITOR_POLL_SECONDS)
+        finally:
+            scard.SCardReleaseContext(context)
+
+    def _transport_poll_loop(self, get_transport, stop_event):
+        """Sondeo de un transporte que no es PC/SC (el transporte activo en cada vuelta)"""
+        while not stop_event.is_set():
+            self._apply_state(*self._transport_state(get_transport()))
+            stop_event.wait(CARD_MONITOR_POLL_SECONDS)
+
+    def _transport_state(self, transport):
+        """Lectores del transporte y {lector: ATR} de los que tienen tarjeta (sin enviar APDUs)"""
+        reader_names = []
+        current_cards = {}
+        for reader in transport.list_readers():
+            name = str(reader)
+            reader_names.append(name)
+            connection = reader.createConnection()
+            try:
+                connection.connect()
+                current_cards[name] = list(connection.getATR())
+            except Exception:
+                continue  # Sin tarjeta
+            finally:
+                connection.disconnect()
+        return reader_names, current_cards
+
+    def _poll_once(self, context):
+        """Compara el estado PC/SC actual con el anterior y publica las diferencias"""
+        hresult, reader_names = scard.SCardListReaders(context, [])
+        if hresult != scard.SCARD_S_SUCCESS:
+            reader_names = []
+
+        current_cards = {}
+        if reader_names:
+            states = [(name, scard.SCARD_STATE_UNAWARE) for name in reader_names]
+            hresult, new_states = scard.SCardGetStatusChange(context, 0, states)
+            if hresult == scard.SCARD_S_SUCCESS:
+                for name, event_state, atr in new_states:
+                    if event_state & scard.SCARD_STATE_PRESENT:
+                        current_cards[name] = list(atr)
+        self._apply_state(reader_names, current_cards)
+
+    def _apply_state(self, reader_names, current_cards):
+        """Publica las diferencias entre el estado leído y el conocido"""
+        with self._lock:
+            known_readers = set(self.readers)
+            known_cards = dict(self.cards)
+
+        for name in reader_names:
+            if name not in known_readers:
+                self._reader_added(name)
+        for name, atr in current_cards.items():
+            if known_cards.get(name) != atr:
+                if name in known_cards:
+                    self._card_removed(name)
+                self._card_inserted(name, atr)
+        for name in known_cards:
+            if name not in current_cards:
+                self._card_removed(name)
+        for name in known_readers:
+            if name not in reader_names:
+                self._reader_removed(name)
+
+    def _publish(self, event):
+        """Envía un evento a todos los suscriptores (llamar con el lock tomado)"""
+        for events in self._subscribers:
+            events.put(event)
+
+    def _reader_added(self, reader_name):
+        with self._lock:
+            self.readers.add(reader_name)
+            self._publish({'type': READER_ADDED, 'reader': reader_name, 'atr': None})
+
+    def _reader_removed(self, reader_name):
+        with self._lock:
+            self.readers.discard(reader_name)
+            self.cards.pop(reader_name, None)
+            self._publish({'type': READER_REMOVED, 'reader': reader_name, 'atr': None})
+
+    def _card_inserted(self, reader_name, atr):
+        with self._lock:
+            self.cards[reader_name] = atr
+            self._publish({'type': CARD_INSERTED, 'reader': reader_name, 'atr': atr})
+
+    def _card_removed(self, reader_name):
+        with self._lock:
+            self.cards.pop(reader_name, None)
+            self._publish({'type': CARD_REMOVED, 'reader': reader_name, 'atr': None})
+
+
+# Instancia global del monitor
+card_monitor = CardEventMonitor()
@@ -12,6 +12,7 @@ from src.utils.app_states import AppStates, ButtonStates, CardStates
 from .memory_manager import MemoryManager
 from .apdu_handler import APDUHandler
 from .code_improvements import CommonMessages
+from .instrumentation import timed
 
 class CardSession:
     """Representa una sesión individual de trabajo con una tarjeta"""
@@ -72,6 +73,7 @@ class CardSession:
             print(f"Warning: Could not create temp file for session: {e}")
             self.temp_file = None
     
+    @timed()
     def save_session_state(self):
         """Guarda el estado actual de la sesión en archivo temporal"""
         if not self.temp_file:
@@ -99,6 +101,97 @@ class CardSession:
         except Exception as e:
             print(f"Warning: Could not save session state: {e}")
     
+    @timed()
+    def to_snapshot(self):
+        """Genera un snapshot completo de la sesión para poder reconstruirla más tarde"""
+        return {
+            'version': 1,
+            'session_id': self.session_id,
+            'card_name': self.card_name,
+            'card_type': self.card_type,
+            'created_at': self.created_at.isoformat(),
+            'card_created': self.card_created,
+            'card_selected': self.card_selected,
+            'psc_verified': self.psc_verified,
+            'psc_has_been_changed': self.psc_has_been_changed,
+            'is_blocked': self.is_blocked,
+            'user_info': self.user_info,
+            'command_log': self.command_log,
+            'memory': self.memory_manager.export_state(),
+            'error_counter_index': self.apdu_handler.error_counter_index,
+            'error_counter': self.apdu_handler.error_counter
+        }
+
+    @classmethod
+    @timed()
+    def from_snapshot(cls, snapshot):
+        """
+        Reconstruye una sesión a partir de un snapshot generado con to_snapshot().
+        No vuelve a inicializar la memoria de fábrica ni añade entradas al log.
+        """
+        session = cls.__new__(cls)
+        session.session_id = snapshot['session_id']
+        session.card_name = snapshot['card_name']
+        session.card_type = snapshot['card_type']
+        session.created_at = datetime.datetime.fromisoformat(snapshot['created_at'])
+
+        # Gestores específicos de esta sesión
+        session.memory_manager = MemoryManager()
+        session.memory_manager.import_state(snapshot['memory'])
+        session.apdu_handler = APDUHandler(session.memory_manager, session.card_type)
+        session.apdu_handler.error_counter_index = snapshot['error_counter_index']
+        session.apdu_handler.error_counter = snapshot['error_counter']
+
+        # Estados de la tarjeta
+        session.card_created = snapshot.get('card_created', True)
+        session.card_selected = snapshot['card_selected']
+        session.psc_verified = snapshot['psc_verified']
+        session.psc_has_been_changed = snapshot['psc_has_been_changed']
+        session.is_blocked = snapshot['is_blocked']
+        session.command_log = snapshot['command_log']
+        session.user_info = snapshot['user_info']
+
+        # Archivo temporal para persistencia
+        session.temp_file = None
+        session._create_temp_file()
+        return session
+
+    @timed()
+    def clone(self, card_name):
+        """
+        Crea una nueva sesión con el mismo contenido que esta.
+        La memoria se comparte copy-on-write; protección, PSC y error counter se copian.
+        La copia empieza sin seleccionar ni PSC verificado, como una tarjeta recién insertada.
+        """
+        session = self.__class__.__new__(self.__class__)
+        session.session_id = str(uuid.uuid4())
+        session.card_name = card_name
+        session.card_type = self.card_type
+        session.created_at = datetime.datetime.now()
+
+        # Gestores específicos de esta sesión
+        session.memory_manager = self.memory_manager.clone()
+        session.apdu_handler = APDUHandler(session.memory_manager, self.card_type)
+        session.apdu_handler.error_counter_index = self.apdu_handler.error_counter_index
+        session.apdu_handler.error_counter = self.apdu_handler.error_counter
+
+        # Estados de la tarjeta
+        session.card_created = True
+        session.card_selected = False
+        session.psc_verified = False
+        session.psc_has_been_changed = self.psc_has_been_changed
+        session.is_blocked = self.is_blocked
+        session.command_log = []
+        session.user_info = self.user_info
+
+        session.temp_file = None
+        session.add_to_log("INFO", f"Card session cloned from {self.card_name}: {card_name} ({session._get_card_type_display()})")
+
+        # Archivo temporal para persistencia (se escribe una sola vez, ya con el log inicial)
+        session._create_temp_file()
+        return session
+
+    @timed()
     def add_to_log(self, log_type, message, apdu_data=None):
         """Añade una entrada al log de comandos de esta sesión"""
         timestamp = datetime.datetime.now().strftime("%H:%M:%S")
@@ -117,6 +210,7 @@ class CardSession:
         # Guardar estado después de cada log
         self.save_session_state()
     
+    @timed()
     def execute_select_card(self):
         """Ejecuta el comando Select Card específico para esta sesión"""
         result = self.apdu_handler.process_select_card()
@@ -136,6 +230,7 @@ class CardSession:
             
         return result
     
+    @timed()
     def execute_present_psc(self, psc_bytes):
         """Ejecuta Present PSC específico para esta sesión"""
         result = self.apdu_handler.process_present_psc(psc_bytes)
@@ -163,6 +258,7 @@ class CardSession:
         result = self.apdu_handler.process_read_memory(address, length)
         return result
     
+    @timed()
     def execute_write_memory(self, address, data_bytes):
         """Ejecuta Write Memory específico para esta sesión"""
         if not self.psc_verified:
@@ -192,6 +288,7 @@ class CardSession:
             
         return result
     
+    @timed()
     def execute_change_psc(self, new_psc_bytes):
         """Ejecuta Change PSC específico para esta sesión"""
         if not self.psc_verified:
@@ -226,6 +323,7 @@ class CardSession:
             
         return result
     
+    @timed()
     def get_memory_display_data_with_colors(self):
         """Obtiene los datos de memoria formateados con colores para la interfaz"""
         # Para SLE5542: PSC es visible solo si está verificado o ha sido cambiado (registro interno)
@@ -0,0 +1,270 @@
+"""
+Transportes de lectores de tarjetas: PC/SC real (pyscard) o lectores virtuales
+
+Un transporte expone list_readers() con objetos con la misma interfaz que los
+lectores de pyscard: str(lector) es su nombre y createConnection() devuelve una
+conexión con connect(), transmit(apdu) -> (datos, sw1, sw2), getATR() y disconnect().
+
+Los lectores virtuales responden a las APDUs de lector (FF A4/20/B0/B1/D0/D2) con
+una tarjeta simulada en el propio proceso (APDUHandler + MemoryManager) y un modelo
+de tiempos configurable, para ejecutar PhysicalCardHandler, los diálogos físicos y
+la estación de grabación sin hardware. Con la variable de entorno
+CARDSIM_VIRTUAL_READERS=5542,5528 la aplicación arranca con un lector virtual por
+tipo indicado en lugar de los lectores PC/SC.
+"""
+
+import logging
+import os
+import threading
+import time
+
+try:
+    from smartcard.System import readers
+    from smartcard.Exceptions import NoCardException
+    SMARTCARD_AVAILABLE = True
+except ImportError:
+    NoCardException = None
+    SMARTCARD_AVAILABLE = False
+
+from src.utils.constants import CARD_TYPE_5542, CARD_TYPE_5528, SW_SUCCESS, SW_WRITE_PROTECTION_ERROR
+from .apdu_planner import get_card_profile
+from .apdu_handler import APDUHandler
+from .memory_manager import MemoryManager
+
+logger = logging.getLogger(__name__)
+
+
+class NoCardError(Exception):
+    """El lector no tiene tarjeta (no es un fallo del lector)"""
+
+
+# Excepciones de connect() que solo indican que el lector está vacío
+NO_CARD_ERRORS = (NoCardError, NoCardException) if NoCardException else (NoCardError,)
+
+# Variable de entorno con los tipos de tarjeta de los lectores virtuales (p. ej. "5542,5528")
+VIRTUAL_READERS_ENV = "CARDSIM_VIRTUAL_READERS"
+
+# Modelo de tiempos de un lector virtual
+DEFAULT_VIRTUAL_TIMING = {
+    'apdu_ms': 15.0,            # Ida y vuelta de cada APDU (USB + firmware del lector)
+    'read_ms_per_byte': 0.1,    # Transferencia por byte leído
+    'write_ms_per_byte': 2.5,   # Ciclo de borrado/escritura de la EEPROM por byte
+    'max_apdu_length': 255,     # Lc/Le máximo que acepta el lector (si no, SW 6700)
+    'realtime': True,           # False: el tiempo solo se contabiliza, sin esperar
+}
+
+
+class PCSCTransport:
+    """Lectores PC/SC reales a través de pyscard"""
+
+    name = 'pcsc'
+
+    def __init__(self):
+        self._warned = False
+
+    def is_available(self):
+        # Se avisa al usar los lectores, no al importar (los procesos de la granja no los usan)
+        if not SMARTCARD_AVAILABLE and not self._warned:
+            logger.warning("pyscard library not found. Install with: pip install pyscard")
+            self._warned = True
+        return SMARTCARD_AVAILABLE
+
+    def list_readers(self):
+        return readers() if SMARTCARD_AVAILABLE else []
+
+
+class VirtualCard:
+    """Tarjeta SLE5542/5528 simulada que responde a las APDUs de lector"""
+
+    def __init__(self, card_type=CARD_TYPE_5542, memory_manager=None, apdu_handler=None):
+        if memory_manager is None:
+            memory_manager = MemoryManager()
+            memory_manager.initialize_memory(card_type)
+        self.card_type = memory_manager.card_type
+        self.memory_manager = memory_manager
+        self.apdu_handler = apdu_handler or APDUHandler(memory_manager, self.card_type)
+        self.atr = list(get_card_profile(self.card_type)['atrs'][0])
+        self.psc_verified = False  # Se pierde con cada SELECT (reset de la tarjeta)
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_session(cls, session):
+        """Tarjeta virtual que comparte memoria y contador de errores con una CardSession"""
+        return cls(memory_manager=session.memory_manager, apdu_handler=session.apdu_handler)
+
+    def process_apdu(self, apdu):
+        """Ejecuta una APDU de lector y devuelve (datos, sw1, sw2)"""
+        if len(apdu) < 5 or apdu[0] != 0xFF:
+            return [], 0x6E, 0x00
+        ins = apdu[1]
+        address = (apdu[2] << 8) | apdu[3]
+        length = apdu[4]
+        body = list(apdu[5:5 + length])
+
+        if ins == 0xA4:
+            self.psc_verified = False
+            return [], *SW_SUCCESS
+
+        if ins == 0x20:
+            result = self.apdu_handler.process_present_psc(body)
+            self.psc_verified = result['success']
+            return [], result['sw1'], result['sw2']
+
+        if ins == 0xB0:
+            length = length or 256  # Le = 00 pide una página completa
+            if address + length > self.memory_manager.get_memory_size():
+                return [], 0x6B, 0x00
+            return self.memory_manager.read_memory(address, length), *SW_SUCCESS
+
+        if ins == 0xB1:
+            psc = self.memory_manager.get_current_psc() if self.psc_verified else [0x00] * 3
+            data = [self.memory_manager.get_error_counter()] + list(psc)
+            return data[:length], *SW_SUCCESS
+
+        if ins in (0xD0, 0xD2):
+            if not self.psc_verified:
+                return [], *SW_WRITE_PROTECTION_ERROR
+            if ins == 0xD2:
+                result = self.apdu_handler.process_change_psc(body)
+            else:
+                if address + length > self.memory_manager.get_memory_size():
+                    return [], 0x6B, 0x00
+                # Los bytes protegidos se ignoran sin error, como en la tarjeta real
+                result = self.apdu_handler.process_write_memory(address, body)
+            return [], result['sw1'], result['sw2']
+
+        return [], 0x6D, 0x00
+
+
+class VirtualConnection:
+    """Conexión con un lector virtual (misma interfaz que CardConnection de pyscard)"""
+
+    def __init__(self, reader):
+        self.reader = reader
+        self.card = None
+
+    def connect(self):
+        if self.reader.card is None:
+            raise NoCardError(f"No smart card inserted in {self.reader.name}")
+        self.card = self.reader.card
+
+    def disconnect(self):
+        self.card = None
+
+    def _check_card(self):
+        if self.card is None or self.reader.card is not self.card:
+            raise Exception("Card was removed")
+
+    def getATR(self):
+        self._check_card()
+        return list(self.card.atr)
+
+    def transmit(self, apdu):
+        self._check_card()
+        timing = self.reader.timing
+        length = apdu[4] if len(apdu) > 4 else 0
+        with self.card.lock:
+            if length > timing['max_apdu_length']:
+                data, sw1, sw2 = [], 0x67, 0x00
+            else:
+                data, sw1, sw2 = self.card.process_apdu(list(apdu))
+
+            cost_ms = timing['apdu_ms'] + len(data) * timing['read_ms_per_byte']
+            if apdu[1] in (0xD0, 0xD2) and (sw1, sw2) == SW_SUCCESS:
+                cost_ms += length * timing['write_ms_per_byte']
+            self.reader.record(cost_ms / 1000.0)
+            if timing['realtime']:
+                time.sleep(cost_ms / 1000.0)
+        return data, sw1, sw2
+
+
+class VirtualReader:
+    """Lector virtual con una ranura en la que se insertan y retiran VirtualCard"""
+
+    def __init__(self, name, card=None, timing=None):
+        self.name = name
+        self.card = card
+        self.timing = dict(DEFAULT_VIRTUAL_TIMING)
+        self.timing.update(timing or {})
+        self.apdu_count = 0
+        self.elapsed_seconds = 0.0  # Tiempo de lector simulado (también con realtime=False)
+        self._stats_lock = threading.Lock()
+
+    def insert(self, card):
+        """Inserta una tarjeta (sustituye a la que hubiera)"""
+        self.card = card
+
+    def eject(self):
+        """Retira la tarjeta: las conexiones abiertas fallan en el siguiente transmit"""
+        self.card = None
+
+    def record(self, seconds):
+        with self._stats_lock:
+            self.apdu_count += 1
+            self.elapsed_seconds += seconds
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self.apdu_count = 0
+            self.elapsed_seconds = 0.0
+
+    def createConnection(self):
+        return VirtualConnection(self)
+
+    def __str__(self):
+        return self.name
+
+
+class VirtualTransport:
+    """Conjunto de lectores virtuales en el propio proceso"""
+
+    name = 'virtual'
+
+    def __init__(self):
+        self.readers = []
+
+    def is_available(self):
+        return True
+
+    def list_readers(self):
+        return list(self.readers)
+
+    def add_reader(self, name=None, card=None, timing=None):
+        """Añade un lector (con la tarjeta indicada insertada, si la hay)"""
+        name = name or f"CardSIM Virtual Reader {len(self.readers)}"
+        reader = VirtualReader(name, card, timing)
+        self.readers.append(reader)
+        return reader
+
+    def remove_reader(self, name):
+        self.readers = [reader for reader in self.readers if reader.name != name]
+
+    def get_reader(self, name):
+        for reader in self.readers:
+            if reader.name == name:
+                return reader
+        return None
+
+
+def transport_from_environment():
+    """Transporte según CARDSIM_VIRTUAL_READERS (lectores virtuales) o PC/SC por defecto"""
+    spec = os.environ.get(VIRTUAL_READERS_ENV, "").strip()
+    if not spec:
+        return PCSCTransport()
+
+    transport = VirtualTransport()
+    for item in spec.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        try:
+            card_type = int(item)
+        except ValueError:
+            logger.warning("Ignoring virtual reader with unknown card type '%s'", item)
+            continue
+        if card_type not in (CARD_TYPE_5542, CARD_TYPE_5528):
+            logger.warning("Ignoring virtual reader with unknown card type '%s'", item)
+            continue
+        name = f"CardSIM Virtual Reader {len(transport.readers)} ({get_card_profile(card_type)['name']})"
+        transport.add_reader(name, VirtualCard(card_type))
+    return transport
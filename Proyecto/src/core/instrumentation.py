@@ -0,0 +1,156 @@
+"""
+Contadores de tiempo de los caminos calientes del simulador
+
+Las funciones marcadas con @timed() y los bloques con measure(nombre) acumulan,
+mientras la instrumentación está activa, número de llamadas, tiempo total y
+tiempo máximo por nombre. Desactivada (por defecto), el decorador solo comprueba
+un booleano y measure() devuelve un contexto vacío compartido, sin crear objetos
+ni leer el reloj.
+
+Se activa desde la pestaña Timings de Performance Diagnostics, que muestra la
+tabla en vivo y la exporta a CSV. A diferencia de action_profiler (cProfile de
+acciones completas), aquí se cuenta cada llamada con un coste mínimo.
+"""
+
+import csv
+import functools
+import threading
+import time
+
+CSV_FIELDS = ['name', 'calls', 'total_ms', 'mean_ms', 'max_ms']
+
+
+class _NullTimer:
+    """Contexto que no mide nada (instrumentación desactivada)"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    """Contexto que mide un bloque y lo suma a su nombre"""
+
+    __slots__ = ('instrumentation', 'name', 'started')
+
+    def __init__(self, instrumentation, name):
+        self.instrumentation = instrumentation
+        self.name = name
+        self.started = 0.0
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.instrumentation.record(self.name, time.perf_counter() - self.started)
+        return False
+
+
+class Instrumentation:
+    """Llamadas, tiempo total y máximo por nombre de función o bloque"""
+
+    def __init__(self):
+        self.enabled = False
+        self._stats = {}  # nombre -> [llamadas, segundos totales, segundos máximo]
+        self._lock = threading.Lock()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    def record(self, name, seconds):
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                self._stats[name] = [1, seconds, seconds]
+                return
+            stats[0] += 1
+            stats[1] += seconds
+            if seconds > stats[2]:
+                stats[2] = seconds
+
+    def measure(self, name):
+        """Contexto que mide el bloque como name (no hace nada si está desactivada)"""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name)
+
+    def snapshot(self):
+        """Filas (dict) ordenadas por tiempo total, de mayor a menor"""
+        with self._lock:
+            items = [(name, list(stats)) for name, stats in self._stats.items()]
+        rows = [{
+            'name': name,
+            'calls': calls,
+            'total_ms': total * 1000,
+            'mean_ms': total / calls * 1000,
+            'max_ms': maximum * 1000,
+        } for name, (calls, total, maximum) in items]
+        rows.sort(key=lambda row: row['total_ms'], reverse=True)
+        return rows
+
+    def export_csv(self, filepath):
+        """
+        Guarda la tabla actual en CSV
+
+        Returns:
+            tuple: (success, message)
+        """
+        rows = self.snapshot()
+        try:
+            with open(filepath, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+                writer.writeheader()
+                for row in rows:
+                    writer.writerow({**row,
+                                     'total_ms': f"{row['total_ms']:.3f}",
+                                     'mean_ms': f"{row['mean_ms']:.4f}",
+                                     'max_ms': f"{row['max_ms']:.3f}"})
+        except OSError as e:
+            return False, f"Could not export timings: {e}"
+        return True, f"{len(rows)} timings exported to {filepath}"
+
+
+# Instancia global (una por proceso)
+instrumentation = Instrumentation()
+
+
+def timed(name=None):
+    """
+    Decorador que acumula llamadas y tiempos de la función en la instrumentación global.
+
+    Sin nombre se usa el qualname (p. ej. 'MemoryManager.read_memory').
+    """
+    def decorator(func):
+        label = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not instrumentation.enabled:
+                return func(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                instrumentation.record(label, time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+def measure(name):
+    """Atajo de instrumentation.measure(name)"""
+    return instrumentation.measure(name)
@@ -0,0 +1,203 @@
+"""
+Cuánta memoria ocupa cada tarjeta abierta
+
+session_memory() recorre una CardSession con sys.getsizeof (listas, dicts,
+conjuntos, cadenas y atributos de objetos) y reparte los bytes en:
+
+    memory_image  memory_data, bits de protección y PSC interno
+    command_log   entradas del log de comandos
+    caches        copia de fábrica y direcciones modificadas
+    other         el resto (la propia sesión, APDUHandler, nombres, rutas...)
+
+Cada objeto se cuenta una sola vez por sesión. Entre sesiones sí puede haber
+objetos compartidos (imagen copy-on-write de un clon, copia de fábrica, las
+cadenas 'FF' internadas), así que el total del SessionManager se calcula con
+un único recorrido y suele ser menor que la suma de las sesiones. Las sesiones
+hibernadas ocupan solo el stub en RAM más su snapshot en disco.
+
+TracemallocSampler complementa el recorrido: mide todo lo asignado por Python
+desde que se activa (incluidos widgets de Tk y estructuras de la interfaz) y
+compara instantáneas para ver qué líneas crecen entre dos momentos.
+"""
+
+import os
+import sys
+import tracemalloc
+import types
+
+from .session_hibernation import HibernatedSession
+
+# Tipos que no pertenecen a ninguna sesión: no se cuentan ni se recorren
+_SKIP_TYPES = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType,
+               types.MethodType, types.CodeType)
+
+CATEGORIES = ('memory_image', 'command_log', 'caches', 'other')
+
+
+def deep_sizeof(obj, seen=None):
+    """
+    Bytes de obj y de todo lo que alcanza (contenedores y atributos de instancia).
+
+    Los objetos cuyo id está en seen no se vuelven a contar; seen se actualiza
+    para que varias llamadas seguidas repartan los objetos compartidos.
+    """
+    if seen is None:
+        seen = set()
+    total = 0
+    stack = [obj]
+    while stack:
+        current = stack.pop()
+        if current is None or isinstance(current, _SKIP_TYPES) or id(current) in seen:
+            continue
+        seen.add(id(current))
+        total += sys.getsizeof(current)
+
+        if isinstance(current, (str, bytes, bytearray, int, float, bool)):
+            continue
+        if isinstance(current, dict):
+            stack.extend(current.keys())
+            stack.extend(current.values())
+        elif isinstance(current, (list, tuple, set, frozenset)):
+            stack.extend(current)
+
+        attributes = getattr(current, '__dict__', None)
+        if attributes is not None and not isinstance(attributes, types.MappingProxyType):
+            stack.append(attributes)
+        for slot in getattr(type(current), '__slots__', ()):
+            value = getattr(current, slot, None)
+            if value is not None:
+                stack.append(value)
+    return total
+
+
+def session_memory(session, seen=None):
+    """
+    Bytes de una sesión por categoría (dict con CATEGORIES, total y datos de la sesión)
+
+    Con seen compartido entre llamadas, lo ya contado en otra sesión no se repite.
+    """
+    if seen is None:
+        seen = set()
+    row = {
+        'session_id': session.session_id,
+        'card_name': session.card_name,
+        'card_type': session.card_type,
+        'hibernated': isinstance(session, HibernatedSession),
+        'log_entries': 0,
+        'shared_memory': False,
+        'disk_bytes': 0,
+    }
+
+    if row['hibernated']:
+        row.update({category: 0 for category in CATEGORIES})
+        row['other'] = deep_sizeof(session, seen)
+        try:
+            if session.snapshot_file:
+                row['disk_bytes'] = os.path.getsize(session.snapshot_file)
+        except OSError:
+            pass
+    else:
+        memory_manager = session.memory_manager
+        row['memory_image'] = sum(deep_sizeof(getattr(memory_manager, name, None), seen)
+                                  for name in ('memory_data', 'protection_data', 'internal_psc_5542'))
+        row['command_log'] = deep_sizeof(session.command_log, seen)
+        row['caches'] = sum(deep_sizeof(getattr(memory_manager, name, None), seen)
+                            for name in ('factory_memory', 'modified_addresses'))
+        row['other'] = deep_sizeof(session, seen)
+        row['log_entries'] = len(session.command_log)
+        row['shared_memory'] = getattr(memory_manager, '_memory_shared', False)
+
+    row['total'] = sum(row[category] for category in CATEGORIES)
+    return row
+
+
+def session_manager_memory(session_manager):
+    """
+    Informe del SessionManager: una fila por sesión, su suma y el total real
+
+    Returns:
+        dict: sessions (filas de session_memory), sessions_total (suma por
+              separado), manager_total (recorrido único, compartidos una vez),
+              resident, hibernated y disk_bytes
+    """
+    rows = [session_memory(session) for session in session_manager.get_all_sessions()]
+    return {
+        'sessions': rows,
+        'sessions_total': sum(row['total'] for row in rows),
+        'manager_total': deep_sizeof(session_manager),
+        'resident': sum(1 for row in rows if not row['hibernated']),
+        'hibernated': sum(1 for row in rows if row['hibernated']),
+        'disk_bytes': sum(row['disk_bytes'] for row in rows),
+    }
+
+
+def format_bytes(count):
+    """Bytes con la unidad más legible"""
+    if count < 1024:
+        return f"{count} B"
+    if count < 1024 * 1024:
+        return f"{count / 1024:.1f} KB"
+    return f"{count / (1024 * 1024):.2f} MB"
+
+
+class TracemallocSampler:
+    """Instantáneas de tracemalloc y diferencias con la anterior"""
+
+    def __init__(self, frames=1):
+        self.frames = frames
+        self.previous = None
+        self._started_here = False
+
+    def is_tracing(self):
+        return tracemalloc.is_tracing()
+
+    def start(self):
+        """Empieza a trazar (si ya lo hacía otro, p. ej. PYTHONTRACEMALLOC, se reutiliza)"""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._started_here = True
+        self.previous = None
+
+    def stop(self):
+        """Deja de trazar si lo empezó este sampler"""
+        if self._started_here and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self._started_here = False
+        self.previous = None
+
+    def sample(self, limit=15):
+        """
+        Memoria trazada y las líneas que más ocupan
+
+        Returns:
+            dict: current, peak, top [(ubicación, bytes, bloques)] y diff
+                  [(ubicación, bytes de diferencia, bloques de diferencia)] con la
+                  muestra anterior (vacío en la primera)
+        """
+        if not tracemalloc.is_tracing():
+            return None
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        ))
+        current, peak = tracemalloc.get_traced_memory()
+
+        top = [(_location(stat.traceback), stat.size, stat.count)
+               for stat in snapshot.statistics('lineno')[:limit]]
+        diff = []
+        if self.previous is not None:
+            diff = [(_location(stat.traceback), stat.size_diff, stat.count_diff)
+                    for stat in snapshot.compare_to(self.previous, 'lineno')[:limit]
+                    if stat.size_diff]
+        self.previous = snapshot
+        return {'current': current, 'peak': peak, 'top': top, 'diff': diff}
+
+
+def _location(traceback):
+    frame = traceback[0]
+    return f"{os.path.basename(frame.filename)}:{frame.lineno}"
+
+
+# Instancia global usada por la ventana de diagnóstico
+tracemalloc_sampler = TracemallocSampler()
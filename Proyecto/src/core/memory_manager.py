@@ -2,8 +2,14 @@
 Gestor de memoria de tarjetas SLE5542/5528
 """
 
+import logging
+
 from src.utils.constants import *
+from src.utils.logging_config import HexBytes
 from .code_improvements import safe_hex_to_ascii, format_memory_display
+from .instrumentation import timed
+
+logger = logging.getLogger(__name__)
 
 class MemoryManager:
     """Gestiona la memoria de l                        # ASCII representation con mejor separación
@@ -20,6 +26,10 @@ class MemoryManager:
         # SLE5542 tiene registro interno separado, SLE5528 usa memoria normal
         self.internal_psc_5542 = [0xFF, 0xFF, 0xFF]  # PSC interno SLE5542
         
+        # Copy-on-write: True mientras memory_data se comparte con una sesión clonada
+        self._memory_shared = False
+        
+    @timed()
     def initialize_memory(self, card_type):
         """Inicializa la memoria según el tipo de tarjeta"""
         self.card_type = card_type
@@ -36,6 +46,7 @@ class MemoryManager:
             self.memory_data = ['FF'] * MEMORY_SIZE_5528
         else:
             self.memory_data = ['FF'] * MEMORY_SIZE_5542
+        self._memory_shared = False
             
         # Set para rastrear direcciones modificadas
         self.modified_addresses = set()
@@ -62,14 +73,14 @@ class MemoryManager:
         if card_type == CARD_TYPE_5542:
             # SLE5542: PSC en registro interno
             self.internal_psc_5542 = DEFAULT_PSC_5542.copy()
-            print(f"DEBUG: SLE5542 initialized with internal PSC: {' '.join([f'{b:02X}' for b in self.internal_psc_5542])}")
+            logger.debug("SLE5542 initialized with internal PSC: %s", HexBytes(self.internal_psc_5542))
         else:
             # SLE5528: PSC en memoria visible
             for i, byte_val in enumerate(psc_data):
                 psc_address = psc_addr + i
                 if psc_address < len(self.memory_data) and psc_address not in init_data:
                     self.memory_data[psc_address] = f"{byte_val:02X}"
-            print(f"DEBUG: SLE5528 initialized with memory PSC at 0x{psc_addr:03X}: {' '.join([f'{b:02X}' for b in psc_data])}")
+            logger.debug("SLE5528 initialized with memory PSC at 0x%03X: %s", psc_addr, HexBytes(psc_data))
                 
         # Inicializar protecciones de fábrica
         self.protection_data = set()
@@ -139,6 +150,7 @@ class MemoryManager:
             self.memory_data = ['FF'] * MEMORY_SIZE_5528
         else:
             self.memory_data = ['FF'] * MEMORY_SIZE_5542
+        self._memory_shared = False
         # Limpiar registro de modificaciones
         self.modified_addresses.clear()
         
@@ -146,6 +158,7 @@ class MemoryManager:
         """Limpia solo el registro de modificaciones sin afectar la memoria"""
         self.modified_addresses.clear()
     
+    @timed()
     def read_memory(self, address, length):
         """Lee datos de la memoria"""
         data = []
@@ -251,13 +264,14 @@ class MemoryManager:
         
         return True, "Área de escritura segura"
     
+    @timed()
     def write_memory(self, address, data_bytes):
         """Escribe datos en la memoria y marca las direcciones como modificadas"""
         
         # Validar que se escriba solo en áreas seguras
         is_valid, validation_msg = self._validate_safe_write_area(address, len(data_bytes))
         if not is_valid:
-            print(f"SIMULADOR - Escritura bloqueada por seguridad: {validation_msg}")
+            logger.warning("SIMULADOR - Escritura bloqueada por seguridad: %s", validation_msg)
             # En el simulador, retornamos directamente sin error para mantener compatibilidad
             # pero mostramos el mensaje de advertencia
         
@@ -274,6 +288,8 @@ class MemoryManager:
         else:  # CARD_TYPE_5528
             readonly_set = READONLY_ADDRESSES_5528
         
+        self._ensure_private_memory()
+        
         for i, byte_val in enumerate(data_bytes):
             addr = address + i
             if addr < len(self.memory_data):
@@ -317,6 +333,7 @@ class MemoryManager:
         if self.card_type == CARD_TYPE_5528 and 0 <= page_num < PAGES_5528:
             self.current_page = page_num
     
+    @timed()
     def get_memory_display_data_with_colors(self, psc_verified=False):
         """Obtiene datos formateados con información de color para cada byte"""
         display_data = []
@@ -456,6 +473,7 @@ class MemoryManager:
             # Solo SLE5528 tiene error counter visible en memoria (dirección 0x3FD)
             error_counter_addr = ERROR_COUNTER_ADDRESS_5528
             if error_counter_addr < len(self.memory_data):
+                self._ensure_private_memory()
                 # SOLO actualizar el error counter, NO tocar PSC
                 self.memory_data[error_counter_addr] = f"{self.error_counter:02X}"
     
@@ -488,6 +506,7 @@ class MemoryManager:
             return False
         return address in self.protection_data
     
+    @timed()
     def get_protection_bits(self):
         """Genera los 4 bytes de bits de protección para los primeros 32 bytes"""
         # Inicializar con todos los bits a 1 (no protegido)
@@ -553,33 +572,100 @@ class MemoryManager:
             # SLE5542: Actualizar registro interno
             if len(new_psc) == 3:
                 self.internal_psc_5542 = new_psc.copy()
-                print(f"DEBUG: SLE5542 internal PSC updated to: {' '.join([f'{b:02X}' for b in new_psc])}")
+                logger.debug("SLE5542 internal PSC updated to: %s", HexBytes(new_psc))
                 return True
             else:
-                print(f"ERROR: SLE5542 PSC must be 3 bytes, got {len(new_psc)}")
+                logger.error("SLE5542 PSC must be 3 bytes, got %d", len(new_psc))
                 return False
         else:
             # SLE5528: Actualizar memoria visible
             if len(new_psc) == 2:
+                self._ensure_private_memory()
                 psc_start = PSC_ADDRESS_5528
                 for i, byte_val in enumerate(new_psc):
                     address = psc_start + i
                     if address < len(self.memory_data):
                         self.memory_data[address] = f"{byte_val:02X}"
                         self.modified_addresses.add(address)
-                print(f"DEBUG: SLE5528 memory PSC updated to: {' '.join([f'{b:02X}' for b in new_psc])}")
+                logger.debug("SLE5528 memory PSC updated to: %s", HexBytes(new_psc))
                 return True
             else:
-                print(f"ERROR: SLE5528 PSC must be 2 bytes, got {len(new_psc)}")
+                logger.error("SLE5528 PSC must be 2 bytes, got %d", len(new_psc))
                 return False
     
+    @timed()
+    def export_state(self):
+        """
+        Exporta el estado completo de la memoria en un formato compacto y serializable.
+        La memoria se guarda como una única cadena hex para reducir el tamaño del snapshot.
+        """
+        return {
+            'card_type': self.card_type,
+            'memory_hex': ''.join(self.memory_data),
+            'current_page': self.current_page,
+            'error_counter': self.error_counter,
+            'protection_data': sorted(self.protection_data) if self.protection_data is not None else None,
+            'internal_psc_5542': list(self.internal_psc_5542),
+            'modified_addresses': sorted(getattr(self, 'modified_addresses', ()))
+        }
+
+    @timed()
+    def import_state(self, state):
+        """Restaura el estado exportado con export_state()"""
+        memory_hex = state['memory_hex']
+        self.card_type = state['card_type']
+        self.memory_data = [memory_hex[i:i + 2] for i in range(0, len(memory_hex), 2)]
+        self._memory_shared = False
+        self.current_page = state.get('current_page', 0)
+        self.error_counter = state.get('error_counter', self.error_counter)
+        protection_data = state.get('protection_data')
+        self.protection_data = set(protection_data) if protection_data is not None else None
+        self.internal_psc_5542 = list(state.get('internal_psc_5542', DEFAULT_PSC_5542))
+        self.modified_addresses = set(state.get('modified_addresses', ()))
+        # La configuración de fábrica no se guarda: se regenera a partir del tipo
+        self._store_factory_configuration(self.card_type)
+
+    @timed()
+    def clone(self):
+        """
+        Crea un MemoryManager que comparte la imagen de memoria con este (copy-on-write).
+        La lista memory_data no se copia hasta que cualquiera de los dos escribe en ella;
+        protección, PSC interno y error counter se copian porque son pequeños.
+        """
+        clone = MemoryManager()
+        clone.card_type = self.card_type
+        clone.current_page = self.current_page
+        clone.error_counter = self.error_counter
+        clone.protection_data = set(self.protection_data) if self.protection_data is not None else None
+        clone.internal_psc_5542 = list(self.internal_psc_5542)
+        clone.modified_addresses = set(getattr(self, 'modified_addresses', ()))
+        
+        # La memoria de fábrica nunca se modifica: se comparte sin copy-on-write
+        if hasattr(self, 'factory_memory'):
+            clone.factory_memory = self.factory_memory
+        else:
+            clone._store_factory_configuration(self.card_type)
+        
+        clone.memory_data = self.memory_data
+        clone._memory_shared = True
+        self._memory_shared = True
+        return clone
+    
+    def _ensure_private_memory(self):
+        """Copia la imagen de memoria compartida antes de la primera escritura"""
+        if self._memory_shared:
+            self.memory_data = list(self.memory_data)
+            self._memory_shared = False
+    
     def load_memory_dump(self, memory_dump):
         """Carga un dump de memoria desde una lista"""
         if isinstance(memory_dump, list):
             self.memory_data = memory_dump.copy()
+            self._memory_shared = False
             return True
         return False
 
+    @timed()
     def load_from_data(self, data):
         """Carga datos de memoria desde una lista de bytes"""
         try:
@@ -591,6 +677,7 @@ class MemoryManager:
                 self.memory_data = [f"{byte:02X}" for byte in data]
             else:
                 return False
+            self._memory_shared = False
             
             # Actualizar el tipo de tarjeta según el tamaño de los datos
             if len(self.memory_data) == MEMORY_SIZE_5542:
@@ -622,5 +709,5 @@ class MemoryManager:
             return True
             
         except Exception as e:
-            print(f"Error loading data: {e}")
+            logger.error("Error loading data: %s", e)
             return False
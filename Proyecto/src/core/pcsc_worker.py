@@ -0,0 +1,398 @@
+"""
+Proceso de E/S para los lectores PC/SC
+
+Las llamadas a pyscard se ejecutan en un proceso aparte para que un lector que deja
+de responder no bloquee la aplicación. Cada petición tiene un tiempo máximo sin
+actividad, que se renueva con cada APDU completada, y se puede cancelar. Si vence o
+se cancela, el proceso se termina (con él la llamada bloqueada en transmit) y se
+vuelve a lanzar en la siguiente petición, sin reiniciar la aplicación.
+
+Cada cliente (RemoteCardHandler) tiene en el proceso de E/S su propio hilo y su
+PhysicalCardHandler, y en este proceso su propio lock y su buzón de respuestas:
+las peticiones de un mismo cliente van de una en una, pero las de clientes
+distintos (p. ej. un lector por cliente en la estación de grabación) se ejecutan
+a la vez. Un hilo despachador reparte las respuestas entre los buzones.
+"""
+
+import itertools
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+
+from src.utils.constants import PCSC_APDU_TIMEOUT_SECONDS, PCSC_WORKER_START_TIMEOUT_SECONDS
+from src.utils.logging_config import configure_logging, get_log_level, set_log_level
+
+logger = logging.getLogger(__name__)
+
+# Intervalo con el que se comprueban respuestas, plazos y cancelaciones
+_RESPONSE_POLL_SECONDS = 0.1
+
+
+class PCSCWorkerError(Exception):
+    """La operación no se completó en el proceso de E/S"""
+
+
+class ReaderTimeoutError(PCSCWorkerError):
+    """El lector no respondió a tiempo; el proceso de E/S se ha reiniciado"""
+
+
+class OperationCancelledError(PCSCWorkerError):
+    """La operación se canceló; el proceso de E/S se ha reiniciado"""
+
+
+def _worker_main(requests, responses, log_level):
+    """Bucle del proceso de E/S: reparte las peticiones entre un hilo por cliente"""
+    configure_logging(log_level)
+    from .physical_card_handler import close_all_connections
+
+    clients = {}  # cliente -> (cola de peticiones, hilo)
+    responses.put({'id': None, 'type': 'ready'})
+    while True:
+        request = requests.get()
+        if request is None:
+            break
+        if request['log_level'] != get_log_level():
+            set_log_level(request['log_level'])  # Cambiado desde Settings en el proceso principal
+
+        client = request['client']
+        if request['method'] == 'close':
+            entry = clients.pop(client, None)
+            if entry is None:
+                responses.put({'id': request['id'], 'type': 'result', 'value': None})
+            else:
+                entry[0].put(request)  # El hilo libera su handler, responde y termina
+            continue
+
+        entry = clients.get(client)
+        if entry is None:
+            inbox = queue.Queue()
+            thread = threading.Thread(target=_client_loop, args=(inbox, responses),
+                                      name=f"pcsc-client-{client}", daemon=True)
+            entry = clients[client] = (inbox, thread)
+            thread.start()
+        entry[0].put(request)
+
+    for inbox, _ in clients.values():
+        inbox.put(None)
+    for _, thread in clients.values():
+        thread.join(1.0)
+    close_all_connections()
+
+
+def _client_loop(inbox, responses):
+    """Hilo de un cliente en el proceso de E/S: su PhysicalCardHandler y sus peticiones, en orden"""
+    from .physical_card_handler import PhysicalCardHandler
+
+    handler = PhysicalCardHandler()
+    try:
+        while True:
+            request = inbox.get()
+            if request is None:
+                return
+            if request['method'] == 'close':
+                handler.release()
+                handler = None
+                responses.put({'id': request['id'], 'type': 'result', 'value': None})
+                return
+            _handle_request(handler, request, responses)
+    finally:
+        if handler is not None:
+            handler.release()
+
+
+def _handle_request(handler, request, responses):
+    """Ejecuta una petición con el handler del cliente y publica su resultado"""
+    from .physical_card_handler import PhysicalCardHandler
+
+    request_id = request['id']
+    method = request['method']
+    kwargs = dict(request['kwargs'])
+    try:
+        if method.startswith('_'):
+            raise AttributeError(f"Method not available: {method}")
+
+        # Cada APDU completada renueva el plazo de la petición en el proceso principal
+        def send_apdu(apdu):
+            result = PhysicalCardHandler.send_apdu(handler, apdu)
+            responses.put({'id': request_id, 'type': 'heartbeat'})
+            return result
+        handler.send_apdu = send_apdu
+
+        if request['progress']:
+            def progress_callback(fraction, eta_seconds):
+                responses.put({'id': request_id, 'type': 'progress', 'fraction': fraction, 'eta': eta_seconds})
+            kwargs['progress_callback'] = progress_callback
+
+        value = getattr(handler, method)(*request['args'], **kwargs)
+        responses.put({'id': request_id, 'type': 'result', 'value': value})
+    except Exception as e:
+        responses.put({'id': request_id, 'type': 'error', 'message': f"{type(e).__name__}: {e}"})
+
+
+class _WorkerProcess:
+    """Un arranque del proceso de E/S con sus colas (se descarta entero al reiniciar)"""
+
+    def __init__(self, context, log_level):
+        self.requests = context.Queue()
+        self.responses = context.Queue()
+        self.ready = threading.Event()  # El proceso ha cargado pyscard
+        self.dead = threading.Event()   # Parado o reiniciado: sus peticiones ya no tendrán respuesta
+        self.process = context.Process(target=_worker_main, args=(self.requests, self.responses, log_level),
+                                       name="pcsc-worker", daemon=True)
+
+
+class _PendingRequest:
+    """Petición en curso de un cliente: su buzón de respuestas y su cancelación"""
+
+    def __init__(self, request_id, client):
+        self.id = request_id
+        self.client = client
+        self.inbox = queue.Queue()
+        self.cancel_event = threading.Event()
+        self.worker_process = None  # Arranque del proceso al que se envió
+
+
+class PCSCWorker:
+    """
+    Lanza el proceso de E/S bajo demanda y le envía las peticiones de cada cliente.
+    Las llamadas bloquean el hilo que las hace (nunca el de Tk) hasta la respuesta,
+    el vencimiento del plazo o la cancelación.
+    """
+
+    def __init__(self, timeout=PCSC_APDU_TIMEOUT_SECONDS):
+        self.timeout = timeout
+        self.restarts = 0  # Veces que se ha tenido que matar el proceso
+
+        # spawn: no se hereda el estado de Tk ni de pyscard del proceso principal
+        self._context = multiprocessing.get_context('spawn')
+        self._worker_process = None
+
+        self._process_lock = threading.Lock()  # Arranque/parada del proceso
+        self._lock = threading.Lock()          # _client_locks y _pending
+        self._client_locks = {}                # cliente -> lock (una petición en curso por cliente)
+        self._pending = {}                     # id de petición -> _PendingRequest
+        self._ids = itertools.count(1)
+
+    def start(self):
+        """Lanza el proceso si no está en marcha (no espera a que esté listo)"""
+        self._current_process()
+
+    def _current_process(self):
+        """Arranque en marcha del proceso (lo lanza, con su despachador, si hace falta)"""
+        with self._process_lock:
+            worker_process = self._worker_process
+            if worker_process is not None and worker_process.process.is_alive() and not worker_process.dead.is_set():
+                return worker_process
+            if worker_process is not None:
+                worker_process.dead.set()
+            worker_process = self._worker_process = _WorkerProcess(self._context, get_log_level())
+            worker_process.process.start()
+            threading.Thread(target=self._dispatch_responses, args=(worker_process,),
+                             name="pcsc-responses", daemon=True).start()
+            return worker_process
+
+    def stop(self):
+        """Pide al proceso que cierre las conexiones y termine"""
+        with self._process_lock:
+            worker_process, self._worker_process = self._worker_process, None
+            if worker_process is None:
+                return
+            process = worker_process.process
+            if process.is_alive():
+                worker_process.requests.put(None)
+                process.join(1.0)
+            if process.is_alive():
+                process.terminate()
+                process.join(1.0)
+            worker_process.dead.set()
+
+    def cancel(self, client=None):
+        """Cancela la petición en curso del cliente indicado (o todas, sin cliente)"""
+        with self._lock:
+            for pending in self._pending.values():
+                if client is None or pending.client == client:
+                    pending.cancel_event.set()
+
+    def is_busy(self):
+        """Indica si hay alguna petición en curso"""
+        with self._lock:
+            return bool(self._pending)
+
+    def _dispatch_responses(self, worker_process):
+        """Hilo despachador: lleva cada mensaje del proceso de E/S al buzón de su petición"""
+        while not worker_process.dead.is_set():
+            try:
+                message = worker_process.responses.get(timeout=_RESPONSE_POLL_SECONDS)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+            if message['type'] == 'ready':
+                worker_process.ready.set()
+                continue
+            with self._lock:
+                pending = self._pending.get(message['id'])
+            if pending is not None:
+                pending.inbox.put(message)
+
+    def call(self, client, method, *args, progress_callback=None, **kwargs):
+        """
+        Ejecuta handler.method(*args, **kwargs) en el proceso de E/S y devuelve su resultado.
+        progress_callback(fracción, segundos_restantes) se llama en el hilo que hace la petición.
+
+        Raises:
+            ReaderTimeoutError: el lector no respondió en self.timeout segundos
+            OperationCancelledError: se llamó a cancel() durante la petición
+            PCSCWorkerError: el método lanzó una excepción en el proceso de E/S
+        """
+        with self._client_lock(client):
+            return self._request(client, method, args, kwargs, progress_callback)
+
+    def close_client(self, client):
+        """
+        Libera el handler del cliente en el proceso de E/S.
+        Si el proceso no está en marcha (o se reinició) no hay nada que liberar y no se arranca.
+        """
+        with self._client_lock(client):
+            try:
+                worker_process = self._worker_process
+                if (worker_process is None or not worker_process.ready.is_set() or worker_process.dead.is_set()
+                        or not worker_process.process.is_alive()):
+                    return
+                self._request(client, 'close', (), {}, None)
+            finally:
+                with self._lock:
+                    self._client_locks.pop(client, None)
+
+    def _client_lock(self, client):
+        with self._lock:
+            lock = self._client_locks.get(client)
+            if lock is None:
+                lock = self._client_locks[client] = threading.Lock()
+            return lock
+
+    def _request(self, client, method, args, kwargs, progress_callback):
+        """Envía una petición y espera su respuesta (con el lock del cliente adquirido)"""
+        pending = _PendingRequest(next(self._ids), client)
+        with self._lock:
+            self._pending[pending.id] = pending
+        try:
+            worker_process = self._wait_until_ready(pending)
+            worker_process.requests.put({
+                'id': pending.id,
+                'client': client,
+                'method': method,
+                'args': args,
+                'kwargs': kwargs,
+                'progress': progress_callback is not None,
+                'log_level': get_log_level(),
+            })
+            return self._wait_for_result(pending, method, progress_callback)
+        finally:
+            with self._lock:
+                self._pending.pop(pending.id, None)
+
+    def _wait_until_ready(self, pending):
+        """Arranca el proceso si hace falta y espera a que haya cargado pyscard"""
+        deadline = time.monotonic() + PCSC_WORKER_START_TIMEOUT_SECONDS
+        while True:
+            worker_process = self._current_process()
+            pending.worker_process = worker_process
+            while not worker_process.dead.is_set():
+                if worker_process.ready.wait(_RESPONSE_POLL_SECONDS):
+                    return worker_process
+                self._check_cancelled(pending, "start")
+                if time.monotonic() > deadline:
+                    self._restart(worker_process)
+                    raise ReaderTimeoutError("The PC/SC worker process did not start")
+            # Otro cliente reinició el proceso mientras arrancaba: esperar al siguiente
+
+    def _wait_for_result(self, pending, method, progress_callback):
+        """Espera la respuesta renovando el plazo con cada mensaje de la petición"""
+        worker_process = pending.worker_process
+        deadline = time.monotonic() + self.timeout
+        while True:
+            self._check_cancelled(pending, method)
+            if time.monotonic() > deadline:
+                self._restart(worker_process)
+                raise ReaderTimeoutError(f"Reader did not respond within {self.timeout:.0f} s ({method})")
+            try:
+                message = pending.inbox.get(timeout=_RESPONSE_POLL_SECONDS)
+            except queue.Empty:
+                if worker_process.dead.is_set():
+                    raise PCSCWorkerError(f"PC/SC worker process restarted during {method}")
+                if not worker_process.process.is_alive():
+                    self._restart(worker_process)
+                    raise PCSCWorkerError(f"PC/SC worker process exited during {method}")
+                continue
+
+            deadline = time.monotonic() + self.timeout
+            if message['type'] == 'progress' and progress_callback:
+                progress_callback(message['fraction'], message['eta'])
+            elif message['type'] == 'result':
+                return message['value']
+            elif message['type'] == 'error':
+                raise PCSCWorkerError(message['message'])
+
+    def _check_cancelled(self, pending, method):
+        if pending.cancel_event.is_set():
+            self._restart(pending.worker_process)
+            raise OperationCancelledError(f"Operation cancelled ({method})")
+
+    def _restart(self, worker_process):
+        """
+        Mata el proceso (y la llamada bloqueada); se relanza en la siguiente petición.
+        Las peticiones de otros clientes en ese proceso terminan con PCSCWorkerError.
+        """
+        with self._process_lock:
+            if worker_process is None or worker_process is not self._worker_process:
+                return  # Ya reiniciado por otro cliente
+            self._worker_process = None
+            worker_process.dead.set()
+            self.restarts += 1
+            process = worker_process.process
+            process.terminate()
+            process.join(1.0)
+            if process.is_alive():
+                process.kill()
+                process.join(1.0)
+        logger.warning("PC/SC worker process restarted (%d restart(s))", self.restarts)
+
+
+_client_ids = itertools.count(1)
+
+
+class RemoteCardHandler:
+    """
+    Sustituto de PhysicalCardHandler para la interfaz: mismos métodos públicos, pero
+    ejecutados en el proceso de E/S, donde cada instancia tiene su propio handler.
+    """
+
+    def __init__(self, worker=None):
+        self.worker = worker or pcsc_worker
+        self.client_id = next(_client_ids)
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        def remote_call(*args, **kwargs):
+            return self.worker.call(self.client_id, name, *args, **kwargs)
+        return remote_call
+
+    def cancel(self):
+        """Cancela la operación en curso de este handler"""
+        self.worker.cancel(self.client_id)
+
+    def close(self):
+        """Libera el handler del proceso de E/S (cada instancia debe cerrarse al dejar de usarla)"""
+        try:
+            self.worker.close_client(self.client_id)
+        except PCSCWorkerError as e:
+            logger.warning("Could not close remote card handler: %s", e)
+
+
+# Instancia global del proceso de E/S
+pcsc_worker = PCSCWorker()
@@ -3,15 +3,104 @@ Physical Card Handler - Manejo de tarjetas físicas con lectores reales
 Basado en el código de Gestión Náutica para comunicación PC/SC
 """
 
-try:
-    from smartcard.System import readers
-    from smartcard.util import toHexString, toBytes
-    SMARTCARD_AVAILABLE = True
-except ImportError:
-    SMARTCARD_AVAILABLE = False
-    print("Warning: pyscard library not found. Install with: pip install pyscard")
+import hashlib
+import logging
+import threading
+import time
+
+from src.utils.reader_profiles import reader_profile_manager, DEFAULT_READER_PROFILE
+from src.utils.logging_config import HexBytes
+from src.utils.constants import CARD_TYPE_5542, CARD_TYPE_5528, PHYSICAL_WRITE_MAX_GAP
+from .apdu_planner import (SHORT_APDU_MAX_LENGTH, plan_chunks, plan_card_read, plan_card_write,
+                           diff_ranges, get_card_profile, card_type_from_header, card_type_from_atr,
+                           build_read_apdu, build_write_apdu)
+from .card_transport import transport_from_environment, NO_CARD_ERRORS
+from .apdu_metrics import apdu_metrics
+
+logger = logging.getLogger(__name__)
+
+
+class ReaderConnection:
+    """
+    Conexión PC/SC de larga duración con un lector y estado conocido de la tarjeta insertada.
+    El estado se descarta en cuanto la tarjeta se extrae o se resetea (fallo de transmit).
+    """
+    
+    def __init__(self, reader_name, reader, connection):
+        self.reader_name = reader_name
+        self.reader = reader
+        self.connection = connection
+        self.lock = threading.RLock()
+        self.reset_card_state()
+        
+        # Última imagen conocida de la tarjeta insertada (leída o escrita por nosotros).
+        # Solo se descarta cuando la tarjeta se extrae o se resetea.
+        self.card_image = None
+        self.card_image_type = None
+    
+    def remember_image(self, card_type, data, start=0, end=None):
+        """Actualiza la imagen conocida de la tarjeta con los bytes indicados"""
+        if self.card_image is None or self.card_image_type != card_type or len(self.card_image) != len(data):
+            self.card_image = list(data)
+            self.card_image_type = card_type
+        else:
+            end = len(data) - 1 if end is None else end
+            self.card_image[start:end + 1] = data[start:end + 1]
+    
+    def update_image(self, card_type, start, data_bytes):
+        """Actualiza unos bytes de la imagen conocida (si la hay) tras una escritura parcial"""
+        if self.card_image is not None and self.card_image_type == card_type:
+            self.card_image[start:start + len(data_bytes)] = data_bytes
+    
+    def reset_card_state(self):
+        """Olvida el estado de la tarjeta (tras extracción, reset o nueva conexión)"""
+        self.selected_type = None   # Tipo de tarjeta seleccionado con SELECT
+        self.psc_verified = False   # PSC presentado con éxito desde el último reset
+        self.verified_psc = None    # PSC con el que se verificó
+    
+    def close(self):
+        """Cierra la conexión física con el lector"""
+        try:
+            self.connection.disconnect()
+        except Exception:
+            pass
+        self.reset_card_state()
+        self.card_image = None
+        self.card_image_type = None
+
+
+# Conexiones abiertas por nombre de lector, compartidas por todos los PhysicalCardHandler
+_connection_pool = {}
+_pool_lock = threading.Lock()
+
+
+# ATR -> tipo de tarjeta ya identificado (incluidos los ATR desconocidos resueltos por sondeo)
+_atr_type_cache = {}
+
+# Origen de los lectores: PC/SC real o lectores virtuales (ver card_transport)
+_transport = transport_from_environment()
+
+
+def get_transport():
+    """Transporte de lectores en uso"""
+    return _transport
+
+
+def set_transport(transport):
+    """Cambia el transporte de lectores cerrando las conexiones abiertas con el anterior"""
+    global _transport
+    close_all_connections()
+    _transport = transport
+
+
+def close_all_connections():
+    """Cierra todas las conexiones abiertas con lectores (al salir de la aplicación)"""
+    with _pool_lock:
+        pooled = list(_connection_pool.values())
+        _connection_pool.clear()
+    for reader_connection in pooled:
+        reader_connection.close()
 
-from src.utils.constants import CARD_TYPE_5542, CARD_TYPE_5528
 
 class PhysicalCardHandler:
     """Maneja la comunicación con lectores de tarjetas físicas"""
@@ -19,6 +108,17 @@ class PhysicalCardHandler:
     def __init__(self):
         self.connection = None
         self.reader = None
+        self.reader_name = None
+        self._state = None  # ReaderConnection compartida del lector en uso
+        self._connection_lost = False
+        self._apdus_ok = 0  # APDUs completadas en la operación en curso
+        self.last_mismatches = []  # Direcciones que no coincidieron en la última verificación
+        self._operation = None  # Medida de la operación de tarjeta completa en curso
+        
+        # Capacidades del lector: longitudes máximas por APDU y tiempos medidos
+        self.reader_profile = dict(DEFAULT_READER_PROFILE)
+        self.max_read_length = SHORT_APDU_MAX_LENGTH
+        self.max_write_length = SHORT_APDU_MAX_LENGTH
         
     def get_safe_write_areas(self, card_type):
         """
@@ -51,28 +151,39 @@ class PhysicalCardHandler:
             }
     
     def check_smartcard_library(self):
-        """Verifica si la librería pyscard está disponible"""
-        return SMARTCARD_AVAILABLE
+        """Verifica si hay lectores disponibles (pyscard instalado o lectores virtuales)"""
+        return _transport.is_available()
     
     def get_available_readers(self):
         """Obtiene la lista de lectores disponibles"""
-        if not SMARTCARD_AVAILABLE:
+        if not _transport.is_available():
             return []
         
         try:
-            reader_list = readers()
+            reader_list = _transport.list_readers()
             return [str(reader) for reader in reader_list]
         except Exception as e:
-            print(f"Error obteniendo lectores: {e}")
+            logger.error("Error obteniendo lectores: %s", e)
             return []
     
     def connect_to_reader(self, reader_identifier=0):
-        """Conecta al lector especificado (índice o nombre)"""
-        if not SMARTCARD_AVAILABLE:
+        """
+        Conecta al lector especificado (índice o nombre).
+        Si ya existe una conexión abierta con ese lector se reutiliza junto con el
+        estado conocido de la tarjeta (SELECT y PSC).
+        """
+        if not _transport.is_available():
             return False
         
+        if isinstance(reader_identifier, str):
+            with _pool_lock:
+                pooled = _connection_pool.get(reader_identifier)
+            if pooled is not None:
+                self._attach(pooled)
+                return True
+        
         try:
-            reader_list = readers()
+            reader_list = _transport.list_readers()
             if not reader_list:
                 return False
             
@@ -88,49 +199,330 @@ class PhysicalCardHandler:
                 if reader_index >= len(reader_list):
                     return False
             
-            self.reader = reader_list[reader_index]
-            self.connection = self.reader.createConnection()
-            self.connection.connect()
+            reader = reader_list[reader_index]
+            reader_name = str(reader)
+            
+            with _pool_lock:
+                pooled = _connection_pool.get(reader_name)
+            if pooled is None:
+                connection = reader.createConnection()
+                connection.connect()
+                pooled = ReaderConnection(reader_name, reader, connection)
+                with _pool_lock:
+                    _connection_pool[reader_name] = pooled
             
+            self._attach(pooled)
             return True
             
+        except NO_CARD_ERRORS as e:
+            # Lector vacío: lo normal al esperar una tarjeta (poll_card lo consulta cada pocos ms)
+            logger.debug("Sin tarjeta en el lector %s: %s", reader_identifier, e)
+            return False
         except Exception as e:
-            print(f"Error conectando al lector: {e}")
+            logger.error("Error conectando al lector: %s", e)
             return False
     
+    def _attach(self, reader_connection):
+        """Asocia este handler a una conexión del pool"""
+        self._state = reader_connection
+        self.reader = reader_connection.reader
+        self.reader_name = reader_connection.reader_name
+        self.connection = reader_connection.connection
+        self._apply_reader_profile(reader_profile_manager.get_profile(self.reader_name))
+    
+    def _apply_reader_profile(self, profile):
+        """Usa las capacidades del lector (sondeadas o por defecto) para planificar APDUs"""
+        self.reader_profile = profile
+        self.max_read_length = min(int(profile['max_read_length']), SHORT_APDU_MAX_LENGTH)
+        self.max_write_length = min(int(profile['max_write_length']), SHORT_APDU_MAX_LENGTH)
+    
+    def has_reader_profile(self):
+        """Indica si el lector conectado ya se sondeó en alguna sesión anterior"""
+        return bool(self.reader_name) and reader_profile_manager.has_profile(self.reader_name)
+    
+    def probe_reader(self, card_type=CARD_TYPE_5542, force=False):
+        """
+        Sondea el lector conectado (con una tarjeta insertada) y guarda el resultado
+        en la caché de perfiles: longitud máxima de lectura y latencia por APDU.
+        
+        Solo se envían lecturas. La longitud máxima de escritura se supone igual a la
+        de lectura y se corrige sola si el lector rechaza una escritura por longitud;
+        el coste por byte escrito se aprende de las escrituras reales.
+        
+        Returns:
+            tuple: (success, message, profile)
+        """
+        if not force and self.has_reader_profile():
+            return True, "Perfil del lector en caché", self.reader_profile
+        return self._run_with_reconnect(self._probe_reader, card_type)
+    
+    def _probe_reader(self, card_type=CARD_TYPE_5542):
+        success, msg = self._select_card(card_type)
+        if not success:
+            return False, msg, self.reader_profile
+        
+        # Latencia: mediana de varias lecturas de 1 byte
+        samples = []
+        for _ in range(5):
+            started = time.perf_counter()
+            response, sw1, sw2, status = self.send_apdu(build_read_apdu(0, 1))
+            if not (sw1 == 0x90 and sw2 == 0x00):
+                return False, f"Error sondeando el lector: SW={sw1:02X}{sw2:02X}", self.reader_profile
+            samples.append((time.perf_counter() - started) * 1000)
+        rtt_ms = sorted(samples)[len(samples) // 2]
+        
+        # Longitud máxima de lectura: la mayor que el lector acepta
+        max_read_length = None
+        read_ms_per_byte = DEFAULT_READER_PROFILE['read_ms_per_byte']
+        for length in (SHORT_APDU_MAX_LENGTH, 128, 64, 32, 16, 8):
+            started = time.perf_counter()
+            response, sw1, sw2, status = self.send_apdu(build_read_apdu(0, length))
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if sw1 == 0x90 and sw2 == 0x00 and len(response) == length:
+                max_read_length = length
+                read_ms_per_byte = max(elapsed_ms - rtt_ms, 0.0) / length
+                break
+            if self._connection_lost:
+                return False, "Conexión perdida durante el sondeo", self.reader_profile
+        
+        if max_read_length is None:
+            return False, "El lector no acepta lecturas de 8 bytes o más", self.reader_profile
+        
+        profile = {
+            'probed': True,
+            'max_read_length': max_read_length,
+            'max_write_length': min(max_read_length, self.reader_profile.get('max_write_length', SHORT_APDU_MAX_LENGTH)),
+            'rtt_ms': round(rtt_ms, 2),
+            'read_ms_per_byte': round(read_ms_per_byte, 4),
+        }
+        reader_profile_manager.save_profile(self.reader_name, profile)
+        self._apply_reader_profile(reader_profile_manager.get_profile(self.reader_name))
+        logger.info("Reader profile for %s: %s", self.reader_name, profile)
+        return True, f"Lector sondeado: lecturas de hasta {max_read_length} bytes, {rtt_ms:.1f} ms por APDU", self.reader_profile
+    
+    def estimate_duration(self, chunks, write=False):
+        """Estima en segundos el tiempo de enviar las APDUs planificadas según el perfil del lector"""
+        per_byte = self.reader_profile['write_ms_per_byte' if write else 'read_ms_per_byte']
+        total_ms = sum(self.reader_profile['rtt_ms'] + length * per_byte for _, length in chunks)
+        return total_ms / 1000.0
+    
+    def _learn_write_timing(self, elapsed_ms, apdu_count, bytes_written):
+        """Actualiza el coste medido por byte escrito del perfil del lector"""
+        if not self.reader_name or bytes_written <= 0:
+            return
+        measured = max(elapsed_ms - apdu_count * self.reader_profile['rtt_ms'], 0.0) / bytes_written
+        previous = self.reader_profile['write_ms_per_byte']
+        learned = measured if not self.reader_profile.get('write_timing_measured') else (previous + measured) / 2
+        reader_profile_manager.save_profile(self.reader_name, {
+            'write_ms_per_byte': round(learned, 4),
+            'write_timing_measured': True,
+        })
+        self.reader_profile['write_ms_per_byte'] = learned
+        self.reader_profile['write_timing_measured'] = True
+    
+    def release(self):
+        """
+        Libera el lector al terminar una operación sin cerrar la conexión,
+        que queda abierta en el pool para la siguiente operación.
+        """
+        self._state = None
+        self.connection = None
+        self.reader = None
+        self.reader_name = None
+        return True, "Lector liberado"
+    
     def disconnect(self):
-        """Desconecta del lector"""
+        """Desconecta del lector y cierra la conexión compartida"""
         try:
-            if self.connection:
+            if self._state is not None:
+                self._drop_connection()
+            elif self.connection:
                 self.connection.disconnect()
-                self.connection = None
-                self.reader = None
+            self.connection = None
+            self.reader = None
+            self.reader_name = None
             return True, "Desconectado correctamente"
         except Exception as e:
             return False, f"Error desconectando: {e}"
     
+    def _drop_connection(self):
+        """Cierra la conexión actual y la elimina del pool (tarjeta extraída o reseteada)"""
+        reader_connection = self._state
+        if reader_connection is None:
+            return
+        with _pool_lock:
+            if _connection_pool.get(reader_connection.reader_name) is reader_connection:
+                del _connection_pool[reader_connection.reader_name]
+        reader_connection.close()
+        self._state = None
+        self.connection = None
+    
+    def poll_card(self, reader_name):
+        """
+        Comprueba si hay una tarjeta en el lector sin enviar ninguna APDU (estado PC/SC).
+        
+        Returns:
+            tuple: (present, new_card) - new_card es True si la conexión tuvo que
+                   abrirse de nuevo, es decir, la tarjeta se ha cambiado o reinsertado
+        """
+        previous = self._state
+        if self.connection is None and not self.connect_to_reader(reader_name):
+            return False, False
+        try:
+            self.connection.getATR()
+        except Exception:
+            # Tarjeta extraída o reseteada: abrir una conexión nueva si ya hay otra tarjeta
+            self._drop_connection()
+            if not self.connect_to_reader(reader_name):
+                return False, False
+        return True, self._state is not previous
+    
+    def detect_card_type(self, default=None):
+        """
+        Detecta el tipo de la tarjeta insertada sin intervención del usuario.
+        
+        1. ATR ya visto: tipo cacheado, sin APDUs.
+        2. ATR conocido o cabecera reconocible (3B 04 A2 ... SLE5542, 3B 04 92 ... SLE5528).
+        3. ATR desconocido: un único SELECT de sondeo (ver _probe_card_type).
+        
+        Devuelve default si no hay tarjeta o no se pudo determinar.
+        """
+        atr = self.get_atr()
+        if atr is None:
+            return default
+        
+        with _pool_lock:
+            card_type = _atr_type_cache.get(atr)
+        if card_type is not None:
+            return card_type
+        
+        card_type = card_type_from_atr(atr)
+        if card_type is None:
+            logger.info("ATR desconocido %s: sondeando tipo de tarjeta", HexBytes(atr))
+            card_type = self._probe_card_type()
+            if card_type is None:
+                return default
+        
+        with _pool_lock:
+            _atr_type_cache[atr] = card_type
+        return card_type
+    
+    def get_atr(self):
+        """ATR de la tarjeta insertada como tupla (reconecta una vez si la conexión caducó)"""
+        if self.connection is None and self.reader_name:
+            self.connect_to_reader(self.reader_name)
+        if not self.connection:
+            return None
+        try:
+            return tuple(self.connection.getATR())
+        except Exception:
+            # Tarjeta cambiada o reseteada desde la última operación
+            self._drop_connection()
+            if not (self.reader_name and self.connect_to_reader(self.reader_name)):
+                return None
+            try:
+                return tuple(self.connection.getATR())
+            except Exception as e:
+                logger.error("Error leyendo ATR: %s", e)
+                return None
+    
+    def _probe_card_type(self):
+        """
+        SELECT de SLE5542 y lectura del byte de cabecera: si es A2 la tarjeta es SLE5542
+        (y queda ya seleccionada); en otro caso se toma como SLE5528.
+        """
+        success, _ = self._select_card(CARD_TYPE_5542)
+        if not success:
+            return CARD_TYPE_5528 if self.connection else None
+        response, sw1, sw2, _ = self.send_apdu(build_read_apdu(0x00, 1))
+        if not self.connection:
+            return None
+        if sw1 == 0x90 and sw2 == 0x00 and response and card_type_from_header(response[0]) == CARD_TYPE_5542:
+            return CARD_TYPE_5542
+        return CARD_TYPE_5528
+    
+    def invalidate_card_state(self):
+        """Olvida el estado cacheado de la tarjeta (p. ej. si se sabe que se ha cambiado)"""
+        if self._state is not None:
+            self._state.reset_card_state()
+            # La imagen conocida tampoco es fiable: la escritura diferencial volverá a leer la tarjeta
+            self._state.card_image = None
+            self._state.card_image_type = None
+    
+    def _run_with_reconnect(self, operation, *args, **kwargs):
+        """
+        Ejecuta una operación y, si la conexión cacheada resulta estar caducada
+        (la primera APDU falla porque la tarjeta se extrajo o reseteó), reconecta
+        y la repite una única vez.
+        """
+        if self.connection is None and self.reader_name:
+            # La conexión se perdió en una operación anterior: volver a abrirla
+            self.connect_to_reader(self.reader_name)
+        
+        self._connection_lost = False
+        self._apdus_ok = 0
+        result = operation(*args, **kwargs)
+        
+        if self._connection_lost and self._apdus_ok == 0 and self.reader_name:
+            logger.info("Conexión con la tarjeta caducada (extracción o reset), reconectando...")
+            if self.connect_to_reader(self.reader_name):
+                self._connection_lost = False
+                result = operation(*args, **kwargs)
+        return result
+    
+    def _run_measured(self, name, card_type, operation, *args):
+        """_run_with_reconnect registrando todas sus APDUs como una operación en apdu_metrics"""
+        self._operation = apdu_metrics.begin_operation(self.reader_name, name, card_type)
+        try:
+            return self._run_with_reconnect(operation, *args)
+        finally:
+            apdu_metrics.end_operation(self._operation)
+            self._operation = None
+    
+    def get_apdu_metrics(self):
+        """Instantánea de las latencias de este proceso (ver apdu_metrics)"""
+        return apdu_metrics.snapshot()
+    
+    def reset_apdu_metrics(self):
+        """Borra las latencias acumuladas en este proceso"""
+        apdu_metrics.reset()
+    
     def send_apdu(self, apdu):
         """Envía una APDU y devuelve la respuesta"""
         if not self.connection:
             return None, 0x6F, 0x00, "No hay conexión activa"
         
         try:
-            response, sw1, sw2 = self.connection.transmit(apdu)
-            apdu_hex = " ".join([f"{b:02X}" for b in apdu])
-            resp_hex = " ".join([f"{b:02X}" for b in response]) if response else ""
-            
-            print(f"APDU: {apdu_hex}")
-            if response:
-                print(f"Response: {resp_hex}")
-            print(f"SW: {sw1:02X} {sw2:02X}")
+            if self._state is not None:
+                with self._state.lock:
+                    started = time.perf_counter()
+                    response, sw1, sw2 = self.connection.transmit(apdu)
+                    elapsed = time.perf_counter() - started
+            else:
+                started = time.perf_counter()
+                response, sw1, sw2 = self.connection.transmit(apdu)
+                elapsed = time.perf_counter() - started
+            self._apdus_ok += 1
+            apdu_metrics.record(self.reader_name, apdu, response, sw1, sw2, elapsed, self._operation)
+            logger.debug("APDU: %s -> %s SW: %02X %02X", HexBytes(apdu), HexBytes(response), sw1, sw2)
             
             return response, sw1, sw2, "OK"
             
         except Exception as e:
+            # La tarjeta se ha extraído o reseteado: el estado cacheado ya no es válido
+            self._connection_lost = True
+            self._drop_connection()
             return None, 0x6F, 0x00, f"Error enviando APDU: {e}"
     
     def select_card(self, card_type=CARD_TYPE_5542):
         """Selecciona la tarjeta según su tipo"""
+        return self._run_with_reconnect(self._select_card, card_type)
+    
+    def _select_card(self, card_type=CARD_TYPE_5542):
+        """Envía SELECT salvo que la tarjeta ya esté seleccionada con ese tipo"""
+        if self._state is not None and self._state.selected_type == card_type:
+            return True, f"Tarjeta {card_type} ya seleccionada"
+        
         if card_type == CARD_TYPE_5542:
             # SLE5542: FF A4 00 00 01 06
             select_apdu = [0xFF, 0xA4, 0x00, 0x00, 0x01, 0x06]
@@ -141,6 +533,10 @@ class PhysicalCardHandler:
         response, sw1, sw2, status = self.send_apdu(select_apdu)
         
         if sw1 == 0x90 and sw2 == 0x00:
+            if self._state is not None:
+                # Un nuevo SELECT reinicia la sesión con la tarjeta: el PSC debe volver a presentarse
+                self._state.reset_card_state()
+                self._state.selected_type = card_type
             return True, f"Tarjeta {card_type} seleccionada correctamente"
         else:
             return False, f"Error seleccionando tarjeta: SW={sw1:02X}{sw2:02X}"
@@ -170,8 +566,14 @@ class PhysicalCardHandler:
         response, sw1, sw2, status = self.send_apdu(psc_apdu)
         
         if sw1 == expected_sw1 and sw2 == expected_sw2:
+            if self._state is not None:
+                self._state.psc_verified = True
+                self._state.verified_psc = list(psc_apdu[5:])
             return True, f"PSC presentado correctamente para {card_type}", sw2
         else:
+            if self._state is not None:
+                self._state.psc_verified = False
+                self._state.verified_psc = None
             # Si falló, sw2 contiene el Error Counter
             return False, f"Error presentando PSC: SW={sw1:02X}{sw2:02X} (esperado: {expected_sw1:02X}{expected_sw2:02X})", sw2
     
@@ -195,10 +597,27 @@ class PhysicalCardHandler:
         response, sw1, sw2, status = self.send_apdu(change_psc_apdu)
         
         if sw1 == 0x90 and sw2 == 0x00:
+            if self._state is not None and self._state.psc_verified:
+                # La tarjeta sigue desbloqueada, ahora con el nuevo PSC
+                self._state.verified_psc = list(change_psc_apdu[5:])
             return True, f"PSC cambiado correctamente para {card_type}"
         else:
             return False, f"Error cambiando PSC: SW={sw1:02X}{sw2:02X}"
     
+    def _ensure_psc(self, card_type, psc=None):
+        """
+        Presenta el PSC solo si no se ha verificado ya con el mismo código desde el último reset.
+        Devuelve lo mismo que present_psc().
+        """
+        if psc is None:
+            psc = [0xFF, 0xFF, 0xFF] if card_type == CARD_TYPE_5542 else [0xFF, 0xFF]
+        psc_length = 3 if card_type == CARD_TYPE_5542 else 2
+        
+        state = self._state
+        if state is not None and state.psc_verified and state.verified_psc == list(psc[:psc_length]):
+            return True, f"PSC ya verificado para {card_type}", None
+        return self.present_psc(card_type, psc)
+    
     def read_error_counter(self, card_type=CARD_TYPE_5542):
         """Lee el Error Counter de la tarjeta física"""
         if card_type == CARD_TYPE_5542:
@@ -217,35 +636,101 @@ class PhysicalCardHandler:
     
     def read_memory(self, start_address, length, card_type=CARD_TYPE_5542):
         """Lee memoria de la tarjeta física"""
-        # Primero seleccionar la tarjeta
-        success, msg = self.select_card(card_type)
+        return self._run_with_reconnect(self._read_memory, start_address, length, card_type)
+    
+    def _read_memory(self, start_address, length, card_type=CARD_TYPE_5542):
+        # Primero seleccionar la tarjeta (sin APDU si ya está seleccionada)
+        success, msg = self._select_card(card_type)
         if not success:
             return None, msg
         
+        card_size = get_card_profile(card_type)['size']
+        if start_address < 0 or length <= 0 or start_address + length > card_size:
+            return None, f"Dirección o longitud fuera de rango para {get_card_profile(card_type)['name']}"
+        
         try:
-            if card_type == CARD_TYPE_5542:
-                # SLE5542: FF B0 00 <address> <length>
-                if start_address > 0xFF or length > 0xFF:
-                    return None, "Dirección o longitud fuera de rango para SLE5542"
-                read_apdu = [0xFF, 0xB0, 0x00, start_address, length]
-            else:
-                # SLE5528: FF B0 <MSB> <LSB> <length>
-                if start_address > 0x3FF or length > 0xFF:
-                    return None, "Dirección o longitud fuera de rango para SLE5528"
-                msb = (start_address >> 8) & 0xFF
-                lsb = start_address & 0xFF
-                read_apdu = [0xFF, 0xB0, msb, lsb, length]
-            
-            response, sw1, sw2, status = self.send_apdu(read_apdu)
-            
-            if sw1 == 0x90 and sw2 == 0x00:
-                return response, f"Lectura exitosa: {len(response)} bytes"
-            else:
-                return None, f"Error leyendo memoria: SW={sw1:02X}{sw2:02X}"
-                
+            chunks = plan_chunks(start_address, start_address + length - 1, self.max_read_length)
+            return self._read_chunks(chunks)
         except Exception as e:
             return None, f"Error en lectura: {e}"
     
+    def read_ranges(self, ranges, card_type=CARD_TYPE_5542):
+        """
+        Lee varios rangos de memoria con un único SELECT.
+        
+        Args:
+            ranges: lista de (dirección inicial, longitud)
+        
+        Returns:
+            tuple: (lista de (dirección, datos) o None, mensaje)
+        """
+        return self._run_with_reconnect(self._read_ranges, ranges, card_type)
+    
+    def _read_ranges(self, ranges, card_type=CARD_TYPE_5542):
+        results = []
+        for start_address, length in ranges:
+            data, msg = self._read_memory(start_address, length, card_type)
+            if data is None:
+                return None, msg
+            results.append((start_address, data))
+        return results, f"Lectura exitosa: {len(results)} rangos"
+    
+    def _read_chunks(self, chunks, progress_callback=None):
+        """
+        Envía las APDUs READ planificadas y concatena las respuestas.
+        progress_callback(fracción, segundos_restantes) se llama tras cada APDU.
+        """
+        data = []
+        total_bytes = sum(length for _, length in chunks) or 1
+        for index, (address, length) in enumerate(chunks):
+            response, sw1, sw2, status = self.send_apdu(build_read_apdu(address, length))
+            if not (sw1 == 0x90 and sw2 == 0x00):
+                return None, f"Error leyendo memoria en 0x{address:03X}: SW={sw1:02X}{sw2:02X}"
+            data.extend(response)
+            if progress_callback:
+                progress_callback(len(data) / total_bytes, self.estimate_duration(chunks[index + 1:]))
+        return data, f"Lectura exitosa: {len(data)} bytes"
+    
+    def _write_chunks(self, data, chunks, progress_callback=None):
+        """
+        Envía las APDUs WRITE planificadas con los bytes de data (indexado por dirección).
+        Si el lector rechaza una APDU por longitud (SW 6700) se reduce el máximo de
+        escritura del perfil y el tramo se reenvía en partes más pequeñas.
+        progress_callback(fracción, segundos_restantes) se llama tras cada APDU.
+        
+        Returns:
+            tuple: (success, message, bytes_written)
+        """
+        bytes_written = 0
+        apdu_count = 0
+        total_bytes = sum(length for _, length in chunks) or 1
+        pending = list(chunks)
+        started = time.perf_counter()
+        
+        while pending:
+            address, length = pending.pop(0)
+            response, sw1, sw2, status = self.send_apdu(build_write_apdu(address, data[address:address + length]))
+            apdu_count += 1
+            
+            if sw1 == 0x67 and sw2 == 0x00 and length > 8:
+                # Longitud no soportada por el lector: recordar el nuevo máximo y replanificar
+                self.max_write_length = length // 2
+                self.reader_profile['max_write_length'] = self.max_write_length
+                if self.reader_name:
+                    reader_profile_manager.save_profile(self.reader_name, {'max_write_length': self.max_write_length})
+                logger.warning("Reader rejected %d-byte write, max write length is now %d", length, self.max_write_length)
+                pending = plan_chunks(address, address + length - 1, self.max_write_length) + pending
+                continue
+            
+            if not (sw1 == 0x90 and sw2 == 0x00):
+                return False, f"Write failed at 0x{address:03X}: SW={sw1:02X}{sw2:02X}", bytes_written
+            bytes_written += length
+            if progress_callback:
+                progress_callback(bytes_written / total_bytes, self.estimate_duration(pending, write=True))
+        
+        self._learn_write_timing((time.perf_counter() - started) * 1000, apdu_count, bytes_written)
+        return True, f"{bytes_written} bytes in {apdu_count} APDUs", bytes_written
+    
     def _validate_safe_write_area(self, start_address, data_length, card_type):
         """
         Valida que la escritura sea en un área segura de la tarjeta.
@@ -282,6 +767,9 @@ class PhysicalCardHandler:
     
     def write_memory(self, start_address, data, card_type=CARD_TYPE_5542, psc=[0xFF, 0xFF, 0xFF]):
         """Escribe datos en la tarjeta física (requiere PSC) con protecciones de seguridad"""
+        return self._run_with_reconnect(self._write_memory, start_address, data, card_type, psc)
+    
+    def _write_memory(self, start_address, data, card_type=CARD_TYPE_5542, psc=[0xFF, 0xFF, 0xFF]):
         # Convertir datos a enteros si son strings hex
         if isinstance(data, list) and len(data) > 0 and isinstance(data[0], str):
             data_bytes = [int(hex_str, 16) for hex_str in data]
@@ -293,154 +781,76 @@ class PhysicalCardHandler:
         if not is_safe:
             return False, f"❌ ESCRITURA BLOQUEADA: {safety_msg}"
         
-        # Primero seleccionar la tarjeta
-        success, msg = self.select_card(card_type)
+        # Primero seleccionar la tarjeta (sin APDU si ya está seleccionada)
+        success, msg = self._select_card(card_type)
         if not success:
             return False, msg
         
         try:
-            # Presentar PSC antes de escribir
-            if card_type == CARD_TYPE_5542:
-                psc_apdu = [0xFF, 0x20, 0x00, 0x00, 0x03] + psc
-            else:
-                # SLE5528 usa PSC de 2 bytes
-                psc_apdu = [0xFF, 0x20, 0x00, 0x00, 0x02] + psc[:2]
-            
-            response, sw1, sw2, status = self.send_apdu(psc_apdu)
-            
-            # Verificar respuesta PSC
-            if not (sw1 == 0x90 or (sw1 == 0x63 and sw2 == 0x07)):
-                return False, f"PSC incorrecto: SW={sw1:02X}{sw2:02X}"
-            
-            # Proceder con la escritura
-            if card_type == CARD_TYPE_5542:
-                # SLE5542: FF D0 00 <address> <length> <data>
-                if start_address > 0xFF or len(data_bytes) > 0xFF:
-                    return False, "Dirección o datos fuera de rango para SLE5542"
-                write_apdu = [0xFF, 0xD0, 0x00, start_address, len(data_bytes)] + data_bytes
-            else:
-                # SLE5528: FF D0 <MSB> <LSB> <length> <data>
-                if start_address > 0x3FF or len(data_bytes) > 0xFF:
-                    return False, "Dirección o datos fuera de rango para SLE5528"
-                msb = (start_address >> 8) & 0xFF
-                lsb = start_address & 0xFF
-                write_apdu = [0xFF, 0xD0, msb, lsb, len(data_bytes)] + data_bytes
-            
-            response, sw1, sw2, status = self.send_apdu(write_apdu)
+            # Presentar PSC antes de escribir (sin APDU si ya está verificado)
+            success, msg, _ = self._ensure_psc(card_type, psc)
+            if not success:
+                return False, f"PSC incorrecto: {msg}"
             
-            print("Write APDU:", ' '.join([hex(b) for b in write_apdu]))
-            print(f"Write Response SW: {sw1:02X} {sw2:02X}")
+            # Proceder con la escritura (varias APDUs si supera el máximo del lector)
+            chunks = plan_chunks(start_address, start_address + len(data_bytes) - 1, self.max_write_length)
+            image = [0] * start_address + data_bytes  # Indexado por dirección
+            success, msg, bytes_written = self._write_chunks(image, chunks)
             
-            if sw1 == 0x90 and sw2 == 0x00:
+            if success:
+                if self._state is not None:
+                    self._state.update_image(card_type, start_address, data_bytes)
                 return True, f"Escritura exitosa: {len(data)} bytes"
             else:
-                return False, f"Error escribiendo memoria: SW={sw1:02X}{sw2:02X}"
+                return False, f"Error escribiendo memoria: {msg}"
                 
         except Exception as e:
             return False, f"Error en escritura: {e}"
     
-    def read_full_card(self, card_type=CARD_TYPE_5542, psc=None):
-        """Lee toda la memoria de la tarjeta"""
+    def read_full_card(self, card_type=CARD_TYPE_5542, psc=None, progress_callback=None):
+        """
+        Lee toda la memoria de la tarjeta.
+        progress_callback(fracción, segundos_restantes) informa del avance de la lectura.
+        """
+        return self._run_measured('read', card_type, self._read_full_card, card_type, psc, progress_callback)
+    
+    def _read_full_card(self, card_type=CARD_TYPE_5542, psc=None, progress_callback=None):
         try:
-            print(f"Starting optimized read for card type {card_type}")
+            logger.debug("Starting optimized read for card type %s", card_type)
             
-            # Seleccionar la tarjeta primero
-            if card_type == CARD_TYPE_5542:
-                # SLE5542 (256 bytes) - SELECT 06
-                select_apdu = [0xFF, 0xA4, 0x00, 0x00, 0x01, 0x06]
-                total_size = 256
-                print("Configuration: SLE5542 - 256 bytes, 4 total commands (SELECT 06 + PRESENT PSC + 2 reads)")
-            else:
-                # SLE5528 (1024 bytes) - SELECT 05
-                select_apdu = [0xFF, 0xA4, 0x00, 0x00, 0x01, 0x05]
-                total_size = 1024
-                print("Configuration: SLE5528 - 1024 bytes, 10 total commands (SELECT 05 + PRESENT PSC + 8 reads)")
-            
-            # Enviar comando SELECT
-            print("Step 1: Sending SELECT CARD command...")
-            response, sw1, sw2, status = self.send_apdu(select_apdu)
-            if sw1 != 0x90 or sw2 != 0x00:
-                print(f"SELECT command failed: {sw1:02X} {sw2:02X}")
-                return None
-            print("SELECT command successful")
+            profile = get_card_profile(card_type)
+            chunks = plan_card_read(card_type, max_length=self.max_read_length)
+            logger.debug("Configuration: %s - %d bytes, %d read commands (+ SELECT and PRESENT PSC if not cached)",
+                         profile['name'], profile['size'], len(chunks))
+            
+            # Enviar comando SELECT (se omite si la tarjeta ya está seleccionada)
+            logger.debug("Step 1: Sending SELECT CARD command...")
+            success, message = self._select_card(card_type)
+            if not success:
+                logger.error("SELECT command failed: %s", message)
+                return None, None
+            logger.debug("SELECT command successful")
             
-            # Presentar PSC después del SELECT
-            print("Step 2: Sending PRESENT PSC command...")
-            success, message, error_counter = self.present_psc(card_type, psc)
+            # Presentar PSC después del SELECT (se omite si ya está verificado)
+            logger.debug("Step 2: Sending PRESENT PSC command...")
+            success, message, error_counter = self._ensure_psc(card_type, psc)
             if not success:
-                print(f"PRESENT PSC command failed: {message}")
+                logger.error("PRESENT PSC command failed: %s", message)
                 # Devolver None para datos, pero incluir el error_counter
                 return None, error_counter
-            print("PRESENT PSC command successful")
+            logger.debug("PRESENT PSC command successful")
             
-            full_data = []
-            
-            if card_type == CARD_TYPE_5542:
-                print("SLE5542: Reading in 2 optimized commands (no pages)...")
-                
-                # Leer direcciones 0x00 a 0xFE (255 bytes)
-                print("Step 3/4: Reading 255 main bytes (FF B0 00 00 FF)...")
-                read_apdu = [0xFF, 0xB0, 0x00, 0x00, 0xFF]
-                response, sw1, sw2, status = self.send_apdu(read_apdu)
-                
-                if sw1 == 0x90 and sw2 == 0x00:
-                    full_data.extend(response)
-                    print(f"Read {len(response)} bytes successfully")
-                else:
-                    print(f"Read error: {sw1:02X} {sw2:02X}")
-                    return None
-                
-                # Leer la última dirección (0xFF)
-                print("Step 4/4: Reading last byte (FF B0 00 FF 01)...")
-                read_last_apdu = [0xFF, 0xB0, 0x00, 0xFF, 0x01]
-                response, sw1, sw2, status = self.send_apdu(read_last_apdu)
-                
-                if sw1 == 0x90 and sw2 == 0x00:
-                    full_data.extend(response)
-                    print(f"Last byte: {response[0]:02X}")
-                else:
-                    print(f"Last byte error: {sw1:02X} {sw2:02X}")
-                    return None
-                    
-            else:
-                print("SLE5528: Reading by pages (2 commands per page)...")
-                
-                # SLE5528: Leer por páginas (4 páginas de 256 bytes cada una)
-                for page in range(4):
-                    cmd_num = 3 + (page * 2)
-                    print(f"Page {page} ({page*256}-{(page+1)*256-1})...")
-                    
-                    # Leer 255 bytes de la página
-                    print(f"Step {cmd_num}/10: Reading 255 bytes from page {page} (FF B0 {page:02X} 00 FF)...")
-                    read_apdu = [0xFF, 0xB0, page, 0x00, 0xFF]
-                    response, sw1, sw2, status = self.send_apdu(read_apdu)
-                    
-                    if sw1 == 0x90 and sw2 == 0x00:
-                        full_data.extend(response)
-                        print(f"Page {page}: {len(response)} bytes read")
-                    else:
-                        print(f"Page {page} error: {sw1:02X} {sw2:02X}")
-                        return None
-                    
-                    # Leer la última dirección de la página
-                    print(f"Step {cmd_num+1}/10: Last byte from page {page} (FF B0 {page:02X} FF 01)...")
-                    read_last_apdu = [0xFF, 0xB0, page, 0xFF, 0x01]
-                    response, sw1, sw2, status = self.send_apdu(read_last_apdu)
-                    
-                    if sw1 == 0x90 and sw2 == 0x00:
-                        full_data.extend(response)
-                        print(f"Page {page}: Last byte {response[0]:02X}")
-                    else:
-                        print(f"Page {page} last byte error: {sw1:02X} {sw2:02X}")
-                        return None
+            logger.debug("Step 3: Reading %d bytes in %d commands...", profile['size'], len(chunks))
+            full_data, message = self._read_chunks(chunks, progress_callback)
+            if full_data is None:
+                logger.error("Read error: %s", message)
+                return None, None
             
-            print("Optimized read completed successfully!")
-            print(f"Total: {len(full_data)} bytes")
-            print(f"First 8 bytes: {' '.join([f'{b:02X}' for b in full_data[:8]])}")
+            logger.info("Read completed: %d bytes, first 8 bytes: %s", len(full_data), HexBytes(full_data[:8]))
             
             # Para SLE5528, reemplazar el dato en 0x3FD con el Error Counter real
             if card_type == CARD_TYPE_5528:
-                print("Reading Error Counter for SLE5528 simulation...")
+                logger.debug("Reading Error Counter for SLE5528 simulation...")
                 error_counter_data, error_msg = self.read_error_counter(card_type)
                 if error_counter_data and len(error_counter_data) > 0:
                     # Reemplazar el byte en la dirección 0x3FD (1021) con el Error Counter
@@ -448,231 +858,251 @@ class PhysicalCardHandler:
                     if error_counter_address < len(full_data):
                         original_value = full_data[error_counter_address]
                         full_data[error_counter_address] = error_counter_data[0]
-                        print(f"Error Counter address 0x3FD: {original_value:02X} → {error_counter_data[0]:02X}")
+                        logger.debug("Error Counter address 0x3FD: %02X → %02X", original_value, error_counter_data[0])
                     else:
-                        print(f"Warning: Error Counter address 0x3FD out of range")
+                        logger.warning("Error Counter address 0x3FD out of range")
                 else:
-                    print(f"Warning: Could not read Error Counter: {error_msg}")
+                    logger.warning("Could not read Error Counter: %s", error_msg)
+            
+            if self._state is not None:
+                self._state.remember_image(card_type, full_data)
             
             # Devolver datos y None para error_counter (éxito)
             return full_data, None
             
         except Exception as e:
-            print(f"Error during optimized read: {e}")
+            logger.error("Error during optimized read: %s", e)
             return None, None
     
-    def write_full_card(self, data, card_type=CARD_TYPE_5542, psc=[0xFF, 0xFF, 0xFF]):
+    def write_full_card(self, data, card_type=CARD_TYPE_5542, psc=[0xFF, 0xFF, 0xFF], progress_callback=None,
+                        verify=False):
         """
         Escribe datos a la tarjeta física con protocolo optimizado por tipo de tarjeta.
         
-        Para SLE5542 (256b): Select -> PSC -> 1 APDU desde 0x20 hasta final
-        Para SLE5528 (1k): Select -> PSC -> Escritura por páginas optimizada
+        Select -> PSC -> escritura del área de usuario con las APDUs que calcula el
+        planificador (SLE5542: 1 APDU desde 0x20; SLE5528: 6 APDUs por páginas).
+        progress_callback(fracción, segundos_restantes) informa del avance de la escritura.
+        Con verify=True se releen los rangos escritos en la misma conexión y se
+        comparan con data (las direcciones distintas quedan en last_mismatches).
         """
+        return self._run_measured('write', card_type, self._write_full_card, data, card_type, psc,
+                                  progress_callback, verify)
+    
+    def _write_full_card(self, data, card_type=CARD_TYPE_5542, psc=[0xFF, 0xFF, 0xFF], progress_callback=None,
+                         verify=False):
         try:
-            print(f"DEBUG write_full_card: Recibido data tipo={type(data)}, len={len(data)}")
-            print(f"DEBUG write_full_card: card_type={card_type} (type: {type(card_type)})")
-            print(f"DEBUG write_full_card: psc={psc} (type: {type(psc)})")
-            print(f"DEBUG write_full_card: Primeros 5 elementos de data: {data[:5]}")
+            logger.debug("write_full_card: data tipo=%s, len=%d, card_type=%s, primeros 5 elementos: %s",
+                         type(data).__name__, len(data), card_type, data[:5])
             
             expected_size = 256 if card_type == CARD_TYPE_5542 else 1024
             
             if len(data) != expected_size:
                 return False, f"Tamaño de datos incorrecto. Esperado: {expected_size}, Recibido: {len(data)}", None
             
-            # PASO 1: Seleccionar la tarjeta
-            success, msg = self.select_card(card_type)
+            # PASO 1: Seleccionar la tarjeta (se omite si ya está seleccionada)
+            success, msg = self._select_card(card_type)
             if not success:
                 return False, f"Error seleccionando tarjeta: {msg}", None
             
-            # PASO 2: Presentar PSC según tipo de tarjeta
-            if card_type == CARD_TYPE_5542:
-                # SLE5542: PSC de 3 bytes, respuesta esperada: 90 07
-                psc_apdu = [0xFF, 0x20, 0x00, 0x00, 0x03] + psc
-                expected_sw1, expected_sw2 = 0x90, 0x07
-                card_name = "SLE5542"
-            else:
-                # SLE5528: PSC de 2 bytes, respuesta esperada: 90 FF  
-                psc_apdu = [0xFF, 0x20, 0x00, 0x00, 0x02] + psc[:2]
-                expected_sw1, expected_sw2 = 0x90, 0xFF
-                card_name = "SLE5528"
-            
-            response, sw1, sw2, status = self.send_apdu(psc_apdu)
-            print(f"PSC APDU: {' '.join([hex(b) for b in psc_apdu])}")
-            print(f"PSC Response SW: {sw1:02X} {sw2:02X}")
-            
-            # Verificar respuesta PSC específica según tipo de tarjeta
-            if not (sw1 == expected_sw1 and sw2 == expected_sw2):
-                error_msg = (f"PSC verification failed for {card_name}. "
-                           f"Expected: {expected_sw1:02X} {expected_sw2:02X}, "
-                           f"Got: {sw1:02X} {sw2:02X}")
-                print(f"ERROR: {error_msg}")
-                
-                # Retornar SW2 que contiene el Error Counter
-                return False, error_msg, sw2
-            
-            print(f"SUCCESS: PSC verified correctly for {card_name}")
+            # PASO 2: Presentar PSC según tipo de tarjeta (se omite si ya está verificado)
+            card_name = "SLE5542" if card_type == CARD_TYPE_5542 else "SLE5528"
+            success, msg, error_counter = self._ensure_psc(card_type, psc)
             
-            # PASO 3: Escribir datos según tipo de tarjeta
-            if card_type == CARD_TYPE_5542:
-                return self._write_sle5542_optimized(data, card_type)
-            else:
-                return self._write_sle5528_optimized(data, card_type)
+            if not success:
+                error_msg = f"PSC verification failed for {card_name}. {msg}"
+                logger.error("%s", error_msg)
                 
-        except Exception as e:
-            error_msg = f"Error in write_full_card: {e}"
-            print(f"EXCEPTION: {error_msg}")
-            return False, error_msg, None
-    
-    def _write_sle5542_optimized(self, data, card_type):
-        """Escritura optimizada para SLE5542: 1 APDU desde 0x20 hasta final"""
-        try:
-            # SLE5542: Escribir desde 0x20 hasta 0xFF (224 bytes)
-            start_addr = 0x20
-            end_addr = 0xFF
-            write_size = end_addr - start_addr + 1  # 224 bytes (0xE0)
-            
-            # Convertir datos a enteros si son strings hex
-            if isinstance(data[0], str):
-                data = [int(x, 16) for x in data]
-            
-            # Extraer datos desde la posición 0x20 hasta el final de la tarjeta
-            write_data = data[start_addr:end_addr + 1]
-            
-            print(f"SLE5542: Writing {len(write_data)} bytes from 0x{start_addr:02X} to 0x{end_addr:02X}")
-            
-            # Construir APDU: FF D0 00 20 E0 <224_bytes>
-            write_apdu = [0xFF, 0xD0, 0x00, start_addr, len(write_data)] + write_data
+                # Retornar SW2 que contiene el Error Counter
+                return False, error_msg, error_counter
             
-            print(f"Write APDU header: FF D0 00 {start_addr:02X} {len(write_data):02X}")
-            print(f"First 8 data bytes: {' '.join([f'{b:02X}' for b in write_data[:8]])}")
-            print(f"APDU length: {len(write_apdu)} bytes total")
+            logger.debug("PSC verified correctly for %s", card_name)
             
-            response, sw1, sw2, status = self.send_apdu(write_apdu)
+            # PASO 3: Escribir el área de usuario con las APDUs planificadas
+            data = self._to_int_list(data)
+            chunks = plan_card_write(card_type, max_length=self.max_write_length)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("%s: Writing user area in %d APDUs (estimated %.1f s)",
+                             card_name, len(chunks), self.estimate_duration(chunks, write=True))
+            success, msg, bytes_written = self._write_chunks(data, chunks, progress_callback)
+            if success and verify:
+                success, msg, _ = self._verify_written(data, chunks)
             
             # Leer Error Counter después de la escritura
             error_counter_data, _ = self.read_error_counter(card_type)
             error_counter = error_counter_data[0] if error_counter_data else None
             
-            if sw1 == 0x90 and sw2 == 0x00:
-                print(f"SUCCESS: SLE5542 written successfully")
-                print(f"Error Counter after write: 0x{error_counter:02X}" if error_counter else "Error Counter: N/A")
-                return True, f"SLE5542 written successfully: {len(write_data)} bytes in 1 APDU", error_counter
-            else:
-                error_msg = f"Write failed: SW={sw1:02X}{sw2:02X}"
-                print(f"ERROR: {error_msg}")
-                return False, error_msg, error_counter
+            if not success:
+                logger.error("%s", msg)
+                if self._state is not None:
+                    self._state.card_image = None
+                return False, msg, error_counter
+            
+            if self._state is not None:
+                start, end = self._get_user_area(card_type)
+                self._state.remember_image(card_type, data, start, end)
+            
+            logger.info("%s write completed: %s (Error Counter: %s)", card_name, msg,
+                        f"0x{error_counter:02X}" if error_counter is not None else "N/A")
+            return True, f"{card_name} written successfully: {msg}", error_counter
                 
         except Exception as e:
-            error_msg = f"Error in SLE5542 write: {e}"
-            print(f"EXCEPTION: {error_msg}")
+            error_msg = f"Error in write_full_card: {e}"
+            logger.exception("%s", error_msg)
             return False, error_msg, None
     
-    def _write_sle5528_optimized(self, data, card_type):
-        """Escritura optimizada para SLE5528: Por páginas según especificación"""
+    def write_card_differential(self, data, card_type=CARD_TYPE_5542, psc=[0xFF, 0xFF, 0xFF], progress_callback=None,
+                                verify=False):
+        """
+        Escribe en la tarjeta física solo los bytes que difieren de su contenido actual.
+        
+        El contenido actual se toma de la última imagen conocida de la tarjeta insertada
+        (leída o escrita en esta conexión) o, si no la hay, se lee la tarjeta completa.
+        Los bytes modificados se agrupan en el mínimo número de APDUs WRITE y, con
+        verify=True, solo esos rangos se releen para comprobarlos.
+        
+        Returns:
+            tuple: (success, message, error_counter) igual que write_full_card()
+        """
+        return self._run_measured('write_differential', card_type, self._write_card_differential, data, card_type,
+                                  psc, progress_callback, verify)
+    
+    def _write_card_differential(self, data, card_type=CARD_TYPE_5542, psc=[0xFF, 0xFF, 0xFF], progress_callback=None,
+                                 verify=False):
         try:
-            # Convertir datos a enteros si son strings hex
-            if isinstance(data[0], str):
-                data = [int(x, 16) for x in data]
-                
-            total_apdus = 0
-            bytes_written = 0
-            
-            print("SLE5528: Starting page-by-page optimized write")
-            
-            # PÁGINA 0 (0x000-0x0FF): Escribir desde 0x20 hasta 0xFF
-            print("Writing Page 0: 0x020-0xFF (224 bytes)")
-            page_0_start = 0x20
-            page_0_end = 0xFF
-            page_0_data = data[page_0_start:page_0_end + 1]  # 224 bytes
-            
-            apdu_0 = [0xFF, 0xD0, 0x00, page_0_start, len(page_0_data)] + page_0_data
-            response, sw1, sw2, status = self.send_apdu(apdu_0)
-            total_apdus += 1
-            
-            if not (sw1 == 0x90 and sw2 == 0x00):
-                return False, f"Page 0 write failed: SW={sw1:02X}{sw2:02X}"
-            
-            bytes_written += len(page_0_data)
-            print(f"Page 0 written successfully: {len(page_0_data)} bytes")
-            
-            # PÁGINA 1 (0x100-0x1FF): 2 APDUs de 128 bytes cada una
-            print("Writing Page 1: 0x100-0x1FF (256 bytes in 2 APDUs)")
-            
-            # Primera mitad: 0x100-0x17F (128 bytes)
-            page_1_half1_data = data[0x100:0x180]  # 128 bytes
-            apdu_1a = [0xFF, 0xD0, 0x01, 0x00, 0x80] + page_1_half1_data
-            response, sw1, sw2, status = self.send_apdu(apdu_1a)
-            total_apdus += 1
-            
-            if not (sw1 == 0x90 and sw2 == 0x00):
-                return False, f"Page 1 first half write failed: SW={sw1:02X}{sw2:02X}"
-            
-            bytes_written += len(page_1_half1_data)
-            print(f"Page 1 first half written: {len(page_1_half1_data)} bytes")
-            
-            # Segunda mitad: 0x180-0x1FF (128 bytes)
-            page_1_half2_data = data[0x180:0x200]  # 128 bytes
-            apdu_1b = [0xFF, 0xD0, 0x01, 0x80, 0x80] + page_1_half2_data
-            response, sw1, sw2, status = self.send_apdu(apdu_1b)
-            total_apdus += 1
-            
-            if not (sw1 == 0x90 and sw2 == 0x00):
-                return False, f"Page 1 second half write failed: SW={sw1:02X}{sw2:02X}"
-            
-            bytes_written += len(page_1_half2_data)
-            print(f"Page 1 second half written: {len(page_1_half2_data)} bytes")
-            
-            # PÁGINA 2 (0x200-0x2FF): 2 APDUs de 128 bytes cada una
-            print("Writing Page 2: 0x200-0x2FF (256 bytes in 2 APDUs)")
-            
-            # Primera mitad: 0x200-0x27F (128 bytes)
-            page_2_half1_data = data[0x200:0x280]  # 128 bytes
-            apdu_2a = [0xFF, 0xD0, 0x02, 0x00, 0x80] + page_2_half1_data
-            response, sw1, sw2, status = self.send_apdu(apdu_2a)
-            total_apdus += 1
-            
-            if not (sw1 == 0x90 and sw2 == 0x00):
-                return False, f"Page 2 first half write failed: SW={sw1:02X}{sw2:02X}"
-            
-            bytes_written += len(page_2_half1_data)
-            print(f"Page 2 first half written: {len(page_2_half1_data)} bytes")
-            
-            # Segunda mitad: 0x280-0x2FF (128 bytes)
-            page_2_half2_data = data[0x280:0x300]  # 128 bytes
-            apdu_2b = [0xFF, 0xD0, 0x02, 0x80, 0x80] + page_2_half2_data
-            response, sw1, sw2, status = self.send_apdu(apdu_2b)
-            total_apdus += 1
-            
-            if not (sw1 == 0x90 and sw2 == 0x00):
-                return False, f"Page 2 second half write failed: SW={sw1:02X}{sw2:02X}"
-            
-            bytes_written += len(page_2_half2_data)
-            print(f"Page 2 second half written: {len(page_2_half2_data)} bytes")
-            
-            # PÁGINA 3 (0x300-0x3FC): 1 APDU con 253 bytes (0xFD)
-            print("Writing Page 3: 0x300-0x3FC (253 bytes)")
-            page_3_end = 0x3FC  # Hasta 0x3FC para respetar últimos 3 bytes (Error Counter + PSC)
-            page_3_data = data[0x300:page_3_end + 1]  # 253 bytes
+            expected_size = 256 if card_type == CARD_TYPE_5542 else 1024
+            if len(data) != expected_size:
+                return False, f"Tamaño de datos incorrecto. Esperado: {expected_size}, Recibido: {len(data)}", None
+            data = self._to_int_list(data)
             
-            apdu_3 = [0xFF, 0xD0, 0x03, 0x00, len(page_3_data)] + page_3_data
-            response, sw1, sw2, status = self.send_apdu(apdu_3)
-            total_apdus += 1
+            success, msg = self._select_card(card_type)
+            if not success:
+                return False, f"Error seleccionando tarjeta: {msg}", None
             
-            if not (sw1 == 0x90 and sw2 == 0x00):
-                return False, f"Page 3 write failed: SW={sw1:02X}{sw2:02X}"
+            card_name = "SLE5542" if card_type == CARD_TYPE_5542 else "SLE5528"
+            success, msg, error_counter = self._ensure_psc(card_type, psc)
+            if not success:
+                error_msg = f"PSC verification failed for {card_name}. {msg}"
+                logger.error("%s", error_msg)
+                return False, error_msg, error_counter
             
-            bytes_written += len(page_3_data)
-            print(f"Page 3 written successfully: {len(page_3_data)} bytes")
+            # Contenido actual de la tarjeta: imagen cacheada o lectura completa
+            state = self._state
+            if state is not None and state.card_image_type == card_type and state.card_image is not None:
+                current = state.card_image
+                logger.debug("Differential write: using cached card image")
+            else:
+                logger.debug("Differential write: no cached image, reading card first")
+                current, error_counter = self._read_full_card(card_type, psc)
+                if current is None:
+                    return False, "Error leyendo la tarjeta para calcular las diferencias", error_counter
+            
+            start, end = self._get_user_area(card_type)
+            ranges = diff_ranges(current, data, start, end, PHYSICAL_WRITE_MAX_GAP)
+            chunks = []
+            for range_start, range_end in ranges:
+                chunks.extend(plan_card_write(card_type, range_start, range_end, self.max_write_length))
+            
+            success, msg, bytes_written = self._write_chunks(data, chunks, progress_callback)
+            if success and verify:
+                success, msg, _ = self._verify_written(data, chunks)
+            if not success:
+                # La imagen cacheada ya no es fiable tras una escritura parcial o fallida
+                if self._state is not None:
+                    self._state.card_image = None
+                return False, msg, None
+            if self._state is not None:
+                for range_start, range_end in ranges:
+                    self._state.update_image(card_type, range_start, data[range_start:range_end + 1])
+            total_apdus = len(chunks)
             
             # Leer Error Counter después de la escritura
             error_counter_data, _ = self.read_error_counter(card_type)
             error_counter = error_counter_data[0] if error_counter_data else None
             
-            print(f"SLE5528 write completed: {bytes_written} bytes using {total_apdus} APDUs")
-            print(f"Error Counter after write: 0x{error_counter:02X}" if error_counter else "Error Counter: N/A")
-            return True, f"SLE5528 written successfully: {bytes_written} bytes in {total_apdus} APDUs", error_counter
+            if not ranges:
+                return True, f"{card_name} already up to date: no bytes changed", error_counter
             
+            verified_note = " (verified)" if verify else ""
+            logger.info("%s differential write: %d bytes in %d APDUs%s", card_name, bytes_written, total_apdus, verified_note)
+            return True, f"{card_name} written successfully: {bytes_written} changed bytes in {total_apdus} APDUs{verified_note}", error_counter
+        
         except Exception as e:
-            error_msg = f"Error in SLE5528 write: {e}"
-            print(f"EXCEPTION: {error_msg}")
-            return False, error_msg, None
\ No newline at end of file
+            error_msg = f"Error in differential write: {e}"
+            logger.exception("%s", error_msg)
+            return False, error_msg, None
+    
+    def verify_card(self, data, card_type=CARD_TYPE_5542, psc=None):
+        """
+        Relee el área de usuario de la tarjeta y comprueba que coincide con data.
+        La lectura no necesita PSC; el parámetro se mantiene por compatibilidad.
+        
+        Returns:
+            tuple: (success, message, mismatches) - mismatches es la lista de
+                   direcciones que no coinciden (None si no se pudo leer)
+        """
+        return self._run_measured('verify', card_type, self._verify_card, data, card_type)
+    
+    def _verify_card(self, data, card_type=CARD_TYPE_5542):
+        data = self._to_int_list(data)
+        success, msg = self._select_card(card_type)
+        if not success:
+            return False, f"Error seleccionando tarjeta: {msg}", None
+        start, end = self._get_user_area(card_type)
+        return self._verify_chunks(data, plan_card_read(card_type, start, end, self.max_read_length))
+    
+    def _verify_written(self, data, write_chunks):
+        """
+        Relee los rangos que cubren las APDUs WRITE indicadas (replanificados con la
+        longitud máxima de lectura del lector) y los compara con data.
+        """
+        ranges = []
+        for address, length in write_chunks:
+            if ranges and ranges[-1][1] + 1 == address:
+                ranges[-1][1] = address + length - 1
+            else:
+                ranges.append([address, address + length - 1])
+        read_chunks = []
+        for range_start, range_end in ranges:
+            read_chunks.extend(plan_chunks(range_start, range_end, self.max_read_length))
+        return self._verify_chunks(data, read_chunks)
+    
+    def _verify_chunks(self, data, chunks):
+        """
+        Lee los tramos indicados y compara el hash SHA-256 de lo leído con el de los
+        mismos bytes de data. Solo si los hashes difieren se buscan las direcciones.
+        
+        Returns:
+            tuple: (success, message, mismatches) - mismatches es None si no se pudo leer
+        """
+        self.last_mismatches = []
+        if not chunks:
+            return True, "Verification OK: nothing to verify", []
+        
+        read_data, msg = self._read_chunks(chunks)
+        if read_data is None:
+            return False, f"Verification read failed: {msg}", None
+        
+        addresses = [address for start, length in chunks for address in range(start, start + length)]
+        expected = [data[address] for address in addresses]
+        read_digest = hashlib.sha256(bytes(read_data)).hexdigest()
+        if read_digest == hashlib.sha256(bytes(expected)).hexdigest():
+            return True, f"Verification OK: {len(addresses)} bytes (SHA-256 {read_digest[:16]})", []
+        
+        mismatches = [address for address, read_byte, expected_byte in zip(addresses, read_data, expected)
+                      if read_byte != expected_byte]
+        self.last_mismatches = mismatches
+        shown = ", ".join(f"0x{address:03X}" for address in mismatches[:8])
+        more = f" (+{len(mismatches) - 8} more)" if len(mismatches) > 8 else ""
+        return False, f"Verification failed: {len(mismatches)} bytes differ at {shown}{more}", mismatches
+    
+    def _get_user_area(self, card_type):
+        """Área que sobrescriben las escrituras completas: (inicio, fin) inclusive"""
+        if card_type == CARD_TYPE_5542:
+            return 0x20, 0xFF
+        return 0x20, 0x3FC
+    
+    def _to_int_list(self, data):
+        """Convierte una lista de strings hex o bytes en una lista de enteros"""
+        if len(data) > 0 and isinstance(data[0], str):
+            return [int(x, 16) for x in data]
+        return list(data)
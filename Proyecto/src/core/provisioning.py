@@ -0,0 +1,229 @@
+"""
+Estación de grabación: escribe imágenes de tarjeta en todos los lectores conectados a la vez
+
+Cada lector tiene su propio hilo de trabajo (con su propio handler en el proceso de E/S
+de lectores) que espera a que se inserte una tarjeta,
+toma la siguiente imagen pendiente, la escribe, relee los rangos escritos en la misma
+conexión para verificarlos y pide que se retire la tarjeta. Las imágenes que fallan se devuelven a la cola para otra tarjeta.
+"""
+
+import logging
+import queue
+import threading
+import time
+
+from src.utils.constants import CARD_TYPE_5542, PROVISIONING_POLL_SECONDS, PROVISIONING_MAX_ATTEMPTS
+from .apdu_planner import get_card_profile
+from .pcsc_worker import RemoteCardHandler
+
+logger = logging.getLogger(__name__)
+
+
+def make_job(label, card_type, data, psc=None):
+    """
+    Crea una imagen a grabar.
+
+    Args:
+        label: nombre que se muestra (p. ej. nombre de la sesión o del alumno)
+        card_type: tipo de tarjeta destino
+        data: memoria completa de la tarjeta (lista de bytes o strings hex)
+        psc: PSC actual de las tarjetas en blanco (None = PSC de fábrica)
+    """
+    if psc is None:
+        psc = [0xFF, 0xFF, 0xFF] if card_type == CARD_TYPE_5542 else [0xFF, 0xFF]
+    return {
+        'label': label,
+        'card_type': card_type,
+        'data': data,
+        'psc': list(psc),
+        'attempts': 0,
+    }
+
+
+class ProvisioningStation:
+    """Reparte una cola de imágenes entre un hilo de trabajo por lector"""
+
+    def __init__(self, jobs, readers, differential=True, verify=True, handler_factory=RemoteCardHandler):
+        """
+        Args:
+            handler_factory: crea el handler de cada hilo (por defecto, uno remoto en el
+                proceso de E/S; PhysicalCardHandler para trabajar en este proceso)
+        """
+        self.readers = list(readers)
+        self.handler_factory = handler_factory
+        self.differential = differential
+        self.verify = verify
+        self.total = len(jobs)
+
+        self._jobs = queue.Queue()
+        for job in jobs:
+            self._jobs.put(job)
+
+        # Eventos de los hilos para la interfaz (se vacían con after() desde Tk)
+        self.events = queue.Queue()
+        self.results = []
+
+        self._lock = threading.Lock()
+        self._remaining = len(jobs)  # Imágenes sin grabar ni descartar
+        self._stop_event = threading.Event()
+        self._threads = []
+        self._started_at = None
+
+    def start(self):
+        """Lanza un hilo por lector"""
+        self._started_at = time.monotonic()
+        for reader_name in self.readers:
+            thread = threading.Thread(target=self._worker, args=(reader_name,), daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def stop(self):
+        """Pide a los hilos que terminen (la tarjeta en curso se completa)"""
+        self._stop_event.set()
+
+    def join(self, timeout=None):
+        """Espera a que terminen todos los hilos"""
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def is_running(self):
+        """Indica si queda algún hilo de trabajo activo"""
+        return any(thread.is_alive() for thread in self._threads)
+
+    def is_finished(self):
+        """Indica si todas las imágenes se han grabado o descartado"""
+        with self._lock:
+            return self._remaining == 0
+
+    def get_summary(self):
+        """Resumen de la ejecución: tarjetas grabadas, fallidas, pendientes y tiempo"""
+        with self._lock:
+            succeeded = sum(1 for result in self.results if result['success'])
+            failed_cards = len(self.results) - succeeded
+            remaining = self._remaining
+        elapsed = time.monotonic() - self._started_at if self._started_at else 0.0
+        return {
+            'total': self.total,
+            'succeeded': succeeded,
+            'failed_cards': failed_cards,
+            'remaining': remaining,
+            'elapsed': elapsed,
+        }
+
+    def _emit(self, reader_name, state, label="", progress=0.0, message=""):
+        """Publica el estado de un lector para la interfaz"""
+        self.events.put({
+            'reader': reader_name,
+            'state': state,
+            'label': label,
+            'progress': progress,
+            'message': message,
+        })
+
+    def _should_stop(self):
+        return self._stop_event.is_set() or self.is_finished()
+
+    def _worker(self, reader_name):
+        """Bucle de un lector: esperar tarjeta -> grabar -> verificar -> esperar extracción"""
+        handler = self.handler_factory()
+        try:
+            while not self._should_stop():
+                self._emit(reader_name, 'waiting', message="Insert a card")
+                if not self._wait_for_card(handler, reader_name):
+                    break
+
+                job = self._next_job(reader_name)
+                if job is None:
+                    break
+
+                self._provision_card(handler, reader_name, job)
+
+                self._emit(reader_name, 'remove', label=job['label'], message="Remove the card")
+                if not self._wait_for_removal(handler, reader_name):
+                    break
+        except Exception as e:
+            logger.error("Error in provisioning worker for %s: %s", reader_name, e)
+            self._emit(reader_name, 'error', message=str(e))
+        finally:
+            if isinstance(handler, RemoteCardHandler):
+                handler.close()
+            else:
+                handler.release()
+            self._emit(reader_name, 'stopped', message="Stopped")
+
+    def _wait_for_card(self, handler, reader_name):
+        """Espera a que haya una tarjeta en el lector. False si hay que parar."""
+        while not self._should_stop():
+            present, _ = handler.poll_card(reader_name)
+            if present:
+                return True
+            time.sleep(PROVISIONING_POLL_SECONDS)
+        return False
+
+    def _wait_for_removal(self, handler, reader_name):
+        """Espera a que se retire (o se cambie) la tarjeta. False si hay que parar."""
+        while not self._should_stop():
+            present, new_card = handler.poll_card(reader_name)
+            if not present or new_card:
+                return True
+            time.sleep(PROVISIONING_POLL_SECONDS)
+        return False
+
+    def _next_job(self, reader_name):
+        """
+        Toma la siguiente imagen pendiente. Si la cola está vacía pero otro lector
+        puede devolver una imagen fallida, espera en lugar de terminar.
+        """
+        while not self._should_stop():
+            try:
+                return self._jobs.get(timeout=PROVISIONING_POLL_SECONDS)
+            except queue.Empty:
+                self._emit(reader_name, 'idle', message="Waiting for pending images")
+        return None
+
+    def _provision_card(self, handler, reader_name, job):
+        """Graba y verifica una imagen en la tarjeta insertada"""
+        started = time.monotonic()
+        label = job['label']
+        card_type = job['card_type']
+
+        def report(fraction, eta_seconds):
+            self._emit(reader_name, 'writing', label, fraction,
+                       f"Writing... ~{eta_seconds:.1f} s left")
+
+        self._emit(reader_name, 'writing', label, 0.0, "Writing...")
+        detected_type = handler.detect_card_type()
+        if detected_type is not None and detected_type != card_type:
+            success, message = False, f"Wrong card type: {get_card_profile(detected_type)['name']}"
+        elif self.differential:
+            # progress_callback por nombre: el handler remoto lo llama en este hilo
+            success, message, _ = handler.write_card_differential(job['data'], card_type, job['psc'],
+                                                                  progress_callback=report, verify=self.verify)
+        else:
+            success, message, _ = handler.write_full_card(job['data'], card_type, job['psc'],
+                                                          progress_callback=report, verify=self.verify)
+
+        job['attempts'] += 1
+        with self._lock:
+            self.results.append({
+                'reader': reader_name,
+                'label': label,
+                'success': success,
+                'message': message,
+                'seconds': time.monotonic() - started,
+            })
+            if success or job['attempts'] >= PROVISIONING_MAX_ATTEMPTS:
+                self._remaining -= 1
+                requeue = False
+            else:
+                requeue = True
+
+        if requeue:
+            # La tarjeta puede estar dañada o tener otro PSC: la imagen pasa a otra tarjeta
+            self._jobs.put(job)
+
+        if success:
+            self._emit(reader_name, 'done', label, 1.0, "Written and verified" if self.verify else "Written")
+        else:
+            retry_note = " (image requeued)" if requeue else ""
+            self._emit(reader_name, 'failed', label, 0.0, f"{message}{retry_note}")
@@ -0,0 +1,274 @@
+"""
+Generación masiva de tarjetas personalizadas a partir de un roster CSV
+
+Cada fila del roster (columnas de USER_INFO_TEMPLATE: Nombre, Apellido1,
+Apellido2, NumeroMatricula, Curso) produce una copia de la tarjeta plantilla con
+los campos escritos en las direcciones de ROSTER_FIELD_LAYOUT (o las indicadas
+con --field) y el User Info relleno, y se guarda con el mismo formato que Save
+Card. Las tarjetas se generan en un pool de procesos: cada proceso recibe la
+plantilla una sola vez, escribe sus ficheros directamente en disco y solo
+devuelve el resultado, que se va añadiendo a manifest.csv según llega.
+
+    python -m src.core.roster_generator plantilla.txt alumnos.csv -o tarjetas/
+    python -m src.core.roster_generator plantilla.txt alumnos.csv -o tarjetas/ \\
+        --field Nombre=0x20:32 --field NumeroMatricula=0x40:16 --name "{Curso}_{NumeroMatricula}"
+
+Los textos se escriben en ASCII (las tildes y la ñ se quitan: 'Núñez' ->
+'Nunez') para que se lean igual en la columna ASCII del simulador y en
+cualquier lector; lo que no cabe en el campo se corta y se avisa.
+"""
+
+import argparse
+import concurrent.futures
+import csv
+import multiprocessing
+import os
+import re
+import sys
+import unicodedata
+
+from src.utils.constants import (USER_INFO_TEMPLATE, ROSTER_FIELD_LAYOUT, ROSTER_PAD_BYTE, ROSTER_NAME_PATTERN,
+                                 MEMORY_SIZE_5542, MEMORY_SIZE_5528, CARD_TYPE_5528)
+
+MANIFEST_FILENAME = "manifest.csv"
+MANIFEST_FIELDS = ['row', 'card_name', 'file', 'success', 'message']
+
+
+def read_roster(filepath):
+    """
+    Filas del roster como dicts (acepta ',' o ';' y el BOM de Excel)
+
+    Raises:
+        ValueError: si el fichero no tiene cabecera
+    """
+    with open(filepath, 'r', encoding='utf-8-sig', newline='') as f:
+        sample = f.read(4096)
+        f.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+        except csv.Error:
+            dialect = csv.excel
+        reader = csv.DictReader(f, dialect=dialect)
+        if not reader.fieldnames:
+            raise ValueError("Roster has no header row")
+        return [{(key or '').strip(): (value or '').strip() for key, value in row.items()}
+                for row in reader if any((value or '').strip() for value in row.values())]
+
+
+def parse_field(text):
+    """'Nombre=0x20:32' -> ('Nombre', 0x20, 32)"""
+    name, _, location = text.partition('=')
+    address, _, length = location.partition(':')
+    try:
+        return name.strip(), int(address, 0), int(length, 0)
+    except ValueError:
+        raise ValueError(f"Invalid field '{text}', expected COLUMN=ADDRESS:LENGTH (e.g. Nombre=0x20:32)")
+
+
+def validate_layout(layout, card_type, columns):
+    """
+    Comprueba que los campos caben en la tarjeta, no se solapan y existen en el roster
+
+    Returns:
+        tuple: (success, message)
+    """
+    memory_size = MEMORY_SIZE_5528 if card_type == CARD_TYPE_5528 else MEMORY_SIZE_5542
+    missing = [column for column in layout if column not in columns]
+    if missing:
+        return False, f"Roster is missing column(s): {', '.join(missing)}"
+
+    used = {}
+    for column, (address, length) in layout.items():
+        if length <= 0 or address < 0 or address + length > memory_size:
+            return False, f"Field {column} (0x{address:02X}, {length} bytes) does not fit in the card"
+        for offset in range(address, address + length):
+            if offset in used:
+                return False, f"Fields {used[offset]} and {column} overlap at 0x{offset:02X}"
+            used[offset] = column
+    return True, "Layout OK"
+
+
+def strip_accents(text):
+    """'Núñez' -> 'Nunez'"""
+    return ''.join(char for char in unicodedata.normalize('NFKD', text) if not unicodedata.combining(char))
+
+
+def encode_field(value, length):
+    """Texto en ASCII ajustado a length bytes; devuelve (bytes, truncado)"""
+    data = list(strip_accents(value).encode('ascii', errors='replace'))
+    truncated = len(data) > length
+    return data[:length] + [ROSTER_PAD_BYTE] * (length - len(data)), truncated
+
+
+def format_user_info(row):
+    """USER_INFO_TEMPLATE con los valores de la fila (solo las claves de la plantilla)"""
+    lines = []
+    for line in USER_INFO_TEMPLATE.splitlines():
+        key = line.split(':', 1)[0].strip()
+        lines.append(f"{key}: {row.get(key, '')}")
+    return "\n".join(lines)
+
+
+def card_names(rows, pattern):
+    """Nombre de tarjeta y fichero de cada fila (únicos: se añade _2, _3... si se repiten)"""
+    names = []
+    seen = {}
+    for row in rows:
+        try:
+            name = pattern.format(**row)
+        except KeyError as e:
+            raise ValueError(f"Name pattern uses unknown column {e}")
+        name = re.sub(r'[^A-Za-z0-9_.-]+', '_', strip_accents(name)).strip('_.') or "card"
+        count = seen.get(name, 0) + 1
+        seen[name] = count
+        names.append(name if count == 1 else f"{name}_{count}")
+    return names
+
+
+def personalize_session(session, row, layout):
+    """
+    Escribe los campos de row en la memoria de session y rellena su User Info
+
+    Returns:
+        list: avisos (campos cortados o bytes protegidos que no se escribieron)
+    """
+    warnings = []
+    for column, (address, length) in layout.items():
+        data, truncated = encode_field(row.get(column, ''), length)
+        if truncated:
+            warnings.append(f"{column} truncated to {length} bytes")
+        result = session.memory_manager.write_memory(address, data)
+        if result['protected_addresses']:
+            warnings.append(f"{column}: {len(result['protected_addresses'])} protected byte(s) not written")
+    session.user_info = format_user_info(row)
+    return warnings
+
+
+# Estado de cada proceso del pool (se fija una vez en _init_worker)
+_worker_template = None
+_worker_layout = None
+_worker_manager = None
+
+
+def _init_worker(template_snapshot, layout):
+    """Inicializador del pool: reconstruye la plantilla una sola vez por proceso"""
+    global _worker_template, _worker_layout, _worker_manager
+    from .card_session import CardSession
+    from .session_manager import SessionManager
+
+    _worker_template = CardSession.from_snapshot(template_snapshot)
+    _worker_layout = layout
+    _worker_manager = SessionManager(max_resident_sessions=None, hibernate_after_seconds=None)
+
+
+def _generate_card(index, row, card_name, filepath):
+    """Tarea del pool: clona la plantilla, la personaliza y la guarda en filepath"""
+    session = _worker_template.clone(card_name)
+    try:
+        warnings = personalize_session(session, row, _worker_layout)
+        _worker_manager._register_session(session)
+        success, message = _worker_manager.save_session_to_file(session.session_id, filepath)
+        if success:
+            message = "; ".join(warnings)
+        return {'row': index, 'card_name': card_name, 'file': filepath, 'success': success, 'message': message}
+    finally:
+        _worker_manager.close_session(session.session_id)
+        session.cleanup()
+
+
+def generate_card_files(template_session, rows, output_dir, layout=None, name_pattern=ROSTER_NAME_PATTERN,
+                        workers=None, overwrite=False):
+    """
+    Genera un fichero de tarjeta por fila en un pool de procesos
+
+    Es un generador: devuelve el resultado de cada tarjeta (dict con row,
+    card_name, file, success y message) según termina, en cualquier orden.
+
+    Raises:
+        ValueError: si el layout no es válido para la plantilla y el roster
+        FileExistsError: si un fichero ya existe y overwrite es False
+    """
+    layout = layout or ROSTER_FIELD_LAYOUT
+    columns = set(rows[0]) if rows else set()
+    success, message = validate_layout(layout, template_session.card_type, columns)
+    if not success:
+        raise ValueError(message)
+
+    os.makedirs(output_dir, exist_ok=True)
+    names = card_names(rows, name_pattern)
+    paths = [os.path.join(output_dir, f"{name}.txt") for name in names]
+    if not overwrite:
+        existing = [path for path in paths if os.path.exists(path)]
+        if existing:
+            raise FileExistsError(f"{len(existing)} card file(s) already exist, e.g. {existing[0]}")
+
+    context = multiprocessing.get_context('spawn')
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                                initializer=_init_worker,
+                                                initargs=(template_session.to_snapshot(), layout)) as executor:
+        futures = [executor.submit(_generate_card, index, row, name, path)
+                   for index, (row, name, path) in enumerate(zip(rows, names, paths), 1)]
+        for future in concurrent.futures.as_completed(futures):
+            yield future.result()
+
+
+def main(argv=None):
+    """Genera las tarjetas de un roster desde la línea de comandos"""
+    parser = argparse.ArgumentParser(description="Generate personalized CardSIM card files from a CSV roster")
+    parser.add_argument("template", help="template card file (saved with Save Card)")
+    parser.add_argument("roster", help="CSV roster with one student per row")
+    parser.add_argument("-o", "--output", required=True, help="directory for the generated card files")
+    parser.add_argument("--field", action='append', default=[], metavar="COLUMN=ADDRESS:LENGTH",
+                        help="field to write (repeatable; default: Nombre, Apellido1, Apellido2, "
+                             "NumeroMatricula and Curso at 0x20-0x9F)")
+    parser.add_argument("--name", default=ROSTER_NAME_PATTERN,
+                        help="card and file name pattern using roster columns (default %(default)s)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--overwrite", action='store_true', help="replace existing card files")
+    args = parser.parse_args(argv)
+
+    # Mismo path que main.py: el núcleo importa también src/utils como "utils"
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from .session_manager import SessionManager
+
+    try:
+        layout = {column: (address, length)
+                  for column, address, length in map(parse_field, args.field)} or None
+        rows = read_roster(args.roster)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    if not rows:
+        parser.error("Roster has no students")
+
+    session_manager = SessionManager()
+    template, message = session_manager.open_card_from_file(args.template, "roster_template")
+    if template is None:
+        parser.error(f"Could not open template: {message}")
+
+    failed = 0
+    try:
+        os.makedirs(args.output, exist_ok=True)
+        with open(os.path.join(args.output, MANIFEST_FILENAME), 'w', newline='', encoding='utf-8') as manifest_file:
+            manifest = csv.DictWriter(manifest_file, fieldnames=MANIFEST_FIELDS)
+            manifest.writeheader()
+            for done, result in enumerate(generate_card_files(template, rows, args.output, layout, args.name,
+                                                              args.workers, args.overwrite), 1):
+                manifest.writerow(result)
+                manifest_file.flush()
+                if not result['success']:
+                    failed += 1
+                status = "OK" if result['success'] else "FAILED"
+                detail = f" ({result['message']})" if result['message'] else ""
+                print(f"[{done}/{len(rows)}] {status} {result['card_name']}{detail}")
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        return 1
+    finally:
+        session_manager.close_all_sessions()
+
+    print(f"{len(rows) - failed} card files written to {args.output}, {failed} failed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,114 @@
+"""
+Hibernación de sesiones inactivas: volcado a disco y rehidratación bajo demanda
+"""
+
+import gzip
+import json
+import logging
+import os
+import tempfile
+
+from .card_session import CardSession
+from .instrumentation import timed
+
+logger = logging.getLogger(__name__)
+
+
+class HibernatedSession:
+    """
+    Stub ligero que sustituye a una CardSession hibernada.
+    Solo conserva los datos necesarios para mostrarla en la lista de tarjetas.
+    """
+
+    __slots__ = ('session_id', 'card_name', 'card_type', 'created_at', 'status', 'snapshot_file')
+
+    is_hibernated = True
+
+    def __init__(self, session_id, card_name, card_type, created_at, status, snapshot_file):
+        self.session_id = session_id
+        self.card_name = card_name
+        self.card_type = card_type
+        self.created_at = created_at
+        self.status = status  # Estado de la aplicación en el momento de hibernar
+        self.snapshot_file = snapshot_file
+
+    def get_current_app_state(self):
+        """Devuelve el estado que tenía la sesión al hibernarse"""
+        return self.status
+
+    def cleanup(self):
+        """Elimina el archivo de snapshot"""
+        try:
+            if self.snapshot_file and os.path.exists(self.snapshot_file):
+                os.remove(self.snapshot_file)
+        except Exception as e:
+            logger.warning("Could not remove session snapshot: %s", e)
+
+
+def _get_snapshot_directory():
+    """Obtiene el directorio donde se guardan los snapshots de sesiones hibernadas"""
+    snapshot_dir = os.path.join(tempfile.gettempdir(), "CardSIM_sessions", "hibernated")
+    os.makedirs(snapshot_dir, exist_ok=True)
+    return snapshot_dir
+
+
+@timed()
+def hibernate_session(session):
+    """
+    Vuelca una CardSession a un snapshot comprimido y devuelve el stub que la sustituye.
+
+    Returns:
+        HibernatedSession o None si no se pudo escribir el snapshot
+    """
+    try:
+        snapshot_file = os.path.join(_get_snapshot_directory(), f"card_session_{session.session_id}.json.gz")
+        with gzip.open(snapshot_file, 'wt', encoding='utf-8') as f:
+            json.dump(session.to_snapshot(), f, separators=(',', ':'), ensure_ascii=False)
+    except Exception as e:
+        logger.warning("Could not hibernate session %s: %s", session.card_name, e)
+        return None
+
+    stub = HibernatedSession(session.session_id, session.card_name, session.card_type,
+                             session.created_at, session.get_current_app_state(), snapshot_file)
+
+    # Liberar el archivo temporal de la sesión activa (el snapshot lo sustituye)
+    session.cleanup()
+    session.temp_file = None
+    return stub
+
+
+def read_snapshot_memory(stub):
+    """
+    Lee la memoria completa (strings hex) del snapshot de una sesión hibernada sin
+    reconstruirla; el snapshot se conserva.
+
+    Returns:
+        list o None si el snapshot no se pudo leer
+    """
+    try:
+        with gzip.open(stub.snapshot_file, 'rt', encoding='utf-8') as f:
+            memory_hex = json.load(f)['memory']['memory_hex']
+    except Exception as e:
+        logger.error("Could not read snapshot of session %s: %s", stub.card_name, e)
+        return None
+    return [memory_hex[i:i + 2] for i in range(0, len(memory_hex), 2)]
+
+
+@timed()
+def rehydrate_session(stub):
+    """
+    Reconstruye la CardSession completa a partir de su stub hibernado.
+
+    Returns:
+        CardSession o None si el snapshot no se pudo leer
+    """
+    try:
+        with gzip.open(stub.snapshot_file, 'rt', encoding='utf-8') as f:
+            snapshot = json.load(f)
+        session = CardSession.from_snapshot(snapshot)
+    except Exception as e:
+        logger.error("Could not rehydrate session %s: %s", stub.card_name, e)
+        return None
+
+    stub.cleanup()
+    return session
@@ -4,43 +4,162 @@ Gestor de múltiples sesiones de tarjetas simultáneas
 
 from .card_session import CardSession
 from src.utils.constants import *
+from src.utils.logging_config import HexBytes
 from .code_improvements import is_valid_hex_string, validate_hex_bytes
+from .session_hibernation import HibernatedSession, hibernate_session, rehydrate_session, read_snapshot_memory
+from .instrumentation import timed
+from collections import OrderedDict
+import logging
 import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
 
 class SessionManager:
     """Gestiona múltiples sesiones de tarjetas simultáneas"""
     
-    def __init__(self):
-        self.sessions = {}  # {session_id: CardSession}
+    def __init__(self, max_resident_sessions=SESSION_MAX_RESIDENT,
+                 hibernate_after_seconds=SESSION_HIBERNATE_AFTER_SECONDS):
+        # Registro ordenado por creación: {session_id: CardSession | HibernatedSession}
+        self.sessions = OrderedDict()
+        self._name_index = {}  # {card_name: session_id} para búsquedas O(1)
         self.active_session_id = None
-        self.session_order = []  # Para mantener orden de creación
+        
+        # Política LRU de hibernación: {session_id: último uso}, del menos al más reciente
+        self.max_resident_sessions = max_resident_sessions
+        self.hibernate_after_seconds = hibernate_after_seconds
+        self._last_used = OrderedDict()
+        # Residencia y LRU también se usan desde hilos de trabajo (escrituras físicas, servidor vpcd)
+        self._lock = threading.RLock()
+        
+        # Sesiones que no se hibernan aunque no se usen (p. ej. expuestas por el servidor vpcd)
+        self.pinned_session_ids = set()
     
-    def create_new_card_session(self, card_name, card_type=CARD_TYPE_5542):
-        """Crea una nueva sesión de tarjeta"""
+    def create_new_card_session(self, card_name, card_type=CARD_TYPE_5542, activate=True):
+        """Crea una nueva sesión de tarjeta (y la hace activa salvo activate=False)"""
         # Verificar que el nombre no esté en uso
-        for session in self.sessions.values():
-            if session.card_name == card_name:
-                return None, f"Card name '{card_name}' already exists"
+        if card_name in self._name_index:
+            return None, f"Card name '{card_name}' already exists"
         
         # Crear nueva sesión
         session = CardSession(card_name, card_type)
         
         # Aplicar configuración global de usuario si existe
-        try:
-            from utils.user_config import user_config_manager
-            if user_config_manager.user_info:
-                session.user_info = user_config_manager.user_info
-        except Exception:
-            pass  # Si no hay configuración global, continúa normalmente
+        user_info = self._get_global_user_info()
+        if user_info:
+            session.user_info = user_info
         
-        self.sessions[session.session_id] = session
-        self.session_order.append(session.session_id)
+        self._register_session(session)
         
         # Hacer esta sesión la activa
-        self.active_session_id = session.session_id
+        if activate:
+            self.active_session_id = session.session_id
+        self.hibernate_inactive_sessions()
         
         return session, "Card session created successfully"
     
+    def create_many(self, card_names, card_type=CARD_TYPE_5542):
+        """
+        Crea varias sesiones de una vez (p. ej. desde scripts).
+        No cambia la sesión activa y aplica la política de hibernación una sola vez al final.
+        
+        Returns:
+            tuple: (lista de sesiones creadas, lista de (nombre, mensaje de error))
+        """
+        created = []
+        errors = []
+        user_info = self._get_global_user_info()
+        
+        for card_name in card_names:
+            if card_name in self._name_index:
+                errors.append((card_name, f"Card name '{card_name}' already exists"))
+                continue
+            
+            session = CardSession(card_name, card_type)
+            if user_info:
+                session.user_info = user_info
+            self._register_session(session)
+            created.append(session)
+        
+        self.hibernate_inactive_sessions()
+        return created, errors
+
+    def clone_session(self, session_id, card_name, activate=True):
+        """
+        Crea una nueva tarjeta idéntica a otra sesión abierta.
+        La memoria se comparte copy-on-write hasta que alguna de las dos escribe, por lo que
+        preparar muchas copias de una tarjeta plantilla apenas consume memoria.
+        """
+        if card_name in self._name_index:
+            return None, f"Card name '{card_name}' already exists"
+
+        if session_id not in self.sessions:
+            return None, "Source card session not found"
+
+        source = self._resolve_session(session_id)
+        if source is None:
+            return None, "Could not restore source card session"
+
+        session = source.clone(card_name)
+        self._register_session(session)
+
+        if activate:
+            self.active_session_id = session.session_id
+        self.hibernate_inactive_sessions()
+
+        return session, "Card session cloned successfully"
+
+    def create_session_from_read(self, card_name, card_type, data, psc_bytes=None, activate=True):
+        """
+        Crea una sesión con la memoria leída de una tarjeta física.
+        Si la tarjeta se leyó con un PSC personalizado, se aplica a la nueva sesión.
+        Con activate=False la sesión activa no cambia.
+        
+        Returns:
+            tuple: (session, message)
+        """
+        session, message = self.create_new_card_session(card_name, card_type, activate)
+        if not session:
+            return None, message
+        
+        # Cargar los datos leídos en la nueva sesión
+        session.memory_manager.load_from_data(data)
+        
+        if psc_bytes is not None:
+            try:
+                if card_type == CARD_TYPE_5542:
+                    # SLE5542: PSC en registro interno (no en memoria visible)
+                    session.memory_manager.internal_psc_5542 = list(psc_bytes)
+                else:
+                    # SLE5528: PSC en memoria visible
+                    for i, byte_val in enumerate(psc_bytes):
+                        session.memory_manager.memory_data[PSC_ADDRESS_5528 + i] = f"{byte_val:02X}"
+                session.psc_has_been_changed = True
+            except Exception as e:
+                logger.warning("Could not apply custom PSC: %s", e)
+        
+        # Asegurar que las direcciones de fábrica estén bloqueadas
+        if hasattr(session.memory_manager, 'ensure_factory_locked'):
+            session.memory_manager.ensure_factory_locked()
+        
+        return session, f"Card '{card_name}' created from read data"
+    
+    def _get_global_user_info(self):
+        """Obtiene la configuración global de usuario, si existe"""
+        try:
+            from utils.user_config import user_config_manager
+            return user_config_manager.user_info
+        except Exception:
+            return ""  # Si no hay configuración global, continúa normalmente
+    
+    def _register_session(self, session):
+        """Añade una sesión al registro y a los índices"""
+        self.sessions[session.session_id] = session
+        self._name_index[session.card_name] = session.session_id
+        self._touch(session.session_id)
+    
+    @timed()
     def open_card_from_file(self, filepath, card_name=None):
         """Crea una sesión desde un archivo de tarjeta guardado"""
         try:
@@ -50,15 +169,15 @@ class SessionManager:
             
             # Detectar tipo de tarjeta del archivo
             card_type = self._detect_card_type_from_file(filepath)
-            print(f"[DEBUG] Opening card from file: {filepath}")
-            print(f"[DEBUG] Detected card type: {card_type}")
+            logger.debug("Opening card from file: %s", filepath)
+            logger.debug("Detected card type: %s", card_type)
             
             # Crear sesión
             session, message = self.create_new_card_session(card_name, card_type)
             if not session:
                 return None, message
             
-            print(f"[DEBUG] Created session with card type: {session.card_type}")
+            logger.debug("Created session with card type: %s", session.card_type)
             
             # Cargar datos del archivo
             success = self._load_card_data_from_file(session, filepath)
@@ -67,15 +186,16 @@ class SessionManager:
                 self.close_session(session.session_id)
                 return None, "Failed to load card data from file"
             
-            print(f"[DEBUG] Final session card type: {session.card_type}")
-            print(f"[DEBUG] PSC should be: {session.get_current_psc()}")
+            logger.debug("Final session card type: %s", session.card_type)
+            logger.debug("PSC should be: %s", session.get_current_psc())
             
             return session, "Card loaded successfully from file"
             
         except Exception as e:
-            print(f"[ERROR] Error opening card from file: {e}")
+            logger.error("Error opening card from file: %s", e)
             return None, f"Error opening card file: {str(e)}"
     
+    @timed()
     def _detect_card_type_from_file(self, filepath):
         """Detecta el tipo de tarjeta basado en el contenido del archivo"""
         try:
@@ -89,13 +209,13 @@ class SessionManager:
             for line in lines[:10]:  # Revisar las primeras 10 líneas
                 line_upper = line.upper()
                 if "SLE5528" in line_upper or "1KB" in line_upper:
-                    print(f"[DEBUG] Detected SLE5528 from header: {line}")
+                    logger.debug("Detected SLE5528 from header: %s", line)
                     return CARD_TYPE_5528
                 elif "SLE5542" in line_upper or "256B" in line_upper:
-                    print(f"[DEBUG] Detected SLE5542 from header: {line}")
+                    logger.debug("Detected SLE5542 from header: %s", line)
                     return CARD_TYPE_5542
                 elif "PAGE" in line_upper and any(x in line_upper for x in ["0", "1", "2", "3"]):
-                    print(f"[DEBUG] Detected SLE5528 from PAGE indicator: {line}")
+                    logger.debug("Detected SLE5528 from PAGE indicator: %s", line)
                     return CARD_TYPE_5528
             
             # Contar líneas de datos reales (no comentarios ni headers)
@@ -108,19 +228,20 @@ class SessionManager:
                     data_lines += 1
             
             # Heurística: SLE5542 tiene ~16 líneas de datos, SLE5528 tiene ~64 líneas
-            print(f"[DEBUG] Data lines counted: {data_lines}")
+            logger.debug("Data lines counted: %d", data_lines)
             if data_lines > 30:  # Para 1KB (64 líneas de 16 bytes cada una)
-                print(f"[DEBUG] Detected SLE5528 based on data lines count")
+                logger.debug("Detected SLE5528 based on data lines count")
                 return CARD_TYPE_5528
             else:  # Para 256B (16 líneas de 16 bytes cada una)
-                print(f"[DEBUG] Detected SLE5542 based on data lines count")
+                logger.debug("Detected SLE5542 based on data lines count")
                 return CARD_TYPE_5542
                 
         except Exception as e:
-            print(f"[DEBUG] Exception in card type detection: {e}")
+            logger.debug("Exception in card type detection: %s", e)
             # Por defecto, asumir 5542
             return CARD_TYPE_5542
     
+    @timed()
     def _load_card_data_from_file(self, session, filepath):
         """Carga los datos de la tarjeta desde un archivo"""
         try:
@@ -131,8 +252,9 @@ class SessionManager:
             memory_data = []
             internal_psc_5542 = None  # Para almacenar PSC interno si se encuentra
             
-            print(f"[DEBUG] Cargando archivo: {filepath}")
-            print(f"[DEBUG] Total lines: {len(lines)}")
+            debug_enabled = logger.isEnabledFor(logging.DEBUG)  # Se consulta una vez, no por cada fila
+            logger.debug("Cargando archivo: %s", filepath)
+            logger.debug("Total lines: %d", len(lines))
             
             # Primero, buscar PSC interno en el header (solo para SLE5542)
             if session.card_type == CARD_TYPE_5542:
@@ -147,10 +269,10 @@ class SessionManager:
                                     psc_bytes.append(int(hex_str, 16))
                             if len(psc_bytes) == 3:
                                 internal_psc_5542 = psc_bytes
-                                print(f"[DEBUG] Found internal PSC in file: {' '.join([f'{b:02X}' for b in internal_psc_5542])}")
+                                logger.debug("Found internal PSC in file: %s", HexBytes(internal_psc_5542))
                                 break
                         except Exception as e:
-                            print(f"[DEBUG] Error parsing internal PSC: {e}")
+                            logger.debug("Error parsing internal PSC: %s", e)
             
             # Parsear el archivo para extraer datos hex
             for line_num, line in enumerate(lines):
@@ -200,10 +322,10 @@ class SessionManager:
                         memory_data.append(hex_byte.upper())
                         line_data_count += 1
                 
-                if line_data_count > 0:
-                    print(f"[DEBUG] Line {line_num+1}: {line_data_count} bytes extracted from: {original_line[:50]}...")
+                if line_data_count > 0 and debug_enabled:
+                    logger.debug("Line %d: %d bytes extracted from: %.50s...", line_num + 1, line_data_count, original_line)
             
-            print(f"[DEBUG] Total bytes extracted: {len(memory_data)}")
+            logger.debug("Total bytes extracted: %d", len(memory_data))
             
             # Si no se encontraron suficientes datos, llenar con FF
             target_size = MEMORY_SIZE_5528 if session.card_type == CARD_TYPE_5528 else MEMORY_SIZE_5542
@@ -213,8 +335,8 @@ class SessionManager:
             # Truncar si hay demasiados datos
             memory_data = memory_data[:target_size]
             
-            print(f"[DEBUG] Final memory size: {len(memory_data)} bytes")
-            print(f"[DEBUG] First 10 bytes: {memory_data[:10]}")
+            logger.debug("Final memory size: %d bytes", len(memory_data))
+            logger.debug("First 10 bytes: %s", memory_data[:10])
             
             # Cargar los datos en la memoria de la sesión
             session.memory_manager.load_memory_dump(memory_data)
@@ -223,9 +345,9 @@ class SessionManager:
             if session.card_type == CARD_TYPE_5542 and internal_psc_5542 is not None:
                 success = session.memory_manager.set_internal_psc(internal_psc_5542)
                 if success:
-                    print(f"[DEBUG] Internal PSC loaded: {' '.join([f'{b:02X}' for b in internal_psc_5542])}")
+                    logger.debug("Internal PSC loaded: %s", HexBytes(internal_psc_5542))
                 else:
-                    print(f"[DEBUG] Failed to set internal PSC")
+                    logger.warning("Failed to set internal PSC")
             
             # Sincronizar estado entre APDU handler y memory manager
             self._synchronize_card_state(session)
@@ -237,51 +359,161 @@ class SessionManager:
             return True
             
         except Exception as e:
-            print(f"[ERROR] Exception in _load_card_data_from_file: {e}")
+            logger.error("Exception in _load_card_data_from_file: %s", e)
             session.add_to_log("ERROR", f"Failed to load card data: {str(e)}")
             return False
     
     def get_active_session(self):
         """Obtiene la sesión actualmente activa"""
         if self.active_session_id and self.active_session_id in self.sessions:
-            return self.sessions[self.active_session_id]
+            return self._resolve_session(self.active_session_id)
         return None
     
     def set_active_session(self, session_id):
-        """Establece una sesión como activa"""
+        """Establece una sesión como activa (rehidratándola si estaba hibernada)"""
         if session_id in self.sessions:
+            if self._resolve_session(session_id) is None:
+                return False
             self.active_session_id = session_id
+            self.hibernate_inactive_sessions()
             return True
         return False
     
     def get_session(self, session_id):
         """Obtiene una sesión específica por ID"""
-        return self.sessions.get(session_id)
+        if session_id not in self.sessions:
+            return None
+        return self._resolve_session(session_id)
     
     def get_session_by_name(self, card_name):
         """Obtiene una sesión por nombre de tarjeta"""
-        for session in self.sessions.values():
-            if session.card_name == card_name:
-                return session
-        return None
+        session_id = self._name_index.get(card_name)
+        if session_id is None:
+            return None
+        return self._resolve_session(session_id)
+    
+    def has_session_name(self, card_name):
+        """Verifica si ya existe una sesión con ese nombre (sin rehidratarla)"""
+        return card_name in self._name_index
     
     def get_all_sessions(self):
-        """Obtiene todas las sesiones en orden de creación"""
-        return [self.sessions[sid] for sid in self.session_order if sid in self.sessions]
+        """
+        Obtiene todas las sesiones en orden de creación.
+        Las sesiones hibernadas se devuelven como stubs (nombre, tipo y estado).
+        """
+        return list(self.sessions.values())
+    
+    def get_memory_dump(self, session_id):
+        """
+        Memoria completa de una sesión sin rehidratarla ni marcarla como usada
+        (las hibernadas se leen de su snapshot). None si no existe o no se pudo leer.
+        """
+        with self._lock:
+            session = self.sessions.get(session_id)
+            if session is None:
+                return None
+            if isinstance(session, HibernatedSession):
+                return read_snapshot_memory(session)
+            return session.memory_manager.get_memory_dump()
+    
+    def pin_session(self, session_id):
+        """
+        Rehidrata una sesión y la fija en memoria hasta unpin_session().
+        
+        Returns:
+            CardSession o None si no existe o no se pudo rehidratar
+        """
+        with self._lock:
+            if session_id not in self.sessions:
+                return None
+            session = self._resolve_session(session_id)
+            if session is not None:
+                self.pinned_session_ids.add(session_id)
+            return session
+    
+    def unpin_session(self, session_id):
+        """Deja que la política LRU vuelva a hibernar la sesión"""
+        with self._lock:
+            self.pinned_session_ids.discard(session_id)
+    
+    def is_session_hibernated(self, session_id):
+        """Verifica si una sesión está hibernada en disco"""
+        return isinstance(self.sessions.get(session_id), HibernatedSession)
+    
+    def _touch(self, session_id):
+        """Marca una sesión como usada recientemente (política LRU)"""
+        with self._lock:
+            self._last_used[session_id] = time.monotonic()
+            self._last_used.move_to_end(session_id)
+    
+    def _resolve_session(self, session_id):
+        """Devuelve la CardSession completa, rehidratándola desde disco si es necesario"""
+        with self._lock:
+            session = self.sessions[session_id]
+            if isinstance(session, HibernatedSession):
+                rehydrated = rehydrate_session(session)
+                if rehydrated is None:
+                    return None
+                self.sessions[session_id] = rehydrated
+                session = rehydrated
+            self._touch(session_id)
+            return session
+    
+    def hibernate_session(self, session_id):
+        """Hiberna una sesión concreta, sustituyéndola por un stub ligero"""
+        with self._lock:
+            session = self.sessions.get(session_id)
+            if session is None or isinstance(session, HibernatedSession):
+                return False
+            
+            stub = hibernate_session(session)
+            if stub is None:
+                return False
+            
+            self.sessions[session_id] = stub
+            self._last_used.pop(session_id, None)
+            return True
+    
+    def hibernate_inactive_sessions(self, now=None):
+        """
+        Aplica la política LRU: hiberna las sesiones que llevan demasiado tiempo sin
+        usarse y las menos recientes si se supera el máximo de sesiones residentes.
+        La sesión activa y las fijadas en pinned_session_ids nunca se hibernan.
+        
+        Returns:
+            int: Número de sesiones hibernadas
+        """
+        if now is None:
+            now = time.monotonic()
+        
+        with self._lock:
+            resident_count = len(self._last_used)
+            hibernated = 0
+            
+            # Recorrer de la menos a la más recientemente usada
+            for session_id, last_used in list(self._last_used.items()):
+                if session_id == self.active_session_id or session_id in self.pinned_session_ids:
+                    continue
+                
+                over_limit = (self.max_resident_sessions is not None and
+                              resident_count > self.max_resident_sessions)
+                idle = (self.hibernate_after_seconds is not None and
+                        now - last_used >= self.hibernate_after_seconds)
+                if not (over_limit or idle):
+                    continue
+                
+                if self.hibernate_session(session_id):
+                    resident_count -= 1
+                    hibernated += 1
+        
+        return hibernated
     
     def close_session(self, session_id):
         """Cierra una sesión específica"""
         if session_id not in self.sessions:
             return False
         
-        # Limpiar la sesión
-        session = self.sessions[session_id]
-        session.cleanup()
-        
-        # Remover de las listas
-        del self.sessions[session_id]
-        if session_id in self.session_order:
-            self.session_order.remove(session_id)
+        self._unregister_session(session_id)
         
         # Si era la sesión activa, no seleccionar automáticamente otra
         if self.active_session_id == session_id:
@@ -289,12 +521,39 @@ class SessionManager:
         
         return True
     
+    def close_many(self, session_ids):
+        """
+        Cierra varias sesiones de una vez.
+        
+        Returns:
+            int: Número de sesiones cerradas
+        """
+        closed = 0
+        for session_id in session_ids:
+            if session_id in self.sessions:
+                self._unregister_session(session_id)
+                closed += 1
+        
+        if self.active_session_id not in self.sessions:
+            self.active_session_id = None
+        
+        return closed
+    
+    def _unregister_session(self, session_id):
+        """Limpia una sesión (o su snapshot si estaba hibernada) y la elimina de los índices"""
+        with self._lock:
+            session = self.sessions.pop(session_id)
+            session.cleanup()
+            self._last_used.pop(session_id, None)
+            self.pinned_session_ids.discard(session_id)
+        if self._name_index.get(session.card_name) == session_id:
+            del self._name_index[session.card_name]
+    
     def close_all_sessions(self):
         """Cierra todas las sesiones"""
-        session_ids = list(self.sessions.keys())
-        for session_id in session_ids:
-            self.close_session(session_id)
+        self.close_many(list(self.sessions.keys()))
     
+    @timed()
     def save_session_to_file(self, session_id, filepath):
         """Guarda una sesión específica a un archivo con formato visual (filas y columnas)"""
         session = self.get_session(session_id)
@@ -430,7 +689,7 @@ class SessionManager:
                 if error_counter_address < len(memory_data):
                     error_counter_value = memory_data[error_counter_address]
                     session.apdu_handler.error_counter = error_counter_value
-                    print(f"[SYNC] Error counter sincronizado: {error_counter_value}")
+                    logger.debug("Error counter sincronizado: %s", error_counter_value)
                     
                 # Verificar PSC desde memoria
                 psc_addresses = [0x3FE, 0x3FF]
@@ -438,7 +697,7 @@ class SessionManager:
                 for addr in psc_addresses:
                     if addr < len(memory_data):
                         psc_values.append(memory_data[addr])
-                print(f"[SYNC] PSC values: {[hex(val) for val in psc_values]}")
+                logger.debug("PSC values: %s", psc_values)
                 
             elif session.card_type == "SLE5542":
                 # Para SLE5542, el error counter no es visible en memoria
@@ -449,10 +708,10 @@ class SessionManager:
                 for addr in psc_addresses:
                     if addr < len(memory_data):
                         psc_values.append(memory_data[addr])
-                print(f"[SYNC] PSC values: {[hex(val) for val in psc_values]}")
+                logger.debug("PSC values: %s", psc_values)
                 
         except Exception as e:
-            print(f"[ERROR] Error en sincronización de estado: {e}")
+            logger.error("Error en sincronización de estado: %s", e)
 
     def _mark_modified_from_factory(self, session):
         """Marca como modificadas las direcciones que difieren de la configuración de fábrica"""
@@ -0,0 +1,251 @@
+"""
+Granja de simulación sin interfaz: muchas CardSession repartidas entre procesos
+
+Cada proceso de trabajo crea sus propias CardSession y las maneja a través de
+VirtualCard (el mismo camino que siguen el servidor vpcd y los lectores
+virtuales) con un guion de APDUs o con una carga aleatoria. No se importa Tk,
+así que la carga usa tantos núcleos como procesos se pidan.
+
+    python -m src.core.simulation_farm --workers 4 --sessions 250 --iterations 50
+    python -m src.core.simulation_farm --script lectura.apdu --card-type 5528
+
+Formato del guion: una APDU en hex por línea, '#' para comentarios y,
+opcionalmente, el SW esperado tras '=>':
+
+    FF A4 00 00 01 06
+    FF 20 00 00 03 FF FF FF => 90 07
+    FF B0 00 20 10
+
+Sin SW esperado, cuenta como error cualquier respuesta con SW1 distinto de 90
+(y un PRESENT PSC que no deje la tarjeta verificada). Las latencias se
+acumulan en LatencyHistogram por tipo de comando, como en el diagnóstico de
+lectores, y se suman entre procesos al terminar.
+"""
+
+import argparse
+import concurrent.futures
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+from src.utils.constants import (CARD_TYPE_5542, CARD_TYPE_5528, DEFAULT_PSC_5542, DEFAULT_PSC_5528,
+                                 MEMORY_SIZE_5542, MEMORY_SIZE_5528)
+from .apdu_metrics import LatencyHistogram, classify_apdu
+
+# Área de usuario donde la carga aleatoria escribe (sin bytes de fábrica ni protegidos)
+USER_AREA = {CARD_TYPE_5542: (0x20, 0xF0), CARD_TYPE_5528: (0x20, 0x3F0)}
+MEMORY_SIZE = {CARD_TYPE_5542: MEMORY_SIZE_5542, CARD_TYPE_5528: MEMORY_SIZE_5528}
+DEFAULT_PSC = {CARD_TYPE_5542: DEFAULT_PSC_5542, CARD_TYPE_5528: DEFAULT_PSC_5528}
+OPERATIONS_PER_TRANSACTION = 8  # Lecturas/escrituras tras cada SELECT + PSC en la carga aleatoria
+MAX_TRANSFER = 32
+
+
+def parse_script(text):
+    """
+    Convierte un guion en una lista de (apdu, sw esperado o None)
+
+    Raises:
+        ValueError: si una línea no es hex válido
+    """
+    steps = []
+    for number, line in enumerate(text.splitlines(), 1):
+        line = line.split('#', 1)[0].strip()
+        if not line:
+            continue
+        command, _, expected = line.partition('=>')
+        try:
+            apdu = list(bytes.fromhex(command))
+            expected_sw = tuple(bytes.fromhex(expected)) if expected.strip() else None
+        except ValueError:
+            raise ValueError(f"Line {number}: invalid hex: {line}")
+        if expected_sw is not None and len(expected_sw) != 2:
+            raise ValueError(f"Line {number}: expected SW must be 2 bytes")
+        steps.append((apdu, expected_sw))
+    return steps
+
+
+def random_transaction(rng, card_type):
+    """SELECT, PSC correcto y una mezcla de lecturas, escrituras y READ_EC"""
+    steps = [([0xFF, 0xA4, 0x00, 0x00, 0x01, 0x06], None),
+             ([0xFF, 0x20, 0x00, 0x00, 0x03] + list(DEFAULT_PSC[card_type]), None)]
+    start, end = USER_AREA[card_type]
+    for _ in range(OPERATIONS_PER_TRANSACTION):
+        choice = rng.random()
+        length = rng.randint(1, MAX_TRANSFER)
+        if choice < 0.55:
+            address = rng.randrange(0, MEMORY_SIZE[card_type] - length)
+            steps.append(([0xFF, 0xB0, address >> 8, address & 0xFF, length], None))
+        elif choice < 0.9:
+            address = rng.randrange(start, end - length)
+            data = [rng.randrange(256) for _ in range(length)]
+            steps.append(([0xFF, 0xD0, address >> 8, address & 0xFF, length] + data, None))
+        else:
+            steps.append(([0xFF, 0xB1, 0x00, 0x00, 0x04], None))
+    return steps
+
+
+def _card_types(card_type, count):
+    if card_type == 'mixed':
+        return [CARD_TYPE_5528 if index % 2 else CARD_TYPE_5542 for index in range(count)]
+    return [int(card_type)] * count
+
+
+def run_worker(worker_index, session_count, card_type, iterations, script=None, seed=None):
+    """
+    Proceso de trabajo: crea sus sesiones y las recorre por turnos
+
+    Returns:
+        dict: worker, sessions, apdus, errors, seconds, setup_seconds,
+              histograms {tipo de comando: LatencyHistogram} y first_errors
+    """
+    # Importar aquí para que el proceso padre no cree sesiones ni ficheros temporales
+    from .card_session import CardSession
+    from .card_transport import VirtualCard
+
+    rng = random.Random(None if seed is None else seed + worker_index)
+    started = time.perf_counter()
+    sessions = [CardSession(f"farm_{worker_index}_{index}", session_type)
+                for index, session_type in enumerate(_card_types(card_type, session_count))]
+    cards = [VirtualCard.from_session(session) for session in sessions]
+    setup_seconds = time.perf_counter() - started
+
+    histograms = {}
+    apdus = errors = 0
+    first_errors = []
+    started = time.perf_counter()
+    try:
+        for _ in range(iterations):
+            for card in cards:
+                steps = script if script is not None else random_transaction(rng, card.card_type)
+                for apdu, expected_sw in steps:
+                    sent = time.perf_counter()
+                    data, sw1, sw2 = card.process_apdu(apdu)
+                    seconds = time.perf_counter() - sent
+
+                    if expected_sw is not None:
+                        ok = (sw1, sw2) == expected_sw
+                    else:
+                        ok = sw1 == 0x90 and (apdu[1] != 0x20 or card.psc_verified)
+                    apdu_class = classify_apdu(apdu)
+                    histogram = histograms.get(apdu_class)
+                    if histogram is None:
+                        histogram = histograms[apdu_class] = LatencyHistogram()
+                    histogram.add(seconds, len(apdu) + len(data) + 2, ok)
+                    apdus += 1
+                    if not ok:
+                        errors += 1
+                        if len(first_errors) < 5:
+                            first_errors.append(f"{' '.join(f'{b:02X}' for b in apdu[:5])} -> {sw1:02X} {sw2:02X}")
+        seconds = time.perf_counter() - started
+    finally:
+        for session in sessions:
+            session.cleanup()
+
+    return {
+        'worker': worker_index,
+        'sessions': session_count,
+        'apdus': apdus,
+        'errors': errors,
+        'seconds': seconds,
+        'setup_seconds': setup_seconds,
+        'histograms': histograms,
+        'first_errors': first_errors,
+    }
+
+
+def run_farm(workers, sessions_per_worker, card_type='5542', iterations=10, script=None, seed=None):
+    """
+    Lanza los procesos de trabajo y suma sus resultados
+
+    Returns:
+        dict: wall_seconds, apdus, errors, apdus_per_second (incluye arrancar los
+              procesos), busy_apdus_per_second (solo el bucle de APDUs), per_worker
+              (filas sin histogramas) y by_command (resumen por tipo de comando)
+    """
+    started = time.perf_counter()
+    context = multiprocessing.get_context('spawn')
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        futures = [executor.submit(run_worker, index, sessions_per_worker, card_type, iterations, script, seed)
+                   for index in range(workers)]
+        results = [future.result() for future in futures]
+    wall_seconds = time.perf_counter() - started
+
+    merged = {}
+    for result in results:
+        for apdu_class, histogram in result['histograms'].items():
+            merged.setdefault(apdu_class, LatencyHistogram()).merge(histogram)
+
+    apdus = sum(result['apdus'] for result in results)
+    # Sin arranque de procesos ni creación de sesiones: lo que aguanta el propio código
+    busy_seconds = max((result['seconds'] for result in results), default=0.0)
+    per_worker = [{key: value for key, value in result.items() if key != 'histograms'} for result in results]
+    for row in per_worker:
+        row['apdus_per_second'] = row['apdus'] / row['seconds'] if row['seconds'] else 0.0
+    return {
+        'workers': workers,
+        'sessions': workers * sessions_per_worker,
+        'wall_seconds': wall_seconds,
+        'apdus': apdus,
+        'errors': sum(result['errors'] for result in results),
+        'apdus_per_second': apdus / wall_seconds if wall_seconds else 0.0,
+        'busy_apdus_per_second': apdus / busy_seconds if busy_seconds else 0.0,
+        'per_worker': per_worker,
+        'by_command': {apdu_class: histogram.summary() for apdu_class, histogram in sorted(merged.items())},
+    }
+
+
+def format_report(report):
+    lines = [f"{report['workers']} workers, {report['sessions']} sessions: {report['apdus']} APDUs in "
+             f"{report['wall_seconds']:.2f} s ({report['apdus_per_second']:.0f} APDU/s), {report['errors']} errors",
+             f"APDU loop only: {report['busy_apdus_per_second']:.0f} APDU/s",
+             "",
+             f"{'Command':<12}{'APDUs':>10}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}{'errors':>8}"]
+    for apdu_class, summary in report['by_command'].items():
+        lines.append(f"{apdu_class:<12}{summary['count']:>10}{summary['p50_ms']:>10.3f}"
+                     f"{summary['p95_ms']:>10.3f}{summary['max_ms']:>10.3f}{summary['errors']:>8}")
+    lines.append("")
+    for row in report['per_worker']:
+        lines.append(f"worker {row['worker']}: {row['apdus']} APDUs in {row['seconds']:.2f} s "
+                     f"({row['apdus_per_second']:.0f}/s), setup {row['setup_seconds']:.2f} s, {row['errors']} errors")
+        for error in row['first_errors']:
+            lines.append(f"    {error}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    """Ejecuta la granja desde la línea de comandos"""
+    parser = argparse.ArgumentParser(description="Drive many simulated cards across worker processes (no GUI)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument("--sessions", type=int, default=100, help="card sessions per worker")
+    parser.add_argument("--card-type", choices=('5542', '5528', 'mixed'), default='mixed')
+    parser.add_argument("--iterations", type=int, default=10,
+                        help="times each session runs the script or a random transaction")
+    parser.add_argument("--script", help="APDU script file (random workload if omitted)")
+    parser.add_argument("--seed", type=int, help="seed for the random workload")
+    parser.add_argument("--json", help="also write the report to this JSON file")
+    args = parser.parse_args(argv)
+
+    # Mismo path que main.py: el núcleo importa también src/utils como "utils"
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    script = None
+    if args.script:
+        try:
+            with open(args.script, 'r', encoding='utf-8') as f:
+                script = parse_script(f.read())
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+
+    report = run_farm(args.workers, args.sessions, args.card_type, args.iterations, script, args.seed)
+    print(format_report(report))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    return 1 if report['errors'] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,296 @@
+"""
+Servidor compatible con vpcd (vsmartcard) que expone tarjetas simuladas como lectores PC/SC
+
+Cada ranura es una VirtualCard respaldada por una CardSession y escucha en su propio
+puerto local (VPCD_BASE_PORT + n), de modo que el driver vpcd de pcscd ve un lector
+por ranura y cualquier herramienta PC/SC (u otra instancia de CardSIM) puede leer y
+escribir las tarjetas simuladas como si fueran reales.
+
+Protocolo (vpcd en modo inverso: vpcd se conecta a la tarjeta virtual): cada mensaje
+va precedido de su longitud en 2 bytes big-endian. Los mensajes de 1 byte son de
+control (00 apagar, 01 encender, 02 reset, 04 pedir ATR) y solo el de ATR tiene
+respuesta; el resto son APDUs y se responden con datos + SW1 SW2.
+
+Todas las ranuras se atienden en un bucle asyncio en un hilo aparte, sin bloquear Tk.
+Las ranuras de sesiones del gestor solo rehidratan y fijan su sesión mientras hay
+algún cliente vpcd conectado.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import threading
+
+from src.utils.constants import CARD_TYPE_5542, CARD_TYPE_5528, VPCD_HOST, VPCD_BASE_PORT
+from .card_transport import VirtualCard
+
+logger = logging.getLogger(__name__)
+
+# Mensajes de control de vpcd
+VPCD_POWER_OFF = 0x00
+VPCD_POWER_ON = 0x01
+VPCD_RESET = 0x02
+VPCD_GET_ATR = 0x04
+
+# Espera máxima a que el bucle abra (o cierre) los puertos de escucha
+_START_TIMEOUT_SECONDS = 5.0
+
+
+class VpcdSlot:
+    """
+    Ranura del servidor: una tarjeta simulada en un puerto.
+    Con acquire/release la tarjeta solo existe mientras hay clientes conectados.
+    """
+
+    def __init__(self, index, port, card_type, label, card=None, acquire=None, release=None):
+        self.index = index
+        self.port = port
+        self.card_type = card_type
+        self.label = label
+        self.card = card
+        self.acquire = acquire  # () -> VirtualCard o None, al conectarse el primer cliente
+        self.release = release  # () al desconectarse el último
+        self.connections = 0  # Clientes vpcd conectados ahora mismo
+        self.apdu_count = 0
+        self.server = None
+
+
+class VpcdServer:
+    """Expone CardSession como lectores vpcd, cada una en su propio puerto"""
+
+    def __init__(self, host=VPCD_HOST, base_port=VPCD_BASE_PORT):
+        self.host = host
+        self.base_port = base_port
+        self.slots = []
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def add_session(self, session):
+        """Añade una ranura que comparte memoria y contador de errores con la sesión"""
+        return self.add_card(VirtualCard.from_session(session), session.card_name)
+
+    def add_managed_session(self, session_manager, session):
+        """
+        Añade una ranura para una sesión del gestor (CardSession o stub hibernado) sin
+        rehidratarla: se rehidrata y se fija al conectarse el primer cliente vpcd y se
+        libera al desconectarse el último.
+        """
+        session_id = session.session_id
+
+        def acquire():
+            resident = session_manager.pin_session(session_id)
+            return VirtualCard.from_session(resident) if resident is not None else None
+
+        return self._add_slot(session.card_type, session.card_name, acquire=acquire,
+                              release=lambda: session_manager.unpin_session(session_id))
+
+    def add_card(self, card, label=None):
+        """Añade una ranura con una tarjeta simulada (antes de start())"""
+        return self._add_slot(card.card_type, label, card=card)
+
+    def _add_slot(self, card_type, label, **card_source):
+        if self.is_running():
+            raise RuntimeError("Cannot add slots while the vpcd server is running")
+        index = len(self.slots)
+        slot = VpcdSlot(index, self.base_port + index, card_type, label or f"Slot {index}", **card_source)
+        self.slots.append(slot)
+        return slot
+
+    def clear_slots(self):
+        """Quita todas las ranuras (con el servidor parado)"""
+        if self.is_running():
+            raise RuntimeError("Cannot remove slots while the vpcd server is running")
+        self.slots = []
+
+    def is_running(self):
+        """Indica si el bucle de red está en marcha"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """
+        Abre un puerto por ranura en un hilo de fondo.
+
+        Returns:
+            tuple: (success, message)
+        """
+        with self._lock:
+            if self.is_running():
+                return False, "vpcd server is already running"
+            if not self.slots:
+                return False, "No cards to share"
+
+            started = threading.Event()
+            errors = []
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._run, args=(started, errors),
+                                            name="vpcd-server", daemon=True)
+            self._thread.start()
+            if not started.wait(_START_TIMEOUT_SECONDS):
+                errors.append("timed out opening ports")
+
+        if errors:
+            self.stop()
+            return False, f"Could not start vpcd server: {errors[0]}"
+        last_port = self.slots[-1].port
+        return True, f"Sharing {len(self.slots)} card(s) on {self.host}:{self.base_port}-{last_port}"
+
+    def stop(self):
+        """Cierra los puertos y las conexiones abiertas y para el hilo"""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            if loop is None:
+                return
+            if thread is not None and thread.is_alive():
+                loop.call_soon_threadsafe(loop.stop)
+                thread.join(_START_TIMEOUT_SECONDS)
+            self._loop = None
+            self._thread = None
+            for slot in self.slots:
+                slot.server = None
+                slot.connections = 0
+
+    def get_status(self):
+        """Estado de cada ranura para la interfaz"""
+        return [{
+            'slot': slot.index,
+            'port': slot.port,
+            'label': slot.label,
+            'card_type': slot.card_type,
+            'connected': slot.connections > 0,
+            'apdu_count': slot.apdu_count,
+        } for slot in self.slots]
+
+    def _run(self, started, errors):
+        """Hilo de fondo: abre los puertos y atiende las conexiones hasta stop()"""
+        loop = self._loop
+        asyncio.set_event_loop(loop)
+        try:
+            try:
+                loop.run_until_complete(self._open_slots())
+            except OSError as e:
+                errors.append(str(e))
+                return
+            finally:
+                started.set()
+            loop.run_forever()
+        finally:
+            self._close_loop(loop)
+
+    async def _open_slots(self):
+        for slot in self.slots:
+            slot.server = await asyncio.start_server(
+                lambda reader, writer, slot=slot: self._serve(slot, reader, writer),
+                self.host, slot.port)
+
+    def _close_loop(self, loop):
+        """Cierra los puertos y cancela las conexiones pendientes"""
+        for slot in self.slots:
+            if slot.server is not None:
+                slot.server.close()
+        tasks = [task for task in asyncio.all_tasks(loop) if not task.done()]
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+        loop.close()
+
+    async def _serve(self, slot, reader, writer):
+        """Atiende a un cliente vpcd conectado a la ranura"""
+        if slot.connections == 0 and slot.acquire is not None:
+            slot.card = self._acquire_card(slot)
+            if slot.card is None:
+                writer.close()
+                return
+        slot.connections += 1
+        try:
+            while True:
+                header = await reader.readexactly(2)
+                payload = await reader.readexactly(int.from_bytes(header, 'big'))
+                response = self._handle_message(slot, payload)
+                if response is not None:
+                    writer.write(len(response).to_bytes(2, 'big') + bytes(response))
+                    await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass  # El cliente ha cerrado la conexión
+        except asyncio.CancelledError:
+            pass  # stop(): se cierran las conexiones abiertas
+        finally:
+            slot.connections -= 1
+            if slot.connections == 0 and slot.release is not None:
+                slot.card = None
+                slot.release()
+            writer.close()
+
+    def _acquire_card(self, slot):
+        """Tarjeta de una ranura bajo demanda (None si su sesión ya no está disponible)"""
+        try:
+            card = slot.acquire()
+        except Exception as e:
+            logger.warning("vpcd slot %d could not load %s: %s", slot.index, slot.label, e)
+            return None
+        if card is None:
+            logger.warning("vpcd slot %d: %s is no longer available", slot.index, slot.label)
+        return card
+
+    def _handle_message(self, slot, payload):
+        """Respuesta a un mensaje de vpcd (None si no lleva respuesta)"""
+        card = slot.card
+        if len(payload) == 1:
+            if payload[0] == VPCD_GET_ATR:
+                return list(card.atr)
+            if payload[0] in (VPCD_POWER_OFF, VPCD_POWER_ON, VPCD_RESET):
+                card.psc_verified = False
+            return None
+
+        slot.apdu_count += 1
+        try:
+            with card.lock:
+                data, sw1, sw2 = card.process_apdu(list(payload))
+        except Exception as e:
+            logger.warning("vpcd slot %d failed to process APDU: %s", slot.index, e)
+            return [0x6F, 0x00]
+        return list(data) + [sw1, sw2]
+
+
+# Instancia global del servidor vpcd
+vpcd_server = VpcdServer()
+
+
+def main(argv=None):
+    """Servidor independiente con tarjetas en blanco, para pruebas de carga sin la interfaz"""
+    parser = argparse.ArgumentParser(description="Share simulated SLE5542/5528 cards as vpcd readers")
+    parser.add_argument("--slots", default="5542",
+                        help="comma separated card types, one slot each (e.g. 5542,5542,5528)")
+    parser.add_argument("--host", default=VPCD_HOST)
+    parser.add_argument("--port", type=int, default=VPCD_BASE_PORT, help="port of slot 0")
+    args = parser.parse_args(argv)
+
+    # Mismo path que main.py: el núcleo importa también src/utils como "utils"
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from .card_session import CardSession
+
+    server = VpcdServer(args.host, args.port)
+    for index, item in enumerate(args.slots.split(',')):
+        card_type = int(item.strip())
+        if card_type not in (CARD_TYPE_5542, CARD_TYPE_5528):
+            parser.error(f"unknown card type: {item}")
+        server.add_session(CardSession(f"vpcd_slot_{index}", card_type))
+
+    success, message = server.start()
+    print(message)
+    if not success:
+        return 1
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
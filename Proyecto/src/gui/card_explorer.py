@@ -1,7 +1,11 @@
 #!/usr/bin/env python3
 """
 Explorador de tarjetas con iconos para CardSIM
-Reemplaza la lista simple con una vista de iconos organizada en grid
+Reemplaza la lista simple con una vista de iconos organizada en grid.
+
+El grid está virtualizado sobre un único Canvas: solo se dibujan las tarjetas
+visibles en la zona de scroll, por lo que el coste de redibujado no depende del
+número de tarjetas abiertas.
 """
 
 import tkinter as tk
@@ -19,108 +23,116 @@ from src.utils.constants import *
 from src.core.code_improvements import load_icon_safe
 
 class CardExplorer:
-    """Explorador visual de tarjetas con iconos organizados en grid"""
-    
+    """Explorador visual de tarjetas con iconos organizados en un grid virtualizado"""
+
     def __init__(self, parent_frame, card_select_callback, panel_frame=None):
         self.parent_frame = parent_frame
         self.card_select_callback = card_select_callback
         self.panel_frame = panel_frame  # Frame padre para el scroll
-        
-        # Grid configuration: 4 filas x 2 columnas = 8 tarjetas máximo
-        self.max_cards = 8
+
         self.grid_cols = 2
-        self.grid_rows = 4
-        
-        # Configuración visual mejorada
-        self.slot_width = 80
-        self.slot_height = 100
-        
-        # Lista de botones de tarjetas
-        self.card_buttons = []
-        self.card_data = []  # Lista de datos de las tarjetas
-        
+
+        # Configuración visual de cada tarjeta del grid
+        self.slot_height = 112
+        self.slot_padding = 3
+
+        self.card_data = []      # Lista de datos de las tarjetas (orden de apertura)
+        self._cards_by_id = {}   # session_id -> datos de la tarjeta
+        self._filtered_cards = []  # Tarjetas que cumplen el filtro actual
+        self._filter_text = ""
+        self._focus_index = -1   # Índice (en la lista filtrada) de la tarjeta con foco de teclado
+        self._redraw_pending = False
+
         # Cargar iconos
         self.load_icons()
-        
+
         # Crear interfaz
         self.setup_ui()
-        
+
     def load_icons(self):
         """Carga los iconos de tarjetas con tamaño consistente"""
         self.icons = {}
         icons_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'assets', 'icons')
-        
+
         icon_size = (120, 85)
 
         icon_files = {
             '5542': '256b_card.png',  # SLE5542 = 256 bytes
             '5528': '1k_card.png',    # SLE5528 = 1KB
         }
-        
+
         for icon_key, filename in icon_files.items():
             icon_path = os.path.join(icons_dir, filename)
             loaded_icon = load_icon_safe(icon_path, icon_size, create_placeholder=True)
             if loaded_icon:
                 self.icons[icon_key] = loaded_icon
-    
+
     def setup_ui(self):
-        """Configura la interfaz del explorador con scroll (igual que el panel de Logs)"""
-        # Frame principal que contendrá el canvas y scrollbar
+        """Configura la interfaz del explorador: filtro, canvas virtualizado y scrollbar"""
+        # Frame principal que contendrá el filtro, el canvas y el scrollbar
         self.main_frame = tk.Frame(self.parent_frame, bg=COLOR_BG_PANEL)
         self.main_frame.pack(fill=tk.BOTH, expand=True, padx=6, pady=6)
 
-        # Configurar grid para canvas y scrollbar
-        self.main_frame.grid_rowconfigure(0, weight=1)
+        self.main_frame.grid_rowconfigure(1, weight=1)
         self.main_frame.grid_columnconfigure(0, weight=1)
-        
-        # Canvas scrollable (igual que el log_text en el panel de Logs)
-        self.canvas = tk.Canvas(self.main_frame, bg=COLOR_BG_PANEL, highlightthickness=0)
-        self.canvas.grid(row=0, column=0, sticky='nsew', padx=4, pady=4)
-        
-        # Scrollbar vertical (igual que en el panel de Logs)
-        scrollbar = tk.Scrollbar(self.main_frame, orient=tk.VERTICAL, command=self.canvas.yview)
-        scrollbar.grid(row=0, column=1, sticky='ns', pady=2)
+
+        # Campo de filtro por nombre o tipo de tarjeta
+        filter_frame = tk.Frame(self.main_frame, bg=COLOR_BG_PANEL)
+        filter_frame.grid(row=0, column=0, columnspan=2, sticky='ew', padx=4, pady=(2, 0))
+        tk.Label(filter_frame, text="Filter:", font=FONT_TINY,
+                 bg=COLOR_BG_PANEL, fg=COLOR_TEXT_PRIMARY).pack(side=tk.LEFT)
+        self.filter_var = tk.StringVar()
+        self.filter_entry = tk.Entry(filter_frame, textvariable=self.filter_var, font=FONT_TINY)
+        self.filter_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(4, 0))
+        self.filter_var.trace_add('write', lambda *args: self.set_filter(self.filter_var.get()))
+        self.filter_entry.bind('<Down>', lambda e: self._focus_grid())
+
+        # Canvas donde se dibujan las tarjetas visibles
+        self.canvas = tk.Canvas(self.main_frame, bg=COLOR_BG_PANEL, highlightthickness=1,
+                                highlightbackground=COLOR_BG_PANEL, highlightcolor=COLOR_BORDER,
+                                takefocus=1)
+        self.canvas.grid(row=1, column=0, sticky='nsew', padx=4, pady=4)
+
+        # Scrollbar vertical: cualquier desplazamiento provoca un redibujado de lo visible
+        scrollbar = tk.Scrollbar(self.main_frame, orient=tk.VERTICAL, command=self._on_scrollbar)
+        scrollbar.grid(row=1, column=1, sticky='ns', pady=2)
         self.canvas.configure(yscrollcommand=scrollbar.set)
-        
-        # Frame interno para los iconos (dentro del canvas)
-        self.icons_frame = tk.Frame(self.canvas, bg=COLOR_BG_PANEL)
-        
-        # Añadir el frame al canvas
-        self.canvas_frame_id = self.canvas.create_window((0, 0), window=self.icons_frame, anchor="nw")
-        
-        # Configurar eventos para actualizar el scroll region
-        self.icons_frame.bind('<Configure>', self._on_frame_configure)
-        self.canvas.bind('<Configure>', self._on_canvas_configure)
-        
-        # Configurar scroll con rueda del ratón
+
+        self.canvas.bind('<Configure>', lambda e: self._schedule_redraw())
+        self.canvas.bind('<Button-1>', self._on_click)
+
+        # Configurar scroll con rueda del ratón y navegación por teclado
         self._setup_mouse_scroll()
-        
-        # Crear grid de slots vacíos
-        self.create_empty_slots()
-    
-    def _on_frame_configure(self, event):
-        """Actualizar scroll region cuando el contenido cambie de tamaño"""
-        self.canvas.configure(scrollregion=self.canvas.bbox("all"))
-    
-    def _on_canvas_configure(self, event):
-        """Actualizar el ancho del frame interno cuando el canvas cambie de tamaño"""
-        canvas_width = event.width
-        self.canvas.itemconfig(self.canvas_frame_id, width=canvas_width)
-    
+        self._setup_keyboard_navigation()
+
+        self._refresh_filter()
+
     def _setup_mouse_scroll(self):
-        """Configurar scroll con rueda del ratón (igual que el panel de Logs)"""
-        def _bind_to_mousewheel(widget):
-            widget.bind("<MouseWheel>", self._on_mousewheel)
-            widget.bind("<Button-4>", self._on_mousewheel)
-            widget.bind("<Button-5>", self._on_mousewheel)
-            
-        _bind_to_mousewheel(self.canvas)
-        _bind_to_mousewheel(self.icons_frame)
-        
-        # Aplicar a todos los widgets hijos
-        for child in self.icons_frame.winfo_children():
-            _bind_to_mousewheel(child)
-    
+        """Configurar scroll con rueda del ratón"""
+        self.canvas.bind("<MouseWheel>", self._on_mousewheel)
+        self.canvas.bind("<Button-4>", self._on_mousewheel)
+        self.canvas.bind("<Button-5>", self._on_mousewheel)
+
+    def _setup_keyboard_navigation(self):
+        """Configurar navegación por teclado entre tarjetas"""
+        self.canvas.bind('<Left>', lambda e: self._move_focus(-1))
+        self.canvas.bind('<Right>', lambda e: self._move_focus(1))
+        self.canvas.bind('<Up>', lambda e: self._move_focus(-self.grid_cols))
+        self.canvas.bind('<Down>', lambda e: self._move_focus(self.grid_cols))
+        self.canvas.bind('<Prior>', lambda e: self._move_focus(-self.grid_cols * self._visible_rows()))
+        self.canvas.bind('<Next>', lambda e: self._move_focus(self.grid_cols * self._visible_rows()))
+        self.canvas.bind('<Home>', lambda e: self._set_focus_index(0))
+        self.canvas.bind('<End>', lambda e: self._set_focus_index(len(self._filtered_cards) - 1))
+        self.canvas.bind('<Return>', lambda e: self._select_focused())
+        self.canvas.bind('<space>', lambda e: self._select_focused())
+        self.canvas.bind('<FocusIn>', lambda e: self._on_focus_in())
+        self.canvas.bind('<FocusOut>', lambda e: self._schedule_redraw())
+
+    def _on_scrollbar(self, *args):
+        """Desplazamiento desde el scrollbar"""
+        self.canvas.yview(*args)
+        self._schedule_redraw()
+
     def _on_mousewheel(self, event):
         """Manejar eventos de rueda del ratón"""
         if event.delta:
@@ -128,275 +140,284 @@ class CardExplorer:
         else:
             delta = -1 if event.num == 4 else 1
         self.canvas.yview_scroll(int(delta), "units")
-    
-    def create_empty_slots(self):
-        """Crea los slots vacíos del grid con tamaños fijos"""
-        # Ajustar ancho según número de columnas
-        slot_width = 280 if self.grid_cols == 1 else 140 
-
-        for i in range(self.max_cards):
-            row = i // self.grid_cols
-            col = i % self.grid_cols
-            
-            # Frame para cada slot con tamaños completamente fijos
-            slot_frame = tk.Frame(self.icons_frame, bg=COLOR_BG_PANEL, 
-                                 width=slot_width, height=120, relief=tk.FLAT, bd=0)
-            
-            # Ajustar posicionamiento según el layout
-            if self.grid_cols == 1:
-                # Para 1 columna: centrar el slot con espaciado normal
-                slot_frame.grid(row=row, column=col, padx=20, pady=2, sticky='')
-            else:
-                # Para 2 columnas: posicionamiento normal
-                slot_frame.grid(row=row, column=col, padx=2, pady=1, sticky='')
-
-            slot_frame.grid_propagate(False)  # Evita que el frame cambie de tamaño
-            slot_frame.pack_propagate(False)  # Evita que el contenido interno cambie el frame
-            
-            # Label vacío (placeholder)
-            empty_label = tk.Label(slot_frame, text="Empty\nSlot", 
-                                  font=FONT_TINY, bg=COLOR_BG_PANEL, 
-                                  fg=COLOR_TEXT_DISABLED)
-            empty_label.pack(expand=True)
-            
-            # Configurar scroll del ratón para el slot vacío
-            slot_frame.bind("<MouseWheel>", self._on_mousewheel)
-            slot_frame.bind("<Button-4>", self._on_mousewheel)
-            slot_frame.bind("<Button-5>", self._on_mousewheel)
-            empty_label.bind("<MouseWheel>", self._on_mousewheel)
-            empty_label.bind("<Button-4>", self._on_mousewheel)
-            empty_label.bind("<Button-5>", self._on_mousewheel)
-            
-            self.card_buttons.append(None)  # Placeholder
-        
-        # Configurar peso de columnas para centrado
-        for col in range(self.grid_cols):
-            self.icons_frame.grid_columnconfigure(col, weight=1)
-        
-        # Configurar filas con altura fija y uniforme
-        for row in range(self.grid_rows):
-            self.icons_frame.grid_rowconfigure(row, weight=0, minsize=108, uniform="row")
-    
+        self._schedule_redraw()
+
+    # ------------------------------------------------------------------
+    # Geometría del grid
+    # ------------------------------------------------------------------
+
+    def _slot_width(self):
+        """Ancho de cada tarjeta según el ancho actual del canvas"""
+        canvas_width = max(self.canvas.winfo_width(), 1)
+        return max(canvas_width // max(self.grid_cols, 1), 1)
+
+    def _total_rows(self):
+        """Número de filas necesarias para las tarjetas filtradas"""
+        return (len(self._filtered_cards) + self.grid_cols - 1) // self.grid_cols
+
+    def _visible_rows(self):
+        """Número de filas que caben en la zona visible del canvas"""
+        return max(self.canvas.winfo_height() // self.slot_height, 1)
+
+    def _index_at(self, x, y):
+        """Devuelve el índice (en la lista filtrada) de la tarjeta en la posición del canvas"""
+        col = int(x) // self._slot_width()
+        row = int(y) // self.slot_height
+        if col < 0 or col >= self.grid_cols or row < 0:
+            return -1
+        index = row * self.grid_cols + col
+        return index if index < len(self._filtered_cards) else -1
+
+    # ------------------------------------------------------------------
+    # Dibujado virtualizado
+    # ------------------------------------------------------------------
+
+    def _schedule_redraw(self):
+        """Agrupa varias peticiones de redibujado en una sola pasada en idle"""
+        if self._redraw_pending:
+            return
+        self._redraw_pending = True
+        try:
+            self.canvas.after_idle(self._redraw)
+        except tk.TclError:
+            self._redraw_pending = False
+
+    def _redraw(self):
+        """Redibuja únicamente las tarjetas que quedan dentro de la zona visible"""
+        self._redraw_pending = False
+        try:
+            canvas_width = self.canvas.winfo_width()
+            canvas_height = self.canvas.winfo_height()
+        except tk.TclError:
+            return  # El canvas ya fue destruido
+
+        total_height = max(self._total_rows() * self.slot_height, canvas_height)
+        self.canvas.configure(scrollregion=(0, 0, canvas_width, total_height))
+        self.canvas.delete('all')
+
+        if not self._filtered_cards:
+            message = "No matching cards" if self._filter_text else "No cards open"
+            self.canvas.create_text(canvas_width // 2, self.slot_height // 2, text=message,
+                                    font=FONT_TINY, fill=COLOR_TEXT_DISABLED)
+            return
+
+        top = self.canvas.canvasy(0)
+        first_row = max(int(top) // self.slot_height, 0)
+        last_row = min(int(top + canvas_height) // self.slot_height, self._total_rows() - 1)
+
+        first_index = first_row * self.grid_cols
+        last_index = min((last_row + 1) * self.grid_cols, len(self._filtered_cards))
+        for index in range(first_index, last_index):
+            self._draw_card(index, self._filtered_cards[index])
+
+    def _draw_card(self, index, card):
+        """Dibuja una tarjeta en su celda del grid"""
+        slot_width = self._slot_width()
+        pad = self.slot_padding
+        x0 = (index % self.grid_cols) * slot_width
+        y0 = (index // self.grid_cols) * self.slot_height
+        x1 = x0 + slot_width
+        y1 = y0 + self.slot_height
+        center_x = (x0 + x1) // 2
+
+        is_active = card['is_active']
+        has_focus = index == self._focus_index and self._canvas_has_focus()
+        bg_color = COLOR_PRIMARY_BLUE if is_active else COLOR_BG_PANEL
+        fg_color = COLOR_TEXT_BUTTON_ENABLED if is_active else COLOR_TEXT_PRIMARY
+
+        self.canvas.create_rectangle(x0 + pad, y0 + pad, x1 - pad, y1 - pad,
+                                     fill=bg_color,
+                                     outline=COLOR_PRIMARY_BLUE_HOVER if has_focus else bg_color,
+                                     width=2 if has_focus else 1)
+
+        icon_image = self.icons.get(card['type'])
+        if icon_image:
+            self.canvas.create_image(center_x, y0 + pad + 46, image=icon_image)
+        else:
+            self.canvas.create_text(center_x, y0 + pad + 46, text=f"SLE{card['type']}",
+                                    font=FONT_TINY, fill=fg_color)
+
+        self.canvas.create_text(center_x, y1 - pad - 12, text=card['name'], font=FONT_TINY,
+                                fill=fg_color, width=max(slot_width - 2 * pad - 4, 1))
+
+    # ------------------------------------------------------------------
+    # Filtro y foco de teclado
+    # ------------------------------------------------------------------
+
+    def set_filter(self, text):
+        """Filtra las tarjetas visibles por nombre o tipo (sin distinguir mayúsculas)"""
+        text = (text or "").strip().lower()
+        if text == self._filter_text:
+            return
+        self._filter_text = text
+        self._refresh_filter()
+        self.canvas.yview_moveto(0)
+
+    def _matches_filter(self, card):
+        """Indica si una tarjeta cumple el filtro actual"""
+        if not self._filter_text:
+            return True
+        return (self._filter_text in card['name'].lower()
+                or self._filter_text in card['type'].lower()
+                or self._filter_text in f"sle{card['type']}")
+
+    def _refresh_filter(self):
+        """Recalcula la lista filtrada y programa el redibujado"""
+        focused = self._focused_card()
+        self._filtered_cards = [card for card in self.card_data if self._matches_filter(card)]
+        if focused is not None and focused in self._filtered_cards:
+            self._focus_index = self._filtered_cards.index(focused)
+        else:
+            self._focus_index = 0 if self._filtered_cards else -1
+        self._schedule_redraw()
+
+    def _canvas_has_focus(self):
+        """Indica si el canvas tiene el foco de teclado"""
+        try:
+            return self.canvas.focus_get() == self.canvas
+        except (KeyError, tk.TclError):
+            # focus_get falla si el foco está en un popdown de ttk
+            return False
+
+    def _focused_card(self):
+        """Tarjeta que tiene actualmente el foco de teclado"""
+        if 0 <= self._focus_index < len(self._filtered_cards):
+            return self._filtered_cards[self._focus_index]
+        return None
+
+    def _focus_grid(self):
+        """Pasa el foco de teclado desde el filtro al grid"""
+        self.canvas.focus_set()
+        return "break"
+
+    def _on_focus_in(self):
+        """Al recibir el foco, situarlo en la tarjeta activa si no hay otra"""
+        if self._focus_index < 0 and self._filtered_cards:
+            self._focus_index = 0
+        self._schedule_redraw()
+
+    def _move_focus(self, offset):
+        """Mueve el foco de teclado un número de posiciones en el grid"""
+        if not self._filtered_cards:
+            return "break"
+        current = max(self._focus_index, 0)
+        return self._set_focus_index(current + offset)
+
+    def _set_focus_index(self, index):
+        """Sitúa el foco en una tarjeta y la hace visible"""
+        if not self._filtered_cards:
+            return "break"
+        self._focus_index = min(max(index, 0), len(self._filtered_cards) - 1)
+        self._scroll_to_index(self._focus_index)
+        self._schedule_redraw()
+        return "break"
+
+    def _scroll_to_index(self, index):
+        """Desplaza el canvas lo mínimo necesario para que la tarjeta sea visible"""
+        total_height = self._total_rows() * self.slot_height
+        if total_height <= 0:
+            return
+        row_top = (index // self.grid_cols) * self.slot_height
+        row_bottom = row_top + self.slot_height
+        view_top = self.canvas.canvasy(0)
+        view_bottom = view_top + self.canvas.winfo_height()
+        if row_top < view_top:
+            self.canvas.yview_moveto(row_top / total_height)
+        elif row_bottom > view_bottom:
+            self.canvas.yview_moveto(max(row_bottom - self.canvas.winfo_height(), 0) / total_height)
+
+    def _select_focused(self):
+        """Selecciona la tarjeta con foco de teclado"""
+        card = self._focused_card()
+        if card is not None:
+            self.select_card(card['session_id'])
+        return "break"
+
+    def _on_click(self, event):
+        """Selecciona la tarjeta bajo el cursor"""
+        self.canvas.focus_set()
+        index = self._index_at(self.canvas.canvasx(event.x), self.canvas.canvasy(event.y))
+        if index < 0:
+            return
+        self._focus_index = index
+        self.select_card(self._filtered_cards[index]['session_id'])
+
+    # ------------------------------------------------------------------
+    # API pública
+    # ------------------------------------------------------------------
+
     def add_card(self, card_name, card_type, session_id, is_active=False):
-        """Añade una nueva tarjeta al explorador en el primer slot disponible"""
-        if len(self.card_data) >= self.max_cards:
-            return False  # No hay espacio
-        
-        # Buscar el primer slot vacío (None en card_buttons)
-        slot_index = -1
-        for i in range(self.max_cards):
-            if self.card_buttons[i] is None:
-                slot_index = i
-                break
-        
-        if slot_index == -1:
-            return False  # No se encontró slot vacío
-        
-        row = slot_index // self.grid_cols
-        col = slot_index % self.grid_cols
-        
+        """Añade una nueva tarjeta al final del explorador"""
+        if session_id in self._cards_by_id:
+            return False
+
         # Datos de la tarjeta
         card_info = {
             'name': card_name,
             'type': card_type,
             'session_id': session_id,
             'is_active': is_active,
-            'slot_index': slot_index
+            'slot_index': len(self.card_data)
         }
         self.card_data.append(card_info)
-        
-        # Obtener slot frame existente
-        slot_frame = None
-        for child in self.icons_frame.grid_slaves():
-            info = child.grid_info()
-            if info['row'] == row and info['column'] == col:
-                slot_frame = child
-                break
-        
-        if slot_frame:
-            # Limpiar slot manteniendo las propiedades del frame
-            for widget in slot_frame.winfo_children():
-                widget.destroy()
-            
-            # Asegurar que las propiedades del frame se mantengan
-            slot_width = 280 if self.grid_cols == 1 else 140  # Ajustar ancho según layout
-            slot_frame.configure(width=slot_width, height=120)
-            slot_frame.grid_propagate(False)
-            slot_frame.pack_propagate(False)
-            
-            # Determinar icono según tipo de tarjeta
-            icon_key = card_type  # '5542' o '5528'
-            
-            # Determinar estilo según estado activo
-            bg_color = COLOR_PRIMARY_BLUE if is_active else COLOR_BG_PANEL
-            fg_color = 'white' if is_active else COLOR_TEXT_PRIMARY
-            border_width = 3 if is_active else 1
-            
-            # Crear botón con icono - sin bordes
-            icon_image = self.icons.get(icon_key)
-            
-            btn = tk.Button(slot_frame, 
-                           image=icon_image,
-                           text=card_name,
-                           compound=tk.TOP,
-                           font=FONT_TINY,
-                           bg=bg_color,
-                           fg=fg_color,
-                           relief=tk.FLAT,
-                           bd=0,
-                           highlightthickness=0 if not is_active else 2,
-                           highlightcolor='white' if is_active else None,
-                           command=lambda sid=session_id: self.select_card(sid))
-            btn.pack(fill=tk.BOTH, expand=True, padx=1, pady=1)
-            
-            # Configurar scroll del ratón para el nuevo botón
-            btn.bind("<MouseWheel>", self._on_mousewheel)
-            btn.bind("<Button-4>", self._on_mousewheel)
-            btn.bind("<Button-5>", self._on_mousewheel)
-            
-            # Mantener referencia fuerte a la imagen para evitar garbage collection
-            btn.image = icon_image
-            
-            self.card_buttons[slot_index] = btn
-            
+        self._cards_by_id[session_id] = card_info
+
+        if self._matches_filter(card_info):
+            self._filtered_cards.append(card_info)
+            if self._focus_index < 0:
+                self._focus_index = 0
+            self._schedule_redraw()
         return True
-    
+
     def remove_card(self, session_id):
-        """Elimina una tarjeta del explorador y restaura slot vacío"""
-        # Encontrar la tarjeta a eliminar
-        card_to_remove = None
-        for card in self.card_data:
-            if card['session_id'] == session_id:
-                card_to_remove = card
-                break
-        
+        """Elimina una tarjeta del explorador"""
+        card_to_remove = self._cards_by_id.pop(session_id, None)
         if card_to_remove is None:
             return False
-        
-        # Encontrar el botón correspondiente al slot
-        slot_index = card_to_remove['slot_index']
-        if slot_index < len(self.card_buttons) and self.card_buttons[slot_index]:
-            # Limpiar el botón existente manteniendo propiedades del frame
-            button = self.card_buttons[slot_index]
-            slot_frame = button.master
-            
-            # Destruir el botón actual
-            button.destroy()
-            
-            # Asegurar que las propiedades del frame se mantengan
-            slot_frame.configure(width=140, height=120)
-            slot_frame.grid_propagate(False)
-            slot_frame.pack_propagate(False)
-            
-            # Crear label vacío de reemplazo
-            empty_label = tk.Label(slot_frame, text="Empty\nSlot", 
-                                  font=FONT_TINY, bg=COLOR_BG_PANEL, 
-                                  fg=COLOR_TEXT_DISABLED)
-            empty_label.pack(expand=True)
-            
-            # Resetear el botón en la lista
-            self.card_buttons[slot_index] = None
-        
-        # Remover de card_data
+
         self.card_data.remove(card_to_remove)
-        
+        for index, card in enumerate(self.card_data):
+            card['slot_index'] = index
+
+        self._refresh_filter()
         return True
-    
+
+    def has_card(self, session_id):
+        """Indica si el explorador contiene la tarjeta de una sesión"""
+        return session_id in self._cards_by_id
+
     def select_card(self, session_id):
         """Selecciona una tarjeta por session_id"""
         if self.card_select_callback:
             self.card_select_callback(session_id)
-    
+
     def set_active_card(self, session_id):
         """Marca una tarjeta como activa"""
-        for i, card in enumerate(self.card_data):
-            if card['session_id'] == session_id:
-                card['is_active'] = True
-            else:
-                card['is_active'] = False
-        
+        for card in self.card_data:
+            card['is_active'] = card['session_id'] == session_id
+
+        # Llevar el foco de teclado a la tarjeta activa
+        active_card = self._cards_by_id.get(session_id)
+        if active_card is not None and active_card in self._filtered_cards:
+            self._focus_index = self._filtered_cards.index(active_card)
+
         # Actualizar visualización
         self.update_visual_states()
-    
+
     def update_visual_states(self):
-        """Actualiza los estados visuales de las tarjetas"""
-        for i, card in enumerate(self.card_data):
-            if i < len(self.card_buttons) and self.card_buttons[card['slot_index']]:
-                btn = self.card_buttons[card['slot_index']]
-                
-                # Usar icono según tipo de tarjeta
-                icon_key = card['type']  # '5542' o '5528'
-                
-                # Actualizar icono
-                if icon_key in self.icons and self.icons[icon_key]:
-                    btn.config(image=self.icons[icon_key])
-                
-                # Actualizar estilo visual para tarjeta activa
-                if card['is_active']:
-                    btn.config(bg=COLOR_PRIMARY_BLUE, 
-                              fg='white',
-                              relief=tk.FLAT,
-                              bd=0,
-                              highlightthickness=2,
-                              highlightcolor='white')
-                else:
-                    btn.config(bg=COLOR_BG_PANEL, 
-                              fg=COLOR_TEXT_PRIMARY,
-                              relief=tk.FLAT,
-                              bd=0,
-                              highlightthickness=0)
-                
-                # Actualizar estilo del botón
-                if card['is_active']:
-                    btn.config(bg=COLOR_PRIMARY_BLUE, fg=COLOR_TEXT_BUTTON_ENABLED, relief=tk.SUNKEN)
-                else:
-                    btn.config(bg=COLOR_BG_PANEL, fg=COLOR_TEXT_PRIMARY, relief=tk.RAISED)
-    
+        """Actualiza los estados visuales de las tarjetas visibles"""
+        self._schedule_redraw()
+
     def get_card_count(self):
         """Retorna el número de tarjetas abiertas"""
         return len(self.card_data)
-    
-    def is_full(self):
-        """Verifica si el explorador está lleno"""
-        return len(self.card_data) >= self.max_cards
 
     def update_layout(self, cards_per_row):
         """Actualiza el layout del grid según la configuración"""
-        # Guardar datos actuales de las tarjetas
-        current_cards = self.card_data.copy()
-        
-        # Actualizar configuración del grid
-        self.grid_cols = cards_per_row
-        self.grid_rows = 8 if cards_per_row == 1 else 4
-        
-        # Limpiar grid actual
-        self.card_buttons = []
-        self.card_data = []
-        
-        # Destruir widgets existentes en icons_frame
-        for widget in self.icons_frame.winfo_children():
-            widget.destroy()
-        
-        # Forzar actualización después de destruir widgets
-        self.icons_frame.update_idletasks()
-        
-        # Recrear el grid con la nueva configuración
-        self.create_empty_slots()
-        
-        # Forzar actualización después de crear slots
-        self.icons_frame.update_idletasks()
-        
-        # Restaurar las tarjetas existentes
-        for card_info in current_cards:
-            self.add_card(
-                card_info['name'], 
-                card_info['type'], 
-                card_info['session_id'], 
-                card_info['is_active']
-            )
-        
-        # Actualizar scroll region y forzar redibujado
-        if hasattr(self, 'canvas'):
+        self.grid_cols = max(int(cards_per_row), 1)
+
+        # Mantener visible la tarjeta con foco tras el cambio de columnas
+        if self._focus_index >= 0:
             self.canvas.update_idletasks()
-            self.canvas.configure(scrollregion=self.canvas.bbox("all"))
-            self.canvas.update()
+            self._scroll_to_index(self._focus_index)
+        self._schedule_redraw()
@@ -3,7 +3,7 @@ import tkinter as tk
 from src.utils.constants import (
     COLOR_BG_MAIN, COLOR_BG_PANEL, COLOR_PRIMARY_BLUE, COLOR_TEXT_PRIMARY,
     FONT_HEADER, FONT_NORMAL, FONT_BOLD, FONT_SMALL, 
-    CARD_TYPE_5542, CARD_TYPE_5528, COLOR_WARNING, PSC_ADDRESS_5528
+    CARD_TYPE_5542, CARD_TYPE_5528, COLOR_WARNING
 )
 from src.utils.resource_manager import get_icon_path
 
@@ -134,46 +134,16 @@ class CreateCardFromReadDialog:
             return
         
         # Verificar que el nombre no esté en uso
-        if self.session_manager.get_session_by_name(name) is not None:
+        if self.session_manager.has_session_name(name):
             tk.messagebox.showerror("Error", f"A card named '{name}' already exists.\nPlease choose a different name.", parent=self.dialog)
             return
         
         try:
-            # Crear nueva sesión con el tipo de tarjeta leído
-            session, message = self.session_manager.create_new_card_session(name, self.card_type)
+            # Crear nueva sesión con los datos leídos (y el PSC personalizado usado, si lo hay)
+            session, message = self.session_manager.create_session_from_read(
+                name, self.card_type, self.card_data, self.psc_bytes)
             
             if session:
-                # Cargar los datos leídos en la nueva sesión
-                session.memory_manager.load_from_data(self.card_data)
-                
-                # Si se usó un PSC personalizado durante la lectura, aplicarlo a la nueva tarjeta
-                if self.psc_bytes is not None:
-                    try:
-                        print(f"DEBUG: Aplicando PSC personalizado: {[f'{b:02X}' for b in self.psc_bytes]}")
-                        # Aplicar el PSC personalizado directamente en el registro interno o memoria
-                        if self.card_type == CARD_TYPE_5542:
-                            # SLE5542: PSC en registro interno (no en memoria visible)
-                            session.memory_manager.internal_psc_5542 = list(self.psc_bytes)
-                            print(f"DEBUG: SLE5542 - PSC guardado en registro interno: {session.memory_manager.internal_psc_5542}")
-                        else:  # CARD_TYPE_5528
-                            # SLE5528: PSC en memoria visible (direcciones 0x000-0x001)
-                            for i, byte_val in enumerate(self.psc_bytes):
-                                addr = PSC_ADDRESS_5528 + i
-                                session.memory_manager.memory_data[addr] = f"{byte_val:02X}"
-                            print(f"DEBUG: SLE5528 - PSC guardado en memoria en 0x{PSC_ADDRESS_5528:03X}")
-                        
-                        # Marcar que el PSC ha sido cambiado
-                        session.psc_has_been_changed = True
-                        print(f"DEBUG: PSC aplicado exitosamente")
-                    except Exception as e:
-                        print(f"WARNING: Could not apply custom PSC: {e}")
-                else:
-                    print("DEBUG: No hay PSC personalizado para aplicar")
-                
-                # Asegurar que las direcciones de fábrica estén bloqueadas
-                if hasattr(session.memory_manager, 'ensure_factory_locked'):
-                    session.memory_manager.ensure_factory_locked()
-                
                 # Almacenar el session_id para devolverlo
                 self.created_session_id = session.session_id
                 
@@ -0,0 +1,395 @@
+"""
+Ventana de diagnóstico de rendimiento (funciones de administrador)
+
+Latencias por APDU de los lectores: percentiles por lector y tipo de comando y,
+por cada lectura o escritura de tarjeta completa, tiempo total, tiempo dentro del
+lector y bytes por segundo. Las APDUs de los diálogos físicos se envían desde el
+proceso de E/S, así que sus métricas se piden a ese proceso y se suman a las del
+propio (estación de grabación).
+
+La pestaña de perfilado muestra las acciones del usuario perfiladas desde
+Settings: totales por acción y las llamadas más lentas con su fichero .prof. La
+de tiempos activa los contadores de instrumentation y los muestra en vivo, con
+exportación a CSV. La de memoria reparte los bytes de cada tarjeta abierta
+(imagen de memoria, log de comandos, cachés) y compara instantáneas de
+tracemalloc.
+"""
+
+import queue
+import threading
+import time
+import tkinter as tk
+from tkinter import ttk, filedialog, messagebox
+
+from src.utils.constants import *
+from src.core.apdu_metrics import apdu_metrics, merge_snapshots, latency_rows
+from src.core.apdu_planner import get_card_profile
+from src.core.action_profiler import action_profiler
+from src.core.instrumentation import instrumentation
+from src.core.memory_accounting import session_manager_memory, tracemalloc_sampler, format_bytes
+from src.core.pcsc_worker import RemoteCardHandler, PCSCWorkerError
+
+# Columnas de las tablas: (clave, título, ancho)
+LATENCY_COLUMNS = [
+    ('reader', "Reader", 200),
+    ('apdu_class', "Command", 90),
+    ('count', "APDUs", 60),
+    ('p50_ms', "p50 ms", 70),
+    ('p95_ms', "p95 ms", 70),
+    ('max_ms', "Max ms", 70),
+    ('bytes', "Bytes", 70),
+    ('errors', "Errors", 60),
+]
+
+OPERATION_COLUMNS = [
+    ('time', "Time", 70),
+    ('reader', "Reader", 180),
+    ('operation', "Operation", 120),
+    ('card', "Card", 70),
+    ('bytes', "Bytes", 60),
+    ('seconds', "Total s", 65),
+    ('reader_share', "In reader", 70),
+    ('bytes_per_second', "Bytes/s", 70),
+    ('p50_ms', "p50 ms", 65),
+    ('p95_ms', "p95 ms", 65),
+    ('max_ms', "Max ms", 65),
+]
+
+PROFILING_SUMMARY_COLUMNS = [
+    ('action', "Action", 220),
+    ('count', "Calls", 60),
+    ('total_seconds', "Total s", 70),
+    ('mean_ms', "Mean ms", 70),
+    ('max_ms', "Max ms", 70),
+    ('last_profile', "Last profile", 300),
+]
+
+PROFILING_SLOWEST_COLUMNS = [
+    ('time', "Time", 70),
+    ('action', "Action", 220),
+    ('ms', "ms", 70),
+    ('profile', "Profile", 460),
+]
+
+TIMING_COLUMNS = [
+    ('name', "Function", 360),
+    ('calls', "Calls", 80),
+    ('total_ms', "Total ms", 90),
+    ('mean_ms', "Mean ms", 90),
+    ('max_ms', "Max ms", 90),
+]
+
+MEMORY_COLUMNS = [
+    ('card', "Card", 160),
+    ('type', "Type", 60),
+    ('state', "State", 80),
+    ('memory_image', "Memory image", 90),
+    ('command_log', "Command log", 90),
+    ('log_entries', "Log entries", 75),
+    ('caches', "Caches", 80),
+    ('other', "Other", 70),
+    ('total', "Total", 80),
+]
+
+TRACEMALLOC_COLUMNS = [
+    ('location', "Allocated at", 300),
+    ('size', "Size", 90),
+    ('blocks', "Blocks", 80),
+    ('change', "Change since last", 120),
+]
+
+
+class DiagnosticsDialog:
+    """Ventana con las métricas de rendimiento recogidas en esta ejecución"""
+
+    def __init__(self, parent, session_manager=None):
+        self.parent = parent
+        self.session_manager = session_manager
+        self.handler = RemoteCardHandler()
+        self.results = queue.Queue()
+        self.status_text = tk.StringVar(value="")
+        self._timings_job = None
+
+        self.dialog = tk.Toplevel(parent)
+        self.dialog.title("Performance Diagnostics")
+        self.dialog.configure(bg=COLOR_BG_MAIN)
+        self.dialog.geometry("900x560")
+        self.dialog.transient(parent)
+        self.dialog.protocol("WM_DELETE_WINDOW", self.close)
+        self.dialog.bind('<Escape>', lambda e: self.close())
+
+        self.create_widgets()
+        self.refresh()
+        self.refresh_timings()
+
+    def create_widgets(self):
+        main_frame = tk.Frame(self.dialog, bg=COLOR_BG_MAIN, padx=15, pady=10)
+        main_frame.pack(fill=tk.BOTH, expand=True)
+
+        self.notebook = ttk.Notebook(main_frame)
+        self.notebook.pack(fill=tk.BOTH, expand=True)
+
+        latency_tab = tk.Frame(self.notebook, bg=COLOR_BG_MAIN, padx=8, pady=8)
+        self.notebook.add(latency_tab, text="APDU Latency")
+
+        tk.Label(latency_tab, text="Latency per reader and command", font=FONT_BOLD,
+                 fg=COLOR_TEXT_PRIMARY, bg=COLOR_BG_MAIN).pack(anchor=tk.W)
+        self.latency_tree = self._create_table(latency_tab, LATENCY_COLUMNS, height=8)
+
+        tk.Label(latency_tab, text="Full-card operations (most recent last)", font=FONT_BOLD,
+                 fg=COLOR_TEXT_PRIMARY, bg=COLOR_BG_MAIN).pack(anchor=tk.W, pady=(10, 0))
+        self.operations_tree = self._create_table(latency_tab, OPERATION_COLUMNS, height=10)
+
+        profiling_tab = tk.Frame(self.notebook, bg=COLOR_BG_MAIN, padx=8, pady=8)
+        self.notebook.add(profiling_tab, text="Profiling")
+
+        tk.Label(profiling_tab, text="Profiled user actions (slowest first)", font=FONT_BOLD,
+                 fg=COLOR_TEXT_PRIMARY, bg=COLOR_BG_MAIN).pack(anchor=tk.W)
+        self.profiling_tree = self._create_table(profiling_tab, PROFILING_SUMMARY_COLUMNS, height=8)
+
+        tk.Label(profiling_tab, text="Slowest calls", font=FONT_BOLD,
+                 fg=COLOR_TEXT_PRIMARY, bg=COLOR_BG_MAIN).pack(anchor=tk.W, pady=(10, 0))
+        self.slowest_tree = self._create_table(profiling_tab, PROFILING_SLOWEST_COLUMNS, height=10)
+
+        timings_tab = tk.Frame(self.notebook, bg=COLOR_BG_MAIN, padx=8, pady=8)
+        self.notebook.add(timings_tab, text="Timings")
+
+        timings_header = tk.Frame(timings_tab, bg=COLOR_BG_MAIN)
+        timings_header.pack(fill=tk.X)
+        tk.Label(timings_header, text="Hot-path timings (live, highest total first)", font=FONT_BOLD,
+                 fg=COLOR_TEXT_PRIMARY, bg=COLOR_BG_MAIN).pack(side=tk.LEFT)
+        tk.Button(timings_header, text="Export CSV...", command=self.export_timings, font=FONT_NORMAL,
+                  bg=COLOR_BUTTON_SECONDARY, fg=COLOR_TEXT_PRIMARY, relief=tk.FLAT).pack(side=tk.RIGHT)
+        self.timing_btn = tk.Button(timings_header, command=self.toggle_timings, font=FONT_NORMAL,
+                                    bg=COLOR_BUTTON_PRIMARY, fg=COLOR_TEXT_BUTTON_ENABLED, width=14,
+                                    relief=tk.FLAT)
+        self.timing_btn.pack(side=tk.RIGHT, padx=(0, 10))
+        self.timings_tree = self._create_table(timings_tab, TIMING_COLUMNS, height=18)
+
+        memory_tab = tk.Frame(self.notebook, bg=COLOR_BG_MAIN, padx=8, pady=8)
+        self.notebook.add(memory_tab, text="Memory")
+
+        self.memory_summary = tk.StringVar(value="")
+        tk.Label(memory_tab, text="Memory per open card (objects shared between cards counted once in the total)",
+                 font=FONT_BOLD, fg=COLOR_TEXT_PRIMARY, bg=COLOR_BG_MAIN).pack(anchor=tk.W)
+        tk.Label(memory_tab, textvariable=self.memory_summary, font=FONT_SMALL,
+                 fg=COLOR_TEXT_PRIMARY, bg=COLOR_BG_MAIN, justify=tk.LEFT).pack(anchor=tk.W)
+        self.memory_tree = self._create_table(memory_tab, MEMORY_COLUMNS, height=8)
+
+        tracemalloc_header = tk.Frame(memory_tab, bg=COLOR_BG_MAIN)
+        tracemalloc_header.pack(fill=tk.X, pady=(10, 0))
+        self.tracemalloc_text = tk.StringVar(value="")
+        tk.Label(tracemalloc_header, textvariable=self.tracemalloc_text, font=FONT_BOLD,
+                 fg=COLOR_TEXT_PRIMARY, bg=COLOR_BG_MAIN).pack(side=tk.LEFT)
+        self.snapshot_btn = tk.Button(tracemalloc_header, text="Take Snapshot", command=self.take_tracemalloc_snapshot,
+                                      font=FONT_NORMAL, bg=COLOR_BUTTON_SECONDARY, fg=COLOR_TEXT_PRIMARY,
+                                      relief=tk.FLAT)
+        self.snapshot_btn.pack(side=tk.RIGHT)
+        self.tracemalloc_btn = tk.Button(tracemalloc_header, command=self.toggle_tracemalloc, font=FONT_NORMAL,
+                                         bg=COLOR_BUTTON_PRIMARY, fg=COLOR_TEXT_BUTTON_ENABLED, width=16,
+                                         relief=tk.FLAT)
+        self.tracemalloc_btn.pack(side=tk.RIGHT, padx=(0, 10))
+        self.tracemalloc_tree = self._create_table(memory_tab, TRACEMALLOC_COLUMNS, height=8)
+        self._update_tracemalloc_controls()
+
+        button_frame = tk.Frame(main_frame, bg=COLOR_BG_MAIN)
+        button_frame.pack(fill=tk.X, pady=(10, 0))
+        tk.Label(button_frame, textvariable=self.status_text, font=FONT_SMALL,
+                 fg=COLOR_TEXT_DISABLED, bg=COLOR_BG_MAIN).pack(side=tk.LEFT)
+        tk.Button(button_frame, text="Close", command=self.close, font=FONT_NORMAL,
+                  bg=COLOR_BUTTON_SECONDARY, fg=COLOR_TEXT_PRIMARY, width=10,
+                  relief=tk.FLAT).pack(side=tk.RIGHT)
+        tk.Button(button_frame, text="Reset", command=self.reset, font=FONT_NORMAL,
+                  bg=COLOR_BUTTON_SECONDARY, fg=COLOR_TEXT_PRIMARY, width=10,
+                  relief=tk.FLAT).pack(side=tk.RIGHT, padx=(0, 10))
+        tk.Button(button_frame, text="Refresh", command=self.refresh, font=FONT_NORMAL,
+                  bg=COLOR_BUTTON_PRIMARY, fg=COLOR_TEXT_BUTTON_ENABLED, width=10,
+                  relief=tk.FLAT).pack(side=tk.RIGHT, padx=(0, 10))
+
+    def _create_table(self, parent, columns, height):
+        frame = tk.Frame(parent, bg=COLOR_BG_MAIN)
+        frame.pack(fill=tk.BOTH, expand=True, pady=(4, 0))
+        tree = ttk.Treeview(frame, columns=[key for key, _, _ in columns], show='headings', height=height)
+        for key, title, width in columns:
+            tree.heading(key, text=title)
+            tree.column(key, width=width,
+                        anchor=tk.W if key in ('reader', 'operation', 'action', 'last_profile', 'profile', 'name',
+                                               'card', 'type', 'state', 'location') else tk.E)
+        scrollbar = ttk.Scrollbar(frame, orient=tk.VERTICAL, command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        return tree
+
+    def refresh(self):
+        """Pide las métricas en segundo plano (el proceso de E/S puede estar ocupado)"""
+        self.status_text.set("Collecting metrics...")
+        self.show_profiling()
+        self.show_memory()
+        threading.Thread(target=self._collect, args=(False,), daemon=True).start()
+        self.dialog.after(UI_UPDATE_POLL_MS, self.process_results)
+
+    def reset(self):
+        """Borra las métricas de este proceso y del proceso de E/S"""
+        self.status_text.set("Resetting metrics...")
+        action_profiler.clear()
+        instrumentation.reset()
+        self.show_profiling()
+        threading.Thread(target=self._collect, args=(True,), daemon=True).start()
+        self.dialog.after(UI_UPDATE_POLL_MS, self.process_results)
+
+    def _collect(self, reset):
+        """Hilo de trabajo: une las métricas locales con las del proceso de E/S"""
+        note = ""
+        remote = None
+        try:
+            if reset:
+                self.handler.reset_apdu_metrics()
+            remote = self.handler.get_apdu_metrics()
+        except PCSCWorkerError as e:
+            note = f" (I/O process unavailable: {e})"
+        if reset:
+            apdu_metrics.reset()
+        self.results.put((merge_snapshots(apdu_metrics.snapshot(), remote), note))
+
+    def process_results(self):
+        """Aplica en Tk el resultado del hilo de trabajo (o vuelve a mirar más tarde)"""
+        try:
+            snapshot, note = self.results.get_nowait()
+        except queue.Empty:
+            if self.dialog.winfo_exists():
+                self.dialog.after(UI_UPDATE_POLL_MS, self.process_results)
+            return
+        if not self.dialog.winfo_exists():
+            return
+        self.show_snapshot(snapshot)
+        self.status_text.set(f"Updated {time.strftime('%H:%M:%S')}{note}")
+
+    def show_snapshot(self, snapshot):
+        self.latency_tree.delete(*self.latency_tree.get_children())
+        for row in latency_rows(snapshot):
+            self.latency_tree.insert('', tk.END, values=(
+                row['reader'], row['apdu_class'], row['count'],
+                f"{row['p50_ms']:.2f}", f"{row['p95_ms']:.2f}", f"{row['max_ms']:.2f}",
+                row['bytes'], row['errors']))
+
+        self.operations_tree.delete(*self.operations_tree.get_children())
+        for operation in snapshot['operations']:
+            reader_share = operation['apdu_seconds'] / operation['seconds'] if operation['seconds'] else 0.0
+            self.operations_tree.insert('', tk.END, values=(
+                time.strftime('%H:%M:%S', time.localtime(operation['finished_at'])),
+                operation['reader'], operation['operation'],
+                get_card_profile(operation['card_type'])['name'], operation['bytes'],
+                f"{operation['seconds']:.2f}", f"{reader_share:.0%}",
+                f"{operation['bytes_per_second']:.0f}",
+                f"{operation['p50_ms']:.2f}", f"{operation['p95_ms']:.2f}", f"{operation['max_ms']:.2f}"))
+        children = self.operations_tree.get_children()
+        if children:
+            self.operations_tree.see(children[-1])
+
+    def show_profiling(self):
+        """Tablas del perfilado de acciones (datos locales, no hace falta hilo)"""
+        self.profiling_tree.delete(*self.profiling_tree.get_children())
+        for row in action_profiler.summary():
+            self.profiling_tree.insert('', tk.END, values=(
+                row['action'], row['count'], f"{row['total_seconds']:.3f}",
+                f"{row['mean_ms']:.1f}", f"{row['max_ms']:.1f}", row['last_profile']))
+
+        self.slowest_tree.delete(*self.slowest_tree.get_children())
+        for record in action_profiler.slowest():
+            self.slowest_tree.insert('', tk.END, values=(
+                time.strftime('%H:%M:%S', time.localtime(record['finished_at'])),
+                record['action'], f"{record['seconds'] * 1000:.1f}", record['profile']))
+
+    def refresh_timings(self):
+        """Repinta la tabla de tiempos y se reprograma mientras la ventana exista"""
+        if not self.dialog.winfo_exists():
+            return
+        self.timing_btn.configure(text="Stop Timing" if instrumentation.enabled else "Start Timing")
+        self.timings_tree.delete(*self.timings_tree.get_children())
+        for row in instrumentation.snapshot():
+            self.timings_tree.insert('', tk.END, values=(
+                row['name'], row['calls'], f"{row['total_ms']:.1f}",
+                f"{row['mean_ms']:.3f}", f"{row['max_ms']:.2f}"))
+        self._timings_job = self.dialog.after(INSTRUMENTATION_REFRESH_MS, self.refresh_timings)
+
+    def toggle_timings(self):
+        if instrumentation.enabled:
+            instrumentation.disable()
+        else:
+            instrumentation.enable()
+        self.timing_btn.configure(text="Stop Timing" if instrumentation.enabled else "Start Timing")
+
+    def export_timings(self):
+        filepath = filedialog.asksaveasfilename(parent=self.dialog, title="Export Timings",
+                                                defaultextension=".csv", initialfile="cardsim_timings.csv",
+                                                filetypes=[("CSV files", "*.csv"), ("All files", "*.*")])
+        if not filepath:
+            return
+        success, message = instrumentation.export_csv(filepath)
+        if success:
+            self.status_text.set(message)
+        else:
+            messagebox.showerror("Export Timings", message, parent=self.dialog)
+
+    def show_memory(self):
+        """Recorre las sesiones abiertas y muestra sus bytes por categoría"""
+        self.memory_tree.delete(*self.memory_tree.get_children())
+        if self.session_manager is None:
+            self.memory_summary.set("No session manager available")
+            return
+        report = session_manager_memory(self.session_manager)
+        for row in report['sessions']:
+            if row['hibernated']:
+                state = "Hibernated"
+            elif row['shared_memory']:
+                state = "Shared image"
+            else:
+                state = "Resident"
+            self.memory_tree.insert('', tk.END, values=(
+                row['card_name'], row['card_type'], state,
+                format_bytes(row['memory_image']), format_bytes(row['command_log']), row['log_entries'],
+                format_bytes(row['caches']), format_bytes(row['other']), format_bytes(row['total'])))
+        self.memory_summary.set(
+            f"{report['resident']} resident, {report['hibernated']} hibernated "
+            f"({format_bytes(report['disk_bytes'])} on disk) - "
+            f"SessionManager total {format_bytes(report['manager_total'])}, "
+            f"sum of cards {format_bytes(report['sessions_total'])}")
+
+    def toggle_tracemalloc(self):
+        if tracemalloc_sampler.is_tracing():
+            tracemalloc_sampler.stop()
+            self.tracemalloc_tree.delete(*self.tracemalloc_tree.get_children())
+        else:
+            tracemalloc_sampler.start()
+        self._update_tracemalloc_controls()
+
+    def _update_tracemalloc_controls(self):
+        tracing = tracemalloc_sampler.is_tracing()
+        self.tracemalloc_btn.configure(text="Stop tracemalloc" if tracing else "Start tracemalloc")
+        self.snapshot_btn.configure(state=tk.NORMAL if tracing else tk.DISABLED)
+        if not tracing:
+            self.tracemalloc_text.set("Python allocations (tracemalloc off; tracing slows the app down)")
+
+    def take_tracemalloc_snapshot(self):
+        """Líneas que más memoria tienen asignada y su cambio desde la instantánea anterior"""
+        sample = tracemalloc_sampler.sample()
+        if sample is None:
+            self._update_tracemalloc_controls()
+            return
+        changes = {location: size_diff for location, size_diff, _ in sample['diff']}
+        self.tracemalloc_tree.delete(*self.tracemalloc_tree.get_children())
+        for location, size, blocks in sample['top']:
+            change = changes.get(location)
+            self.tracemalloc_tree.insert('', tk.END, values=(
+                location, format_bytes(size), blocks,
+                f"{'+' if change > 0 else '-'}{format_bytes(abs(change))}" if change else ""))
+        self.tracemalloc_text.set(f"Python allocations: {format_bytes(sample['current'])} traced, "
+                                  f"peak {format_bytes(sample['peak'])}")
+
+    def close(self):
+        if self._timings_job:
+            self.dialog.after_cancel(self._timings_job)
+        # Liberar el handler en el proceso de E/S (espera a una consulta en curso: fuera del hilo de Tk)
+        threading.Thread(target=self.handler.close, daemon=True).start()
+        self.dialog.destroy()
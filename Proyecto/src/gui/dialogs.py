@@ -9,6 +9,10 @@ import os
 from src.utils.constants import *
 from src.utils.resource_manager import get_resource_path, get_icon_path
 from src.core.code_improvements import is_valid_hex_string, validate_hex_bytes, CommonMessages, load_icon_safe
+from src.core.vpcd_server import vpcd_server
+from src.core.action_profiler import action_profiler
+from src.utils.logging_config import LOG_LEVELS, get_log_level, set_log_level
+from src.utils.user_config import user_config_manager
 
 def load_icon_image(icon_name, size=(24, 24)):
     """Carga un icono PNG desde assets/icons/ y lo redimensiona"""
@@ -2482,7 +2486,7 @@ class SettingsDialog:
         # Crear ventana modal
         self.dialog = tk.Toplevel(self.parent)
         self.dialog.title("Settings")
-        self.dialog.geometry("450x550")
+        self.dialog.geometry("450x630")
         self.dialog.resizable(True, True)
         self.dialog.transient(self.parent)
         self.dialog.grab_set()
@@ -2504,7 +2508,7 @@ class SettingsDialog:
         # Manejar cierre de ventana
         self.dialog.protocol("WM_DELETE_WINDOW", self._on_close)
     
-    def _center_dialog(self, width=420, height=520):
+    def _center_dialog(self, width=420, height=600):
         """Centra el diálogo sobre la ventana padre con tamaño personalizable y más compacto"""
         # Asegurar que el padre está actualizado
         self.parent.update_idletasks()
@@ -2649,6 +2653,25 @@ class SettingsDialog:
                                           command=self._apply_small_screen_mode, width=10)
         apply_small_screen_btn.pack(anchor='w', pady=(3, 0))
         
+        # === LOGGING SUBSECTION ===
+        logging_frame = tk.LabelFrame(ui_inner_frame, text="Console Log Level", 
+                                     font=FONT_NORMAL, fg=COLOR_TEXT_PRIMARY, bg=COLOR_BG_MAIN)
+        logging_frame.pack(fill='x', pady=(0, 0))
+        
+        logging_inner_frame = tk.Frame(logging_frame, bg=COLOR_BG_MAIN, padx=8, pady=6)
+        logging_inner_frame.pack(fill='x')
+        
+        self.log_level_var = tk.StringVar(value=get_log_level())
+        log_level_menu = tk.OptionMenu(logging_inner_frame, self.log_level_var, *LOG_LEVELS)
+        log_level_menu.configure(font=FONT_NORMAL, bg=COLOR_BG_MAIN, width=8)
+        log_level_menu.pack(side='left')
+        
+        apply_log_level_btn = tk.Button(logging_inner_frame, text="Apply", 
+                                       font=FONT_NORMAL, bg=COLOR_SUCCESS, 
+                                       fg='white', padx=15, pady=3,
+                                       command=self._apply_log_level, width=10)
+        apply_log_level_btn.pack(side='left', padx=(10, 0))
+        
         # === SECCIÓN ADMINISTRATIVA (ABAJO) ===
         admin_section_frame = tk.LabelFrame(main_frame, text="Administrative Settings", 
                                            font=FONT_NORMAL, fg=COLOR_TEXT_PRIMARY, bg=COLOR_BG_MAIN)
@@ -2696,6 +2719,43 @@ class SettingsDialog:
                              fg=COLOR_TEXT_PRIMARY, justify='left')
         info_label.pack(pady=(0, 6))
         
+        # Servidor vpcd: comparte las tarjetas abiertas como lectores PC/SC
+        vpcd_frame = tk.LabelFrame(self.admin_functions_frame, text="Virtual Readers (vpcd)", 
+                                  font=FONT_NORMAL, fg=COLOR_TEXT_PRIMARY, bg=COLOR_BG_MAIN)
+        vpcd_frame.pack(fill='x', pady=(0, 6))
+        
+        self.vpcd_status_label = tk.Label(vpcd_frame, font=FONT_NORMAL, bg=COLOR_BG_MAIN, 
+                                         fg=COLOR_TEXT_PRIMARY, justify='left')
+        self.vpcd_status_label.pack(anchor='w', padx=8, pady=(4, 3))
+        
+        self.vpcd_btn = tk.Button(vpcd_frame, font=FONT_NORMAL, bg=COLOR_PRIMARY_BLUE, 
+                                 fg='white', padx=12, pady=3,
+                                 command=self._toggle_vpcd_server)
+        self.vpcd_btn.pack(anchor='w', padx=8, pady=(0, 6))
+        self._update_vpcd_status()
+        
+        # Perfilado de acciones: .prof por acción para analizar la lentitud en los equipos del laboratorio
+        profiling_frame = tk.LabelFrame(self.admin_functions_frame, text="Profiling", 
+                                       font=FONT_NORMAL, fg=COLOR_TEXT_PRIMARY, bg=COLOR_BG_MAIN)
+        profiling_frame.pack(fill='x', pady=(0, 6))
+        
+        self.profiling_status_label = tk.Label(profiling_frame, font=FONT_NORMAL, bg=COLOR_BG_MAIN, 
+                                              fg=COLOR_TEXT_PRIMARY, justify='left', wraplength=380)
+        self.profiling_status_label.pack(anchor='w', padx=8, pady=(4, 3))
+        
+        self.profiling_btn = tk.Button(profiling_frame, font=FONT_NORMAL, bg=COLOR_PRIMARY_BLUE, 
+                                      fg='white', padx=12, pady=3,
+                                      command=self._toggle_profiling)
+        self.profiling_btn.pack(anchor='w', padx=8, pady=(0, 6))
+        self._update_profiling_status()
+        
+        # Ventana de diagnóstico de rendimiento (latencias de los lectores)
+        diagnostics_btn = tk.Button(self.admin_functions_frame, text="Performance Diagnostics", 
+                                   font=FONT_NORMAL, bg=COLOR_PRIMARY_BLUE, 
+                                   fg='white', padx=12, pady=3,
+                                   command=self._open_diagnostics)
+        diagnostics_btn.pack(anchor='w', pady=(0, 6))
+        
         # Frame para el botón Close más compacto
         close_frame = tk.Frame(main_frame, bg=COLOR_BG_MAIN)
         close_frame.pack(fill='x', pady=(6, 0))
@@ -2828,6 +2888,14 @@ class SettingsDialog:
             messagebox.showwarning("No Changes Applied", 
                                   f"Small Screen Form Factor is already {small_screen_text.lower()}.")
     
+    def _apply_log_level(self):
+        """Aplica y guarda el nivel de logging de consola (DEBUG muestra cada APDU)"""
+        level = set_log_level(self.log_level_var.get())
+        user_config_manager.log_level = level
+        self.main_interface.log(f"Console log level set to {level}", "INFO")
+        messagebox.showinfo("Console Log Level Applied", 
+                           f"Console log level: {level}")
+    
     def _enable_apdu_9(self):
         """Habilita la función APDU 9 en la interfaz principal"""
         # Vincular tecla 9 para APDU 9
@@ -2860,6 +2928,69 @@ class SettingsDialog:
             self.main_interface.log(f"Error opening Change Card PSC dialog: {e}")
             messagebox.showerror("Error", f"Error opening Change Card PSC dialog:\n{e}")
     
+    def _toggle_vpcd_server(self):
+        """Empieza o deja de compartir las tarjetas abiertas a través de vpcd"""
+        session_manager = self.main_interface.session_manager
+        
+        if vpcd_server.is_running():
+            vpcd_server.stop()
+            self.main_interface.log("vpcd server stopped", "INFO")
+            self._update_vpcd_status()
+            return
+        
+        vpcd_server.clear_slots()
+        for session in session_manager.get_all_sessions():
+            # Cada sesión se rehidrata y se fija solo mientras un cliente vpcd está conectado a su ranura
+            vpcd_server.add_managed_session(session_manager, session)
+        
+        success, message = vpcd_server.start()
+        if not success:
+            messagebox.showerror("vpcd Server", message)
+        self.main_interface.log(message, "INFO" if success else "ERROR")
+        self._update_vpcd_status()
+    
+    def _toggle_profiling(self):
+        """Activa o desactiva el perfilado de las acciones del usuario"""
+        if action_profiler.enabled:
+            action_profiler.disable()
+            self.main_interface.log(f"Profiling stopped, results in {action_profiler.output_dir}", "INFO")
+        else:
+            success, message = action_profiler.enable(user_config_manager.config_dir / PROFILING_DIR_NAME)
+            if not success:
+                messagebox.showerror("Profiling", message)
+            else:
+                self.main_interface.log(message, "INFO")
+        self._update_profiling_status()
+    
+    def _update_profiling_status(self):
+        """Actualiza el estado y el botón del perfilado"""
+        if action_profiler.enabled:
+            self.profiling_status_label.configure(text=f"Profiling actions to:\n{action_profiler.output_dir}",
+                                                  fg=COLOR_SUCCESS)
+            self.profiling_btn.configure(text="Stop Profiling")
+        else:
+            self.profiling_status_label.configure(text="Write a .prof file for each user action.",
+                                                  fg=COLOR_TEXT_PRIMARY)
+            self.profiling_btn.configure(text="Start Profiling")
+    
+    def _open_diagnostics(self):
+        """Abre la ventana de diagnóstico de rendimiento"""
+        from src.gui.diagnostics_dialog import DiagnosticsDialog
+        DiagnosticsDialog(self.main_interface.root, self.main_interface.session_manager)
+        self.main_interface.log("Performance Diagnostics opened via Admin Settings", "INFO")
+    
+    def _update_vpcd_status(self):
+        """Actualiza el estado y el botón del servidor vpcd"""
+        if vpcd_server.is_running():
+            lines = [f"Slot {slot['slot']} (port {slot['port']}): {slot['label']}"
+                     for slot in vpcd_server.get_status()]
+            self.vpcd_status_label.configure(text="\n".join(lines), fg=COLOR_SUCCESS)
+            self.vpcd_btn.configure(text="Stop Sharing")
+        else:
+            self.vpcd_status_label.configure(text="Share open cards as PC/SC readers on localhost.",
+                                            fg=COLOR_TEXT_PRIMARY)
+            self.vpcd_btn.configure(text="Share Open Cards")
+    
     def _on_close(self):
         """Maneja el cierre del diálogo"""
         if self.dialog:
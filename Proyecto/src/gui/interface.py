@@ -25,7 +25,11 @@ from .dialogs import (ReadMemoryDialog, WriteMemoryDialog, ChangePSCDialog,
                         InfoDialog, ClearLogDialog, OpenCardDialog, SaveCardDialog,
                         SaveLogDialog)
 from .card_explorer import CardExplorer
-from .physical_card_dialogs import PhysicalCardReadDialog, PhysicalCardWriteDialog
+from .physical_card_dialogs import PhysicalCardReadDialog, PhysicalCardWriteDialog, ProvisioningDialog
+from src.core.pcsc_worker import pcsc_worker
+from src.core.vpcd_server import vpcd_server
+from src.core.action_profiler import profiled_action, action_profiler
+from src.core.instrumentation import timed
 
 class CardSimInterface:
     """Interfaz gráfica principal de CardSIM"""
@@ -113,6 +117,20 @@ class CardSimInterface:
         
         # Configurar protocolo de cierre
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
+        
+        # Revisión periódica de sesiones inactivas para hibernarlas
+        self.root.after(SESSION_HIBERNATION_CHECK_MS, self._hibernate_inactive_sessions)
+        
+        # Arrancar ya el proceso de E/S de lectores para que el primer diálogo no espere
+        pcsc_worker.start()
+    
+    def _hibernate_inactive_sessions(self):
+        """Hiberna las sesiones inactivas y reprograma la siguiente revisión"""
+        try:
+            self.session_manager.hibernate_inactive_sessions()
+        except Exception as e:
+            print(f"Warning: Session hibernation check failed: {e}")
+        self.root.after(SESSION_HIBERNATION_CHECK_MS, self._hibernate_inactive_sessions)
     
     def safe_messagebox(self, box_type, title, message, **kwargs):
         """Muestra un messagebox de forma segura, manejando errores de cierre de aplicación"""
@@ -155,6 +173,7 @@ class CardSimInterface:
         self.update_button_states()
         self.log(f"App state changed to: {new_state}")
     
+    @timed()
     def update_button_states(self):
         """Actualiza el estado de todos los botones según el estado actual con estilos visuales"""
         button_states = ButtonStates.get_all_button_states(self.current_app_state)
@@ -428,6 +447,7 @@ class CardSimInterface:
         
         # CARD INFORMATION SECTION se crea en create_memory_panel
     
+    @timed()
     def update_interface_for_active_session(self):
         """Actualiza toda la interfaz basada en la sesión activa"""
         active_session = self.session_manager.get_active_session()
@@ -531,6 +551,7 @@ class CardSimInterface:
             # Volver a deshabilitar escritura
             self.log_text.config(state=tk.DISABLED)
     
+    @timed()
     def update_command_log_display(self):
         """Actualiza el display del command log con el log de la sesión activa con formato profesional"""
         if not hasattr(self, 'log_text'):
@@ -703,6 +724,7 @@ class CardSimInterface:
             self.log_text.insert(tk.END, "ERROR: ", "error_text")
             self.log_text.insert(tk.END, f"{message}\n\n", "error_text")
 
+    @timed()
     def update_cards_list(self):
         """Actualiza la lista de tarjetas abiertas en la interfaz (usando CardExplorer)"""
         if not hasattr(self, 'card_explorer'):
@@ -726,27 +748,17 @@ class CardSimInterface:
         # Añadir nuevas tarjetas
         for session in sessions:
             # Verificar si la tarjeta ya existe en el explorador
-            card_exists = any(card['session_id'] == session.session_id for card in self.card_explorer.card_data)
-            
-            if not card_exists:
+            if not self.card_explorer.has_card(session.session_id):
                 # Añadir nueva tarjeta
                 card_type_str = '5542' if session.card_type == CARD_TYPE_5542 else '5528'
                 is_active = active_session and session.session_id == active_session.session_id
                 
-                success = self.card_explorer.add_card(
+                self.card_explorer.add_card(
                     session.card_name, 
                     card_type_str, 
                     session.session_id, 
                     is_active
                 )
-                
-                if not success:
-                    # Explorer está lleno
-                    from tkinter import messagebox
-                    messagebox.showwarning("Card Limit", 
-                                         f"Maximum cards limit reached ({self.card_explorer.max_cards}). "
-                                         "Close some cards before creating new ones.")
-                    break
         
         # Actualizar estados visuales
         if active_session:
@@ -756,6 +768,7 @@ class CardSimInterface:
         if getattr(self, 'small_screen_mode', False) and hasattr(self, 'compact_listbox'):
             self._populate_compact_cards_list()
     
+    @timed()
     def update_card_info_display(self):
         """Actualiza la información mostrada de la tarjeta seleccionada"""
         active_session = self.session_manager.get_active_session()
@@ -1034,6 +1047,12 @@ class CardSimInterface:
                                font=FONT_BOLD, relief=tk.RAISED, bd=2, padx=10, pady=10,  # Más alto
                                command=self.show_credits_image, width=12, height=1)  # Añadido height
         credits_btn.grid(row=2, column=0, padx=3, pady=3, sticky='ew')
+        
+        # FILA 3: Provision (2,1) - grabación en todos los lectores a la vez
+        provision_btn = tk.Button(buttons_container, text="PROVISION", bg=COLOR_PRIMARY_BLUE, fg='white',
+                                 font=FONT_BOLD, relief=tk.RAISED, bd=2, padx=10, pady=10,
+                                 command=self.open_provisioning_station, width=12, height=1)
+        provision_btn.grid(row=2, column=1, padx=3, pady=3, sticky='ew')
     
     def create_write_card_icon(self, parent_frame):
         """Crea los iconos Write Card y Read Card"""
@@ -1109,6 +1128,7 @@ class CardSimInterface:
                                command=self.read_from_real_card, width=14)
             read_btn.pack(pady=(3, 15), padx=8)  # Reducida separación superior
     
+    @profiled_action("view.session_switch")
     def on_card_select_from_explorer(self, session_id):
         """Maneja la selección de una tarjeta desde el CardExplorer"""
         self.session_manager.set_active_session(session_id)
@@ -1125,6 +1145,7 @@ class CardSimInterface:
         import datetime
         return datetime.datetime.now().strftime("%H:%M:%S")
     
+    @profiled_action("view.page_switch")
     def select_page(self, page_num):
         """Selecciona una página específica para tarjetas SLE5528"""
         active_session = self.session_manager.get_active_session()
@@ -1148,6 +1169,7 @@ class CardSimInterface:
         self.update_page_buttons()
         self.update_card_display()
     
+    @timed()
     def update_page_buttons(self):
         """Actualiza el estado visual de los botones de página según la tarjeta activa"""
         active_session = self.session_manager.get_active_session()
@@ -1195,6 +1217,7 @@ class CardSimInterface:
         if hasattr(self, '_small_screen_page_buttons'):
             self._update_small_screen_page_buttons()
     
+    @profiled_action("dialog.new_card")
     def new_card_dialog(self):
         """Abre diálogo para crear una nueva tarjeta"""
         from src.gui.dialogs import NewCardDialog
@@ -1206,13 +1229,6 @@ class CardSimInterface:
             name = card_data['name']
             card_type_str = card_data['type']
             
-            # Verificar límite de tarjetas
-            if hasattr(self, 'card_explorer') and self.card_explorer.is_full():
-                messagebox.showwarning("Card Limit", 
-                                     f"Maximum cards limit reached ({self.card_explorer.max_cards}). "
-                                     "Close some cards before creating new ones.")
-                return
-            
             # Convertir string a constante
             card_type = CARD_TYPE_5542 if card_type_str == "5542" else CARD_TYPE_5528
             
@@ -1227,6 +1243,7 @@ class CardSimInterface:
             else:
                 messagebox.showerror("Error", f"Could not create card: {message}")
     
+    @profiled_action("dialog.open_card")
     def open_card_dialog(self):
         """Abre diálogo para cargar una tarjeta desde archivo"""
         def handle_open(filepath):
@@ -1237,19 +1254,21 @@ class CardSimInterface:
             name = self.ask_card_name(suggested_name)
             if name:
                 # Verificar que el nombre no esté duplicado
-                if self.session_manager.get_session_by_name(name):
+                if self.session_manager.has_session_name(name):
                     InfoDialog(self.root, "Error", f"Card name '{name}' already exists. Choose a different name.", "error")
                     return
                 
-                session, message = self.session_manager.open_card_from_file(filepath, name)
-                
-                if session:
-                    self.update_cards_list()
-                    # Actualizar interfaz con la sesión cargada
-                    self.session_manager.set_active_session(session.session_id)
-                    self.update_interface_for_active_session()
-                    self.log(f"Card '{name}' loaded from file: {filepath}", "SUCCESS")
-                else:
+                # Perfilar solo la carga: el diálogo del nombre espera al usuario
+                with action_profiler.profile("file.open"):
+                    session, message = self.session_manager.open_card_from_file(filepath, name)
+                    
+                    if session:
+                        self.update_cards_list()
+                        # Actualizar interfaz con la sesión cargada
+                        self.session_manager.set_active_session(session.session_id)
+                        self.update_interface_for_active_session()
+                        self.log(f"Card '{name}' loaded from file: {filepath}", "SUCCESS")
+                if not session:
                     InfoDialog(self.root, "Error", f"Could not open card: {message}", "error")
         
         # Mostrar diálogo personalizado centrado
@@ -1266,6 +1285,7 @@ class CardSimInterface:
             return name.strip()
         return None
 
+    @profiled_action("dialog.settings")
     def open_settings_dialog(self):
         """Abre el diálogo de Settings con control de acceso administrativo"""
         from .dialogs import SettingsDialog
@@ -2301,6 +2321,7 @@ class CardSimInterface:
             
             print(f"   Botón CHANGE PSC creado en posición ({row_pos},{col_pos}) - Small Screen: {is_small_screen}")
     
+    @profiled_action("dialog.apdu_9")
     def execute_apdu_9_dialog(self):
         """Ejecuta el diálogo de cambio de PSC físico independiente"""
         print("DEBUG: execute_apdu_9_dialog() called - Physical Card Dialog")
@@ -2316,6 +2337,7 @@ class CardSimInterface:
             self.log(f"Error opening Change Card PSC dialog: {e}")
             messagebox.showerror("Error", f"Error opening Change Card PSC dialog:\n{e}")
 
+    @profiled_action("apdu.select_card")
     def select_card_apdu(self):
         """APDU 1 - SELECT_CARD_TYPE - Power down/up y reset de tarjeta"""
         active_session = self.session_manager.get_active_session()
@@ -2350,6 +2372,7 @@ class CardSimInterface:
             self.log(f"❌ SELECT CARD Error: {result.get('message', 'Unknown error')}")
             messagebox.showerror("Error", f"Select Card failed: {result.get('message', 'Unknown error')}")
     
+    @profiled_action("apdu.read_error_counter")
     def read_error_counter(self):
         """APDU 6 - READ_PRESENTATION_ERROR_COUNTER - Lee contador de errores de presentación PSC"""
         active_session = self.session_manager.get_active_session()
@@ -2521,6 +2544,7 @@ class CardSimInterface:
             error_msg = f"Error resetting error counter: {str(e)}"
             self.safe_messagebox("error", "Error", error_msg)
         
+    @profiled_action("apdu.read_protection_bits")
     def read_protection_bits(self):
         """APDU 7 - READ_PROTECTION_BITS - Lee bits de protección para los primeros 32 bytes"""
         active_session = self.session_manager.get_active_session()
@@ -2606,6 +2630,7 @@ class CardSimInterface:
             error_msg = f"Error reading protection bits: {str(e)}"
             messagebox.showerror("Error", error_msg)
         
+    @profiled_action("dialog.present_psc")
     def present_psc(self):
         """APDU 3 - PRESENT PSC - Abre diálogo para presentar PSC"""
         active_session = self.session_manager.get_active_session()
@@ -2618,6 +2643,7 @@ class CardSimInterface:
         card_type = active_session.memory_manager.card_type
         PresentPSCDialog(self.root, self._execute_present_psc, card_type)
     
+    @profiled_action("apdu.present_psc")
     def _execute_present_psc(self, psc_input):
         """Ejecuta la presentación del PSC"""
         active_session = self.session_manager.get_active_session()
@@ -2674,6 +2700,7 @@ class CardSimInterface:
         except ValueError as e:
             messagebox.showerror("Error", f"Invalid PSC format: {str(e)}")
     
+    @profiled_action("dialog.change_psc")
     def change_psc_dialog(self):
         """Abre diálogo para cambiar PSC"""
         print("DEBUG: change_psc_dialog() called - Simulator Dialog")
@@ -2687,6 +2714,7 @@ class CardSimInterface:
         card_type = active_session.memory_manager.card_type
         ChangePSCDialog(self.root, self.change_psc, card_type)
     
+    @profiled_action("apdu.change_psc")
     def change_psc(self, new_psc):
         """Cambia el PSC escribiendo en las direcciones correspondientes"""
         active_session = self.session_manager.get_active_session()
@@ -2743,10 +2771,12 @@ class CardSimInterface:
             messagebox.showerror("Error", f"PSC change failed: {str(e)}")
             self.log(f"PSC change error: {str(e)}", "ERROR")
     
+    @profiled_action("dialog.read_memory")
     def read_memory_dialog(self):
         """Abre diálogo para leer memoria"""
         ReadMemoryDialog(self.root, self.read_memory, self.session_manager)
     
+    @profiled_action("apdu.read_memory")
     def read_memory(self, address, length):
         """Lee memoria de la tarjeta usando el sistema de sesiones"""
         active_session = self.session_manager.get_active_session()
@@ -2884,10 +2914,12 @@ class CardSimInterface:
         
         self.safe_messagebox("info", "Read Memory", summary)
     
+    @profiled_action("dialog.write_memory")
     def write_memory_dialog(self):
         """Abre diálogo para escribir memoria"""
         WriteMemoryDialog(self.root, self.write_memory, self.session_manager)
     
+    @profiled_action("apdu.write_memory")
     def write_memory(self, address, data_str):
         """Escribe datos en memoria usando el sistema de sesiones"""
         active_session = self.session_manager.get_active_session()
@@ -2948,6 +2980,7 @@ class CardSimInterface:
             self.safe_messagebox("error", "Error", f"Write operation failed: {str(e)}")
             self.log(f"Write memory error: {str(e)}")
     
+    @profiled_action("dialog.save_card")
     def save_card_dialog(self):
         """Abre diálogo para guardar tarjeta"""
         active_session = self.session_manager.get_active_session()
@@ -2957,9 +2990,11 @@ class CardSimInterface:
             return
         
         def handle_save(filepath):
-            success, message = self.session_manager.save_session_to_file(active_session.session_id, filepath)
+            with action_profiler.profile("file.save"):
+                success, message = self.session_manager.save_session_to_file(active_session.session_id, filepath)
+                if success:
+                    self.log(f"Card '{active_session.card_name}' saved to: {filepath}")
             if success:
-                self.log(f"Card '{active_session.card_name}' saved to: {filepath}")
                 InfoDialog(self.root, "Success", "Card saved successfully", "success")
             else:
                 InfoDialog(self.root, "Error", f"Save failed: {message}", "error")
@@ -3038,10 +3073,12 @@ class CardSimInterface:
             # Solo usar self.log() para evitar duplicación
             self.log(f"Card '{active_session.card_name}' cleared - Reset to factory state")
     
+    @profiled_action("dialog.write_protect")
     def write_protect_dialog(self):
         """Abre diálogo para protección contra escritura"""
         WriteProtectDialog(self.root, self.write_protect, self.session_manager)
     
+    @profiled_action("apdu.write_protect")
     def write_protect(self, address, data_pattern):
         """APDU 8 - WRITE_PROTECTION_MEMORY_CARD - Protege direcciones por comparación de contenido"""
         active_session = self.session_manager.get_active_session()
@@ -3149,6 +3186,7 @@ class CardSimInterface:
             self.update_command_log_display()
             messagebox.showerror("Error", error_msg)
     
+    @profiled_action("dialog.user_config")
     def user_config_dialog(self):
         """Abre diálogo de configuración de usuario"""
         from src.utils.user_config import user_config_manager
@@ -3205,6 +3243,7 @@ class CardSimInterface:
         self.log(f"Card type changed to: {card_type}")
         self.update_page_buttons()
     
+    @timed()
     def update_card_display(self):
         """Actualiza la visualización de memoria con datos de la sesión activa y colores"""
         # Habilitar edición temporalmente
@@ -3605,6 +3644,7 @@ class CardSimInterface:
         else:
             InfoDialog(self.root, "Warning", "No active session available", "warning")
     
+    @profiled_action("dialog.apdus_reference")
     def show_apdus_reference(self):
         """Muestra una ventana con las imágenes de teoría sobre APDUs"""
         try:
@@ -4133,6 +4173,14 @@ class CardSimInterface:
             self.log(f"Error opening Write Card dialog: {e}")
             messagebox.showerror("Error", f"Error opening Write Card dialog:\n{e}")
     
+    def open_provisioning_station(self):
+        """Abre la estación de grabación en varios lectores"""
+        try:
+            ProvisioningDialog(self.root, self.session_manager)
+        except Exception as e:
+            self.log(f"Error opening Provisioning dialog: {e}")
+            messagebox.showerror("Error", f"Error opening Provisioning dialog:\n{e}")
+    
     def read_from_real_card(self):
         """Lee una tarjeta física y crea una nueva sesión"""
         try:
@@ -4170,6 +4218,12 @@ class CardSimInterface:
             # Cleanup de sesiones si es necesario
             if hasattr(self, 'session_manager'):
                 self.session_manager.close_all_sessions()
+            
+            # Cerrar las conexiones que quedan abiertas con los lectores físicos
+            from src.core.physical_card_handler import close_all_connections
+            close_all_connections()
+            pcsc_worker.stop()
+            vpcd_server.stop()
         except Exception as e:
             print(f"Error during cleanup: {e}")
         finally:
@@ -4208,6 +4262,7 @@ class CardSimInterface:
                     break
         return False
     
+    @timed()
     def update_info_panels(self):
         """Actualiza solo los paneles de información (PSC y Error Counter) sin tocar la memoria"""
         active_session = self.session_manager.get_active_session()
@@ -4266,12 +4321,7 @@ class CardSimInterface:
             # Forzar reorganización del CardExplorer después del Small Screen Mode
             if hasattr(self, 'card_explorer'):
                 self.card_explorer.canvas.update_idletasks()
-                self.card_explorer.canvas.configure(scrollregion=self.card_explorer.canvas.bbox("all"))
-                
-                if hasattr(self.card_explorer, 'icons_frame'):
-                    for widget in self.card_explorer.icons_frame.winfo_children():
-                        widget.update_idletasks()
-                    self.card_explorer.icons_frame.update_idletasks()
+                self.card_explorer.update_visual_states()
             
             self.root.update_idletasks()
             
@@ -3,21 +3,130 @@ Diálogos para operaciones con tarjetas físicas
 """
 
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
+import os
 import threading
+import queue
 import logging
 from src.utils.constants import *
 from src.utils.resource_manager import get_icon_path
-from src.core.physical_card_handler import PhysicalCardHandler
+from src.core.pcsc_worker import RemoteCardHandler
+from src.core.apdu_planner import get_card_profile
+from src.core.provisioning import ProvisioningStation, make_job
+from src.core.card_monitor import card_monitor, READER_ADDED, READER_REMOVED, CARD_INSERTED, CARD_REMOVED
 from src.core.session_manager import SessionManager
 
-class PhysicalCardReadDialog:
+class CardEventsMixin:
+    """
+    Refresco automático de la lista de lectores y avisos de inserción/extracción de
+    tarjetas a partir del monitor en segundo plano (sin pulsar Refresh Readers).
+    Los hilos de trabajo no tocan Tk: encolan sus cambios con run_on_ui() y el
+    diálogo los aplica con after(). Al cerrar el diálogo se cancela la operación
+    en curso del handler (RemoteCardHandler) y se libera en el proceso de E/S.
+    Requiere reader_listbox, status_text y refresh_readers() en el diálogo.
+    """
+    
+    card_events = None
+    ui_updates = None
+    _card_events_job = None
+    _ui_updates_job = None
+    
+    def start_card_monitor(self):
+        """Suscribe el diálogo al monitor de lectores y tarjetas"""
+        self.card_events = card_monitor.subscribe()
+        self.ui_updates = queue.Queue()
+        self.dialog.bind('<Destroy>', self.on_dialog_destroy, add='+')
+        self._card_events_job = self.dialog.after(CARD_MONITOR_GUI_POLL_MS, self.process_card_events)
+        self._ui_updates_job = self.dialog.after(UI_UPDATE_POLL_MS, self.process_ui_updates)
+    
+    def stop_card_monitor(self):
+        """Cancela la suscripción al cerrar el diálogo"""
+        for job in (self._card_events_job, self._ui_updates_job):
+            if job is not None:
+                try:
+                    self.dialog.after_cancel(job)
+                except tk.TclError:
+                    pass
+        self._card_events_job = None
+        self._ui_updates_job = None
+        if self.card_events is not None:
+            card_monitor.unsubscribe(self.card_events)
+            self.card_events = None
+    
+    def on_dialog_destroy(self, event):
+        """<Destroy> llega también por cada widget hijo: solo cuenta el del diálogo"""
+        if event.widget is self.dialog:
+            self.stop_card_monitor()
+            # Un lector bloqueado no debe seguir ocupando el proceso de E/S
+            self.handler.cancel()
+            # close() espera a que termine la operación cancelada: fuera del hilo de Tk
+            threading.Thread(target=self.handler.close, daemon=True).start()
+    
+    def run_on_ui(self, func, *args, **kwargs):
+        """Encola una llamada para ejecutarla en el hilo de Tk (se puede usar desde cualquier hilo)"""
+        self.ui_updates.put((func, args, kwargs))
+    
+    def process_ui_updates(self):
+        """Aplica las llamadas encoladas por los hilos de trabajo (se ejecuta en el hilo de Tk)"""
+        for func, args, kwargs in card_monitor.drain(self.ui_updates):
+            try:
+                func(*args, **kwargs)
+            except tk.TclError as e:
+                print(f"Warning: UI update failed: {e}")
+        self._ui_updates_job = self.dialog.after(UI_UPDATE_POLL_MS, self.process_ui_updates)
+    
+    def process_card_events(self):
+        """Vacía la cola de eventos del monitor (se ejecuta en el hilo de Tk)"""
+        if self.card_events is None:
+            return
+        
+        readers_changed = False
+        inserted_reader = None
+        for event in card_monitor.drain(self.card_events):
+            if event['type'] in (READER_ADDED, READER_REMOVED):
+                readers_changed = True
+            elif event['type'] == CARD_INSERTED:
+                inserted_reader = event['reader']
+                self.status_text.set(f"Card inserted in {event['reader']}")
+                self.on_card_inserted(event['reader'])
+            elif event['type'] == CARD_REMOVED:
+                if inserted_reader == event['reader']:
+                    inserted_reader = None
+                self.status_text.set(f"Card removed from {event['reader']}")
+        
+        if readers_changed:
+            self.refresh_readers()
+        if inserted_reader:
+            # refresh_readers() selecciona el primer lector con un pequeño retraso
+            self.dialog.after(150, lambda: self.select_reader(inserted_reader))
+        
+        self._card_events_job = self.dialog.after(CARD_MONITOR_GUI_POLL_MS, self.process_card_events)
+    
+    def on_card_inserted(self, reader_name):
+        """Punto de extensión: se llama en el hilo de Tk por cada tarjeta insertada"""
+        pass
+    
+    def select_reader(self, reader_name):
+        """Selecciona en la lista el lector indicado (donde se acaba de insertar una tarjeta)"""
+        try:
+            readers = self.reader_listbox.get(0, tk.END)
+            if reader_name in readers:
+                index = readers.index(reader_name)
+                self.reader_listbox.selection_clear(0, tk.END)
+                self.reader_listbox.selection_set(index)
+                self.reader_listbox.activate(index)
+                self.reader_listbox.see(index)
+        except tk.TclError:
+            pass
+
+
+class PhysicalCardReadDialog(CardEventsMixin):
     """Diálogo para leer datos de una tarjeta física"""
     
     def __init__(self, parent, session_manager):
         self.parent = parent
         self.session_manager = session_manager
-        self.handler = PhysicalCardHandler()
+        self.handler = RemoteCardHandler()
         self.dialog = None
         self.result = None
         
@@ -28,7 +137,7 @@ class PhysicalCardReadDialog:
         self.created_session_id = None  # Para almacenar el ID de la sesión creada
         
         # Variables de control
-        self.card_type_var = tk.StringVar(value=CARD_TYPE_5542)
+        self.card_type_var = tk.StringVar(value=CARD_TYPE_AUTO)
         self.status_text = tk.StringVar(value="Ready to read physical card")
         self.progress_var = tk.DoubleVar()
         
@@ -36,6 +145,18 @@ class PhysicalCardReadDialog:
         self.psc_type_var = tk.StringVar(value="factory")  # "factory" o "custom"
         self.custom_psc_var = tk.StringVar(value="")
         
+        # Modo de lectura continua: importa cada tarjeta insertada sin diálogos
+        self.continuous_var = tk.BooleanVar(value=False)
+        self.continuous_target_var = tk.StringVar(value="session")  # "session" o "file"
+        self.name_prefix_var = tk.StringVar(value="Card")
+        self.archive_dir = None
+        self.intake_results = queue.Queue()  # Resultados de los hilos de lectura
+        self.intake_busy = set()             # Lectores con una lectura en curso
+        self.intake_handlers = set()         # Handlers de las lecturas en curso
+        self.intake_cancelled = threading.Event()  # Se activa al cerrar el diálogo
+        self.imported_count = 0
+        self._intake_job = None
+        
         # Callback para actualizar interfaz cuando cambie el tipo de tarjeta
         self.card_type_var.trace('w', self.on_card_type_change)
         
@@ -80,6 +201,9 @@ class PhysicalCardReadDialog:
         # Centrar diálogo
         self.center_dialog()
         
+        # Lectores y tarjetas se detectan automáticamente
+        self.start_card_monitor()
+        
     def create_header(self, parent):
         """Crear cabecera con título e icono"""
         header_frame = tk.Frame(parent, bg=COLOR_BG_MAIN)
@@ -144,6 +268,11 @@ class PhysicalCardReadDialog:
         rb_frame = tk.Frame(type_frame, bg=COLOR_BG_MAIN)
         rb_frame.pack(side=tk.LEFT)
         
+        tk.Radiobutton(rb_frame, text="Auto-detect", variable=self.card_type_var, 
+                      value=CARD_TYPE_AUTO, font=("Arial", 10, "bold"), 
+                      fg=COLOR_TEXT_PRIMARY, bg=COLOR_BG_MAIN,
+                      selectcolor=COLOR_BG_PANEL, activebackground=COLOR_BG_MAIN).pack(side=tk.LEFT, padx=(0, 15))
+        
         tk.Radiobutton(rb_frame, text="SLE5542 (256B)", variable=self.card_type_var, 
                       value=CARD_TYPE_5542, font=("Arial", 10, "bold"), 
                       fg=COLOR_TEXT_PRIMARY, bg=COLOR_BG_MAIN,
@@ -158,6 +287,33 @@ class PhysicalCardReadDialog:
         separator = tk.Frame(config_frame, height=1, bg=COLOR_BG_PANEL)
         separator.pack(fill=tk.X, padx=10, pady=(5, 10))
         
+        # Lectura continua
+        self.create_continuous_options(config_frame)
+        
+    def create_continuous_options(self, parent):
+        """Opciones del modo de lectura continua (una sesión o un archivo por tarjeta insertada)"""
+        continuous_frame = tk.Frame(parent, bg=COLOR_BG_MAIN)
+        continuous_frame.pack(fill=tk.X, padx=10, pady=(0, 10))
+        
+        tk.Checkbutton(continuous_frame, text="Continuous read: import every inserted card",
+                       variable=self.continuous_var, command=self.toggle_continuous_mode,
+                       font=FONT_NORMAL, fg=COLOR_TEXT_PRIMARY, bg=COLOR_BG_MAIN,
+                       selectcolor=COLOR_BG_PANEL, activebackground=COLOR_BG_MAIN).pack(anchor=tk.W)
+        
+        options_frame = tk.Frame(continuous_frame, bg=COLOR_BG_MAIN)
+        options_frame.pack(fill=tk.X, padx=(20, 0), pady=(5, 0))
+        
+        tk.Label(options_frame, text="Name prefix:", font=FONT_SMALL,
+                 fg=COLOR_TEXT_PRIMARY, bg=COLOR_BG_MAIN).pack(side=tk.LEFT)
+        tk.Entry(options_frame, textvariable=self.name_prefix_var, width=10,
+                 font=FONT_SMALL).pack(side=tk.LEFT, padx=(5, 15))
+        tk.Radiobutton(options_frame, text="Open as sessions", variable=self.continuous_target_var,
+                       value="session", font=FONT_SMALL, fg=COLOR_TEXT_PRIMARY, bg=COLOR_BG_MAIN,
+                       selectcolor=COLOR_BG_PANEL, activebackground=COLOR_BG_MAIN).pack(side=tk.LEFT)
+        tk.Radiobutton(options_frame, text="Save to folder", variable=self.continuous_target_var,
+                       value="file", font=FONT_SMALL, fg=COLOR_TEXT_PRIMARY, bg=COLOR_BG_MAIN,
+                       selectcolor=COLOR_BG_PANEL, activebackground=COLOR_BG_MAIN).pack(side=tk.LEFT, padx=(10, 0))
+        
     def create_progress_area(self, parent):
         """Crear área de progreso"""
         progress_frame = tk.LabelFrame(parent, text="Operation Status", 
@@ -316,6 +472,145 @@ class PhysicalCardReadDialog:
             print(f"Error restoring selection: {e}")
     
     
+    def toggle_continuous_mode(self):
+        """Activa o desactiva la lectura continua"""
+        if self.continuous_var.get():
+            if self.continuous_target_var.get() == "file":
+                folder = filedialog.askdirectory(parent=self.dialog, title="Folder for imported cards")
+                if not folder:
+                    self.continuous_var.set(False)
+                    return
+                self.archive_dir = folder
+            
+            self.default_read_btn.config(state=tk.DISABLED)
+            self.custom_psc_btn.config(state=tk.DISABLED)
+            self.status_text.set("Continuous read: insert a card...")
+            if self._intake_job is None:
+                self._intake_job = self.dialog.after(CARD_MONITOR_GUI_POLL_MS, self.process_intake_results)
+            
+            # Las tarjetas que ya están insertadas también se importan
+            for reader_name in card_monitor.get_inserted_cards():
+                self.on_card_inserted(reader_name)
+        else:
+            self.default_read_btn.config(state=tk.NORMAL)
+            self.custom_psc_btn.config(state=tk.NORMAL)
+            self.status_text.set(f"Continuous read stopped ({self.imported_count} card(s) imported)")
+    
+    def on_card_inserted(self, reader_name):
+        """En modo continuo, lanza la lectura de la tarjeta recién insertada"""
+        if not self.continuous_var.get() or reader_name in self.intake_busy:
+            return
+        self.intake_busy.add(reader_name)
+        self.status_text.set(f"Reading card in {reader_name}...")
+        
+        selected_type = self.card_type_var.get()
+        default_type = None if selected_type == CARD_TYPE_AUTO else int(selected_type)
+        thread = threading.Thread(target=self.intake_card_thread, args=(reader_name, default_type))
+        thread.daemon = True
+        thread.start()
+    
+    def intake_card_thread(self, reader_name, default_type):
+        """Lee una tarjeta en modo continuo (hilo separado, sin tocar la interfaz)"""
+        handler = RemoteCardHandler()
+        self.intake_handlers.add(handler)
+        result = {'reader': reader_name, 'card_type': default_type, 'data': None, 'message': ""}
+        try:
+            if self.intake_cancelled.is_set() or not handler.connect_to_reader(reader_name):
+                result['message'] = "Failed to connect to reader"
+                return
+            
+            # El tipo se detecta por el ATR; si no se puede, se usa el seleccionado
+            card_type = handler.detect_card_type(default_type)
+            if card_type is None:
+                result['message'] = "Could not detect the card type"
+                return
+            result['card_type'] = card_type
+            if not handler.has_reader_profile():
+                handler.probe_reader(card_type)
+            
+            if self.intake_cancelled.is_set():
+                return
+            data, _ = handler.read_full_card(card_type, None)
+            result['data'] = data
+            if data is None:
+                result['message'] = "Failed to read card data"
+        except Exception as e:
+            result['message'] = str(e)
+        finally:
+            self.intake_handlers.discard(handler)
+            handler.close()
+            self.intake_results.put(result)
+    
+    def on_dialog_destroy(self, event):
+        """Además del handler del diálogo, cancela las lecturas del modo continuo en curso"""
+        if event.widget is self.dialog:
+            self.intake_cancelled.set()
+            for handler in list(self.intake_handlers):
+                handler.cancel()
+        super().on_dialog_destroy(event)
+    
+    def process_intake_results(self):
+        """Crea las sesiones o archivos de las tarjetas leídas (hilo de Tk)"""
+        for result in card_monitor.drain(self.intake_results):
+            self.intake_busy.discard(result['reader'])
+            if result['data'] is None:
+                self.status_text.set(f"Could not import card in {result['reader']}: {result['message']}")
+                continue
+            self.import_read_card(result['card_type'], result['data'])
+        
+        if self.continuous_var.get() or self.intake_busy:
+            self._intake_job = self.dialog.after(CARD_MONITOR_GUI_POLL_MS, self.process_intake_results)
+        else:
+            self._intake_job = None
+    
+    def next_intake_name(self):
+        """Siguiente nombre libre: <prefijo> 001, <prefijo> 002..."""
+        prefix = self.name_prefix_var.get().strip() or "Card"
+        index = self.imported_count + 1
+        while True:
+            name = f"{prefix} {index:03d}"
+            in_use = self.session_manager.has_session_name(name)
+            if self.continuous_target_var.get() == "file":
+                in_use = in_use or os.path.exists(os.path.join(self.archive_dir, f"{name}.txt"))
+            if not in_use:
+                return name
+            index += 1
+    
+    def import_read_card(self, card_type, data):
+        """Crea una sesión (o guarda un archivo) con los datos de una tarjeta leída"""
+        name = self.next_intake_name()
+        # Al archivar en disco la sesión es temporal: no debe quitar la tarjeta activa del usuario
+        to_file = self.continuous_target_var.get() == "file"
+        session, message = self.session_manager.create_session_from_read(name, card_type, data,
+                                                                         activate=not to_file)
+        if not session:
+            self.status_text.set(f"Could not create card '{name}': {message}")
+            return
+        
+        if to_file:
+            filepath = os.path.join(self.archive_dir, f"{name}.txt")
+            success, message = self.session_manager.save_session_to_file(session.session_id, filepath)
+            self.session_manager.close_session(session.session_id)
+            if not success:
+                self.status_text.set(f"Could not save '{name}': {message}")
+                return
+        else:
+            # Al cerrar el diálogo la interfaz actualiza la lista y selecciona la última tarjeta
+            self.created_session_id = session.session_id
+        
+        self.imported_count += 1
+        self.status_text.set(f"Imported '{name}' ({self.imported_count} card(s)) - insert the next card")
+    
+    def stop_card_monitor(self):
+        """Además de la suscripción, detiene el procesado del modo continuo"""
+        if self._intake_job is not None:
+            try:
+                self.dialog.after_cancel(self._intake_job)
+            except tk.TclError:
+                pass
+            self._intake_job = None
+        super().stop_card_monitor()
+    
     def show_custom_psc_dialog(self):
         """Mostrar diálogo para introducir PSC personalizado"""
         # Crear diálogo modal
@@ -344,16 +639,17 @@ class PhysicalCardReadDialog:
         
         # Determinar tipo de tarjeta
         card_type = self.card_type_var.get()
-        if isinstance(card_type, str):
-            card_type = int(card_type)
         
         # Información
-        if card_type == CARD_TYPE_5542:
+        if card_type == CARD_TYPE_AUTO:
+            info_text = "Enter 3 hex bytes for SLE5542 or 2 for SLE5528"
+            expected_bytes = (3, 2)
+        elif int(card_type) == CARD_TYPE_5542:
             info_text = "Enter 3 hex bytes (e.g., FF FF FF)"
-            expected_bytes = 3
+            expected_bytes = (3,)
         else:
             info_text = "Enter 2 hex bytes (e.g., FF FF)"
-            expected_bytes = 2
+            expected_bytes = (2,)
         
         info_label = tk.Label(main_frame, text=info_text, 
                              font=FONT_NORMAL, fg=COLOR_TEXT_DISABLED, bg=COLOR_BG_MAIN)
@@ -373,9 +669,10 @@ class PhysicalCardReadDialog:
             hex_parts = psc_str.split()
             
             # Validar formato
-            if len(hex_parts) != expected_bytes:
+            if len(hex_parts) not in expected_bytes:
+                expected_text = " or ".join(str(count) for count in expected_bytes)
                 messagebox.showerror("Invalid PSC", 
-                                   f"Please enter exactly {expected_bytes} hex bytes separated by spaces.",
+                                   f"Please enter exactly {expected_text} hex bytes separated by spaces.",
                                    parent=psc_dialog)
                 return
             
@@ -463,23 +760,36 @@ class PhysicalCardReadDialog:
     def read_card_thread(self, reader_name, card_type, use_psc=False, custom_psc=None):
         """Ejecutar lectura de tarjeta en hilo separado"""
         try:
-            # Convertir card_type a entero si es string
-            if isinstance(card_type, str):
-                card_type = int(card_type)
-            
             # Conectar al lector
-            self.status_text.set("Connecting to reader...")
-            self.progress_var.set(20)
+            self.run_on_ui(self.status_text.set, "Connecting to reader...")
+            self.run_on_ui(self.progress_var.set, 20)
             
             if not self.handler.connect_to_reader(reader_name):
-                self.status_text.set("Failed to connect to reader")
-                self.default_read_btn.config(state=tk.NORMAL)
-                self.custom_psc_btn.config(state=tk.NORMAL)
+                self.run_on_ui(self.status_text.set, "Failed to connect to reader")
+                self.run_on_ui(self.default_read_btn.config, state=tk.NORMAL)
+                self.run_on_ui(self.custom_psc_btn.config, state=tk.NORMAL)
                 return
             
+            # Tipo de tarjeta: detectado por el ATR o el elegido por el usuario
+            if card_type == CARD_TYPE_AUTO:
+                self.run_on_ui(self.status_text.set, "Detecting card type...")
+                card_type = self.handler.detect_card_type()
+                if card_type is None:
+                    self.run_on_ui(self.status_text.set, "Could not detect the card type (is a card inserted?)")
+                    self.run_on_ui(self.default_read_btn.config, state=tk.NORMAL)
+                    self.run_on_ui(self.custom_psc_btn.config, state=tk.NORMAL)
+                    return
+            elif isinstance(card_type, str):
+                card_type = int(card_type)
+            
+            # Sondear el lector la primera vez que se usa (el resultado queda en caché)
+            if not self.handler.has_reader_profile():
+                self.run_on_ui(self.status_text.set, "Probing reader capabilities...")
+                self.handler.probe_reader(card_type)
+            
             # Leer tarjeta
-            self.status_text.set("Reading card data...")
-            self.progress_var.set(50)
+            self.run_on_ui(self.status_text.set, "Reading card data...")
+            self.run_on_ui(self.progress_var.set, 50)
             
             # Determinar PSC a usar
             if use_psc and custom_psc:
@@ -493,11 +803,13 @@ class PhysicalCardReadDialog:
                 self.read_psc_bytes = None  # No guardar PSC
                 print(f"DEBUG: Default Read - Sin PSC")
             
-            data, error_counter = self.handler.read_full_card(card_type, psc_bytes)
+            data, error_counter = self.handler.read_full_card(
+                card_type, psc_bytes,
+                progress_callback=lambda fraction, eta: self.report_progress("Reading card data", fraction, eta))
             
             if data:
-                self.progress_var.set(80)
-                self.status_text.set("Card data read successfully!")
+                self.run_on_ui(self.progress_var.set, 80)
+                self.run_on_ui(self.status_text.set, "Card data read successfully!")
                 
                 # Almacenar los datos leídos para uso posterior
                 self.read_data = data
@@ -505,29 +817,34 @@ class PhysicalCardReadDialog:
                 
                 # SIEMPRE crear una nueva tarjeta con los datos leídos
                 # No sobreescribir la sesión actual
-                self.progress_var.set(100)
-                self.status_text.set("Creating new card from read data...")
+                self.run_on_ui(self.progress_var.set, 100)
+                self.run_on_ui(self.status_text.set, "Creating new card from read data...")
                 
                 # Mostrar diálogo para crear nueva tarjeta después de la lectura exitosa
-                self.dialog.after(1000, lambda: self.show_create_card_option(data))
+                self.run_on_ui(self.dialog.after, 1000, lambda: self.show_create_card_option(data))
             else:
                 # Error en la lectura
                 if use_psc and error_counter is not None:
                     # Si se usó Custom PSC y hay Error Counter, mostrarlo
-                    self.status_text.set("PSC verification failed")
-                    self.dialog.after(500, lambda: self.show_psc_read_error_dialog(error_counter, card_type))
+                    self.run_on_ui(self.status_text.set, "PSC verification failed")
+                    self.run_on_ui(self.dialog.after, 500, lambda: self.show_psc_read_error_dialog(error_counter, card_type))
                 else:
-                    self.status_text.set("Failed to read card data")
-                    self.default_read_btn.config(state=tk.NORMAL)
-                    self.custom_psc_btn.config(state=tk.NORMAL)
+                    self.run_on_ui(self.status_text.set, "Failed to read card data")
+                    self.run_on_ui(self.default_read_btn.config, state=tk.NORMAL)
+                    self.run_on_ui(self.custom_psc_btn.config, state=tk.NORMAL)
                 
         except Exception as e:
             logging.error(f"Error in read operation: {e}")
-            self.status_text.set(f"Error: {str(e)}")
-            self.default_read_btn.config(state=tk.NORMAL)
-            self.custom_psc_btn.config(state=tk.NORMAL)
+            self.run_on_ui(self.status_text.set, f"Error: {str(e)}")
+            self.run_on_ui(self.default_read_btn.config, state=tk.NORMAL)
+            self.run_on_ui(self.custom_psc_btn.config, state=tk.NORMAL)
         finally:
-            self.handler.disconnect()
+            self.handler.release()
+    
+    def report_progress(self, action, fraction, eta_seconds):
+        """Actualiza la barra de progreso (50-95 %) con el tiempo restante estimado"""
+        self.run_on_ui(self.progress_var.set, 50 + 45 * fraction)
+        self.run_on_ui(self.status_text.set, f"{action}... {int(fraction * 100)}% (~{eta_seconds:.1f} s left)")
     
     def interpret_error_counter(self, error_counter, card_type):
         """Interpreta el Error Counter según el tipo de tarjeta"""
@@ -874,8 +1191,8 @@ class PhysicalCardReadDialog:
         self.dialog.destroy()
     
     def cancel(self):
-        """Cancelar operación"""
-        self.result = False
+        """Cancelar operación (las tarjetas importadas en modo continuo se conservan)"""
+        self.result = self.created_session_id is not None
         self.dialog.destroy()
     
     def show(self):
@@ -884,13 +1201,13 @@ class PhysicalCardReadDialog:
         return self.result, self.created_session_id
 
 
-class PhysicalCardWriteDialog:
+class PhysicalCardWriteDialog(CardEventsMixin):
     """Diálogo para escribir datos a una tarjeta física"""
     
     def __init__(self, parent, session_manager):
         self.parent = parent
         self.session_manager = session_manager
-        self.handler = PhysicalCardHandler()
+        self.handler = RemoteCardHandler()
         self.dialog = None
         self.result = None
         
@@ -902,6 +1219,11 @@ class PhysicalCardWriteDialog:
         self.psc_type_var = tk.StringVar(value="factory")
         self.custom_psc_var = tk.StringVar(value="")
         
+        # Escritura diferencial: solo los bytes que difieren del contenido de la tarjeta
+        self.differential_var = tk.BooleanVar(value=True)
+        # Releer lo escrito y compararlo con la sesión antes de dar la escritura por buena
+        self.verify_var = tk.BooleanVar(value=True)
+        
         # Variables para Error Counter
         self.last_error_counter = None
         self.last_card_type = None
@@ -955,6 +1277,9 @@ class PhysicalCardWriteDialog:
         # Forzar actualización de lectores después de crear la interfaz
         self.dialog.after(100, self.refresh_readers)
         
+        # Lectores y tarjetas se detectan automáticamente
+        self.start_card_monitor()
+        
     def create_header(self, parent):
         """Crear cabecera con título e icono"""
         header_frame = tk.Frame(parent, bg=COLOR_BG_MAIN)
@@ -1193,92 +1518,113 @@ class PhysicalCardWriteDialog:
         if not result:
             return
         
+        # Obtener PSC seleccionado por el usuario (el hilo de escritura no lee variables de Tk)
+        try:
+            psc_bytes = self.get_psc_bytes()
+        except ValueError as e:
+            self.status_text.set(f"PSC Error: {str(e)}")
+            return
+        
+        # Imagen de la sesión activa (el hilo de escritura no usa el gestor de sesiones)
+        session = self.session_manager.get_active_session()
+        if not session:
+            self.status_text.set("No active session available")
+            return
+        card_type = int(session.memory_manager.card_type)
+        memory_data_hex = session.memory_manager.get_memory_dump()
+        
         # Deshabilitar botones durante la operación
         self.write_btn.config(state=tk.DISABLED)
         self.progress_var.set(0)
         self.status_text.set("Starting write operation...")
         
         # Iniciar escritura en hilo separado
-        thread = threading.Thread(target=self.write_card_thread, args=(selected_reader,))
+        thread = threading.Thread(target=self.write_card_thread,
+                                  args=(selected_reader, card_type, memory_data_hex, psc_bytes,
+                                        self.differential_var.get(), self.verify_var.get()))
         thread.daemon = True
         thread.start()
     
-    def write_card_thread(self, reader_name):
+    def write_card_thread(self, reader_name, card_type, memory_data_hex, psc_bytes, differential=True, verify=True):
         """Ejecutar escritura de tarjeta en hilo separado"""
         try:
-            # Obtener datos de la sesión
-            session = self.session_manager.get_active_session()
-            if not session:
-                self.status_text.set("No active session available")
-                self.write_btn.config(state=tk.NORMAL)
-                return
-            
-            memory_manager = session.memory_manager
-            card_type = memory_manager.card_type
-            
-            # Convertir card_type a entero si es string (por si acaso)
-            if isinstance(card_type, str):
-                card_type = int(card_type)
-            
-            # Obtener PSC seleccionado por el usuario
-            try:
-                psc_bytes = self.get_psc_bytes()
-            except ValueError as e:
-                self.status_text.set(f"PSC Error: {str(e)}")
-                self.write_btn.config(state=tk.NORMAL)
-                return
-            
-            # Convertir datos del memory manager a formato bytes
-            memory_data_hex = memory_manager.get_memory_dump()
-            
             # Conectar al lector
-            self.status_text.set("Connecting to reader...")
-            self.progress_var.set(20)
+            self.run_on_ui(self.status_text.set, "Connecting to reader...")
+            self.run_on_ui(self.progress_var.set, 20)
             
             if not self.handler.connect_to_reader(reader_name):
-                self.status_text.set("Failed to connect to reader")
-                self.write_btn.config(state=tk.NORMAL)
+                self.run_on_ui(self.status_text.set, "Failed to connect to reader")
+                self.run_on_ui(self.write_btn.config, state=tk.NORMAL)
                 return
             
+            # Comprobar por el ATR que la tarjeta insertada es del tipo de la sesión
+            detected_type = self.handler.detect_card_type()
+            if detected_type is not None and detected_type != card_type:
+                self.run_on_ui(self.status_text.set,
+                               f"The inserted card is {get_card_profile(detected_type)['name']}, "
+                               f"but the session is {get_card_profile(card_type)['name']}")
+                self.run_on_ui(self.write_btn.config, state=tk.NORMAL)
+                return
+            
+            # Sondear el lector la primera vez que se usa (el resultado queda en caché)
+            if not self.handler.has_reader_profile():
+                self.run_on_ui(self.status_text.set, "Probing reader capabilities...")
+                self.handler.probe_reader(card_type)
+            
             # Escribir tarjeta con PSC del usuario
-            self.status_text.set("Writing user data area (skipping protected regions)...")
-            self.progress_var.set(50)
+            self.run_on_ui(self.status_text.set, "Writing user data area (skipping protected regions)...")
+            self.run_on_ui(self.progress_var.set, 50)
             
-            success, message, error_counter = self.handler.write_full_card(memory_data_hex, card_type, psc_bytes)
+            report = lambda fraction, eta: self.report_progress("Writing card data", fraction, eta)
+            if differential:
+                success, message, error_counter = self.handler.write_card_differential(
+                    memory_data_hex, card_type, psc_bytes, progress_callback=report,
+                    verify=verify)
+            else:
+                success, message, error_counter = self.handler.write_full_card(
+                    memory_data_hex, card_type, psc_bytes, progress_callback=report,
+                    verify=verify)
             
             # Guardar error_counter para usarlo en los diálogos
             self.last_error_counter = error_counter
             self.last_card_type = card_type
             
             if success:
-                self.progress_var.set(100)
-                self.status_text.set("Write operation completed successfully")
+                self.run_on_ui(self.progress_var.set, 100)
+                self.run_on_ui(self.status_text.set, "Write operation completed successfully")
                 
                 # Cerrar diálogo y mostrar ventana de éxito con Error Counter
-                self.success_close()
+                self.run_on_ui(self.success_close)
             else:
                 # Mostrar status básico
-                self.status_text.set("Write operation failed")
+                self.run_on_ui(self.status_text.set, "Write operation failed")
                 
                 # Detectar errores específicos y mostrar diálogo de error correspondiente
                 if "PSC verification failed" in message:
                     # Error crítico de PSC - mostrar diálogo de error
-                    self.dialog.after(500, lambda: self.show_psc_error_dialog(message))
+                    self.run_on_ui(self.dialog.after, 500, lambda: self.show_psc_error_dialog(message))
                 elif "PSC incorrecto" in message or "PSC" in message:
-                    self.dialog.after(500, lambda: self.show_error_dialog("PSC Error", message))
+                    self.run_on_ui(self.dialog.after, 500, lambda: self.show_error_dialog("PSC Error", message))
+                elif "Verification failed" in message:
+                    self.run_on_ui(self.dialog.after, 500, lambda: self.show_error_dialog("Verification Failed", message))
                 elif "Tamaño de datos incorrecto" in message:
-                    self.dialog.after(500, lambda: self.show_error_dialog("Data Size Error", message))
+                    self.run_on_ui(self.dialog.after, 500, lambda: self.show_error_dialog("Data Size Error", message))
                 elif "Error seleccionando tarjeta" in message:
-                    self.dialog.after(500, lambda: self.show_error_dialog("Card Selection Error", message))
+                    self.run_on_ui(self.dialog.after, 500, lambda: self.show_error_dialog("Card Selection Error", message))
                 else:
-                    self.dialog.after(500, lambda: self.show_error_dialog("Write Failed", message))
+                    self.run_on_ui(self.dialog.after, 500, lambda: self.show_error_dialog("Write Failed", message))
                 
         except Exception as e:
             logging.error(f"Error in write operation: {e}")
-            self.status_text.set(f"Error: {str(e)}")
-            self.write_btn.config(state=tk.NORMAL)
+            self.run_on_ui(self.status_text.set, f"Error: {str(e)}")
+            self.run_on_ui(self.write_btn.config, state=tk.NORMAL)
         finally:
-            self.handler.disconnect()
+            self.handler.release()
+    
+    def report_progress(self, action, fraction, eta_seconds):
+        """Actualiza la barra de progreso (50-95 %) con el tiempo restante estimado"""
+        self.run_on_ui(self.progress_var.set, 50 + 45 * fraction)
+        self.run_on_ui(self.status_text.set, f"{action}... {int(fraction * 100)}% (~{eta_seconds:.1f} s left)")
     
     def success_close(self):
         """Cerrar diálogo tras éxito mostrando confirmación con Error Counter"""
@@ -1593,6 +1939,20 @@ class PhysicalCardWriteDialog:
         self.custom_help_label = tk.Label(custom_frame, text="(hex bytes, e.g., FF FF FF)", 
                              font=FONT_SMALL, fg=COLOR_TEXT_DISABLED, bg=COLOR_BG_MAIN)
         self.custom_help_label.pack(side=tk.LEFT)
+        
+        # Escritura diferencial
+        differential_cb = tk.Checkbutton(config_frame, text="Only write changed bytes (differential write)",
+                                         variable=self.differential_var,
+                                         font=FONT_SMALL, fg=COLOR_TEXT_PRIMARY, bg=COLOR_BG_MAIN,
+                                         selectcolor=COLOR_BG_PANEL, activebackground=COLOR_BG_MAIN)
+        differential_cb.pack(anchor=tk.W, pady=(0, 2))
+        
+        # Verificación tras la escritura
+        verify_cb = tk.Checkbutton(config_frame, text="Verify written data (read back and compare)",
+                                   variable=self.verify_var,
+                                   font=FONT_SMALL, fg=COLOR_TEXT_PRIMARY, bg=COLOR_BG_MAIN,
+                                   selectcolor=COLOR_BG_PANEL, activebackground=COLOR_BG_MAIN)
+        verify_cb.pack(anchor=tk.W, pady=(0, 8))
     
     def on_psc_type_change(self):
         """Manejar cambio de tipo de PSC"""
@@ -1667,13 +2027,13 @@ class PhysicalCardWriteDialog:
             return psc_bytes
 
 
-class PhysicalCardChangePSCDialog:
+class PhysicalCardChangePSCDialog(CardEventsMixin):
     """Diálogo para cambiar PSC en una tarjeta física"""
     
     def __init__(self, parent, main_interface):
         self.parent = parent
         self.main_interface = main_interface
-        self.handler = PhysicalCardHandler()
+        self.handler = RemoteCardHandler()
         self.dialog = None
         
         # Variables de control
@@ -1742,6 +2102,9 @@ class PhysicalCardChangePSCDialog:
         # Forzar actualización de lectores
         self.dialog.after(100, self.refresh_readers)
         
+        # Lectores y tarjetas se detectan automáticamente
+        self.start_card_monitor()
+        
         # Dar foco
         self.dialog.after(100, lambda: self.dialog.focus_force())
     
@@ -2101,41 +2464,45 @@ class PhysicalCardChangePSCDialog:
         if not messagebox.askyesno("Confirm PSC Change", confirm_msg):
             return
         
+        # El lector se lee aquí: el hilo de trabajo no toca los widgets
+        selected_reader = None
+        if self.reader_listbox.curselection():
+            selected_reader = self.reader_listbox.get(self.reader_listbox.curselection()[0])
+        
         # Ejecutar en hilo separado para no bloquear la UI
         threading.Thread(target=self._perform_psc_change, 
-                        args=(current_psc, new_psc, card_type, card_name), 
+                        args=(current_psc, new_psc, card_type, card_name, selected_reader), 
                         daemon=True).start()
     
-    def _perform_psc_change(self, current_psc, new_psc, card_type, card_name):
+    def _perform_psc_change(self, current_psc, new_psc, card_type, card_name, selected_reader):
         """Realizar el cambio de PSC en hilo separado"""
         try:
             # Actualizar UI
-            self.change_btn.configure(state='disabled')
-            self.status_text.set("Connecting to card reader...")
+            self.run_on_ui(self.change_btn.configure, state='disabled')
+            self.run_on_ui(self.status_text.set, "Connecting to card reader...")
             
             # 0. CONECTAR AL LECTOR
             # Verificar que hay un lector seleccionado
-            if not self.reader_listbox.curselection():
+            if selected_reader is None:
                 raise Exception("No card reader selected")
             
-            selected_reader = self.reader_listbox.get(self.reader_listbox.curselection()[0])
             if "No card readers found" in selected_reader:
                 raise Exception("No valid card reader available")
             
             # Conectar al lector seleccionado
-            self.status_text.set(f"Step 0/4: Connecting to {selected_reader}...")
+            self.run_on_ui(self.status_text.set, f"Step 0/4: Connecting to {selected_reader}...")
             if not self.handler.connect_to_reader(selected_reader):
                 raise Exception(f"Failed to connect to reader: {selected_reader}")
             
             # 1. SELECT CARD TYPE
-            self.status_text.set(f"Step 1/4: Selecting {card_name} card...")
+            self.run_on_ui(self.status_text.set, f"Step 1/4: Selecting {card_name} card...")
             
             success, message = self.handler.select_card(card_type)
             if not success:
                 raise Exception(f"SELECT CARD failed: {message}")
             
             # 2. PRESENT CURRENT PSC
-            self.status_text.set("Step 2/4: Presenting current PSC...")
+            self.run_on_ui(self.status_text.set, "Step 2/4: Presenting current PSC...")
             
             # Convertir PSC a lista de bytes
             current_psc_bytes = [int(current_psc[i:i+2], 16) for i in range(0, len(current_psc), 2)]
@@ -2144,7 +2511,7 @@ class PhysicalCardChangePSCDialog:
                 raise Exception(f"PRESENT PSC failed: {message}")
             
             # 3. CHANGE PSC
-            self.status_text.set("Step 3/4: Changing to new PSC...")
+            self.run_on_ui(self.status_text.set, "Step 3/4: Changing to new PSC...")
             
             # Convertir nuevo PSC a lista de bytes
             new_psc_bytes = [int(new_psc[i:i+2], 16) for i in range(0, len(new_psc), 2)]
@@ -2153,16 +2520,16 @@ class PhysicalCardChangePSCDialog:
                 raise Exception(f"CHANGE PSC failed: {message}")
             
             # 4. DESCONECTAR
-            self.status_text.set("Step 4/4: Disconnecting...")
-            self.handler.disconnect()
+            self.run_on_ui(self.status_text.set, "Step 4/4: Disconnecting...")
+            self.handler.release()
             
             # Éxito
-            self.status_text.set("PSC changed successfully!")
+            self.run_on_ui(self.status_text.set, "PSC changed successfully!")
             
             # Log en la interfaz principal
             current_psc_display = self.format_psc_for_display(current_psc)
             new_psc_display = self.format_psc_for_display(new_psc)
-            self.main_interface.log(f"PSC changed successfully on {card_name} card: {current_psc_display} → {new_psc_display}", "SUCCESS")
+            self.run_on_ui(self.main_interface.log, f"PSC changed successfully on {card_name} card: {current_psc_display} → {new_psc_display}", "SUCCESS")
             
             # Mostrar mensaje de éxito en un diálogo propio con botón Cerrar
             def show_success_dialog():
@@ -2217,23 +2584,303 @@ class PhysicalCardChangePSCDialog:
                 y = parent_y + (parent_height - height) // 2
                 dialog.geometry(f"{width}x{height}+{x}+{y}")
 
-            self.parent.after(0, show_success_dialog)
+            self.run_on_ui(show_success_dialog)
             
         except Exception as e:
             error_message = str(e)
-            self.status_text.set(f"Error: {error_message}")
+            self.run_on_ui(self.status_text.set, f"Error: {error_message}")
             
             # Log del error
-            self.main_interface.log(f"PSC change failed: {error_message}", "ERROR")
+            self.run_on_ui(self.main_interface.log, f"PSC change failed: {error_message}", "ERROR")
             
             # Mostrar error
-            self.parent.after(0, lambda: messagebox.showerror("PSC Change Failed", 
-                                                             f"Failed to change PSC: {error_message}"))
+            self.run_on_ui(messagebox.showerror, "PSC Change Failed",
+                           f"Failed to change PSC: {error_message}", parent=self.dialog)
         finally:
             # Reactivar botón
-            self.parent.after(0, lambda: self.change_btn.configure(state='normal'))
+            self.run_on_ui(self.change_btn.configure, state='normal')
     
     def close_dialog(self):
         """Cerrar el diálogo"""
         if self.dialog:
             self.dialog.destroy()
+
+
+class ProvisioningDialog:
+    """Diálogo de la estación de grabación: escribe en todos los lectores conectados a la vez"""
+    
+    # Colores del estado de cada lector
+    STATE_COLORS = {
+        'waiting': COLOR_TEXT_DISABLED,
+        'idle': COLOR_TEXT_DISABLED,
+        'writing': COLOR_PRIMARY_BLUE,
+        'done': COLOR_SUCCESS,
+        'remove': COLOR_SUCCESS,
+        'failed': COLOR_ERROR,
+        'error': COLOR_ERROR,
+        'stopped': COLOR_TEXT_DISABLED,
+    }
+    
+    def __init__(self, parent, session_manager):
+        self.parent = parent
+        self.session_manager = session_manager
+        self.handler = RemoteCardHandler()  # Solo lista los lectores; cada hilo de la estación tiene el suyo
+        self.dialog = None
+        self.station = None
+        self.readers = []
+        self.reader_rows = {}
+        
+        # Variables de control
+        self.source_var = tk.StringVar(value="active")
+        self.copies_var = tk.IntVar(value=1)
+        self.psc_type_var = tk.StringVar(value="factory")
+        self.custom_psc_var = tk.StringVar(value="")
+        self.differential_var = tk.BooleanVar(value=True)
+        self.verify_var = tk.BooleanVar(value=True)
+        self.summary_text = tk.StringVar(value="Ready")
+        
+        # Crear y mostrar el diálogo
+        self.create_dialog()
+    
+    def create_dialog(self):
+        """Crear la ventana del diálogo"""
+        self.dialog = tk.Toplevel(self.parent)
+        self.dialog.title("Provisioning Station")
+        self.dialog.configure(bg=COLOR_BG_MAIN)
+        self.dialog.resizable(False, False)
+        
+        # Configurar icono y modal
+        try:
+            self.dialog.iconbitmap(get_icon_path("etsisi"))
+        except:
+            pass
+        self.dialog.transient(self.parent)
+        self.dialog.grab_set()
+        self.dialog.protocol("WM_DELETE_WINDOW", self.close_dialog)
+        
+        main_frame = tk.Frame(self.dialog, bg=COLOR_BG_MAIN, padx=30, pady=20)
+        main_frame.pack(fill=tk.BOTH, expand=True)
+        
+        # Cabecera
+        tk.Label(main_frame, text="Provisioning Station", font=FONT_HEADER,
+                 fg=COLOR_TEXT_PRIMARY, bg=COLOR_BG_MAIN).pack()
+        tk.Label(main_frame, text="Write cards on every connected reader at the same time",
+                 font=FONT_NORMAL, fg=COLOR_TEXT_DISABLED, bg=COLOR_BG_MAIN).pack(pady=(5, 15))
+        
+        self.create_source_options(main_frame)
+        self.create_psc_options(main_frame)
+        self.create_reader_rows(main_frame)
+        
+        # Resumen
+        tk.Label(main_frame, textvariable=self.summary_text, font=FONT_NORMAL,
+                 fg=COLOR_TEXT_PRIMARY, bg=COLOR_BG_MAIN).pack(pady=(0, 15))
+        
+        self.create_buttons(main_frame)
+        
+        # Centrar diálogo
+        self.dialog.update_idletasks()
+        width = max(560, self.dialog.winfo_reqwidth())
+        height = self.dialog.winfo_reqheight()
+        x = self.parent.winfo_rootx() + (self.parent.winfo_width() - width) // 2
+        y = self.parent.winfo_rooty() + (self.parent.winfo_height() - height) // 2
+        self.dialog.geometry(f"{width}x{height}+{x}+{y}")
+    
+    def create_source_options(self, parent):
+        """Origen de las imágenes: sesión activa repetida o una tarjeta por sesión abierta"""
+        source_frame = tk.LabelFrame(parent, text="Card Images", font=FONT_NORMAL,
+                                     fg=COLOR_TEXT_PRIMARY, bg=COLOR_BG_MAIN)
+        source_frame.pack(fill=tk.X, pady=(0, 15))
+        
+        active_row = tk.Frame(source_frame, bg=COLOR_BG_MAIN)
+        active_row.pack(fill=tk.X, padx=10, pady=(10, 5))
+        tk.Radiobutton(active_row, text="Active session image, copies:", variable=self.source_var,
+                       value="active", font=FONT_NORMAL, fg=COLOR_TEXT_PRIMARY,
+                       bg=COLOR_BG_MAIN, selectcolor=COLOR_BG_PANEL).pack(side=tk.LEFT)
+        tk.Spinbox(active_row, from_=1, to=999, width=5, textvariable=self.copies_var,
+                   font=FONT_NORMAL).pack(side=tk.LEFT, padx=(5, 0))
+        
+        open_sessions = len(self.session_manager.get_all_sessions())
+        tk.Radiobutton(source_frame, text=f"One personalized card per open session ({open_sessions})",
+                       variable=self.source_var, value="sessions", font=FONT_NORMAL,
+                       fg=COLOR_TEXT_PRIMARY, bg=COLOR_BG_MAIN,
+                       selectcolor=COLOR_BG_PANEL).pack(anchor=tk.W, padx=10, pady=(0, 5))
+        
+        options_row = tk.Frame(source_frame, bg=COLOR_BG_MAIN)
+        options_row.pack(fill=tk.X, padx=10, pady=(0, 10))
+        tk.Checkbutton(options_row, text="Only write changed bytes", variable=self.differential_var,
+                       font=FONT_NORMAL, fg=COLOR_TEXT_PRIMARY, bg=COLOR_BG_MAIN,
+                       selectcolor=COLOR_BG_PANEL).pack(side=tk.LEFT)
+        tk.Checkbutton(options_row, text="Verify by readback", variable=self.verify_var,
+                       font=FONT_NORMAL, fg=COLOR_TEXT_PRIMARY, bg=COLOR_BG_MAIN,
+                       selectcolor=COLOR_BG_PANEL).pack(side=tk.LEFT, padx=(15, 0))
+    
+    def create_psc_options(self, parent):
+        """PSC actual de las tarjetas en blanco"""
+        psc_frame = tk.LabelFrame(parent, text="Blank Card PSC", font=FONT_NORMAL,
+                                  fg=COLOR_TEXT_PRIMARY, bg=COLOR_BG_MAIN)
+        psc_frame.pack(fill=tk.X, pady=(0, 15))
+        
+        row = tk.Frame(psc_frame, bg=COLOR_BG_MAIN)
+        row.pack(fill=tk.X, padx=10, pady=10)
+        tk.Radiobutton(row, text="Factory", variable=self.psc_type_var, value="factory",
+                       font=FONT_NORMAL, fg=COLOR_TEXT_PRIMARY, bg=COLOR_BG_MAIN,
+                       selectcolor=COLOR_BG_PANEL).pack(side=tk.LEFT)
+        tk.Radiobutton(row, text="Custom (hex):", variable=self.psc_type_var, value="custom",
+                       font=FONT_NORMAL, fg=COLOR_TEXT_PRIMARY, bg=COLOR_BG_MAIN,
+                       selectcolor=COLOR_BG_PANEL).pack(side=tk.LEFT, padx=(15, 5))
+        tk.Entry(row, textvariable=self.custom_psc_var, width=10, font=FONT_NORMAL).pack(side=tk.LEFT)
+    
+    def create_reader_rows(self, parent):
+        """Una fila de estado y progreso por lector conectado"""
+        readers_frame = tk.LabelFrame(parent, text="Readers", font=FONT_NORMAL,
+                                      fg=COLOR_TEXT_PRIMARY, bg=COLOR_BG_MAIN)
+        readers_frame.pack(fill=tk.X, pady=(0, 15))
+        readers_frame.grid_columnconfigure(1, weight=1)
+        
+        self.readers = self.handler.get_available_readers()
+        if not self.readers:
+            tk.Label(readers_frame, text="No card readers detected", font=FONT_NORMAL,
+                     fg=COLOR_TEXT_DISABLED, bg=COLOR_BG_MAIN).grid(row=0, column=0, padx=10, pady=10)
+            return
+        
+        for row, reader_name in enumerate(self.readers):
+            tk.Label(readers_frame, text=reader_name, font=FONT_SMALL, fg=COLOR_TEXT_PRIMARY,
+                     bg=COLOR_BG_MAIN, anchor=tk.W, width=24).grid(row=row * 2, column=0, sticky='w',
+                                                                   padx=10, pady=(8, 0))
+            progress_var = tk.DoubleVar()
+            ttk.Progressbar(readers_frame, variable=progress_var, maximum=100,
+                            length=220).grid(row=row * 2, column=1, sticky='ew', padx=(0, 10), pady=(8, 0))
+            status_label = tk.Label(readers_frame, text="Idle", font=FONT_SMALL,
+                                    fg=COLOR_TEXT_DISABLED, bg=COLOR_BG_MAIN, anchor=tk.W)
+            status_label.grid(row=row * 2 + 1, column=0, columnspan=2, sticky='w', padx=10, pady=(0, 4))
+            self.reader_rows[reader_name] = {'progress': progress_var, 'status': status_label}
+    
+    def create_buttons(self, parent):
+        """Botones Start / Stop / Close"""
+        button_frame = tk.Frame(parent, bg=COLOR_BG_MAIN)
+        button_frame.pack()
+        
+        self.start_btn = tk.Button(button_frame, text="Start", command=self.start_provisioning,
+                                   bg=COLOR_BUTTON_PRIMARY, fg=COLOR_TEXT_BUTTON_ENABLED,
+                                   font=FONT_BOLD, width=10, relief=tk.FLAT, cursor="hand2")
+        self.start_btn.pack(side=tk.LEFT, padx=(0, 10))
+        if not self.readers:
+            self.start_btn.config(state=tk.DISABLED)
+        
+        self.stop_btn = tk.Button(button_frame, text="Stop", command=self.stop_provisioning,
+                                  bg=COLOR_BUTTON_SECONDARY, fg=COLOR_TEXT_PRIMARY,
+                                  font=FONT_NORMAL, width=10, relief=tk.FLAT, state=tk.DISABLED)
+        self.stop_btn.pack(side=tk.LEFT, padx=(0, 10))
+        
+        tk.Button(button_frame, text="Close", command=self.close_dialog,
+                  bg=COLOR_BUTTON_SECONDARY, fg=COLOR_TEXT_PRIMARY,
+                  font=FONT_NORMAL, width=10, relief=tk.FLAT).pack(side=tk.LEFT)
+        
+        self.dialog.bind('<Escape>', lambda e: self.close_dialog())
+    
+    def get_custom_psc(self):
+        """PSC personalizado introducido en hexadecimal (None si se usa el de fábrica)"""
+        if self.psc_type_var.get() == "factory":
+            return None
+        try:
+            psc_bytes = [int(part, 16) for part in self.custom_psc_var.get().split()]
+        except ValueError:
+            raise ValueError("Custom PSC must be hex bytes separated by spaces (e.g. 12 34 56)")
+        if not 2 <= len(psc_bytes) <= 3 or any(not 0 <= b <= 255 for b in psc_bytes):
+            raise ValueError("Custom PSC must be 3 bytes for SLE5542 or 2 bytes for SLE5528")
+        return psc_bytes
+    
+    def build_jobs(self):
+        """Prepara las imágenes a grabar según el origen elegido"""
+        psc = self.get_custom_psc()
+        
+        if self.source_var.get() == "active":
+            session = self.session_manager.get_active_session()
+            if not session:
+                raise ValueError("No active session available")
+            card_type = int(session.memory_manager.card_type)
+            data = session.memory_manager.get_memory_dump()
+            copies = max(1, int(self.copies_var.get()))
+            return [make_job(f"{session.card_name} #{index + 1}", card_type, data, psc)
+                    for index in range(copies)]
+        
+        # Las sesiones hibernadas se leen de su snapshot sin rehidratarlas
+        jobs = []
+        for session in self.session_manager.get_all_sessions():
+            data = self.session_manager.get_memory_dump(session.session_id)
+            if data is None:
+                continue
+            jobs.append(make_job(session.card_name, int(session.card_type), data, psc))
+        if not jobs:
+            raise ValueError("There are no open sessions to provision")
+        return jobs
+    
+    def start_provisioning(self):
+        """Arranca un hilo de trabajo por lector"""
+        try:
+            jobs = self.build_jobs()
+        except (ValueError, tk.TclError) as e:
+            messagebox.showerror("Provisioning", str(e), parent=self.dialog)
+            return
+        
+        if not messagebox.askyesno("Confirm Provisioning",
+                                   f"{len(jobs)} card(s) will be written on {len(self.readers)} reader(s).\n\n"
+                                   "Insert blank cards; each reader starts as soon as a card is inserted.",
+                                   icon='warning', parent=self.dialog):
+            return
+        
+        self.station = ProvisioningStation(jobs, self.readers,
+                                           differential=self.differential_var.get(),
+                                           verify=self.verify_var.get())
+        self.start_btn.config(state=tk.DISABLED)
+        self.stop_btn.config(state=tk.NORMAL)
+        self.station.start()
+        self.poll_events()
+    
+    def stop_provisioning(self):
+        """Para la estación al terminar las tarjetas en curso"""
+        if self.station:
+            self.station.stop()
+            self.stop_btn.config(state=tk.DISABLED)
+            self.summary_text.set("Stopping after the cards in progress...")
+    
+    def poll_events(self):
+        """Vacía la cola de eventos de los hilos y actualiza las filas (hilo de Tk)"""
+        if not self.station or not self.dialog.winfo_exists():
+            return
+        
+        while True:
+            try:
+                event = self.station.events.get_nowait()
+            except queue.Empty:
+                break
+            row = self.reader_rows.get(event['reader'])
+            if row is None:
+                continue
+            row['progress'].set(event['progress'] * 100)
+            text = f"{event['label']}: {event['message']}" if event['label'] else event['message']
+            row['status'].config(text=text, fg=self.STATE_COLORS.get(event['state'], COLOR_TEXT_PRIMARY))
+        
+        summary = self.station.get_summary()
+        self.summary_text.set(f"Written: {summary['succeeded']}/{summary['total']}   "
+                              f"Failed cards: {summary['failed_cards']}   "
+                              f"Elapsed: {summary['elapsed']:.0f} s")
+        
+        if self.station.is_running():
+            self.dialog.after(100, self.poll_events)
+        else:
+            self.start_btn.config(state=tk.NORMAL)
+            self.stop_btn.config(state=tk.DISABLED)
+            if summary['remaining'] == 0:
+                self.summary_text.set(self.summary_text.get() + "   - Finished")
+    
+    def close_dialog(self):
+        """Cerrar el diálogo (detiene la estación si sigue en marcha)"""
+        if self.station and self.station.is_running():
+            if not messagebox.askyesno("Provisioning Running",
+                                       "Provisioning is still running. Stop it and close?",
+                                       parent=self.dialog):
+                return
+            self.station.stop()
+        self.dialog.destroy()
+        threading.Thread(target=self.handler.close, daemon=True).start()
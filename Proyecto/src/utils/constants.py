@@ -24,12 +24,42 @@ STATUS_PSC_VERIFIED = "PSC verified - Write access enabled"
 # Tipos de tarjetas
 CARD_TYPE_5542 = 5542
 CARD_TYPE_5528 = 5528
+CARD_TYPE_AUTO = "auto"  # Tarjetas físicas: tipo detectado por el ATR
 
 # Tamaños de memoria
 MEMORY_SIZE_5542 = 256  # bytes
 MEMORY_SIZE_5528 = 1024  # bytes (1KB)
 PAGES_5528 = 4  # 4 páginas de 256 bytes cada una
 
+# Hibernación de sesiones inactivas (política LRU)
+SESSION_MAX_RESIDENT = 8                 # Sesiones completas en memoria como máximo
+SESSION_HIBERNATE_AFTER_SECONDS = 15 * 60  # Inactividad antes de hibernar una sesión
+SESSION_HIBERNATION_CHECK_MS = 60 * 1000   # Intervalo de revisión desde la interfaz
+
+# Escritura diferencial en tarjetas físicas
+PHYSICAL_WRITE_MAX_GAP = 8  # Bytes sin cambios que se reenvían para no partir una escritura en dos APDUs
+
+# Estación de grabación con varios lectores
+PROVISIONING_POLL_SECONDS = 0.3    # Intervalo de comprobación de inserción/extracción de tarjeta
+PROVISIONING_MAX_ATTEMPTS = 3      # Intentos por imagen antes de darla por fallida
+
+# Monitor de lectores y tarjetas
+CARD_MONITOR_POLL_SECONDS = 0.5    # Sondeo de respaldo si no hay monitores de pyscard
+CARD_MONITOR_GUI_POLL_MS = 200     # Frecuencia con la que los diálogos vacían su cola de eventos
+
+# Proceso de E/S PC/SC
+PCSC_APDU_TIMEOUT_SECONDS = 5.0          # Tiempo sin respuesta del lector antes de reiniciar el proceso
+PCSC_WORKER_START_TIMEOUT_SECONDS = 30.0  # Arranque del proceso (importar pyscard)
+UI_UPDATE_POLL_MS = 50                   # Frecuencia con la que los diálogos aplican los cambios de los hilos
+APDU_METRICS_MAX_OPERATIONS = 100        # Lecturas/escrituras completas que se conservan en el diagnóstico
+PROFILING_MAX_RECORDS = 200              # Acciones perfiladas que se conservan para la tabla de las más lentas
+PROFILING_DIR_NAME = "profiles"          # Subdirectorio de config donde se escriben los .prof
+INSTRUMENTATION_REFRESH_MS = 1000        # Refresco de la tabla de tiempos en vivo del diagnóstico
+
+# Servidor vpcd (lectores PC/SC virtuales para herramientas externas)
+VPCD_HOST = "127.0.0.1"      # Solo conexiones locales
+VPCD_BASE_PORT = 35963       # Puerto de la ranura 0 (puerto por defecto de vpcd); la ranura n usa el siguiente n
+
 # Estados de la aplicación
 STATE_NO_CARD = "no_card"
 STATE_CARD_CREATED = "card_created"
@@ -358,3 +388,15 @@ Apellido1:
 Apellido2: 
 NumeroMatricula: 
 Curso: """
+
+# Generación masiva desde un roster CSV: columna -> (dirección, longitud en bytes)
+# Dentro del área de usuario común a SLE5542 y SLE5528 (0x20-0xFA)
+ROSTER_FIELD_LAYOUT = {
+    'Nombre': (0x20, 32),
+    'Apellido1': (0x40, 32),
+    'Apellido2': (0x60, 32),
+    'NumeroMatricula': (0x80, 16),
+    'Curso': (0x90, 16),
+}
+ROSTER_PAD_BYTE = 0x00  # Relleno de los campos más cortos que su longitud
+ROSTER_NAME_PATTERN = "{NumeroMatricula}"  # Nombre de cada tarjeta y de su fichero
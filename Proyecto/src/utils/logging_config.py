@@ -0,0 +1,60 @@
+"""
+Configuración del registro (logging) de CardSIM
+
+Cada módulo usa su propio logger (logging.getLogger(__name__)) con formato
+perezoso al estilo %: si el nivel del mensaje está desactivado no se llega a
+formatear ni a escribir en consola. Por defecto se registra desde INFO; el
+detalle de cada APDU, cada escritura o cada línea de fichero es DEBUG y se
+activa con --log-level DEBUG o desde Settings.
+"""
+
+import logging
+import sys
+
+LOG_LEVELS = ('DEBUG', 'INFO', 'WARNING', 'ERROR')
+DEFAULT_LOG_LEVEL = 'INFO'
+LOG_FORMAT = "%(asctime)s %(levelname)-7s %(name)s: %(message)s"
+
+_console_handler = None
+
+
+def normalize_log_level(level):
+    """Nombre de nivel válido en mayúsculas (None si no se reconoce)"""
+    if not level:
+        return None
+    level = str(level).strip().upper()
+    return level if level in LOG_LEVELS else None
+
+
+def configure_logging(level=None):
+    """Instala el handler de consola (una sola vez por proceso) y fija el nivel"""
+    global _console_handler
+    if _console_handler is None:
+        _console_handler = logging.StreamHandler(sys.stdout)
+        _console_handler.setFormatter(logging.Formatter(LOG_FORMAT, "%H:%M:%S"))
+        logging.getLogger().addHandler(_console_handler)
+    set_log_level(level)
+
+
+def set_log_level(level):
+    """Cambia el nivel de todos los loggers de la aplicación (DEFAULT_LOG_LEVEL si no es válido)"""
+    level = normalize_log_level(level) or DEFAULT_LOG_LEVEL
+    logging.getLogger().setLevel(level)
+    return level
+
+
+def get_log_level():
+    """Nivel actual como nombre ('DEBUG', 'INFO'...)"""
+    return logging.getLevelName(logging.getLogger().level)
+
+
+class HexBytes:
+    """Bytes que se formatean en hexadecimal solo si el mensaje se llega a emitir"""
+
+    __slots__ = ('data',)
+
+    def __init__(self, data):
+        self.data = data
+
+    def __str__(self):
+        return " ".join(f"{b:02X}" for b in self.data) if self.data else ""
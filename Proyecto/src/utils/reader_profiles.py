@@ -0,0 +1,98 @@
+"""
+Perfiles de capacidad de los lectores de tarjetas (caché persistente por nombre de lector)
+"""
+
+import json
+import logging
+import sys
+import threading
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Valores supuestos para un lector que todavía no se ha sondeado
+DEFAULT_READER_PROFILE = {
+    'max_read_length': 255,
+    'max_write_length': 255,
+    'probed': False,              # Solo _probe_reader lo pone a True
+    'rtt_ms': 20.0,               # Ida y vuelta de una APDU mínima
+    'read_ms_per_byte': 0.1,      # Coste adicional por byte leído
+    'write_ms_per_byte': 2.5,     # Coste adicional por byte escrito (EEPROM)
+}
+
+
+class ReaderProfileManager:
+    """Guarda en disco el resultado del sondeo de cada lector para no repetirlo"""
+
+    def __init__(self):
+        self.config_dir = self._get_config_directory()
+        self.profiles_file = self.config_dir / "reader_profiles.json"
+        self._profiles = {}
+        self._lock = threading.Lock()  # Varios lectores pueden guardar a la vez
+        self._load_profiles()
+
+    def _get_config_directory(self):
+        """Obtiene el directorio de configuración según el contexto de ejecución"""
+        try:
+            # Si estamos en un ejecutable empaquetado (PyInstaller)
+            if getattr(sys, 'frozen', False) and hasattr(sys, '_MEIPASS'):
+                return Path(sys.executable).parent / "config"
+            # Modo desarrollo - directorio del proyecto
+            return Path(__file__).parent.parent.parent / "config"
+        except Exception:
+            # Fallback - directorio actual
+            return Path.cwd() / "config"
+
+    def _load_profiles(self):
+        """Carga los perfiles desde el archivo"""
+        try:
+            if self.profiles_file.exists():
+                with open(self.profiles_file, 'r', encoding='utf-8') as f:
+                    self._profiles = json.load(f)
+        except Exception as e:
+            logger.warning("Could not load reader profiles: %s", e)
+            self._profiles = {}
+
+    def _save_profiles(self):
+        """Guarda los perfiles en el archivo"""
+        try:
+            self.config_dir.mkdir(exist_ok=True)
+            with open(self.profiles_file, 'w', encoding='utf-8') as f:
+                json.dump(self._profiles, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            logger.warning("Could not save reader profiles: %s", e)
+
+    def has_profile(self, reader_name):
+        """
+        Indica si el lector ya se ha sondeado.
+        Los datos parciales (tiempos de escritura aprendidos, máximo reducido tras un
+        6700) no cuentan: el lector sigue necesitando el sondeo.
+        """
+        return self._profiles.get(reader_name, {}).get('probed', False)
+
+    def get_profile(self, reader_name):
+        """Devuelve el perfil del lector (o los valores por defecto si no se ha sondeado)"""
+        profile = dict(DEFAULT_READER_PROFILE)
+        profile.update(self._profiles.get(reader_name, {}))
+        return profile
+
+    def save_profile(self, reader_name, profile):
+        """Guarda (o actualiza) el perfil de un lector"""
+        with self._lock:
+            stored = self._profiles.get(reader_name, {})
+            stored.update(profile)
+            if profile.get('probed'):
+                stored['probed_at'] = time.strftime("%Y-%m-%d %H:%M:%S")
+            self._profiles[reader_name] = stored
+            self._save_profiles()
+
+    def forget_profile(self, reader_name):
+        """Elimina el perfil de un lector para volver a sondearlo"""
+        with self._lock:
+            if self._profiles.pop(reader_name, None) is not None:
+                self._save_profiles()
+
+
+# Instancia global del manager
+reader_profile_manager = ReaderProfileManager()
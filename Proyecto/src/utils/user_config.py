@@ -16,6 +16,7 @@ class UserConfigManager:
         self.config_dir = self._get_config_directory()
         self.config_file = self.config_dir / "user_config.json"
         self._user_info = ""
+        self._log_level = None  # Nivel de logging elegido en Settings (None = por defecto)
         self._load_config()
     
     def _get_config_directory(self):
@@ -49,6 +50,7 @@ class UserConfigManager:
                 with open(self.config_file, 'r', encoding='utf-8') as f:
                     config = json.load(f)
                     self._user_info = config.get('user_info', '')
+                    self._log_level = config.get('log_level')
         except Exception as e:
             print(f"Warning: Could not load user config: {e}")
             self._user_info = ""
@@ -58,7 +60,8 @@ class UserConfigManager:
         try:
             self._ensure_config_dir()
             config = {
-                'user_info': self._user_info
+                'user_info': self._user_info,
+                'log_level': self._log_level
             }
             with open(self.config_file, 'w', encoding='utf-8') as f:
                 json.dump(config, f, ensure_ascii=False, indent=2)
@@ -75,6 +78,17 @@ class UserConfigManager:
         """Establece la información del usuario y la guarda"""
         self._user_info = value
         self.save_config()
+    
+    @property
+    def log_level(self):
+        """Obtiene el nivel de logging guardado (None si no se ha elegido)"""
+        return self._log_level
+    
+    @log_level.setter
+    def log_level(self, value):
+        """Establece el nivel de logging y lo guarda"""
+        self._log_level = value
+        self.save_config()
 
 
 # Instancia global del manager
@@ -0,0 +1,16 @@
+"""
+Pruebas de comportamiento del núcleo de CardSIM
+
+Se ejecutan sin hardware ni pyscard desde el directorio Proyecto:
+
+    python -m unittest discover tests
+"""
+
+import os
+import sys
+
+# Mismo path que main.py: el núcleo importa también src/utils como "utils"
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (PROJECT_DIR, os.path.join(PROJECT_DIR, 'src')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
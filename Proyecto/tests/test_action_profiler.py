@@ -0,0 +1,95 @@
+"""Perfilado de acciones: ficheros .prof, summary.csv, acciones anidadas e hilos"""
+
+import csv
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from tests import PROJECT_DIR  # noqa: F401  (configura sys.path)
+from src.core import action_profiler as action_profiler_module
+from src.core.action_profiler import ActionProfiler, SUMMARY_FILENAME, profiled_action
+
+
+class ActionProfilerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.profiler = ActionProfiler(max_records=3)
+        patcher = mock.patch.object(action_profiler_module, 'action_profiler', self.profiler)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.output_dir = Path(directory.name) / "profiles"
+
+    def profile_files(self):
+        return sorted(self.output_dir.glob("*.prof"))
+
+    def test_disabled_decorator_only_calls_the_function(self):
+        action = profiled_action("Read Memory")(lambda value: value * 2)
+        self.assertEqual(action(21), 42)
+        self.assertEqual(self.profiler.summary(), [])
+        self.assertFalse(self.output_dir.exists())
+
+    def test_enabled_actions_write_profiles_and_summary(self):
+        success, _ = self.profiler.enable(self.output_dir)
+        self.assertTrue(success)
+        action = profiled_action("Open Card/File")(lambda: sum(range(1000)))
+        action()
+        action()
+
+        self.assertEqual(len(self.profile_files()), 2)
+        self.assertTrue(all("Open_Card_File" in path.name for path in self.profile_files()))
+        row, = self.profiler.summary()
+        self.assertEqual((row['action'], row['count']), ("Open Card/File", 2))
+        with open(self.output_dir / SUMMARY_FILENAME, newline='', encoding='utf-8') as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual([(row['action'], row['count']) for row in rows], [("Open Card/File", "2")])
+
+    def test_nested_actions_are_profiled_as_the_outer_one(self):
+        self.profiler.enable(self.output_dir)
+        inner = profiled_action("Inner")(lambda: None)
+        outer = profiled_action("Outer")(lambda: inner())
+        outer()
+        self.assertEqual([row['action'] for row in self.profiler.summary()], ["Outer"])
+        self.assertEqual(len(self.profile_files()), 1)
+
+    def test_actions_off_the_main_thread_are_not_profiled(self):
+        self.profiler.enable(self.output_dir)
+        results = []
+        action = profiled_action("Worker")(lambda: results.append(True))
+        thread = threading.Thread(target=action)
+        thread.start()
+        thread.join()
+        self.assertEqual(results, [True])
+        self.assertEqual(self.profiler.summary(), [])
+
+    def test_summary_is_sorted_and_records_are_bounded(self):
+        self.profiler.enable(self.output_dir)
+        for action, seconds in (("fast", 0.001), ("slow", 0.050), ("fast", 0.002), ("medium", 0.010)):
+            self.profiler._record(action, seconds, mock.Mock())
+        self.assertEqual([row['action'] for row in self.profiler.summary()], ["slow", "medium", "fast"])
+        self.assertEqual(len(self.profiler.records), 3)
+        self.assertEqual(self.profiler.slowest(1)[0]['action'], "slow")
+
+        self.profiler.disable()
+        self.assertFalse(self.profiler.enabled)
+        self.profiler.clear()
+        self.assertEqual(self.profiler.summary(), [])
+
+    def test_exceptions_still_record_the_call(self):
+        self.profiler.enable(self.output_dir)
+
+        @profiled_action("Failing")
+        def failing():
+            raise RuntimeError("boom")
+
+        with self.assertRaises(RuntimeError):
+            failing()
+        self.assertEqual(self.profiler.summary()[0]['count'], 1)
+        self.assertFalse(self.profiler._profiling)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,134 @@
+"""Latencias por APDU: clasificación, histogramas, operaciones y registro desde el handler"""
+
+import unittest
+
+from tests import PROJECT_DIR  # noqa: F401  (configura sys.path)
+from tests.virtual_readers import SimCard, RecordingReader, install_readers
+from src.utils.constants import CARD_TYPE_5542
+from src.core.apdu_metrics import (ApduMetrics, LatencyHistogram, classify_apdu, merge_snapshots,
+                                   latency_rows, apdu_metrics)
+from src.core.physical_card_handler import PhysicalCardHandler
+
+
+READ_APDU = [0xFF, 0xB0, 0x00, 0x20, 0x04]
+WRITE_APDU = [0xFF, 0xD0, 0x00, 0x20, 0x03, 0x01, 0x02, 0x03]
+
+
+class ClassifyApduTest(unittest.TestCase):
+
+    def test_reader_commands(self):
+        self.assertEqual(classify_apdu([0xFF, 0xA4, 0x00, 0x00, 0x01, 0x06]), 'SELECT')
+        self.assertEqual(classify_apdu(READ_APDU), 'READ')
+        self.assertEqual(classify_apdu(WRITE_APDU), 'WRITE')
+        self.assertEqual(classify_apdu([0xFF, 0xB1, 0x00, 0x00, 0x04]), 'READ_EC')
+
+    def test_unknown_commands(self):
+        self.assertEqual(classify_apdu([0x00, 0xB0, 0x00, 0x00]), 'OTHER')
+        self.assertEqual(classify_apdu([0xFF, 0x99]), 'OTHER')
+        self.assertEqual(classify_apdu([0xFF]), 'OTHER')
+
+
+class LatencyHistogramTest(unittest.TestCase):
+
+    def test_percentiles_are_within_a_bucket(self):
+        histogram = LatencyHistogram()
+        for milliseconds in range(1, 101):
+            histogram.add(milliseconds / 1000.0)
+        self.assertEqual(histogram.count, 100)
+        self.assertAlmostEqual(histogram.percentile(0.50), 0.050, delta=0.005)
+        self.assertAlmostEqual(histogram.percentile(0.95), 0.095, delta=0.010)
+        self.assertEqual(histogram.percentile(1.0), 0.100)
+
+    def test_empty_histogram(self):
+        summary = LatencyHistogram().summary()
+        self.assertEqual((summary['count'], summary['p50_ms'], summary['mean_ms']), (0, 0.0, 0.0))
+
+    def test_merge_adds_counts_bytes_and_errors(self):
+        first, second = LatencyHistogram(), LatencyHistogram()
+        first.add(0.001, 4)
+        second.add(0.003, 8, ok=False)
+        first.merge(second)
+        self.assertEqual((first.count, first.bytes, first.errors), (2, 12, 1))
+        self.assertEqual(first.max_seconds, 0.003)
+
+    def test_out_of_range_latency_uses_the_maximum(self):
+        histogram = LatencyHistogram()
+        histogram.add(1000.0)
+        self.assertEqual(histogram.percentile(0.5), 1000.0)
+
+
+class ApduMetricsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.metrics = ApduMetrics(max_operations=2)
+
+    def test_bytes_are_counted_for_reads_and_successful_writes(self):
+        self.metrics.record("R", READ_APDU, [1, 2, 3, 4], 0x90, 0x00, 0.001)
+        self.metrics.record("R", WRITE_APDU, [], 0x90, 0x00, 0.002)
+        self.metrics.record("R", WRITE_APDU, [], 0x62, 0x00, 0.002)
+        histograms = self.metrics.snapshot()['histograms']
+        self.assertEqual(histograms[("R", 'READ')].bytes, 4)
+        self.assertEqual((histograms[("R", 'WRITE')].bytes, histograms[("R", 'WRITE')].errors), (3, 1))
+
+    def test_operations_without_apdus_are_discarded(self):
+        self.metrics.end_operation(self.metrics.begin_operation("R", 'read', CARD_TYPE_5542))
+        self.assertEqual(self.metrics.snapshot()['operations'], [])
+
+    def test_only_the_last_operations_are_kept(self):
+        for name in ('first', 'second', 'third'):
+            operation = self.metrics.begin_operation("R", name, CARD_TYPE_5542)
+            self.metrics.record("R", READ_APDU, [0] * 4, 0x90, 0x00, 0.001, operation)
+            self.metrics.end_operation(operation)
+        operations = self.metrics.snapshot()['operations']
+        self.assertEqual([operation['operation'] for operation in operations], ['second', 'third'])
+        self.assertEqual((operations[-1]['count'], operations[-1]['bytes']), (1, 4))
+
+    def test_snapshot_is_a_copy(self):
+        self.metrics.record("R", READ_APDU, [0] * 4, 0x90, 0x00, 0.001)
+        snapshot = self.metrics.snapshot()
+        self.metrics.reset()
+        self.assertEqual(snapshot['histograms'][("R", 'READ')].count, 1)
+        self.assertEqual(self.metrics.snapshot()['histograms'], {})
+
+    def test_merge_snapshots_and_rows(self):
+        other = ApduMetrics()
+        self.metrics.record("A", READ_APDU, [0] * 4, 0x90, 0x00, 0.001)
+        other.record("A", READ_APDU, [0] * 4, 0x90, 0x00, 0.002)
+        other.record("B", WRITE_APDU, [], 0x90, 0x00, 0.002)
+        merged = merge_snapshots(self.metrics.snapshot(), None, other.snapshot())
+        rows = latency_rows(merged)
+        self.assertEqual([(row['reader'], row['apdu_class'], row['count']) for row in rows],
+                         [("A", 'READ', 2), ("B", 'WRITE', 1)])
+
+
+class HandlerMetricsTest(unittest.TestCase):
+    """Las APDUs de PhysicalCardHandler quedan registradas en apdu_metrics"""
+
+    def setUp(self):
+        apdu_metrics.reset()
+        self.addCleanup(apdu_metrics.reset)
+        self.card = SimCard(CARD_TYPE_5542)
+        self.reader = RecordingReader("Metrics Reader", self.card)
+        install_readers(self, self.reader)
+        self.handler = PhysicalCardHandler()
+        self.assertTrue(self.handler.connect_to_reader(self.reader.name))
+
+    def test_full_read_is_recorded_as_one_operation(self):
+        data, message = self.handler.read_full_card(CARD_TYPE_5542)
+        self.assertEqual(data, self.card.memory(), message)
+        snapshot = self.handler.get_apdu_metrics()
+        read_apdus = sum(1 for apdu in self.reader.sent if apdu[1] == 0xB0)
+        self.assertEqual(snapshot['histograms'][(self.reader.name, 'READ')].count, read_apdus)
+        self.assertEqual(snapshot['histograms'][(self.reader.name, 'READ')].bytes, 256)
+        operation, = snapshot['operations']
+        self.assertEqual((operation['operation'], operation['reader'], operation['bytes']),
+                         ('read', self.reader.name, 256))
+
+    def test_reset(self):
+        self.handler.read_full_card(CARD_TYPE_5542)
+        self.handler.reset_apdu_metrics()
+        self.assertEqual(self.handler.get_apdu_metrics()['operations'], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
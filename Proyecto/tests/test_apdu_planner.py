@@ -0,0 +1,177 @@
+"""Planificación de APDUs: huecos protegidos, páginas, longitud máxima y diferencias"""
+
+import unittest
+
+from tests import PROJECT_DIR  # noqa: F401  (configura sys.path)
+from tests.virtual_readers import SimCard, RecordingReader, install_readers
+from src.utils.constants import CARD_TYPE_5542, CARD_TYPE_5528
+from src.core.apdu_planner import (subtract_holes, plan_chunks, plan_card_read, plan_card_write,
+                                   diff_ranges, get_card_profile)
+from src.core.physical_card_handler import PhysicalCardHandler
+
+
+def covered(chunks):
+    """Direcciones cubiertas por las APDUs, en orden"""
+    return [address for start, length in chunks for address in range(start, start + length)]
+
+
+class SubtractHolesTest(unittest.TestCase):
+
+    def test_hole_in_the_middle_splits_the_range(self):
+        self.assertEqual(subtract_holes(0, 99, [(10, 19)]), [(0, 9), (20, 99)])
+
+    def test_holes_at_the_edges_and_outside(self):
+        self.assertEqual(subtract_holes(0x20, 0x3FF, [(0x000, 0x01F), (0x3FD, 0x3FF)]), [(0x20, 0x3FC)])
+        self.assertEqual(subtract_holes(0x20, 0x30, [(0x40, 0x50)]), [(0x20, 0x30)])
+
+    def test_range_inside_a_hole_is_empty(self):
+        self.assertEqual(subtract_holes(0x05, 0x10, [(0x00, 0x1F)]), [])
+
+
+class PlanChunksTest(unittest.TestCase):
+
+    def assert_valid_plan(self, chunks, start, end, max_length, holes=(), page_size=256):
+        expected = [address for start_, end_ in subtract_holes(start, end, holes)
+                    for address in range(start_, end_ + 1)]
+        self.assertEqual(covered(chunks), expected)
+        for address, length in chunks:
+            self.assertGreaterEqual(length, 1)
+            self.assertLessEqual(length, max_length)
+            self.assertEqual(address // page_size, (address + length - 1) // page_size,
+                             f"chunk 0x{address:03X}+{length} crosses a page")
+
+    def test_full_page_is_split_evenly(self):
+        chunks = plan_chunks(0x000, 0x0FF, 255)
+        self.assertEqual(chunks, [(0x000, 128), (0x080, 128)])
+
+    def test_chunks_never_cross_pages(self):
+        chunks = plan_chunks(0x0F0, 0x21F, 255)
+        self.assert_valid_plan(chunks, 0x0F0, 0x21F, 255)
+        self.assertEqual(chunks[0], (0x0F0, 16))
+
+    def test_small_max_length(self):
+        for max_length in (1, 7, 16, 100):
+            with self.subTest(max_length=max_length):
+                self.assert_valid_plan(plan_chunks(0x20, 0x3FC, max_length), 0x20, 0x3FC, max_length)
+
+    def test_max_length_is_clamped_to_short_apdu(self):
+        chunks = plan_chunks(0x000, 0x3FF, 1000)
+        self.assertTrue(all(length <= 255 for _, length in chunks))
+        self.assertEqual(len(chunks), 8)
+
+    def test_protected_holes_are_skipped(self):
+        holes = [(0x000, 0x01F), (0x3FD, 0x3FF)]
+        chunks = plan_chunks(0x000, 0x3FF, 64, holes=holes)
+        self.assert_valid_plan(chunks, 0x000, 0x3FF, 64, holes)
+        addresses = set(covered(chunks))
+        self.assertFalse(addresses & set(range(0x000, 0x020)))
+        self.assertFalse(addresses & {0x3FD, 0x3FE, 0x3FF})
+
+    def test_hole_in_the_middle_of_a_page(self):
+        chunks = plan_chunks(0x100, 0x1FF, 255, holes=[(0x180, 0x18F)])
+        self.assert_valid_plan(chunks, 0x100, 0x1FF, 255, [(0x180, 0x18F)])
+        self.assertEqual(chunks, [(0x100, 128), (0x190, 112)])
+
+    def test_single_byte_and_empty_range(self):
+        self.assertEqual(plan_chunks(0x42, 0x42), [(0x42, 1)])
+        self.assertEqual(plan_chunks(0x10, 0x1F, holes=[(0x00, 0x1F)]), [])
+
+
+class CardPlansTest(unittest.TestCase):
+
+    def test_full_reads_cover_the_whole_card(self):
+        for card_type in (CARD_TYPE_5542, CARD_TYPE_5528):
+            with self.subTest(card_type=card_type):
+                size = get_card_profile(card_type)['size']
+                self.assertEqual(covered(plan_card_read(card_type)), list(range(size)))
+
+    def test_writes_skip_factory_and_psc_areas(self):
+        self.assertEqual(covered(plan_card_write(CARD_TYPE_5542)), list(range(0x20, 0x100)))
+        self.assertEqual(covered(plan_card_write(CARD_TYPE_5528)), list(range(0x20, 0x3FD)))
+
+    def test_partial_write_is_clipped_to_the_card(self):
+        self.assertEqual(covered(plan_card_write(CARD_TYPE_5542, 0xF0, 0x1FF)), list(range(0xF0, 0x100)))
+        self.assertEqual(plan_card_write(CARD_TYPE_5528, 0x3FD, 0x3FF), [])
+
+
+class DiffRangesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.current = [0] * 64
+
+    def changed(self, *addresses):
+        data = list(self.current)
+        for address in addresses:
+            data[address] = 0xAA
+        return data
+
+    def test_identical_data_has_no_ranges(self):
+        self.assertEqual(diff_ranges(self.current, list(self.current), 0, 63), [])
+
+    def test_adjacent_changes_form_one_range(self):
+        self.assertEqual(diff_ranges(self.current, self.changed(10, 11, 12), 0, 63), [(10, 12)])
+
+    def test_gap_merging(self):
+        data = self.changed(10, 13, 20)
+        self.assertEqual(diff_ranges(self.current, data, 0, 63), [(10, 10), (13, 13), (20, 20)])
+        self.assertEqual(diff_ranges(self.current, data, 0, 63, max_gap=2), [(10, 13), (20, 20)])
+        self.assertEqual(diff_ranges(self.current, data, 0, 63, max_gap=6), [(10, 20)])
+
+    def test_changes_outside_the_window_are_ignored(self):
+        data = self.changed(5, 30, 60)
+        self.assertEqual(diff_ranges(self.current, data, 0x10, 0x3F - 4), [(30, 30)])
+
+
+class PlannedHandlerTest(unittest.TestCase):
+    """PhysicalCardHandler envía las APDUs que calcula el planificador"""
+
+    def connect(self, card_type):
+        self.card = SimCard(card_type)
+        self.reader = RecordingReader(f"Test Reader {card_type}", self.card)
+        install_readers(self, self.reader)
+        handler = PhysicalCardHandler()
+        self.assertTrue(handler.connect_to_reader(self.reader.name))
+        return handler
+
+    def reads(self):
+        return [((apdu[2] << 8) | apdu[3], apdu[4]) for apdu in self.reader.sent if apdu[1] == 0xB0]
+
+    def test_full_read_follows_the_plan(self):
+        for card_type in (CARD_TYPE_5542, CARD_TYPE_5528):
+            with self.subTest(card_type=card_type):
+                handler = self.connect(card_type)
+                data, _ = handler.read_full_card(card_type)
+                self.assertEqual(data, self.card.memory())
+                self.assertEqual(self.reads(), plan_card_read(card_type))
+
+    def test_full_5528_write_takes_six_apdus(self):
+        handler = self.connect(CARD_TYPE_5528)
+        data = [address & 0xFF for address in range(1024)]
+        success, message, _ = handler.write_full_card(data, CARD_TYPE_5528)
+        self.assertTrue(success, message)
+        self.assertEqual(self.reader.writes(), plan_card_write(CARD_TYPE_5528))
+        self.assertEqual(len(self.reader.writes()), 6)
+
+    def test_read_memory_accepts_any_length(self):
+        handler = self.connect(CARD_TYPE_5528)
+        data, message = handler.read_memory(0xF0, 300, CARD_TYPE_5528)
+        self.assertEqual(data, self.card.memory()[0xF0:0xF0 + 300], message)
+        self.assertEqual(self.reads(), plan_chunks(0xF0, 0xF0 + 299))
+
+    def test_reader_limit_is_respected(self):
+        handler = self.connect(CARD_TYPE_5542)
+        handler.max_read_length = 32
+        data, _ = handler.read_memory(0x00, 256, CARD_TYPE_5542)
+        self.assertEqual(data, self.card.memory())
+        self.assertTrue(all(length <= 32 for _, length in self.reads()))
+
+    def test_read_ranges_selects_once(self):
+        handler = self.connect(CARD_TYPE_5542)
+        results, message = handler.read_ranges([(0x20, 4), (0x80, 8)], CARD_TYPE_5542)
+        self.assertEqual(results, [(0x20, self.card.memory()[0x20:0x24]), (0x80, self.card.memory()[0x80:0x88])],
+                         message)
+        self.assertEqual([apdu[1] for apdu in self.reader.sent], [0xA4, 0xB0, 0xB0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+"""Harness de benchmarks: calibración, filtro, JSON de resultados y comparación"""
+
+import io
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from tests import PROJECT_DIR  # noqa: F401  (configura sys.path)
+from benchmarks.harness import Benchmark, run_benchmarks, save_results, format_seconds
+from benchmarks.compare import compare_results, main as compare_main
+from benchmarks.bench_core import core_benchmarks
+
+
+def result(median):
+    return {'median': median}
+
+
+class HarnessTest(unittest.TestCase):
+
+    def test_each_round_gets_a_fresh_setup(self):
+        calls = []
+        benchmark = Benchmark("group.case", run=lambda state: state.append(1), setup=lambda: calls.append([]) or [],
+                              teardown=lambda state: None, loops=3)
+        measured = benchmark.measure(rounds=4)
+        self.assertEqual((measured['group'], measured['loops'], measured['rounds']), ("group", 3, 4))
+        self.assertEqual(len(calls), 4)
+        self.assertLessEqual(measured['min'], measured['median'])
+        self.assertLessEqual(measured['median'], measured['max'])
+
+    def test_calibration_reaches_the_minimum_time(self):
+        benchmark = Benchmark("fast", run=lambda state: None)
+        loops = benchmark.calibrate(0.01)
+        self.assertGreater(loops, 1)
+        self.assertGreaterEqual(benchmark._round(loops), 0.005)
+
+    def test_filter_and_saved_json(self):
+        benchmarks = [Benchmark("memory.read", run=lambda state: None, loops=1),
+                      Benchmark("files.save", run=lambda state: None, loops=1)]
+        results = run_benchmarks(benchmarks, rounds=1, pattern="memory.*", out=io.StringIO())
+        self.assertEqual(list(results), ["memory.read"])
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "results.json")
+            save_results(path, 'core', results)
+            with open(path, encoding='utf-8') as f:
+                document = json.load(f)
+        self.assertEqual(document['suite'], 'core')
+        self.assertIn('python', document['environment'])
+        self.assertEqual(document['benchmarks']['memory.read']['loops'], 1)
+
+    def test_format_seconds(self):
+        self.assertEqual(format_seconds(0.0000025), "2.5 µs")
+        self.assertEqual(format_seconds(0.0125), "12.50 ms")
+        self.assertEqual(format_seconds(2.0), "2.000 s")
+
+    def test_core_benchmark_names_are_unique(self):
+        names = [benchmark.name for benchmark in core_benchmarks()]
+        self.assertEqual(len(names), len(set(names)))
+        self.assertTrue(all('.' in name for name in names))
+
+
+class CompareTest(unittest.TestCase):
+
+    def test_rows(self):
+        baseline = {'benchmarks': {'a': result(1.0), 'b': result(1.0), 'c': result(1.0)}}
+        current = {'benchmarks': {'a': result(1.05), 'b': result(1.5), 'c': result(0.5), 'd': result(1.0)}}
+        rows = {name: status for name, *_, status in compare_results(baseline, current, 0.10)}
+        self.assertEqual(rows, {'a': '', 'b': 'slower', 'c': 'faster', 'd': 'new'})
+
+    def test_fail_on_regression(self):
+        with tempfile.TemporaryDirectory() as directory:
+            paths = []
+            for name, median in (("before", 1.0), ("after", 2.0)):
+                path = os.path.join(directory, f"{name}.json")
+                with open(path, 'w', encoding='utf-8') as f:
+                    json.dump({'environment': {}, 'benchmarks': {'memory.read': result(median)}}, f)
+                paths.append(path)
+            with mock.patch('sys.stdout', new_callable=io.StringIO):
+                self.assertEqual(compare_main(paths), 0)
+                self.assertEqual(compare_main(paths + ['--fail-on-regression']), 1)
+                self.assertEqual(compare_main(paths[::-1] + ['--fail-on-regression']), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
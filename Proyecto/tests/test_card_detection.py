@@ -0,0 +1,91 @@
+"""Detección del tipo de tarjeta física por el ATR, con caché y SELECT de sondeo"""
+
+import unittest
+
+from tests import PROJECT_DIR  # noqa: F401  (configura sys.path)
+from tests.virtual_readers import SimCard, RecordingReader, install_readers
+from src.utils.constants import CARD_TYPE_5542, CARD_TYPE_5528
+from src.core import physical_card_handler
+from src.core.apdu_planner import card_type_from_atr
+from src.core.physical_card_handler import PhysicalCardHandler
+from src.core.provisioning import ProvisioningStation, make_job
+
+UNKNOWN_ATR = [0x3B, 0x02, 0x14, 0x50]
+
+
+class CardTypeFromAtrTest(unittest.TestCase):
+
+    def test_known_atrs_and_headers(self):
+        self.assertEqual(card_type_from_atr([0x3B, 0x04, 0xA2, 0x13, 0x10, 0x91]), CARD_TYPE_5542)
+        self.assertEqual(card_type_from_atr((0x3B, 0x04, 0x92, 0x23, 0x10, 0x91)), CARD_TYPE_5528)
+        self.assertEqual(card_type_from_atr([0x3B, 0x04, 0x92, 0xFF]), CARD_TYPE_5528)
+        self.assertIsNone(card_type_from_atr(UNKNOWN_ATR))
+        self.assertIsNone(card_type_from_atr([]))
+
+
+class DetectCardTypeTest(unittest.TestCase):
+
+    def setUp(self):
+        physical_card_handler._atr_type_cache.clear()
+        self.addCleanup(physical_card_handler._atr_type_cache.clear)
+
+    def connect(self, card):
+        self.reader = RecordingReader(f"Reader {id(card)}", card)
+        install_readers(self, self.reader)
+        handler = PhysicalCardHandler()
+        self.assertTrue(handler.connect_to_reader(self.reader.name))
+        return handler
+
+    def unknown_card(self, card_type):
+        card = SimCard(card_type)
+        card.atr = list(UNKNOWN_ATR)
+        return card
+
+    def test_known_atr_needs_no_apdus(self):
+        handler = self.connect(SimCard(CARD_TYPE_5528))
+        self.assertEqual(handler.detect_card_type(), CARD_TYPE_5528)
+        self.assertEqual(self.reader.sent, [])
+
+    def test_unknown_atr_is_probed_once_and_cached(self):
+        handler = self.connect(self.unknown_card(CARD_TYPE_5542))
+        self.assertEqual(handler.detect_card_type(), CARD_TYPE_5542)
+        self.assertEqual([apdu[1] for apdu in self.reader.sent], [0xA4, 0xB0])
+
+        self.reader.sent.clear()
+        self.assertEqual(handler.detect_card_type(), CARD_TYPE_5542)
+        self.assertEqual(self.reader.sent, [])
+
+    def test_probed_sle5542_stays_selected(self):
+        handler = self.connect(self.unknown_card(CARD_TYPE_5542))
+        handler.detect_card_type()
+        self.reader.sent.clear()
+        handler.read_memory(0x20, 4, CARD_TYPE_5542)
+        self.assertEqual([apdu[1] for apdu in self.reader.sent], [0xB0])
+
+    def test_unknown_atr_with_another_header_is_an_sle5528(self):
+        handler = self.connect(self.unknown_card(CARD_TYPE_5528))
+        self.assertEqual(handler.detect_card_type(), CARD_TYPE_5528)
+
+    def test_removed_card_returns_the_default(self):
+        handler = self.connect(SimCard(CARD_TYPE_5528))
+        self.reader.eject()
+        self.assertEqual(handler.detect_card_type(default=CARD_TYPE_5542), CARD_TYPE_5542)
+
+
+class WrongCardTypeTest(unittest.TestCase):
+
+    def test_provisioning_refuses_a_card_of_another_type(self):
+        reader = RecordingReader("Reader", SimCard(CARD_TYPE_5528))
+        install_readers(self, reader)
+        station = ProvisioningStation([make_job("Card", CARD_TYPE_5542, [0] * 256)], ["Reader"])
+        handler = PhysicalCardHandler()
+        handler.connect_to_reader("Reader")
+        station._provision_card(handler, "Reader", station._jobs.get())
+
+        self.assertFalse(station.results[0]['success'])
+        self.assertIn("Wrong card type", station.results[0]['message'])
+        self.assertEqual(reader.writes(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
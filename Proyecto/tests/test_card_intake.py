@@ -0,0 +1,78 @@
+"""Lectura continua: tipo de tarjeta por el ATR y sesiones creadas desde lecturas"""
+
+import unittest
+
+from tests import PROJECT_DIR  # noqa: F401  (configura sys.path)
+from tests.virtual_readers import SimCard, RecordingReader, install_readers
+from src.utils.constants import CARD_TYPE_5542, CARD_TYPE_5528
+from src.core.apdu_planner import card_type_from_header
+from src.core.card_monitor import CardEventMonitor
+from src.core.physical_card_handler import PhysicalCardHandler
+from src.core.session_manager import SessionManager
+
+
+class CardTypeDetectionTest(unittest.TestCase):
+
+    def test_header_bytes(self):
+        self.assertEqual(card_type_from_header(0xA2), CARD_TYPE_5542)
+        self.assertEqual(card_type_from_header(0x92), CARD_TYPE_5528)
+        self.assertIsNone(card_type_from_header(0x00))
+
+    def test_type_is_read_from_the_atr(self):
+        card_types = (CARD_TYPE_5542, CARD_TYPE_5528)
+        readers = [RecordingReader(f"Reader {card_type}", SimCard(card_type)) for card_type in card_types]
+        install_readers(self, *readers)
+        for reader, card_type in zip(readers, card_types):
+            handler = PhysicalCardHandler()
+            handler.connect_to_reader(reader.name)
+            self.assertEqual(handler.detect_card_type(), card_type)
+            self.assertEqual(reader.sent, [])
+
+
+class SessionFromReadTest(unittest.TestCase):
+
+    def setUp(self):
+        self.manager = SessionManager(max_resident_sessions=None, hibernate_after_seconds=None)
+
+    def tearDown(self):
+        self.manager.close_all_sessions()
+
+    def test_read_data_is_loaded(self):
+        data = [(address * 3) & 0xFF for address in range(256)]
+        session, message = self.manager.create_session_from_read("Read 001", CARD_TYPE_5542, data)
+        self.assertIsNotNone(session, message)
+        self.assertEqual(session.memory_manager.read_memory(0x20, 0xE0), data[0x20:])
+
+    def test_custom_psc_is_applied(self):
+        session, _ = self.manager.create_session_from_read("5542", CARD_TYPE_5542, [0] * 256, [0x12, 0x34, 0x56])
+        self.assertEqual(session.memory_manager.get_current_psc(), [0x12, 0x34, 0x56])
+        session, _ = self.manager.create_session_from_read("5528", CARD_TYPE_5528, [0] * 1024, [0xAB, 0xCD])
+        self.assertEqual(session.memory_manager.get_current_psc(), [0xAB, 0xCD])
+
+    def test_duplicate_name_is_rejected(self):
+        self.manager.create_session_from_read("Read 001", CARD_TYPE_5542, [0] * 256)
+        session, message = self.manager.create_session_from_read("Read 001", CARD_TYPE_5542, [0] * 256)
+        self.assertIsNone(session)
+        self.assertIn("already exists", message)
+
+    def test_archived_read_keeps_the_active_card(self):
+        working, _ = self.manager.create_new_card_session("Working", CARD_TYPE_5542)
+        session, _ = self.manager.create_session_from_read("Read 001", CARD_TYPE_5542, [0] * 256, activate=False)
+        self.assertIsNotNone(session)
+        self.assertEqual(self.manager.active_session_id, working.session_id)
+
+
+class InsertedCardsTest(unittest.TestCase):
+
+    def test_inserted_cards_snapshot(self):
+        monitor = CardEventMonitor()
+        monitor._card_inserted("Reader", [0x3B, 0x04, 0xA2])
+        cards = monitor.get_inserted_cards()
+        self.assertEqual(cards, {"Reader": [0x3B, 0x04, 0xA2]})
+        monitor._card_removed("Reader")
+        self.assertEqual(cards, {"Reader": [0x3B, 0x04, 0xA2]})
+        self.assertEqual(monitor.get_inserted_cards(), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
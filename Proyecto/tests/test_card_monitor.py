@@ -0,0 +1,155 @@
+"""Monitor de lectores y tarjetas: eventos, suscriptores y sondeo del estado PC/SC"""
+
+import time
+import types
+import unittest
+
+from tests import PROJECT_DIR  # noqa: F401  (configura sys.path)
+from tests.virtual_readers import SimCard, RecordingReader, install_readers
+from src.core import card_monitor
+from src.core.card_monitor import (CardEventMonitor, READER_ADDED, READER_REMOVED,
+                                   CARD_INSERTED, CARD_REMOVED)
+
+ATR = [0x3B, 0x04, 0xA2, 0x13, 0x10, 0x91]
+
+
+class FakeSCard(types.SimpleNamespace):
+    """Estado PC/SC con la interfaz de smartcard.scard que usa el sondeo"""
+
+    SCARD_S_SUCCESS = 0
+    SCARD_STATE_UNAWARE = 0
+    SCARD_STATE_PRESENT = 0x20
+
+    def __init__(self):
+        super().__init__(readers={})  # Lector -> ATR o None
+
+    def SCardListReaders(self, context, groups):
+        return self.SCARD_S_SUCCESS, list(self.readers)
+
+    def SCardGetStatusChange(self, context, timeout, states):
+        return self.SCARD_S_SUCCESS, [
+            (name, self.SCARD_STATE_PRESENT if self.readers[name] else 0, self.readers[name] or [])
+            for name, _ in states]
+
+
+def quiet_monitor():
+    """Monitor sin observadores de pyscard ni hilo de sondeo: los eventos se inyectan a mano"""
+    monitor = CardEventMonitor()
+    monitor._start = lambda: None
+    monitor._stop = lambda: None
+    return monitor
+
+
+def events_of(monitor, events):
+    return [(event['type'], event['reader']) for event in monitor.drain(events)]
+
+
+class CardEventMonitorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.monitor = quiet_monitor()
+
+    def test_events_reach_every_subscriber(self):
+        first, second = self.monitor.subscribe(), self.monitor.subscribe()
+        self.monitor._reader_added("Reader")
+        self.monitor._card_inserted("Reader", ATR)
+        for events in (first, second):
+            self.assertEqual(events_of(self.monitor, events), [(READER_ADDED, "Reader"), (CARD_INSERTED, "Reader")])
+
+    def test_new_subscribers_receive_the_current_state(self):
+        self.monitor._reader_added("Reader A")
+        self.monitor._reader_added("Reader B")
+        self.monitor._card_inserted("Reader B", ATR)
+        events = self.monitor.subscribe()
+        self.assertEqual(events_of(self.monitor, events),
+                         [(READER_ADDED, "Reader A"), (READER_ADDED, "Reader B"), (CARD_INSERTED, "Reader B")])
+        self.assertTrue(self.monitor.has_card("Reader B"))
+        self.assertFalse(self.monitor.has_card("Reader A"))
+
+    def test_unsubscribed_queues_get_nothing(self):
+        events = self.monitor.subscribe()
+        self.monitor.unsubscribe(events)
+        self.monitor._reader_added("Reader")
+        self.assertEqual(events_of(self.monitor, events), [])
+        self.assertFalse(self.monitor._running)
+
+    def test_removing_a_reader_forgets_its_card(self):
+        self.monitor._reader_added("Reader")
+        self.monitor._card_inserted("Reader", ATR)
+        self.monitor._reader_removed("Reader")
+        self.assertFalse(self.monitor.has_card("Reader"))
+
+
+class PollingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.scard = FakeSCard()
+        saved = card_monitor.__dict__.get('scard')
+        card_monitor.scard = self.scard
+        self.addCleanup(setattr, card_monitor, 'scard', saved)
+
+        self.monitor = quiet_monitor()
+        self.events = self.monitor.subscribe()
+
+    def poll(self):
+        self.monitor._poll_once(context=None)
+        return events_of(self.monitor, self.events)
+
+    def test_changes_between_polls_become_events(self):
+        self.scard.readers = {"Reader": None}
+        self.assertEqual(self.poll(), [(READER_ADDED, "Reader")])
+        self.assertEqual(self.poll(), [])
+
+        self.scard.readers["Reader"] = ATR
+        self.assertEqual(self.poll(), [(CARD_INSERTED, "Reader")])
+        self.scard.readers["Reader"] = None
+        self.assertEqual(self.poll(), [(CARD_REMOVED, "Reader")])
+
+        del self.scard.readers["Reader"]
+        self.assertEqual(self.poll(), [(READER_REMOVED, "Reader")])
+
+    def test_card_swap_between_polls(self):
+        self.scard.readers = {"Reader": ATR}
+        self.poll()
+        self.scard.readers["Reader"] = [0x3B, 0x04, 0x92, 0x23, 0x10, 0x91]
+        self.assertEqual(self.poll(), [(CARD_REMOVED, "Reader"), (CARD_INSERTED, "Reader")])
+
+
+class TransportPollingTest(unittest.TestCase):
+    """Sondeo de un transporte que no es PC/SC (lectores virtuales)"""
+
+    def setUp(self):
+        self.reader = RecordingReader("Virtual Reader")
+        self.transport = install_readers(self, self.reader)
+        self.monitor = quiet_monitor()
+        self.events = self.monitor.subscribe()
+
+    def poll(self):
+        self.monitor._apply_state(*self.monitor._transport_state(self.transport))
+        return events_of(self.monitor, self.events)
+
+    def test_readers_and_cards_become_events_without_apdus(self):
+        self.assertEqual(self.poll(), [(READER_ADDED, "Virtual Reader")])
+        card = SimCard()
+        self.reader.insert(card)
+        self.assertEqual(self.poll(), [(CARD_INSERTED, "Virtual Reader")])
+        self.assertEqual(self.monitor.cards["Virtual Reader"], list(card.atr))
+        self.reader.eject()
+        self.assertEqual(self.poll(), [(CARD_REMOVED, "Virtual Reader")])
+        self.assertEqual(self.reader.sent, [])
+
+    def test_monitor_polls_the_active_transport(self):
+        monitor = CardEventMonitor()
+        events = monitor.subscribe()
+        self.addCleanup(monitor.unsubscribe, events)
+        self.assertIsNotNone(monitor._poll_thread)
+        deadline = time.monotonic() + 5.0
+        received = []
+        while not received and time.monotonic() < deadline:
+            received = events_of(monitor, events)
+            time.sleep(0.01)
+        self.assertEqual(received, [(READER_ADDED, "Virtual Reader")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+"""Transportes de lectores: tarjetas y lectores virtuales, modelo de tiempos y entorno"""
+
+import os
+import unittest
+from unittest import mock
+
+from tests import PROJECT_DIR  # noqa: F401  (configura sys.path)
+from src.utils.constants import CARD_TYPE_5542, CARD_TYPE_5528, DEFAULT_PSC_5542
+from src.core.card_session import CardSession
+from src.core.card_transport import (VirtualCard, VirtualTransport, PCSCTransport, DEFAULT_VIRTUAL_TIMING,
+                                     VIRTUAL_READERS_ENV, transport_from_environment)
+
+SELECT_5542 = [0xFF, 0xA4, 0x00, 0x00, 0x01, 0x06]
+PRESENT_PSC = [0xFF, 0x20, 0x00, 0x00, 0x03] + list(DEFAULT_PSC_5542)
+
+
+class VirtualCardTest(unittest.TestCase):
+
+    def setUp(self):
+        self.card = VirtualCard(CARD_TYPE_5542)
+
+    def test_writes_need_the_psc(self):
+        write = [0xFF, 0xD0, 0x00, 0x40, 0x02, 0xAB, 0xCD]
+        self.card.process_apdu(SELECT_5542)
+        self.assertEqual(self.card.process_apdu(write)[1:], (0x69, 0x82))
+
+        _, sw1, _ = self.card.process_apdu(PRESENT_PSC)
+        self.assertEqual(sw1, 0x90)
+        self.assertEqual(self.card.process_apdu(write), ([], 0x90, 0x00))
+        self.assertEqual(self.card.process_apdu([0xFF, 0xB0, 0x00, 0x40, 0x02]), ([0xAB, 0xCD], 0x90, 0x00))
+
+    def test_select_resets_the_psc(self):
+        self.card.process_apdu(PRESENT_PSC)
+        self.card.process_apdu(SELECT_5542)
+        self.assertEqual(self.card.process_apdu([0xFF, 0xD0, 0x00, 0x40, 0x01, 0x00])[1:], (0x69, 0x82))
+
+    def test_out_of_range_and_unknown_instructions(self):
+        self.assertEqual(self.card.process_apdu([0xFF, 0xB0, 0x00, 0xF0, 0x20])[1:], (0x6B, 0x00))
+        self.assertEqual(self.card.process_apdu([0xFF, 0x99, 0x00, 0x00, 0x00])[1:], (0x6D, 0x00))
+        self.assertEqual(self.card.process_apdu([0x00, 0xB0, 0x00, 0x00, 0x01])[1:], (0x6E, 0x00))
+
+    def test_card_from_session_shares_its_memory(self):
+        session = CardSession("Card", CARD_TYPE_5528)
+        try:
+            card = VirtualCard.from_session(session)
+            self.assertEqual(card.card_type, CARD_TYPE_5528)
+            session.memory_manager.write_memory(0x40, [0x5A])
+            self.assertEqual(card.process_apdu([0xFF, 0xB0, 0x00, 0x40, 0x01])[0], [0x5A])
+        finally:
+            session.cleanup()
+
+
+class VirtualReaderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.transport = VirtualTransport()
+        self.card = VirtualCard(CARD_TYPE_5542)
+        self.reader = self.transport.add_reader("Reader", self.card, {'realtime': False, 'max_apdu_length': 64})
+        self.connection = self.reader.createConnection()
+        self.connection.connect()
+
+    def test_reader_looks_like_a_pyscard_reader(self):
+        self.assertEqual(str(self.reader), "Reader")
+        self.assertIs(self.transport.get_reader("Reader"), self.reader)
+        self.assertEqual(self.connection.getATR(), self.card.atr)
+
+    def test_long_apdus_are_rejected(self):
+        self.assertEqual(self.connection.transmit([0xFF, 0xB0, 0x00, 0x00, 0x40])[1:], (0x90, 0x00))
+        self.assertEqual(self.connection.transmit([0xFF, 0xB0, 0x00, 0x00, 0x41]), ([], 0x67, 0x00))
+
+    def test_time_is_accounted_without_sleeping(self):
+        self.connection.transmit([0xFF, 0xB0, 0x00, 0x00, 0x20])
+        expected = (DEFAULT_VIRTUAL_TIMING['apdu_ms'] + 0x20 * DEFAULT_VIRTUAL_TIMING['read_ms_per_byte']) / 1000
+        self.assertEqual(self.reader.apdu_count, 1)
+        self.assertAlmostEqual(self.reader.elapsed_seconds, expected)
+        self.reader.reset_stats()
+        self.assertEqual((self.reader.apdu_count, self.reader.elapsed_seconds), (0, 0.0))
+
+    def test_ejected_card_breaks_the_connection(self):
+        self.reader.eject()
+        with self.assertRaises(Exception):
+            self.connection.transmit(SELECT_5542)
+        with self.assertRaises(Exception):
+            self.reader.createConnection().connect()
+
+        self.reader.insert(VirtualCard(CARD_TYPE_5542))
+        with self.assertRaises(Exception):
+            self.connection.getATR()  # La conexión antigua no ve la tarjeta nueva
+
+
+class TransportFromEnvironmentTest(unittest.TestCase):
+
+    def test_default_is_pcsc(self):
+        with mock.patch.dict(os.environ, {VIRTUAL_READERS_ENV: ""}):
+            self.assertIsInstance(transport_from_environment(), PCSCTransport)
+
+    def test_one_virtual_reader_per_listed_type(self):
+        with mock.patch.dict(os.environ, {VIRTUAL_READERS_ENV: "5542, 5528,1234,abc"}):
+            transport = transport_from_environment()
+        self.assertIsInstance(transport, VirtualTransport)
+        self.assertEqual([reader.card.card_type for reader in transport.list_readers()],
+                         [CARD_TYPE_5542, CARD_TYPE_5528])
+
+
+if __name__ == "__main__":
+    unittest.main()
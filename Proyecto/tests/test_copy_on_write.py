@@ -0,0 +1,118 @@
+"""Copy-on-write de las sesiones clonadas: ninguna escritura debe verse en la otra copia"""
+
+import unittest
+
+from tests import PROJECT_DIR  # noqa: F401  (configura sys.path)
+from src.utils.constants import CARD_TYPE_5542, CARD_TYPE_5528, DEFAULT_PSC_5542, DEFAULT_PSC_5528
+from src.core.card_session import CardSession
+from src.core.memory_manager import MemoryManager
+from src.core.session_manager import SessionManager
+
+
+class MemoryManagerCloneTest(unittest.TestCase):
+
+    def setUp(self):
+        self.source = MemoryManager()
+        self.source.initialize_memory(CARD_TYPE_5528)
+        self.source.write_memory(0x40, [0x11, 0x22])
+        self.clone = self.source.clone()
+
+    def test_clone_shares_memory_until_a_write(self):
+        self.assertIs(self.clone.memory_data, self.source.memory_data)
+        self.assertEqual(self.clone.read_memory(0x40, 2), [0x11, 0x22])
+
+    def test_write_to_clone_does_not_change_source(self):
+        self.clone.write_memory(0x40, [0xAA, 0xBB])
+        self.assertEqual(self.clone.read_memory(0x40, 2), [0xAA, 0xBB])
+        self.assertEqual(self.source.read_memory(0x40, 2), [0x11, 0x22])
+
+    def test_write_to_source_does_not_change_clone(self):
+        self.source.write_memory(0x40, [0xCC])
+        self.assertEqual(self.clone.read_memory(0x40, 1), [0x11])
+
+    def test_psc_and_error_counter_writes_are_private(self):
+        self.clone.set_internal_psc([0x12, 0x34])
+        self.clone.error_counter = 0x3F
+        self.clone._update_error_counter_in_memory()
+        self.assertEqual(self.clone.get_current_psc(), [0x12, 0x34])
+        self.assertEqual(self.source.get_current_psc(), list(DEFAULT_PSC_5528))
+        self.assertNotEqual(self.source.read_memory(0x3FD, 1), [0x3F])
+
+    def test_protection_bits_are_copied(self):
+        self.clone.set_protection_bit(0x50)
+        self.assertTrue(self.clone.is_protected(0x50))
+        self.assertFalse(self.source.is_protected(0x50))
+
+    def test_loading_data_replaces_only_this_copy(self):
+        self.clone.load_from_data([0x00] * 1024)
+        self.assertEqual(self.clone.read_memory(0x40, 1), [0x00])
+        self.assertEqual(self.source.read_memory(0x40, 1), [0x11])
+
+
+class CardSessionCloneTest(unittest.TestCase):
+
+    def setUp(self):
+        self.template = CardSession("Template", CARD_TYPE_5542)
+        self.template.execute_select_card()
+        self.template.execute_present_psc(list(DEFAULT_PSC_5542))
+        self.template.execute_write_memory(0x20, [0x41, 0x42, 0x43])
+        self.copies = []
+
+    def tearDown(self):
+        for session in [self.template] + self.copies:
+            session.cleanup()
+
+    def clone(self, name):
+        session = self.template.clone(name)
+        self.copies.append(session)
+        return session
+
+    def test_clone_starts_like_a_fresh_card_with_the_same_content(self):
+        copy = self.clone("Copy")
+        self.assertFalse(copy.card_selected)
+        self.assertFalse(copy.psc_verified)
+        self.assertEqual(copy.memory_manager.read_memory(0x20, 3), [0x41, 0x42, 0x43])
+
+    def test_apdu_writes_are_isolated_between_copies(self):
+        first, second = self.clone("First"), self.clone("Second")
+        for session, value in ((first, 0x01), (second, 0x02)):
+            session.execute_select_card()
+            session.execute_present_psc(list(DEFAULT_PSC_5542))
+            self.assertTrue(session.execute_write_memory(0x20, [value])['success'])
+
+        self.assertEqual(first.memory_manager.read_memory(0x20, 1), [0x01])
+        self.assertEqual(second.memory_manager.read_memory(0x20, 1), [0x02])
+        self.assertEqual(self.template.memory_manager.read_memory(0x20, 1), [0x41])
+
+    def test_failed_psc_on_a_copy_keeps_the_template_counter(self):
+        copy = self.clone("Copy")
+        copy.execute_select_card()
+        copy.execute_present_psc([0x00, 0x00, 0x00])
+        self.assertNotEqual(copy.memory_manager.get_error_counter(),
+                            self.template.memory_manager.get_error_counter())
+
+
+class SessionManagerCloneTest(unittest.TestCase):
+
+    def setUp(self):
+        self.manager = SessionManager(max_resident_sessions=None, hibernate_after_seconds=None)
+        self.template, _ = self.manager.create_new_card_session("Template", CARD_TYPE_5528)
+
+    def tearDown(self):
+        self.manager.close_all_sessions()
+
+    def test_clone_without_activation_keeps_the_active_card(self):
+        copy, _ = self.manager.clone_session(self.template.session_id, "Copy", activate=False)
+        self.assertIsNotNone(copy)
+        self.assertEqual(self.manager.active_session_id, self.template.session_id)
+        copy.memory_manager.write_memory(0x100, [0x99])
+        self.assertNotEqual(self.template.memory_manager.read_memory(0x100, 1), [0x99])
+
+    def test_duplicate_clone_name_is_rejected(self):
+        copy, message = self.manager.clone_session(self.template.session_id, "Template")
+        self.assertIsNone(copy)
+        self.assertIn("already exists", message)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+"""Escritura diferencial: solo se envían a la tarjeta los bytes que han cambiado"""
+
+import unittest
+
+from tests import PROJECT_DIR  # noqa: F401  (configura sys.path)
+from tests.virtual_readers import SimCard, RecordingReader, install_readers
+from src.utils.constants import CARD_TYPE_5542, CARD_TYPE_5528, PHYSICAL_WRITE_MAX_GAP
+from src.core.physical_card_handler import PhysicalCardHandler
+
+READER_NAME = "Test Reader"
+
+
+def pattern(size, seed=0):
+    """Contenido de tarjeta completo y distinto del de fábrica"""
+    return [(address * 7 + seed) & 0xFF for address in range(size)]
+
+
+class DifferentialWriteTest(unittest.TestCase):
+
+    card_type = CARD_TYPE_5542
+    size = 256
+    user_end = 0xFF  # Último byte que escriben las escrituras completas
+
+    def setUp(self):
+        self.card = SimCard(self.card_type)
+        self.reader = RecordingReader(READER_NAME, self.card)
+        install_readers(self, self.reader)
+        self.handler = PhysicalCardHandler()
+        self.assertTrue(self.handler.connect_to_reader(READER_NAME))
+
+    def user_area(self, data):
+        return data[0x20:self.user_end + 1]
+
+    def write_baseline(self):
+        data = pattern(self.size)
+        success, message, _ = self.handler.write_full_card(data, self.card_type)
+        self.assertTrue(success, message)
+        self.reader.sent.clear()
+        return data
+
+    def test_only_changed_ranges_are_written(self):
+        data = self.write_baseline()
+        data[0x30] ^= 0xFF
+        data[0x31] ^= 0xFF
+        data[0xC0] ^= 0xFF
+        success, message, _ = self.handler.write_card_differential(data, self.card_type)
+        self.assertTrue(success, message)
+
+        self.assertEqual(self.reader.writes(), [(0x30, 2), (0xC0, 1)])
+        self.assertEqual(self.user_area(self.card.memory()), self.user_area(data))
+
+    def test_cached_image_avoids_reading_the_card(self):
+        data = self.write_baseline()
+        data[0x40] ^= 0xFF
+        self.handler.write_card_differential(data, self.card_type)
+        self.assertFalse(any(apdu[1] == 0xB0 for apdu in self.reader.sent))
+
+    def test_close_changes_are_merged(self):
+        data = self.write_baseline()
+        data[0x50] ^= 0xFF
+        data[0x50 + PHYSICAL_WRITE_MAX_GAP + 1] ^= 0xFF
+        data[0x90] ^= 0xFF
+        self.handler.write_card_differential(data, self.card_type)
+        self.assertEqual(self.reader.writes(), [(0x50, PHYSICAL_WRITE_MAX_GAP + 2), (0x90, 1)])
+
+    def test_unchanged_card_sends_no_writes(self):
+        data = self.write_baseline()
+        success, message, _ = self.handler.write_card_differential(data, self.card_type)
+        self.assertTrue(success, message)
+        self.assertIn("already up to date", message)
+        self.assertEqual(self.reader.writes(), [])
+
+    def test_unknown_card_is_read_first(self):
+        self.card.memory_manager.write_memory(0x20, self.user_area(pattern(self.size)))
+        data = pattern(self.size)
+        data[0x60] ^= 0xFF
+        success, message, _ = self.handler.write_card_differential(data, self.card_type)
+        self.assertTrue(success, message)
+        self.assertTrue(any(apdu[1] == 0xB0 for apdu in self.reader.sent))
+        self.assertEqual(self.reader.writes(), [(0x60, 1)])
+
+    def test_new_card_drops_the_cached_image(self):
+        data = self.write_baseline()
+        new_card = SimCard(self.card_type)
+        self.reader.insert(new_card)
+        success, message, _ = self.handler.write_card_differential(data, self.card_type)
+        self.assertTrue(success, message)
+        self.assertEqual(self.user_area(new_card.memory()), self.user_area(data))
+
+    def test_invalidated_state_reads_the_card_again(self):
+        data = self.write_baseline()
+        self.card.memory_manager.write_memory(0x70, [0x00])  # Cambio hecho fuera de la aplicación
+        self.handler.invalidate_card_state()
+        success, message, _ = self.handler.write_card_differential(data, self.card_type)
+        self.assertTrue(success, message)
+        self.assertTrue(any(apdu[1] == 0xB0 for apdu in self.reader.sent))
+        self.assertEqual(self.reader.writes(), [(0x70, 1)])
+        self.assertEqual(self.user_area(self.card.memory()), self.user_area(data))
+
+    def test_wrong_size_is_rejected(self):
+        success, _, _ = self.handler.write_card_differential([0] * 100, self.card_type)
+        self.assertFalse(success)
+        self.assertEqual(self.reader.writes(), [])
+
+
+class DifferentialWrite5528Test(DifferentialWriteTest):
+
+    card_type = CARD_TYPE_5528
+    size = 1024
+    user_end = 0x3FC
+
+    def test_writes_stay_within_one_page(self):
+        data = self.write_baseline()
+        for address in range(0xF0, 0x110):
+            data[address] ^= 0xFF
+        self.handler.write_card_differential(data, self.card_type)
+        self.assertEqual(self.reader.writes(), [(0xF0, 16), (0x100, 16)])
+        self.assertEqual(self.user_area(self.card.memory()), self.user_area(data))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+"""Contadores de tiempo: desactivados no miden nada, activos acumulan por nombre"""
+
+import csv
+import os
+import tempfile
+import unittest
+
+from tests import PROJECT_DIR  # noqa: F401  (configura sys.path)
+from src.utils.constants import CARD_TYPE_5542
+from src.core.instrumentation import Instrumentation, instrumentation, measure, timed
+from src.core.memory_manager import MemoryManager
+
+
+class InstrumentationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.instrumentation = Instrumentation()
+
+    def test_disabled_measure_is_a_shared_no_op(self):
+        self.assertIs(self.instrumentation.measure("a"), self.instrumentation.measure("b"))
+        with self.instrumentation.measure("a"):
+            pass
+        self.assertEqual(self.instrumentation.snapshot(), [])
+
+    def test_enabled_measure_accumulates_per_name(self):
+        self.instrumentation.enable()
+        self.instrumentation.record("slow", 0.004)
+        self.instrumentation.record("slow", 0.002)
+        with self.instrumentation.measure("block"):
+            pass
+        rows = {row['name']: row for row in self.instrumentation.snapshot()}
+        self.assertEqual(self.instrumentation.snapshot()[0]['name'], "slow")
+        self.assertEqual(rows["slow"]['calls'], 2)
+        self.assertAlmostEqual(rows["slow"]['total_ms'], 6.0)
+        self.assertAlmostEqual(rows["slow"]['mean_ms'], 3.0)
+        self.assertAlmostEqual(rows["slow"]['max_ms'], 4.0)
+        self.assertEqual(rows["block"]['calls'], 1)
+
+        self.instrumentation.reset()
+        self.assertEqual(self.instrumentation.snapshot(), [])
+
+    def test_export_csv(self):
+        self.instrumentation.record("MemoryManager.read_memory", 0.001)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "timings.csv")
+            success, message = self.instrumentation.export_csv(path)
+            self.assertTrue(success, message)
+            with open(path, newline='', encoding='utf-8') as f:
+                rows = list(csv.DictReader(f))
+            success, _ = self.instrumentation.export_csv(os.path.join(directory, "missing", "timings.csv"))
+            self.assertFalse(success)
+        self.assertEqual([(row['name'], row['calls']) for row in rows], [("MemoryManager.read_memory", "1")])
+
+
+class TimedDecoratorTest(unittest.TestCase):
+    """@timed() usa la instancia global; se deja desactivada y vacía al terminar"""
+
+    def setUp(self):
+        instrumentation.reset()
+        self.addCleanup(instrumentation.reset)
+        self.addCleanup(instrumentation.disable)
+
+    def test_decorated_core_methods_are_counted_only_when_enabled(self):
+        memory_manager = MemoryManager()
+        memory_manager.initialize_memory(CARD_TYPE_5542)
+        memory_manager.read_memory(0x20, 4)
+        self.assertEqual(instrumentation.snapshot(), [])
+
+        instrumentation.enable()
+        memory_manager.read_memory(0x20, 4)
+        memory_manager.read_memory(0x30, 4)
+        rows = {row['name']: row['calls'] for row in instrumentation.snapshot()}
+        self.assertEqual(rows.get("MemoryManager.read_memory"), 2)
+
+    def test_custom_name_and_exceptions(self):
+        @timed("custom")
+        def failing():
+            raise ValueError("boom")
+
+        instrumentation.enable()
+        with self.assertRaises(ValueError):
+            failing()
+        with measure("block"):
+            pass
+        self.assertEqual(sorted(row['name'] for row in instrumentation.snapshot()), ["block", "custom"])
+
+
+if __name__ == "__main__":
+    unittest.main()
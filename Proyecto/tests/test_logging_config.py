@@ -0,0 +1,84 @@
+"""Logging del núcleo: niveles, formato perezoso y trazas de APDU en DEBUG"""
+
+import logging
+import unittest
+
+from tests import PROJECT_DIR  # noqa: F401  (configura sys.path)
+from tests.virtual_readers import SimCard, RecordingReader, install_readers
+from src.utils.constants import CARD_TYPE_5542
+from src.utils.logging_config import (DEFAULT_LOG_LEVEL, HexBytes, get_log_level, normalize_log_level,
+                                      set_log_level)
+from src.core.physical_card_handler import PhysicalCardHandler
+
+
+class CountingBytes(HexBytes):
+    """HexBytes que cuenta cuántas veces se ha formateado"""
+
+    formatted = 0
+
+    def __str__(self):
+        CountingBytes.formatted += 1
+        return super().__str__()
+
+
+class LogLevelTest(unittest.TestCase):
+
+    def setUp(self):
+        previous = get_log_level()
+        self.addCleanup(set_log_level, previous)
+
+    def test_normalize(self):
+        self.assertEqual(normalize_log_level(" debug "), 'DEBUG')
+        self.assertIsNone(normalize_log_level("verbose"))
+        self.assertIsNone(normalize_log_level(None))
+
+    def test_invalid_level_falls_back_to_default(self):
+        self.assertEqual(set_log_level('WARNING'), 'WARNING')
+        self.assertEqual(get_log_level(), 'WARNING')
+        self.assertEqual(set_log_level('nonsense'), DEFAULT_LOG_LEVEL)
+        self.assertEqual(get_log_level(), DEFAULT_LOG_LEVEL)
+
+
+class HexBytesTest(unittest.TestCase):
+
+    def setUp(self):
+        previous = get_log_level()
+        self.addCleanup(set_log_level, previous)
+        CountingBytes.formatted = 0
+
+    def test_format(self):
+        self.assertEqual(str(HexBytes([0x00, 0xAB, 0xFF])), "00 AB FF")
+        self.assertEqual(str(HexBytes(None)), "")
+
+    def test_disabled_messages_are_not_formatted(self):
+        set_log_level('INFO')
+        logging.getLogger("src.core.test").debug("APDU: %s", CountingBytes([0xFF, 0xB0]))
+        self.assertEqual(CountingBytes.formatted, 0)
+
+        with self.assertLogs("src.core.test", level='DEBUG') as logs:
+            logging.getLogger("src.core.test").debug("APDU: %s", CountingBytes([0xFF, 0xB0]))
+        self.assertEqual(logs.output, ["DEBUG:src.core.test:APDU: FF B0"])
+        self.assertEqual(CountingBytes.formatted, 1)
+
+
+class HandlerLoggingTest(unittest.TestCase):
+
+    def setUp(self):
+        previous = get_log_level()
+        self.addCleanup(set_log_level, previous)
+        self.reader = RecordingReader("Logging Reader", SimCard(CARD_TYPE_5542))
+        install_readers(self, self.reader)
+        self.handler = PhysicalCardHandler()
+        self.assertTrue(self.handler.connect_to_reader(self.reader.name))
+
+    def test_apdu_traces_are_debug(self):
+        with self.assertLogs("src.core.physical_card_handler", level='DEBUG') as logs:
+            self.handler.read_full_card(CARD_TYPE_5542)
+        apdu_lines = [record for record in logs.records if record.getMessage().startswith("APDU: ")]
+        self.assertEqual(len(apdu_lines), len(self.reader.sent))
+        self.assertTrue(all(record.levelno == logging.DEBUG for record in apdu_lines))
+        self.assertIn("FF A4", apdu_lines[0].getMessage())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+"""Contabilidad de memoria por sesión: categorías, objetos compartidos y sesiones hibernadas"""
+
+import sys
+import tracemalloc
+import unittest
+
+from tests import PROJECT_DIR  # noqa: F401  (configura sys.path)
+from src.utils.constants import CARD_TYPE_5542, CARD_TYPE_5528
+from src.core.card_session import CardSession
+from src.core.session_manager import SessionManager
+from src.core.memory_accounting import (CATEGORIES, TracemallocSampler, deep_sizeof, format_bytes,
+                                        session_manager_memory, session_memory)
+
+
+class DeepSizeofTest(unittest.TestCase):
+
+    def test_shared_objects_are_counted_once(self):
+        shared = [0] * 1000
+        container = [shared, shared]
+        self.assertEqual(deep_sizeof(container), sys.getsizeof(container) + deep_sizeof(shared))
+
+        seen = set()
+        first = deep_sizeof(shared, seen)
+        self.assertEqual(deep_sizeof(container, seen), sys.getsizeof(container))
+        self.assertGreater(first, 0)
+
+    def test_instance_attributes_are_followed(self):
+        class Holder:
+            def __init__(self):
+                self.payload = "x" * 10000
+
+        self.assertGreater(deep_sizeof(Holder()), 10000)
+
+
+class SessionMemoryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.session = CardSession("Card", CARD_TYPE_5528)
+        self.addCleanup(self.session.cleanup)
+
+    def test_categories_add_up_to_the_total(self):
+        row = session_memory(self.session)
+        self.assertEqual(row['total'], sum(row[category] for category in CATEGORIES))
+        self.assertGreater(row['memory_image'], 1024)
+        self.assertFalse(row['hibernated'])
+
+    def test_command_log_grows_with_its_entries(self):
+        before = session_memory(self.session)['command_log']
+        for _ in range(50):
+            self.session.execute_select_card()
+        row = session_memory(self.session)
+        self.assertEqual(row['log_entries'], len(self.session.command_log))
+        self.assertGreater(row['command_log'], before)
+
+    def test_clone_shares_its_image_until_written(self):
+        copy = self.session.clone("Copy")
+        self.addCleanup(copy.cleanup)
+        seen = set()
+        session_memory(self.session, seen)
+        row = session_memory(copy, seen)
+        self.assertTrue(row['shared_memory'])
+        self.assertLess(row['memory_image'], session_memory(copy)['memory_image'])
+
+
+class SessionManagerMemoryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.manager = SessionManager(max_resident_sessions=1, hibernate_after_seconds=None)
+        self.addCleanup(self.manager.close_all_sessions)
+
+    def test_report_covers_resident_and_hibernated_sessions(self):
+        self.manager.create_new_card_session("First", CARD_TYPE_5542)
+        self.manager.create_new_card_session("Second", CARD_TYPE_5528)
+        report = session_manager_memory(self.manager)
+
+        self.assertEqual((report['resident'], report['hibernated']), (1, 1))
+        hibernated, = [row for row in report['sessions'] if row['hibernated']]
+        self.assertEqual(hibernated['card_name'], "First")
+        self.assertGreater(hibernated['disk_bytes'], 0)
+        self.assertEqual(report['disk_bytes'], hibernated['disk_bytes'])
+        self.assertEqual(report['sessions_total'], sum(row['total'] for row in report['sessions']))
+        self.assertGreater(report['manager_total'], 0)
+
+
+class FormatAndTracemallocTest(unittest.TestCase):
+
+    def test_format_bytes(self):
+        self.assertEqual(format_bytes(512), "512 B")
+        self.assertEqual(format_bytes(2048), "2.0 KB")
+        self.assertEqual(format_bytes(3 * 1024 * 1024), "3.00 MB")
+
+    def test_sampler_reports_growth_between_samples(self):
+        if tracemalloc.is_tracing():
+            self.skipTest("tracemalloc already active in this process")
+        sampler = TracemallocSampler()
+        self.assertIsNone(sampler.sample())
+        sampler.start()
+        try:
+            first = sampler.sample()
+            self.assertEqual(first['diff'], [])
+            allocated = [bytearray(1024) for _ in range(200)]
+            second = sampler.sample()
+            self.assertTrue(second['top'])
+            self.assertTrue(any(size_diff > 0 for _, size_diff, _ in second['diff']))
+            del allocated
+        finally:
+            sampler.stop()
+        self.assertFalse(tracemalloc.is_tracing())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,152 @@
+"""Proceso de E/S de lectores: llamadas remotas, errores, plazos, cancelación y clientes en paralelo"""
+
+import os
+import threading
+import unittest
+from unittest import mock
+
+from tests import PROJECT_DIR  # noqa: F401  (configura sys.path)
+from src.utils.constants import CARD_TYPE_5542, CARD_TYPE_5528
+from src.core.card_transport import VIRTUAL_READERS_ENV
+from src.core.pcsc_worker import (PCSCWorker, RemoteCardHandler, PCSCWorkerError,
+                                  ReaderTimeoutError, OperationCancelledError)
+from src.core.physical_card_handler import PhysicalCardHandler
+
+
+def process_of(worker):
+    """Proceso de E/S en marcha (None si no se ha arrancado o se ha reiniciado)"""
+    return worker._worker_process.process if worker._worker_process is not None else None
+
+
+def call_in_thread(function, *args):
+    """Lanza function(*args) en un hilo; devuelve (hilo, lista con el resultado o la excepción)"""
+    outcome = []
+
+    def run():
+        try:
+            outcome.append(function(*args))
+        except PCSCWorkerError as e:
+            outcome.append(e)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread, outcome
+
+
+def wait_until_busy(worker, thread):
+    while not worker.is_busy() and thread.is_alive():
+        thread.join(0.001)
+
+
+class PCSCWorkerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.worker = PCSCWorker(timeout=10.0)
+        self.addCleanup(self.worker.stop)
+        self.handler = RemoteCardHandler(self.worker)
+
+    def test_calls_run_in_the_worker_process(self):
+        expected = PhysicalCardHandler().get_safe_write_areas(CARD_TYPE_5542)
+        self.assertEqual(self.handler.get_safe_write_areas(CARD_TYPE_5542), expected)
+        self.assertTrue(process_of(self.worker).is_alive())
+        self.assertFalse(self.worker.is_busy())
+
+    def test_exceptions_come_back_as_worker_errors(self):
+        with self.assertRaises(PCSCWorkerError):
+            self.handler.no_such_method()
+        with self.assertRaises(AttributeError):
+            self.handler._send_apdu
+        with self.assertRaises(PCSCWorkerError):
+            self.worker.call(self.handler.client_id, '_drop_connection')
+
+    def test_timeout_restarts_the_process(self):
+        self.handler.get_safe_write_areas(CARD_TYPE_5542)
+        first_process = process_of(self.worker)
+        self.worker.timeout = 0.0
+        with self.assertRaises(ReaderTimeoutError):
+            self.handler.get_safe_write_areas(CARD_TYPE_5542)
+        self.assertEqual(self.worker.restarts, 1)
+        self.assertFalse(first_process.is_alive())
+
+        self.worker.timeout = 10.0
+        self.assertTrue(self.handler.get_safe_write_areas(CARD_TYPE_5542))
+        self.assertIsNot(process_of(self.worker), first_process)
+
+    def test_cancel_interrupts_the_request(self):
+        thread, outcome = call_in_thread(self.handler.get_safe_write_areas, CARD_TYPE_5542)
+        wait_until_busy(self.worker, thread)
+        self.handler.cancel()
+        thread.join(10.0)
+
+        self.assertIsInstance(outcome[0], OperationCancelledError)
+        self.assertEqual(self.worker.restarts, 1)
+
+    def test_close_does_not_start_the_process(self):
+        self.handler.close()
+        self.assertIsNone(process_of(self.worker))
+
+    def test_closed_client_gets_a_new_handler(self):
+        self.handler.get_safe_write_areas(CARD_TYPE_5542)
+        self.handler.close()
+        self.assertTrue(process_of(self.worker).is_alive())
+        self.assertTrue(self.handler.get_safe_write_areas(CARD_TYPE_5542))
+        self.assertEqual(self.worker.restarts, 0)
+        self.assertEqual(list(self.worker._client_locks), [self.handler.client_id])
+
+
+class ConcurrentClientsTest(unittest.TestCase):
+    """Clientes distintos no se esperan entre sí (lectores virtuales en el proceso de E/S)"""
+
+    def setUp(self):
+        environment = mock.patch.dict(os.environ, {VIRTUAL_READERS_ENV: "5528,5528"})
+        environment.start()
+        self.addCleanup(environment.stop)
+        self.worker = PCSCWorker(timeout=10.0)
+        self.addCleanup(self.worker.stop)
+
+        self.slow, self.fast = RemoteCardHandler(self.worker), RemoteCardHandler(self.worker)
+        self.addCleanup(self.slow.close)
+        self.addCleanup(self.fast.close)
+        self.readers = self.slow.get_available_readers()
+        self.assertTrue(self.slow.connect_to_reader(self.readers[0]))
+        self.assertTrue(self.fast.connect_to_reader(self.readers[1]))
+
+    def start_slow_read(self):
+        """Lectura completa de la SLE5528 con los tiempos reales del lector virtual (~0,3 s)"""
+        thread, outcome = call_in_thread(self.slow.read_full_card, CARD_TYPE_5528)
+        wait_until_busy(self.worker, thread)
+        return thread, outcome
+
+    def test_other_clients_are_served_during_a_long_operation(self):
+        thread, outcome = self.start_slow_read()
+        self.assertEqual(self.fast.detect_card_type(), CARD_TYPE_5528)
+        self.assertTrue(thread.is_alive(), "the fast call waited for the slow one")
+        thread.join(10.0)
+        data, _ = outcome[0]
+        self.assertEqual(len(data), 1024)
+
+    def test_cancel_of_another_client_is_ignored(self):
+        thread, outcome = self.start_slow_read()
+        self.fast.cancel()
+        thread.join(10.0)
+        self.assertEqual(len(outcome[0][0]), 1024)
+        self.assertEqual(self.worker.restarts, 0)
+
+    def test_restart_fails_the_other_clients_requests(self):
+        thread, outcome = self.start_slow_read()
+        other_thread, other_outcome = call_in_thread(self.fast.read_full_card, CARD_TYPE_5528)
+        while len(self.worker._pending) < 2 and other_thread.is_alive():
+            other_thread.join(0.001)
+        self.slow.cancel()
+        thread.join(10.0)
+        other_thread.join(10.0)
+
+        self.assertIsInstance(outcome[0], OperationCancelledError)
+        self.assertIsInstance(other_outcome[0], PCSCWorkerError)
+        self.assertIn("restarted", str(other_outcome[0]))
+        self.assertEqual(self.worker.restarts, 1)
+        self.assertFalse(self.worker.is_busy())
+
+
+if __name__ == "__main__":
+    unittest.main()
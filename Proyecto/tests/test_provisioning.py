@@ -0,0 +1,143 @@
+"""Estación de grabación: varias tarjetas en varios lectores a la vez"""
+
+import os
+import queue
+import time
+import unittest
+from unittest import mock
+
+from tests import PROJECT_DIR  # noqa: F401  (configura sys.path)
+from tests.virtual_readers import SimCard, RecordingReader, install_readers, restore_reader_profiles_file
+from src.utils.constants import CARD_TYPE_5542
+from src.core import provisioning
+from src.core.card_transport import VIRTUAL_READERS_ENV
+from src.core.pcsc_worker import PCSCWorker, RemoteCardHandler
+from src.core.physical_card_handler import PhysicalCardHandler
+from src.core.provisioning import ProvisioningStation, make_job
+
+
+def image(seed):
+    """Imagen completa de SLE5542 distinta para cada seed"""
+    return [(address * 5 + seed) & 0xFF for address in range(256)]
+
+
+class PollCardTest(unittest.TestCase):
+
+    def setUp(self):
+        self.reader = RecordingReader("Test Reader")
+        install_readers(self, self.reader)
+        self.handler = PhysicalCardHandler()
+
+    def test_empty_reader(self):
+        with self.assertNoLogs("src.core.physical_card_handler", level='INFO'):
+            for _ in range(3):
+                self.assertEqual(self.handler.poll_card("Test Reader"), (False, False))
+
+    def test_reader_failures_are_still_errors(self):
+        def broken_connection():
+            raise OSError("reader unplugged")
+
+        self.reader.createConnection = broken_connection
+        with self.assertLogs("src.core.physical_card_handler", level='ERROR'):
+            self.assertEqual(self.handler.poll_card("Test Reader"), (False, False))
+
+    def test_inserted_and_swapped_cards(self):
+        self.reader.insert(SimCard(CARD_TYPE_5542))
+        self.assertEqual(self.handler.poll_card("Test Reader"), (True, True))
+        self.assertEqual(self.handler.poll_card("Test Reader"), (True, False))
+        self.reader.insert(SimCard(CARD_TYPE_5542))
+        self.assertEqual(self.handler.poll_card("Test Reader"), (True, True))
+        self.assertEqual(self.reader.sent, [])
+
+
+class ProvisioningStationTest(unittest.TestCase):
+
+    def setUp(self):
+        saved_poll = provisioning.PROVISIONING_POLL_SECONDS
+        provisioning.PROVISIONING_POLL_SECONDS = 0.01
+        self.addCleanup(setattr, provisioning, 'PROVISIONING_POLL_SECONDS', saved_poll)
+
+        self.readers = [RecordingReader(f"Reader {index}", SimCard(CARD_TYPE_5542)) for index in range(2)]
+        install_readers(self, *self.readers)
+        self.finished_cards = []  # (lector, tarjeta) retiradas tras grabarse
+
+    def run_station(self, jobs, timeout=10.0):
+        """Ejecuta la estación retirando e insertando tarjetas cuando lo pide"""
+        station = ProvisioningStation(jobs, [reader.name for reader in self.readers],
+                                      handler_factory=PhysicalCardHandler)
+        self.addCleanup(station.join, 1.0)
+        self.addCleanup(station.stop)
+        readers = {reader.name: reader for reader in self.readers}
+        station.start()
+
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if not station.is_running() and station.events.empty():
+                break
+            try:
+                event = station.events.get(timeout=0.05)
+            except queue.Empty:
+                continue
+            if event['state'] == 'remove':
+                reader = readers[event['reader']]
+                self.finished_cards.append((event['label'], reader.card))
+                reader.insert(SimCard(CARD_TYPE_5542))
+        self.assertFalse(station.is_running(), "the station did not finish")
+        return station
+
+    def test_every_image_is_written_once(self):
+        jobs = [make_job(f"Card {index}", CARD_TYPE_5542, image(index)) for index in range(5)]
+        station = self.run_station(jobs)
+
+        summary = station.get_summary()
+        self.assertEqual((summary['succeeded'], summary['failed_cards'], summary['remaining']), (5, 0, 0))
+        written = {label: card for label, card in self.finished_cards}
+        self.assertEqual(sorted(written), [f"Card {index}" for index in range(5)])
+        for index in range(5):
+            self.assertEqual(written[f"Card {index}"].memory()[0x20:], image(index)[0x20:])
+        self.assertEqual({result['reader'] for result in station.results}, {"Reader 0", "Reader 1"})
+
+    def test_failed_card_requeues_its_image(self):
+        self.readers[0].card.memory_manager.set_internal_psc([0x12, 0x34, 0x56])  # PSC distinto
+        self.readers = self.readers[:1]
+        station = self.run_station([make_job("Card", CARD_TYPE_5542, image(7))])
+
+        self.assertEqual([result['success'] for result in station.results], [False, True])
+        label, card = self.finished_cards[-1]
+        self.assertEqual(card.memory()[0x20:], image(7)[0x20:])
+        self.assertEqual(station.get_summary()['remaining'], 0)
+
+
+class RemoteProvisioningStationTest(unittest.TestCase):
+    """La estación graba a través del proceso de E/S, un cliente por lector"""
+
+    def setUp(self):
+        restore_reader_profiles_file(self)  # Se restaura después de parar el proceso
+        environment = mock.patch.dict(os.environ, {VIRTUAL_READERS_ENV: "5542,5542"})
+        environment.start()
+        self.addCleanup(environment.stop)
+        self.worker = PCSCWorker(timeout=10.0)
+        self.addCleanup(self.worker.stop)
+
+    def test_each_reader_is_written_through_the_worker(self):
+        probe = RemoteCardHandler(self.worker)
+        self.addCleanup(probe.close)
+        readers = probe.get_available_readers()
+        jobs = [make_job(f"Card {index}", CARD_TYPE_5542, image(index)) for index in range(2)]
+        station = ProvisioningStation(jobs, readers, handler_factory=lambda: RemoteCardHandler(self.worker))
+        self.addCleanup(station.stop)
+        station.start()
+        station.join(20.0)
+
+        self.assertFalse(station.is_running(), "the station did not finish")
+        self.assertEqual([result['success'] for result in station.results], [True, True])
+        self.assertEqual({result['reader'] for result in station.results}, set(readers))
+        self.assertEqual(list(self.worker._client_locks), [probe.client_id])
+
+    def test_default_handler_is_remote(self):
+        station = ProvisioningStation([], [])
+        self.assertIs(station.handler_factory, RemoteCardHandler)
+
+
+if __name__ == "__main__":
+    unittest.main()
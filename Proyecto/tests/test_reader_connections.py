@@ -0,0 +1,81 @@
+"""Conexiones con lectores compartidas y estado de la tarjeta cacheado (SELECT y PSC)"""
+
+import unittest
+
+from tests import PROJECT_DIR  # noqa: F401  (configura sys.path)
+from tests.virtual_readers import SimCard, RecordingReader, install_readers
+from src.utils.constants import CARD_TYPE_5542
+from src.core import physical_card_handler
+from src.core.physical_card_handler import PhysicalCardHandler
+
+READER_NAME = "Test Reader"
+
+
+def instructions(apdus):
+    return [apdu[1] for apdu in apdus]
+
+
+class ReaderConnectionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.card = SimCard(CARD_TYPE_5542)
+        self.reader = RecordingReader(READER_NAME, self.card)
+        install_readers(self, self.reader)
+        self.handler = PhysicalCardHandler()
+        self.assertTrue(self.handler.connect_to_reader(READER_NAME))
+
+    def test_handlers_share_one_connection_per_reader(self):
+        other = PhysicalCardHandler()
+        self.assertTrue(other.connect_to_reader(READER_NAME))
+        self.assertIs(other.connection, self.handler.connection)
+        self.assertEqual(self.reader.connects, 1)
+
+    def test_repeated_reads_select_the_card_once(self):
+        for index in range(10):
+            data, message = self.handler.read_memory(0x20 + index * 8, 8, CARD_TYPE_5542)
+            self.assertIsNotNone(data, message)
+        self.assertEqual(instructions(self.reader.sent), [0xA4] + [0xB0] * 10)
+
+    def test_psc_is_presented_once_for_consecutive_writes(self):
+        for address in (0x20, 0x30):
+            success, message = self.handler.write_memory(address, [0x11, 0x22], CARD_TYPE_5542)
+            self.assertTrue(success, message)
+        self.assertEqual(instructions(self.reader.sent), [0xA4, 0x20, 0xD0, 0xD0])
+        self.assertEqual(self.card.memory()[0x30:0x32], [0x11, 0x22])
+
+    def test_state_survives_release(self):
+        self.handler.read_memory(0x20, 4, CARD_TYPE_5542)
+        self.handler.release()
+        again = PhysicalCardHandler()
+        again.connect_to_reader(READER_NAME)
+        again.read_memory(0x20, 4, CARD_TYPE_5542)
+        self.assertEqual(instructions(self.reader.sent), [0xA4, 0xB0, 0xB0])
+
+    def test_card_swap_reconnects_and_selects_again(self):
+        self.handler.read_memory(0x20, 4, CARD_TYPE_5542)
+        new_card = SimCard(CARD_TYPE_5542)
+        new_card.memory_manager.write_memory(0x20, [0xCA, 0xFE, 0xBA, 0xBE])
+        self.reader.insert(new_card)
+        self.reader.sent.clear()
+
+        data, message = self.handler.read_memory(0x20, 4, CARD_TYPE_5542)
+        self.assertEqual(data, [0xCA, 0xFE, 0xBA, 0xBE], message)
+        self.assertEqual(self.reader.connects, 2)
+        self.assertEqual(instructions(self.reader.sent), [0xA4, 0xB0])
+
+    def test_removed_card_fails_without_retrying_forever(self):
+        self.reader.eject()
+        data, _ = self.handler.read_memory(0x20, 4, CARD_TYPE_5542)
+        self.assertIsNone(data)
+        self.assertEqual(self.reader.sent, [])
+
+    def test_close_all_connections_empties_the_pool(self):
+        connection = self.handler.connection
+        physical_card_handler.close_all_connections()
+        self.assertIsNone(connection.card)
+        self.assertTrue(PhysicalCardHandler().connect_to_reader(READER_NAME))
+        self.assertEqual(self.reader.connects, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
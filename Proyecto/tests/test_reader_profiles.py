@@ -0,0 +1,113 @@
+"""Sondeo de lectores y caché de perfiles por nombre de lector"""
+
+import json
+import unittest
+
+from tests import PROJECT_DIR  # noqa: F401  (configura sys.path)
+from tests.virtual_readers import SimCard, RecordingReader, install_readers, use_temp_reader_profiles
+from src.utils.constants import CARD_TYPE_5542
+from src.utils.reader_profiles import reader_profile_manager, DEFAULT_READER_PROFILE
+from src.core.physical_card_handler import PhysicalCardHandler
+
+READER_NAME = "Test Reader"
+
+
+class ReaderProfileManagerTest(unittest.TestCase):
+
+    def setUp(self):
+        use_temp_reader_profiles(self)
+
+    def test_unknown_reader_gets_the_defaults(self):
+        self.assertFalse(reader_profile_manager.has_profile(READER_NAME))
+        self.assertEqual(reader_profile_manager.get_profile(READER_NAME)['max_read_length'],
+                         DEFAULT_READER_PROFILE['max_read_length'])
+
+    def test_profiles_are_persisted(self):
+        reader_profile_manager.save_profile(READER_NAME, {'max_read_length': 64})
+        with open(reader_profile_manager.profiles_file, encoding='utf-8') as f:
+            self.assertEqual(json.load(f)[READER_NAME]['max_read_length'], 64)
+
+        reader_profile_manager._profiles = {}
+        reader_profile_manager._load_profiles()
+        self.assertEqual(reader_profile_manager.get_profile(READER_NAME)['max_read_length'], 64)
+
+    def test_partial_profile_does_not_count_as_probed(self):
+        reader_profile_manager.save_profile(READER_NAME, {'max_write_length': 32})
+        self.assertFalse(reader_profile_manager.has_profile(READER_NAME))
+        self.assertNotIn('probed_at', reader_profile_manager._profiles[READER_NAME])
+
+        reader_profile_manager.save_profile(READER_NAME, {'probed': True, 'max_read_length': 64})
+        self.assertTrue(reader_profile_manager.has_profile(READER_NAME))
+        self.assertEqual(reader_profile_manager.get_profile(READER_NAME)['max_write_length'], 32)
+
+    def test_forget_profile(self):
+        reader_profile_manager.save_profile(READER_NAME, {'max_read_length': 64})
+        reader_profile_manager.forget_profile(READER_NAME)
+        self.assertFalse(reader_profile_manager.has_profile(READER_NAME))
+
+
+class ReaderProbeTest(unittest.TestCase):
+
+    max_apdu_length = 64
+
+    def setUp(self):
+        self.card = SimCard(CARD_TYPE_5542)
+        self.reader = RecordingReader(READER_NAME, self.card, max_apdu_length=self.max_apdu_length)
+        install_readers(self, self.reader)
+        self.handler = PhysicalCardHandler()
+        self.assertTrue(self.handler.connect_to_reader(READER_NAME))
+
+    def test_probe_finds_the_longest_accepted_read(self):
+        success, message, profile = self.handler.probe_reader(CARD_TYPE_5542)
+        self.assertTrue(success, message)
+        self.assertEqual(profile['max_read_length'], 64)
+        self.assertEqual(self.handler.max_read_length, 64)
+        self.assertEqual(reader_profile_manager.get_profile(READER_NAME)['max_read_length'], 64)
+        self.assertFalse(any(apdu[1] in (0xD0, 0xD2) for apdu in self.reader.sent))
+
+    def test_learned_write_timings_still_need_a_probe(self):
+        data = [address & 0xFF for address in range(256)]
+        success, message, _ = self.handler.write_full_card(data, CARD_TYPE_5542)
+        self.assertTrue(success, message)
+        self.assertFalse(self.handler.has_reader_profile())
+
+        success, message, _ = self.handler.probe_reader(CARD_TYPE_5542)
+        self.assertTrue(success, message)
+        self.assertTrue(self.handler.has_reader_profile())
+
+    def test_probed_reader_is_not_probed_again(self):
+        self.handler.probe_reader(CARD_TYPE_5542)
+        self.reader.sent.clear()
+        other = PhysicalCardHandler()
+        other.connect_to_reader(READER_NAME)
+        self.assertTrue(other.has_reader_profile())
+        self.assertEqual(other.max_read_length, 64)
+        success, _, _ = other.probe_reader(CARD_TYPE_5542)
+        self.assertTrue(success)
+        self.assertEqual(self.reader.sent, [])
+
+    def test_reads_use_the_probed_length(self):
+        self.handler.probe_reader(CARD_TYPE_5542)
+        self.reader.sent.clear()
+        data, _ = self.handler.read_full_card(CARD_TYPE_5542)
+        self.assertEqual(data, self.card.memory())
+        self.assertTrue(all(apdu[4] <= 64 for apdu in self.reader.sent if apdu[1] == 0xB0))
+
+    def test_rejected_write_length_is_halved_and_remembered(self):
+        data = [(address * 3) & 0xFF for address in range(256)]
+        success, message, _ = self.handler.write_full_card(data, CARD_TYPE_5542)
+        self.assertTrue(success, message)
+        self.assertEqual(self.card.memory()[0x20:], data[0x20:])
+        self.assertLessEqual(self.handler.max_write_length, 64)
+        self.assertEqual(reader_profile_manager.get_profile(READER_NAME)['max_write_length'],
+                         self.handler.max_write_length)
+
+    def test_estimate_grows_with_the_plan(self):
+        short = self.handler.estimate_duration([(0x20, 16)])
+        long = self.handler.estimate_duration([(0x20, 128), (0xA0, 96)], write=True)
+        self.assertGreater(short, 0)
+        self.assertGreater(long, short)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+"""Generación desde un roster CSV: lectura, layout, personalización y ficheros en el pool"""
+
+import os
+import tempfile
+import unittest
+
+from tests import PROJECT_DIR  # noqa: F401  (configura sys.path)
+from src.utils.constants import CARD_TYPE_5542, CARD_TYPE_5528, ROSTER_FIELD_LAYOUT, ROSTER_PAD_BYTE
+from src.core.card_session import CardSession
+from src.core.session_manager import SessionManager
+from src.core.roster_generator import (card_names, encode_field, format_user_info, generate_card_files, parse_field,
+                                       personalize_session, read_roster, validate_layout)
+
+COLUMNS = ['Nombre', 'Apellido1', 'Apellido2', 'NumeroMatricula', 'Curso']
+
+
+def student(number, name="Ana", surname="Núñez"):
+    return {'Nombre': name, 'Apellido1': surname, 'Apellido2': "Gil", 'NumeroMatricula': number, 'Curso': "1A"}
+
+
+class RosterParsingTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def write(self, text):
+        path = os.path.join(self.directory, "roster.csv")
+        with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+            f.write(text)
+        return path
+
+    def test_semicolons_bom_and_blank_lines(self):
+        path = self.write("Nombre;NumeroMatricula\r\n Ana ;A001\r\n;\r\nLuis;A002\r\n")
+        self.assertEqual(read_roster(path), [{'Nombre': "Ana", 'NumeroMatricula': "A001"},
+                                             {'Nombre': "Luis", 'NumeroMatricula': "A002"}])
+
+    def test_empty_file_has_no_header(self):
+        with self.assertRaises(ValueError):
+            read_roster(self.write(""))
+
+    def test_parse_field(self):
+        self.assertEqual(parse_field("Nombre=0x20:32"), ("Nombre", 0x20, 32))
+        with self.assertRaisesRegex(ValueError, "COLUMN=ADDRESS:LENGTH"):
+            parse_field("Nombre=0x20")
+
+
+class LayoutAndEncodingTest(unittest.TestCase):
+
+    def test_default_layout_fits_both_cards(self):
+        for card_type in (CARD_TYPE_5542, CARD_TYPE_5528):
+            self.assertTrue(validate_layout(ROSTER_FIELD_LAYOUT, card_type, set(COLUMNS))[0])
+
+    def test_invalid_layouts(self):
+        success, message = validate_layout({'Nombre': (0x20, 8)}, CARD_TYPE_5542, {'Curso'})
+        self.assertFalse(success)
+        self.assertIn("missing column", message)
+        self.assertFalse(validate_layout({'Nombre': (0xF0, 32)}, CARD_TYPE_5542, {'Nombre'})[0])
+        success, message = validate_layout({'Nombre': (0x20, 8), 'Curso': (0x24, 4)}, CARD_TYPE_5542,
+                                           {'Nombre', 'Curso'})
+        self.assertIn("overlap", message)
+
+    def test_encode_field(self):
+        self.assertEqual(encode_field("Núñez", 6), (list(b"Nunez") + [ROSTER_PAD_BYTE], False))
+        self.assertEqual(encode_field("Fernández", 4), (list(b"Fern"), True))
+
+    def test_card_names_are_unique_and_safe(self):
+        rows = [student("A 001"), student("A 001"), student("Ñ/2")]
+        self.assertEqual(card_names(rows, "{NumeroMatricula}"), ["A_001", "A_001_2", "N_2"])
+        with self.assertRaisesRegex(ValueError, "unknown column"):
+            card_names(rows, "{Grupo}")
+
+
+class PersonalizeTest(unittest.TestCase):
+
+    def test_fields_and_user_info(self):
+        session = CardSession("Template", CARD_TYPE_5528)
+        self.addCleanup(session.cleanup)
+        warnings = personalize_session(session, student("A001", name="Maximiliano" * 4), ROSTER_FIELD_LAYOUT)
+
+        self.assertEqual(warnings, ["Nombre truncated to 32 bytes"])
+        self.assertEqual(bytes(session.memory_manager.read_memory(0x40, 5)), b"Nunez")
+        self.assertEqual(bytes(session.memory_manager.read_memory(0x80, 4)), b"A001")
+        self.assertEqual(session.user_info, format_user_info(student("A001", name="Maximiliano" * 4)))
+        self.assertIn("NumeroMatricula: A001", session.user_info)
+
+
+class GenerateCardFilesTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.output_dir = directory.name
+        self.template = CardSession("Template", CARD_TYPE_5542)
+        self.addCleanup(self.template.cleanup)
+        self.template.memory_manager.write_memory(0xC0, [0xAB])
+
+    def test_files_are_written_by_the_pool(self):
+        rows = [student("A001"), student("A002", name="Luis")]
+        results = sorted(generate_card_files(self.template, rows, self.output_dir, workers=2),
+                         key=lambda result: result['row'])
+        self.assertEqual([(result['card_name'], result['success']) for result in results],
+                         [("A001", True), ("A002", True)])
+
+        manager = SessionManager(max_resident_sessions=None, hibernate_after_seconds=None)
+        self.addCleanup(manager.close_all_sessions)
+        card, message = manager.open_card_from_file(results[1]['file'], "A002")
+        self.assertIsNotNone(card, message)
+        self.assertEqual(bytes(card.memory_manager.read_memory(0x20, 4)), b"Luis")
+        self.assertEqual(card.memory_manager.read_memory(0xC0, 1), [0xAB])
+
+    def test_existing_files_are_not_overwritten(self):
+        open(os.path.join(self.output_dir, "A001.txt"), 'w').close()
+        with self.assertRaises(FileExistsError):
+            list(generate_card_files(self.template, [student("A001")], self.output_dir))
+
+    def test_invalid_layout_is_rejected_before_starting(self):
+        with self.assertRaisesRegex(ValueError, "missing column"):
+            list(generate_card_files(self.template, [{'Nombre': "Ana"}], self.output_dir))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,222 @@
+"""Snapshots e hibernación: una sesión rehidratada debe ser idéntica a la original"""
+
+import os
+import threading
+import time
+import unittest
+from unittest import mock
+
+from tests import PROJECT_DIR  # noqa: F401  (configura sys.path)
+from src.utils.constants import CARD_TYPE_5542, CARD_TYPE_5528, DEFAULT_PSC_5528
+from src.core.card_session import CardSession
+from src.core.session_hibernation import HibernatedSession, hibernate_session, rehydrate_session
+from src.core import session_manager
+from src.core.session_manager import SessionManager
+
+
+def prepared_session(card_type=CARD_TYPE_5528):
+    """Sesión con memoria, protección, PSC, error counter y log modificados"""
+    session = CardSession("Prepared", card_type)
+    session.execute_select_card()
+    session.execute_present_psc([0x00, 0x00])  # Falla: baja el error counter
+    session.execute_present_psc(list(DEFAULT_PSC_5528))
+    session.execute_write_memory(0x20, [0x10, 0x20, 0x30])
+    session.execute_write_memory(0x3F0, [0xFE])
+    session.memory_manager.set_protection_bit(0x21)
+    session.memory_manager.set_internal_psc([0x12, 0x34])
+    session.user_info = "Nombre: Ana"
+    return session
+
+
+def session_state(session):
+    """Lo que debe sobrevivir a un snapshot"""
+    memory_manager = session.memory_manager
+    return {
+        'session_id': session.session_id,
+        'card_name': session.card_name,
+        'card_type': session.card_type,
+        'created_at': session.created_at,
+        'memory': memory_manager.get_memory_dump(),
+        'protection': set(memory_manager.protection_data or ()),
+        'modified': set(memory_manager.modified_addresses),
+        'psc': memory_manager.get_current_psc(),
+        'error_counter': memory_manager.get_error_counter(),
+        'apdu_error_counter': session.apdu_handler.error_counter,
+        'psc_verified': session.psc_verified,
+        'card_selected': session.card_selected,
+        'user_info': session.user_info,
+        'command_log': list(session.command_log),
+    }
+
+
+class SnapshotTest(unittest.TestCase):
+
+    def test_snapshot_round_trip(self):
+        for card_type in (CARD_TYPE_5542, CARD_TYPE_5528):
+            with self.subTest(card_type=card_type):
+                session = CardSession("Card", card_type)
+                session.execute_select_card()
+                session.memory_manager.write_memory(0x30, [0x01, 0x02])
+                restored = CardSession.from_snapshot(session.to_snapshot())
+                try:
+                    self.assertEqual(session_state(restored), session_state(session))
+                finally:
+                    session.cleanup()
+                    restored.cleanup()
+
+    def test_hibernate_and_rehydrate(self):
+        session = prepared_session()
+        expected = session_state(session)
+
+        stub = hibernate_session(session)
+        self.assertIsInstance(stub, HibernatedSession)
+        self.assertTrue(os.path.exists(stub.snapshot_file))
+        self.assertEqual((stub.session_id, stub.card_name), (expected['session_id'], expected['card_name']))
+
+        restored = rehydrate_session(stub)
+        try:
+            self.assertIsNotNone(restored)
+            self.assertEqual(session_state(restored), expected)
+            self.assertFalse(os.path.exists(stub.snapshot_file))
+        finally:
+            restored.cleanup()
+
+    def test_rehydrated_session_keeps_working(self):
+        restored = rehydrate_session(hibernate_session(prepared_session()))
+        try:
+            result = restored.execute_write_memory(0x22, [0x77])
+            self.assertTrue(result['success'])
+            self.assertEqual(restored.memory_manager.read_memory(0x20, 3), [0x10, 0x20, 0x77])
+        finally:
+            restored.cleanup()
+
+    def test_snapshot_of_a_clone_is_independent(self):
+        template = prepared_session()
+        copy = template.clone("Copy")
+        restored = rehydrate_session(hibernate_session(copy))
+        try:
+            restored.memory_manager.write_memory(0x20, [0xEE])
+            self.assertEqual(template.memory_manager.read_memory(0x20, 1), [0x10])
+        finally:
+            template.cleanup()
+            restored.cleanup()
+
+
+class SessionManagerHibernationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.manager = SessionManager(max_resident_sessions=1, hibernate_after_seconds=None)
+
+    def tearDown(self):
+        self.manager.close_all_sessions()
+
+    def test_least_recently_used_sessions_are_hibernated(self):
+        first, _ = self.manager.create_new_card_session("First", CARD_TYPE_5542)
+        first.memory_manager.write_memory(0x40, [0xAB])
+        second, _ = self.manager.create_new_card_session("Second", CARD_TYPE_5542)
+
+        self.assertTrue(self.manager.is_session_hibernated(first.session_id))
+        self.assertFalse(self.manager.is_session_hibernated(second.session_id))
+        self.assertIsInstance(self.manager.get_all_sessions()[0], HibernatedSession)
+
+    def test_get_session_rehydrates_transparently(self):
+        first, _ = self.manager.create_new_card_session("First", CARD_TYPE_5542)
+        first.memory_manager.write_memory(0x40, [0xAB])
+        expected = session_state(first)
+        self.manager.create_new_card_session("Second", CARD_TYPE_5542)
+
+        restored = self.manager.get_session(first.session_id)
+        self.assertIsInstance(restored, CardSession)
+        self.assertEqual(session_state(restored), expected)
+        self.assertIs(self.manager.get_session_by_name("First"), restored)
+        self.assertFalse(self.manager.is_session_hibernated(first.session_id))
+
+    def test_active_session_stays_resident(self):
+        first, _ = self.manager.create_new_card_session("First", CARD_TYPE_5542)
+        self.manager.create_new_card_session("Second", CARD_TYPE_5542)
+        self.manager.set_active_session(first.session_id)
+        self.manager.hibernate_inactive_sessions()
+        self.assertEqual(self.manager.active_session_id, first.session_id)
+        self.assertFalse(self.manager.is_session_hibernated(first.session_id))
+
+    def test_pinned_sessions_stay_resident(self):
+        first, _ = self.manager.create_new_card_session("First", CARD_TYPE_5542)
+        self.manager.pinned_session_ids.add(first.session_id)
+        second, _ = self.manager.create_new_card_session("Second", CARD_TYPE_5542)
+        self.assertFalse(self.manager.is_session_hibernated(first.session_id))
+        self.assertFalse(self.manager.is_session_hibernated(second.session_id))
+
+        self.manager.close_session(first.session_id)
+        self.assertNotIn(first.session_id, self.manager.pinned_session_ids)
+
+    def test_idle_sessions_are_hibernated_after_the_timeout(self):
+        manager = SessionManager(max_resident_sessions=None, hibernate_after_seconds=60)
+        try:
+            first, _ = manager.create_new_card_session("First", CARD_TYPE_5542)
+            second, _ = manager.create_new_card_session("Second", CARD_TYPE_5542)
+            manager.hibernate_inactive_sessions(now=time.monotonic() + 30)
+            self.assertFalse(manager.is_session_hibernated(first.session_id))
+            manager.hibernate_inactive_sessions(now=time.monotonic() + 120)
+            self.assertTrue(manager.is_session_hibernated(first.session_id))
+            self.assertFalse(manager.is_session_hibernated(second.session_id))
+        finally:
+            manager.close_all_sessions()
+
+    def test_memory_dump_does_not_rehydrate(self):
+        first, _ = self.manager.create_new_card_session("First", CARD_TYPE_5542)
+        first.memory_manager.write_memory(0x40, [0xAB])
+        expected = first.memory_manager.get_memory_dump()
+        second, _ = self.manager.create_new_card_session("Second", CARD_TYPE_5542)
+
+        self.assertEqual(self.manager.get_memory_dump(first.session_id), expected)
+        self.assertTrue(self.manager.is_session_hibernated(first.session_id))
+        self.assertTrue(os.path.exists(self.manager.sessions[first.session_id].snapshot_file))
+        self.assertEqual(self.manager.get_memory_dump(second.session_id),
+                         second.memory_manager.get_memory_dump())
+        self.assertIsNone(self.manager.get_memory_dump("missing"))
+
+    def test_sessions_used_from_other_threads_wait_for_hibernation(self):
+        manager = SessionManager(max_resident_sessions=None, hibernate_after_seconds=60)
+        self.addCleanup(manager.close_all_sessions)
+        first, _ = manager.create_new_card_session("First", CARD_TYPE_5542)
+        manager.create_new_card_session("Second", CARD_TYPE_5542)
+
+        hibernating, release = threading.Event(), threading.Event()
+        real_hibernate = session_manager.hibernate_session
+
+        def slow_hibernate(session):
+            hibernating.set()
+            release.wait(5.0)
+            return real_hibernate(session)
+
+        with mock.patch.object(session_manager, 'hibernate_session', slow_hibernate):
+            hibernation = threading.Thread(target=manager.hibernate_inactive_sessions,
+                                           args=(time.monotonic() + 120,))
+            hibernation.start()
+            hibernating.wait(5.0)
+            used = []
+            user = threading.Thread(target=lambda: used.append(manager.get_session(first.session_id)))
+            user.start()
+            user.join(0.05)
+            self.assertTrue(user.is_alive(), "get_session did not wait for the hibernation")
+            release.set()
+            hibernation.join(5.0)
+            user.join(5.0)
+
+        # El hilo recibe la sesión rehidratada, no la que se acaba de hibernar
+        self.assertIs(used[0], manager.sessions[first.session_id])
+        self.assertFalse(manager.is_session_hibernated(first.session_id))
+
+    def test_closing_a_hibernated_session_removes_its_snapshot(self):
+        first, _ = self.manager.create_new_card_session("First", CARD_TYPE_5542)
+        self.manager.create_new_card_session("Second", CARD_TYPE_5542)
+        snapshot_file = self.manager.sessions[first.session_id].snapshot_file
+        self.assertTrue(os.path.exists(snapshot_file))
+
+        self.assertTrue(self.manager.close_session(first.session_id))
+        self.assertFalse(os.path.exists(snapshot_file))
+        self.assertEqual([session.card_name for session in self.manager.get_all_sessions()], ["Second"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+"""Registro de sesiones: índice por nombre y operaciones en bloque"""
+
+import unittest
+
+from tests import PROJECT_DIR  # noqa: F401  (configura sys.path)
+from src.utils.constants import CARD_TYPE_5542, CARD_TYPE_5528
+from src.core.session_manager import SessionManager
+
+
+class SessionRegistryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.manager = SessionManager(max_resident_sessions=None, hibernate_after_seconds=None)
+
+    def tearDown(self):
+        self.manager.close_all_sessions()
+
+    def test_duplicate_names_are_rejected(self):
+        session, _ = self.manager.create_new_card_session("Card", CARD_TYPE_5542)
+        self.assertIsNotNone(session)
+        duplicate, message = self.manager.create_new_card_session("Card", CARD_TYPE_5528)
+        self.assertIsNone(duplicate)
+        self.assertIn("already exists", message)
+
+    def test_lookup_by_name(self):
+        session, _ = self.manager.create_new_card_session("Card", CARD_TYPE_5542)
+        self.assertTrue(self.manager.has_session_name("Card"))
+        self.assertIs(self.manager.get_session_by_name("Card"), session)
+        self.assertIsNone(self.manager.get_session_by_name("Missing"))
+
+    def test_closed_names_can_be_reused(self):
+        session, _ = self.manager.create_new_card_session("Card", CARD_TYPE_5542)
+        self.assertTrue(self.manager.close_session(session.session_id))
+        self.assertFalse(self.manager.has_session_name("Card"))
+        self.assertIsNone(self.manager.active_session_id)
+        again, _ = self.manager.create_new_card_session("Card", CARD_TYPE_5542)
+        self.assertIsNotNone(again)
+
+    def test_sessions_are_listed_in_creation_order(self):
+        names = ["C", "A", "B"]
+        for name in names:
+            self.manager.create_new_card_session(name, CARD_TYPE_5542)
+        self.assertEqual([session.card_name for session in self.manager.get_all_sessions()], names)
+
+
+class BulkOperationsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.manager = SessionManager(max_resident_sessions=None, hibernate_after_seconds=None)
+
+    def tearDown(self):
+        self.manager.close_all_sessions()
+
+    def test_create_many_keeps_the_active_session(self):
+        active, _ = self.manager.create_new_card_session("Active", CARD_TYPE_5542)
+        created, errors = self.manager.create_many(["Card 1", "Card 2", "Card 3"], CARD_TYPE_5528)
+
+        self.assertEqual([session.card_name for session in created], ["Card 1", "Card 2", "Card 3"])
+        self.assertEqual(errors, [])
+        self.assertTrue(all(session.card_type == CARD_TYPE_5528 for session in created))
+        self.assertEqual(self.manager.active_session_id, active.session_id)
+
+    def test_create_many_reports_duplicates(self):
+        self.manager.create_new_card_session("Card 1", CARD_TYPE_5542)
+        created, errors = self.manager.create_many(["Card 1", "Card 2"])
+        self.assertEqual([session.card_name for session in created], ["Card 2"])
+        self.assertEqual([name for name, _ in errors], ["Card 1"])
+
+    def test_close_many(self):
+        created, _ = self.manager.create_many(["A", "B", "C"])
+        self.manager.set_active_session(created[1].session_id)
+
+        closed = self.manager.close_many([created[0].session_id, created[1].session_id, "unknown"])
+        self.assertEqual(closed, 2)
+        self.assertIsNone(self.manager.active_session_id)
+        self.assertEqual([session.card_name for session in self.manager.get_all_sessions()], ["C"])
+        self.assertFalse(self.manager.has_session_name("A"))
+
+    def test_bulk_creation_respects_the_resident_limit(self):
+        manager = SessionManager(max_resident_sessions=2, hibernate_after_seconds=None)
+        try:
+            created, _ = manager.create_many([f"Card {index}" for index in range(5)])
+            hibernated = [manager.is_session_hibernated(session.session_id) for session in created]
+            self.assertEqual(hibernated, [True, True, True, False, False])
+            self.assertTrue(manager.has_session_name("Card 0"))
+        finally:
+            manager.close_all_sessions()
+
+
+if __name__ == "__main__":
+    unittest.main()
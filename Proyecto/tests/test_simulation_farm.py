@@ -0,0 +1,72 @@
+"""Granja de simulación: guiones de APDUs, carga aleatoria y suma entre procesos"""
+
+import random
+import unittest
+
+from tests import PROJECT_DIR  # noqa: F401  (configura sys.path)
+from src.utils.constants import CARD_TYPE_5542, CARD_TYPE_5528
+from src.core.simulation_farm import (USER_AREA, format_report, parse_script, random_transaction, run_farm,
+                                      run_worker)
+
+SCRIPT = """
+# Selección y PSC por defecto
+FF A4 00 00 01 06
+FF 20 00 00 03 FF FF FF => 90 07
+FF B0 00 20 10
+"""
+
+
+class ParseScriptTest(unittest.TestCase):
+
+    def test_comments_and_expected_sw(self):
+        steps = parse_script(SCRIPT)
+        self.assertEqual(len(steps), 3)
+        self.assertEqual(steps[0], ([0xFF, 0xA4, 0x00, 0x00, 0x01, 0x06], None))
+        self.assertEqual(steps[1][1], (0x90, 0x07))
+
+    def test_invalid_lines(self):
+        with self.assertRaisesRegex(ValueError, "Line 2"):
+            parse_script("FF A4 00 00\nFF ZZ")
+        with self.assertRaisesRegex(ValueError, "2 bytes"):
+            parse_script("FF B0 00 20 10 => 90")
+
+
+class RandomWorkloadTest(unittest.TestCase):
+
+    def test_writes_stay_in_the_user_area(self):
+        rng = random.Random(1)
+        for card_type in (CARD_TYPE_5542, CARD_TYPE_5528):
+            start, end = USER_AREA[card_type]
+            for _ in range(50):
+                for apdu, _ in random_transaction(rng, card_type):
+                    if apdu[1] == 0xD0:
+                        address = (apdu[2] << 8) | apdu[3]
+                        self.assertGreaterEqual(address, start)
+                        self.assertLessEqual(address + apdu[4], end)
+
+    def test_seeded_worker_runs_without_errors(self):
+        result = run_worker(0, 4, 'mixed', iterations=3, seed=7)
+        self.assertEqual(result['errors'], 0, result['first_errors'])
+        self.assertGreater(result['apdus'], 4 * 3 * 2)
+        self.assertEqual(sum(histogram.count for histogram in result['histograms'].values()), result['apdus'])
+
+    def test_script_expectations_are_checked(self):
+        steps = parse_script(SCRIPT.replace("=> 90 07", "=> 90 00"))
+        result = run_worker(0, 2, '5542', iterations=2, script=steps)
+        self.assertEqual((result['apdus'], result['errors']), (12, 4))
+        self.assertTrue(result['first_errors'][0].startswith("FF 20 00 00 03"))
+
+
+class RunFarmTest(unittest.TestCase):
+
+    def test_results_are_merged_across_processes(self):
+        report = run_farm(2, 3, '5542', iterations=2, script=parse_script(SCRIPT), seed=1)
+        self.assertEqual((report['workers'], report['sessions']), (2, 6))
+        self.assertEqual((report['apdus'], report['errors']), (36, 0))
+        self.assertEqual(report['by_command']['READ']['count'], 12)
+        self.assertEqual([row['worker'] for row in report['per_worker']], [0, 1])
+        self.assertIn("worker 1:", format_report(report))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,194 @@
+"""Servidor vpcd: sesiones abiertas expuestas como lectores PC/SC por TCP local"""
+
+import socket
+import time
+import unittest
+
+from tests import PROJECT_DIR  # noqa: F401  (configura sys.path)
+from src.utils.constants import CARD_TYPE_5542, CARD_TYPE_5528, DEFAULT_PSC_5542, VPCD_HOST
+from src.core.card_session import CardSession
+from src.core.session_manager import SessionManager
+from src.core.vpcd_server import VpcdServer, VPCD_GET_ATR, VPCD_RESET
+
+
+def free_port_range(count):
+    """Primer puerto de count puertos consecutivos libres"""
+    for _ in range(20):
+        with socket.socket() as probe:
+            probe.bind((VPCD_HOST, 0))
+            base = probe.getsockname()[1]
+        if base + count > 65535:
+            continue
+        try:
+            sockets = []
+            for port in range(base, base + count):
+                sock = socket.socket()
+                sockets.append(sock)
+                sock.bind((VPCD_HOST, port))
+            return base
+        except OSError:
+            continue
+        finally:
+            for sock in sockets:
+                sock.close()
+    raise RuntimeError("no free ports")
+
+
+class VpcdClient:
+    """Cliente con el protocolo de vpcd: mensajes con la longitud en 2 bytes big-endian"""
+
+    def __init__(self, port):
+        self.sock = socket.create_connection((VPCD_HOST, port), timeout=5)
+
+    def send(self, message):
+        self.sock.sendall(len(message).to_bytes(2, 'big') + bytes(message))
+
+    def receive(self):
+        length = int.from_bytes(self._read(2), 'big')
+        return list(self._read(length))
+
+    def exchange(self, message):
+        self.send(message)
+        return self.receive()
+
+    def _read(self, count):
+        data = b""
+        while len(data) < count:
+            chunk = self.sock.recv(count - len(data))
+            if not chunk:
+                raise ConnectionError("server closed the connection")
+            data += chunk
+        return data
+
+    def close(self):
+        self.sock.close()
+
+
+class VpcdServerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.sessions = [CardSession("Card A", CARD_TYPE_5542), CardSession("Card B", CARD_TYPE_5528)]
+        self.server = VpcdServer(base_port=free_port_range(len(self.sessions)))
+        for session in self.sessions:
+            self.server.add_session(session)
+        success, message = self.server.start()
+        self.assertTrue(success, message)
+        self.clients = []
+
+    def tearDown(self):
+        for client in self.clients:
+            client.close()
+        self.server.stop()
+        for session in self.sessions:
+            session.cleanup()
+
+    def connect(self, slot):
+        client = VpcdClient(self.server.slots[slot].port)
+        self.clients.append(client)
+        return client
+
+    def test_each_slot_answers_with_its_own_atr(self):
+        atrs = [self.connect(slot).exchange([VPCD_GET_ATR]) for slot in range(2)]
+        self.assertEqual([atr[2] for atr in atrs], [0xA2, 0x92])
+
+    def test_apdus_read_and_write_the_session(self):
+        client = self.connect(0)
+        self.sessions[0].memory_manager.write_memory(0x40, [0x12])
+        self.assertEqual(client.exchange([0xFF, 0xA4, 0x00, 0x00, 0x01, 0x06]), [0x90, 0x00])
+
+        page = client.exchange([0xFF, 0xB0, 0x00, 0x00, 0x00])  # Le = 00: página completa
+        self.assertEqual(len(page), 256 + 2)
+        self.assertEqual(page[0x40], 0x12)
+
+        client.exchange([0xFF, 0x20, 0x00, 0x00, 0x03] + list(DEFAULT_PSC_5542))
+        self.assertEqual(client.exchange([0xFF, 0xD0, 0x00, 0x50, 0x01, 0x77]), [0x90, 0x00])
+        self.assertEqual(self.sessions[0].memory_manager.read_memory(0x50, 1), [0x77])
+
+    def test_reset_drops_the_presented_psc(self):
+        client = self.connect(0)
+        client.exchange([0xFF, 0x20, 0x00, 0x00, 0x03] + list(DEFAULT_PSC_5542))
+        client.send([VPCD_RESET])
+        self.assertEqual(client.exchange([0xFF, 0xD0, 0x00, 0x50, 0x01, 0x77]), [0x69, 0x82])
+
+    def test_status_reports_connections_and_apdus(self):
+        client = self.connect(1)
+        client.exchange([0xFF, 0xA4, 0x00, 0x00, 0x01, 0x05])
+        status = self.server.get_status()
+        self.assertEqual([(row['label'], row['card_type']) for row in status],
+                         [("Card A", CARD_TYPE_5542), ("Card B", CARD_TYPE_5528)])
+        self.assertEqual([row['connected'] for row in status], [False, True])
+        self.assertEqual(status[1]['apdu_count'], 1)
+
+        client.close()
+        self.clients.remove(client)
+        deadline = time.monotonic() + 5
+        while self.server.get_status()[1]['connected'] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertFalse(self.server.get_status()[1]['connected'])
+
+    def test_slots_cannot_change_while_running(self):
+        self.assertFalse(self.server.start()[0])
+        with self.assertRaises(RuntimeError):
+            self.server.add_session(self.sessions[0])
+        self.server.stop()
+        self.assertFalse(self.server.is_running())
+        self.server.clear_slots()
+        self.assertEqual(self.server.start(), (False, "No cards to share"))
+
+
+class ManagedSessionSlotTest(unittest.TestCase):
+    """Las sesiones del gestor solo se rehidratan y fijan mientras hay un cliente conectado"""
+
+    def setUp(self):
+        self.manager = SessionManager(max_resident_sessions=1, hibernate_after_seconds=None)
+        self.addCleanup(self.manager.close_all_sessions)
+        self.shared, _ = self.manager.create_new_card_session("Shared", CARD_TYPE_5542)
+        self.shared.memory_manager.write_memory(0x40, [0x12])
+        self.manager.create_new_card_session("Other", CARD_TYPE_5528)
+        self.session_id = self.shared.session_id
+        self.assertTrue(self.manager.is_session_hibernated(self.session_id))
+
+        self.server = VpcdServer(base_port=free_port_range(1))
+        self.server.add_managed_session(self.manager, self.manager.get_all_sessions()[0])
+        success, message = self.server.start()
+        self.assertTrue(success, message)
+        self.addCleanup(self.server.stop)
+
+    def connect(self):
+        client = VpcdClient(self.server.slots[0].port)
+        self.addCleanup(client.close)
+        return client
+
+    def wait_until_disconnected(self):
+        deadline = time.monotonic() + 5
+        while self.server.get_status()[0]['connected'] and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def test_session_is_pinned_only_while_a_client_is_connected(self):
+        self.assertEqual(self.server.get_status()[0]['card_type'], CARD_TYPE_5542)
+        self.assertTrue(self.manager.is_session_hibernated(self.session_id))
+
+        client = self.connect()
+        client.exchange([0xFF, 0xA4, 0x00, 0x00, 0x01, 0x06])
+        page = client.exchange([0xFF, 0xB0, 0x00, 0x00, 0x00])
+        self.assertEqual(page[0x40], 0x12)
+        self.assertFalse(self.manager.is_session_hibernated(self.session_id))
+        self.assertIn(self.session_id, self.manager.pinned_session_ids)
+        self.assertEqual(self.manager.hibernate_inactive_sessions(), 0)
+
+        client.close()
+        self.wait_until_disconnected()
+        self.assertNotIn(self.session_id, self.manager.pinned_session_ids)
+        self.assertEqual(self.manager.hibernate_inactive_sessions(), 1)
+        self.assertTrue(self.manager.is_session_hibernated(self.session_id))
+
+    def test_closed_session_refuses_the_connection(self):
+        self.manager.close_session(self.session_id)
+        client = self.connect()
+        with self.assertRaises(ConnectionError):
+            client.exchange([VPCD_GET_ATR])
+        self.assertNotIn(self.session_id, self.manager.pinned_session_ids)
+
+
+if __name__ == "__main__":
+    unittest.main()
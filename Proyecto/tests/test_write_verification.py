@@ -0,0 +1,77 @@
+"""Verificación tras escribir: se releen solo los rangos escritos y se comparan por hash"""
+
+import unittest
+
+from tests import PROJECT_DIR  # noqa: F401  (configura sys.path)
+from tests.virtual_readers import SimCard, RecordingReader, install_readers
+from src.utils.constants import CARD_TYPE_5542
+from src.core.physical_card_handler import PhysicalCardHandler
+
+
+def image(seed=0):
+    return [(address * 7 + seed) & 0xFF for address in range(256)]
+
+
+class WriteVerificationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.card = SimCard(CARD_TYPE_5542)
+        self.reader = RecordingReader("Test Reader", self.card)
+        install_readers(self, self.reader)
+        self.handler = PhysicalCardHandler()
+        self.assertTrue(self.handler.connect_to_reader("Test Reader"))
+
+    def reads(self):
+        return [((apdu[2] << 8) | apdu[3], apdu[4]) for apdu in self.reader.sent if apdu[1] == 0xB0]
+
+    def test_full_write_rereads_the_user_area(self):
+        success, message, _ = self.handler.write_full_card(image(), CARD_TYPE_5542, verify=True)
+        self.assertTrue(success, message)
+        self.assertIn("Verification OK", message)
+        covered = [address for start, length in self.reads() for address in range(start, start + length)]
+        self.assertEqual(covered, list(range(0x20, 0x100)))
+        self.assertEqual(self.handler.last_mismatches, [])
+
+    def test_differential_write_rereads_only_the_changed_ranges(self):
+        data = image()
+        self.handler.write_full_card(data, CARD_TYPE_5542)
+        self.reader.sent.clear()
+        data[0x40] ^= 0xFF
+        data[0xA0] ^= 0xFF
+        success, message, _ = self.handler.write_card_differential(data, CARD_TYPE_5542, verify=True)
+        self.assertTrue(success, message)
+        self.assertIn("(verified)", message)
+        self.assertEqual(self.reads(), [(0x40, 1), (0xA0, 1)])
+
+    def test_ignored_bytes_are_reported(self):
+        self.card.memory_manager.set_protection_bit(0x50)  # La tarjeta ignora la escritura sin error
+        self.card.memory_manager.set_protection_bit(0x51)
+        success, message, _ = self.handler.write_full_card(image(1), CARD_TYPE_5542, verify=True)
+        self.assertFalse(success)
+        self.assertIn("0x050, 0x051", message)
+        self.assertEqual(self.handler.last_mismatches, [0x50, 0x51])
+
+    def test_failed_verification_drops_the_cached_image(self):
+        self.card.memory_manager.set_protection_bit(0x50)
+        self.handler.write_full_card(image(1), CARD_TYPE_5542, verify=True)
+        self.reader.sent.clear()
+        self.handler.write_card_differential(image(1), CARD_TYPE_5542)
+        self.assertTrue(self.reads(), "the card should be read again")
+
+    def test_verify_card_reads_the_user_area(self):
+        data = image(2)
+        self.handler.write_full_card(data, CARD_TYPE_5542)
+        self.reader.sent.clear()
+        success, message, mismatches = self.handler.verify_card(data, CARD_TYPE_5542)
+        self.assertTrue(success, message)
+        self.assertEqual(mismatches, [])
+        self.assertTrue(all(address >= 0x20 for address, _ in self.reads()))
+
+        data[0x80] ^= 0xFF
+        success, _, mismatches = self.handler.verify_card(data, CARD_TYPE_5542)
+        self.assertFalse(success)
+        self.assertEqual(mismatches, [0x80])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+"""
+Lectores virtuales para las pruebas de PhysicalCardHandler
+
+Usan VirtualTransport sin esperas reales y registran las APDUs que recibe cada
+lector. Los perfiles de lector de cada prueba se guardan en un directorio temporal.
+"""
+
+import tempfile
+from pathlib import Path
+
+from tests import PROJECT_DIR  # noqa: F401  (configura sys.path)
+from src.utils.reader_profiles import reader_profile_manager
+from src.utils.constants import CARD_TYPE_5542
+from src.core import physical_card_handler
+from src.core.card_transport import VirtualCard, VirtualConnection, VirtualReader, VirtualTransport
+
+
+class SimCard(VirtualCard):
+    """Tarjeta virtual con acceso directo a toda su memoria"""
+
+    def __init__(self, card_type=CARD_TYPE_5542):
+        super().__init__(card_type)
+
+    def memory(self):
+        return self.memory_manager.read_memory(0, self.memory_manager.get_memory_size())
+
+
+class RecordingConnection(VirtualConnection):
+
+    def connect(self):
+        super().connect()
+        self.reader.connects += 1
+
+    def transmit(self, apdu):
+        self._check_card()
+        self.reader.sent.append(list(apdu))
+        return super().transmit(apdu)
+
+
+class RecordingReader(VirtualReader):
+    """Lector virtual sin esperas que registra en sent las APDUs transmitidas"""
+
+    def __init__(self, name, card=None, max_apdu_length=255):
+        super().__init__(name, card, {'realtime': False, 'max_apdu_length': max_apdu_length})
+        self.sent = []
+        self.connects = 0
+
+    def createConnection(self):
+        return RecordingConnection(self)
+
+    def writes(self):
+        """(dirección, longitud) de las APDUs WRITE MEMORY enviadas"""
+        return [((apdu[2] << 8) | apdu[3], apdu[4]) for apdu in self.sent if apdu[1] == 0xD0]
+
+
+def use_temp_reader_profiles(test_case):
+    """Guarda los perfiles de lector de una prueba en un directorio temporal"""
+    profiles_dir = tempfile.TemporaryDirectory()
+    saved = (reader_profile_manager.config_dir, reader_profile_manager.profiles_file,
+             reader_profile_manager._profiles)
+    reader_profile_manager.config_dir = Path(profiles_dir.name)
+    reader_profile_manager.profiles_file = reader_profile_manager.config_dir / "reader_profiles.json"
+    reader_profile_manager._profiles = {}
+
+    def restore():
+        (reader_profile_manager.config_dir, reader_profile_manager.profiles_file,
+         reader_profile_manager._profiles) = saved
+        profiles_dir.cleanup()
+    test_case.addCleanup(restore)
+
+
+def restore_reader_profiles_file(test_case):
+    """
+    Deja el fichero de perfiles del proyecto como estaba al terminar la prueba
+    (el proceso de E/S de lectores no usa el directorio temporal y guarda en él)
+    """
+    profiles_file = reader_profile_manager.profiles_file
+    saved = profiles_file.read_bytes() if profiles_file.exists() else None
+    created_dir = not profiles_file.parent.exists()
+
+    def restore():
+        if saved is not None:
+            profiles_file.write_bytes(saved)
+            return
+        profiles_file.unlink(missing_ok=True)
+        if created_dir and profiles_file.parent.exists() and not any(profiles_file.parent.iterdir()):
+            profiles_file.parent.rmdir()
+    test_case.addCleanup(restore)
+
+
+def install_readers(test_case, *readers):
+    """Usa un VirtualTransport con los lectores indicados durante una prueba"""
+    use_temp_reader_profiles(test_case)
+    transport = VirtualTransport()
+    transport.readers.extend(readers)
+    saved = physical_card_handler.get_transport()
+    physical_card_handler.set_transport(transport)
+    test_case.addCleanup(physical_card_handler.set_transport, saved)
+    return transport